@@ -5,10 +5,14 @@ This module sets up the DataDiVR-Backend application, configures static file ser
 loads event handlers and route handlers, and sets up the WebSocket endpoint.
 """
 
+import os
+
 from dotenv import load_dotenv
 
 from server_components import (
+    add_backplane,
     add_custom_static_folder,
+    add_job_manager,
     add_static_files,
     add_websocket_endpoint,
     create_fastapi_app,
@@ -44,10 +48,20 @@ def create_app():
     # TODO: load_custom_event_handlers(app, '/project_files/handlers/')
 
     add_websocket_endpoint(app)  # websocket server
+    add_backplane(app)  # connect to the websocket managers of other workers
+    add_job_manager(app)  # stop background jobs on shutdown
     return app
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(create_app(), host="0.0.0.0", port=8000)
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        # workers need a shared backplane so broadcasts reach all clients
+        os.environ.setdefault("WS_BACKPLANE", "unix")
+        uvicorn.run(
+            "app:create_app", factory=True, host="0.0.0.0", port=8000, workers=workers
+        )
+    else:
+        uvicorn.run(create_app(), host="0.0.0.0", port=8000)
@@ -0,0 +1,129 @@
+"""
+Aggregation benchmark for the DataDiVR-Backend.
+
+This script measures how many numbers per second the /sum route and the
+/aggregate route (JSON and float64 bodies) process, in-process through the
+ASGI app, for growing input sizes, and the error of each sum against an
+exactly rounded reference (math.fsum). Beyond about 3000 numbers the path of
+/sum exceeds the maximum URL length of the HTTP client.
+
+Usage:
+    python -m benchmarks.bench_aggregate [--seconds 1.0] [--sizes 100,10000,1000000]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+
+import numpy as np
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient, InvalidURL
+
+from routes.aggregate import route as aggregate_route
+from routes.sum import route as sum_route
+from utils.custom_logging import logger
+
+
+def make_app():
+    """
+    Build an app with only the routes under test.
+    """
+    app = FastAPI()
+    app.include_router(sum_route)
+    app.include_router(aggregate_route)
+    return app
+
+
+async def measure(request, seconds):
+    """
+    Send a request repeatedly for about the given time.
+
+    Returns:
+        Tuple[float, float]: The requests per second and the last returned sum.
+    """
+    calls, result = 0, None
+    start = time.perf_counter()
+    while True:
+        result = await request()
+        calls += 1
+        now = time.perf_counter()
+        if now - start >= seconds:
+            return calls / (now - start), result
+
+
+async def run(sizes, seconds):
+    rng = np.random.default_rng(0)
+    async with AsyncClient(
+        transport=ASGITransport(app=make_app()), base_url="http://bench"
+    ) as client:
+
+        async def via_sum():
+            response = await client.get(sum_path)
+            return response.json()["sum"]
+
+        async def via_json():
+            response = await client.post("/aggregate?ops=sum", content=json_body)
+            return response.json()["sum"]
+
+        async def via_binary():
+            response = await client.post(
+                "/aggregate?ops=sum",
+                content=binary_body,
+                headers={"content-type": "application/octet-stream"},
+            )
+            return response.json()["sum"]
+
+        print(
+            f"{'values':>10}  {'route':<18}{'values/s':>16}{'speedup':>10}{'sum error':>12}"
+        )
+        for size in sizes:
+            # large values that cancel, where plain summation loses digits
+            values = rng.normal(0, 1e12, size)
+            exact = math.fsum(values)
+            sum_path = "/sum/" + "/".join(map(repr, values.tolist()))
+            json_body = json.dumps(values.tolist())
+            binary_body = values.astype("<f8").tobytes()
+
+            baseline = None
+            for name, request in [
+                ("GET /sum", via_sum),
+                ("POST /aggregate", via_json),
+                ("POST /aggregate f8", via_binary),
+            ]:
+                try:
+                    rate, result = await measure(request, seconds)
+                except InvalidURL:
+                    # the numbers no longer fit into a URL
+                    print(f"{size:>10}  {name:<18}{'URL too long':>16}")
+                    continue
+                throughput = rate * size
+                baseline = baseline or throughput
+                error = abs(result - exact) / max(abs(exact), 1e-300)
+                print(
+                    f"{size:>10}  {name:<18}{throughput:>16,.0f}"
+                    f"{throughput / baseline:>9.2f}x{error:>12.1e}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--seconds", type=float, default=1.0, help="time per measurement"
+    )
+    parser.add_argument(
+        "--sizes",
+        default="100,10000,1000000",
+        help="comma-separated numbers of values per request",
+    )
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    # /sum logs every request
+    logger.setLevel(logging.WARNING)
+    asyncio.run(run(sizes, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
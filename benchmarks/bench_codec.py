@@ -0,0 +1,102 @@
+"""
+Codec benchmark for the DataDiVR-Backend.
+
+This script measures how many messages per second the WebSocket receive and
+forward path can decode and re-encode, comparing the previous path
+(receive_json/send_json, i.e. stdlib json for both directions) with the codec
+layer in utils.websocket.codec (accelerated backend when installed, and raw
+pass-through of the forwarded payload).
+
+Usage:
+    python -m benchmarks.bench_codec [--seconds 1.0]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from utils.websocket import codec
+from utils.websocket.codec import RawJSON
+
+MESSAGES = {
+    "ping": {"event": "ping"},
+    "pose": {
+        "event": "pose",
+        "head": [random.random() for _ in range(7)],
+        "left": [random.random() for _ in range(7)],
+        "right": [random.random() for _ in range(7)],
+    },
+    "nodes_10k": {
+        "event": "node_positions",
+        "positions": [random.random() for _ in range(30_000)],
+    },
+}
+
+
+def forward_stdlib(text):
+    """
+    Decode an incoming frame and encode the broadcast envelope with stdlib json.
+    """
+    data = json.loads(text)
+    return json.dumps(
+        {"event": data["event"], "sender_id": "id", "sender_name": "n", "data": data}
+    )
+
+
+def forward_codec(text):
+    """
+    Decode an incoming frame with the codec and forward its payload as raw JSON.
+    """
+    data = codec.decode(text)
+    return codec.encode(
+        {
+            "event": data["event"],
+            "sender_id": "id",
+            "sender_name": "n",
+            "data": RawJSON(text),
+        }
+    )
+
+
+def measure(func, text, seconds):
+    """
+    Call func(text) repeatedly for about the given time.
+
+    Returns:
+        float: The number of calls per second.
+    """
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(10):
+            func(text)
+        calls += 10
+        now = time.perf_counter()
+        if now >= deadline:
+            return calls / (now - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--seconds", type=float, default=1.0, help="time per measurement"
+    )
+    args = parser.parse_args()
+
+    print(f"codec backend: {codec.BACKEND}")
+    print(
+        f"{'message':<12}{'bytes':>10}{'before msg/s':>16}{'after msg/s':>16}{'speedup':>10}"
+    )
+    for name, message in MESSAGES.items():
+        text = json.dumps(message)
+        before = measure(forward_stdlib, text, args.seconds)
+        after = measure(forward_codec, text, args.seconds)
+        print(
+            f"{name:<12}{len(text):>10}{before:>16,.0f}{after:>16,.0f}{after / before:>9.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
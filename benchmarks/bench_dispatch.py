@@ -0,0 +1,124 @@
+"""
+Dispatch benchmark for the DataDiVR-Backend.
+
+This script measures the overhead per event of dispatching a WebSocket event to
+its handler, comparing the previous dispatch (the decorator wrapper inspecting
+the handler's signature and looking up the client on every call, on top of the
+dispatcher's own lookup) with the precompiled HandlerAdapter.
+
+Usage:
+    python -m benchmarks.bench_dispatch [--events 200000]
+"""
+
+import argparse
+import asyncio
+import inspect
+import logging
+import time
+from functools import wraps
+
+from utils.custom_logging import logger
+from utils.websocket.event_decorator import event_decorator
+from utils.websocket.event_handler import EventHandler
+
+CLIENTS = {"websocket": {"client_id": "id", "first_name": "Bench"}}
+
+
+def get_client_info(websocket):
+    """
+    Look up a client the way ClientManager does, by scanning the clients.
+    """
+    for key, info in CLIENTS.items():
+        if key == websocket:
+            return info
+    return {"client_id": "Unknown", "first_name": "Unknown"}
+
+
+def legacy_event_decorator(handlers, get_client_info):
+    """
+    The previous event decorator, inspecting the handler on every call.
+    """
+
+    def decorator(event_name):
+        def wrapper(func):
+            @wraps(func)
+            async def inner(data, websocket):
+                client_info = get_client_info(websocket)
+                params = inspect.signature(func).parameters
+                kwargs = {}
+                if "data" in params:
+                    kwargs["data"] = data
+                if "websocket" in params:
+                    kwargs["websocket"] = websocket
+                if "client_info" in params:
+                    kwargs["client_info"] = client_info
+                return await func(**kwargs)
+
+            handlers[event_name] = inner
+            return func
+
+        return wrapper
+
+    return decorator
+
+
+def make_dispatcher(make_decorator):
+    """
+    Create an EventHandler with a ping-like and a hello-like handler.
+    """
+    handlers = {}
+    event = make_decorator(handlers, get_client_info)
+
+    @event("ping")
+    async def ping(websocket):
+        pass
+
+    @event("hello")
+    async def hello(data, websocket, client_info):
+        pass
+
+    async def broadcast(data, include_sender=False, room=None):
+        pass
+
+    return EventHandler(handlers, get_client_info, broadcast)
+
+
+async def measure(dispatcher, event_name, events):
+    """
+    Dispatch an event repeatedly.
+
+    Returns:
+        float: The dispatch time per event in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(events):
+        await dispatcher.handle_event(event_name, {"event": event_name}, "websocket")
+    return (time.perf_counter() - start) / events * 1e6
+
+
+async def run(events):
+    before = make_dispatcher(legacy_event_decorator)
+    after = make_dispatcher(event_decorator)
+    print(f"{'event':<10}{'before us':>12}{'after us':>12}{'speedup':>10}")
+    for event_name in ("ping", "hello"):
+        before_us = await measure(before, event_name, events)
+        after_us = await measure(after, event_name, events)
+        print(
+            f"{event_name:<10}{before_us:>12.2f}{after_us:>12.2f}{before_us / after_us:>9.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--events", type=int, default=200_000, help="events per measurement"
+    )
+    args = parser.parse_args()
+
+    # measure dispatch itself, not the debug logging of every event
+    logger.setLevel(logging.INFO)
+    asyncio.run(run(args.events))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,730 @@
+"""
+WebSocket load generator for the DataDiVR-Backend.
+
+This script boots the application with uvicorn (or targets a running server),
+opens many simulated clients against the /ws endpoint and drives a configurable
+mix of events:
+
+- ping: round trip until the client receives its 'pong'
+- hello: round trip until the client receives its 'hello' reply
+- broadcast: an unknown event, forwarded to all other clients; the latency is
+  measured from sending until each other client receives it
+- long_task: time until the client receives the next 'long_task_completed'
+- pose: a head pose update, batched by the server's tick broadcaster; the latency
+  is measured from sending until each client receives it in a 'batch' frame
+
+All clients connect first, then send events at the given mean rate for the
+given duration. The script reports p50/p90/p99 latencies, throughput and the
+server's resident memory, and saves the results as JSON so runs on different
+commits can be compared.
+
+Usage:
+    python -m benchmarks.loadgen [--clients 1000] [--duration 30] [--rate 1.0]
+        [--mix ping=70,hello=20,broadcast=9,long_task=1] [--client-processes 4]
+        [--url ws://host:port/ws] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import websockets
+
+KINDS = ("ping", "hello", "broadcast", "long_task", "pose")
+DEFAULT_MIX = "ping=70,hello=20,broadcast=9,long_task=1"
+RESULTS_DIR = os.path.join("benchmarks", "results")
+# Replies that complete a pending request of a kind
+REPLY_EVENTS = {"pong": "ping", "hello": "hello", "long_task_completed": "long_task"}
+BROADCAST_EVENT = "loadgen_broadcast"
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parse an event mix like 'ping=70,hello=30' into weights.
+
+    Args:
+        text (str): Comma separated kind=weight pairs.
+
+    Returns:
+        Dict[str, float]: Maps event kinds to their weights.
+
+    Raises:
+        ValueError: If a kind is unknown or no weight is positive.
+    """
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        kind, _, weight = part.partition("=")
+        if kind not in KINDS:
+            raise ValueError(f"Unknown event kind '{kind}', expected one of {KINDS}")
+        mix[kind] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The mix needs at least one kind with a positive weight")
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """
+    Get a percentile of sorted values using the nearest-rank method.
+
+    Args:
+        sorted_values (List[float]): The values, sorted ascending.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        Optional[float]: The percentile, or None if there are no values.
+    """
+    if not sorted_values:
+        return None
+    rank = -(-len(sorted_values) * q // 100)
+    return sorted_values[max(1, int(rank)) - 1]
+
+
+def summarize(latencies: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Summarize latencies given in seconds as milliseconds.
+
+    Args:
+        latencies (List[float]): The measured latencies.
+
+    Returns:
+        Dict[str, Optional[float]]: The count, mean, p50, p90, p99 and max.
+    """
+    values = sorted(latencies)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "count": len(values),
+        "mean": ms(sum(values) / len(values)) if values else None,
+        "p50": ms(percentile(values, 50)),
+        "p90": ms(percentile(values, 90)),
+        "p99": ms(percentile(values, 99)),
+        "max": ms(values[-1] if values else None),
+    }
+
+
+class RunStats:
+    """
+    Measurements of the simulated clients of one process.
+    """
+
+    def __init__(self):
+        self.connected = 0
+        self.connect_errors = 0
+        self.disconnects = 0
+        self.received = 0
+        self.sent: Dict[str, int] = defaultdict(int)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def to_dict(self) -> dict:
+        """
+        Get the measurements as plain data that can be sent between processes.
+        """
+        return {
+            "connected": self.connected,
+            "connect_errors": self.connect_errors,
+            "disconnects": self.disconnects,
+            "received": self.received,
+            "sent": dict(self.sent),
+            "latencies": dict(self.latencies),
+        }
+
+
+class SimulatedClient:
+    """
+    One WebSocket client sending a random mix of events.
+
+    Requests of a kind are answered in order, so the send times of pending
+    requests are kept in one FIFO per kind.
+    """
+
+    def __init__(self, url: str, mix: Dict[str, float], rate: float, stats: RunStats):
+        """
+        Initialize the SimulatedClient.
+
+        Args:
+            url (str): The WebSocket URL of the server.
+            mix (Dict[str, float]): Maps event kinds to their weights.
+            rate (float): Mean number of events sent per second.
+            stats (RunStats): Where measurements are recorded.
+        """
+        self.url = url
+        self.kinds = list(mix)
+        self.weights = list(mix.values())
+        self.rate = rate
+        self.stats = stats
+        self.pending: Dict[str, deque] = defaultdict(deque)
+        self.websocket = None
+        self._receiver: Optional[asyncio.Task] = None
+
+    async def connect(self) -> bool:
+        """
+        Open the connection and start receiving.
+
+        Returns:
+            bool: True if the client is connected.
+        """
+        start = time.perf_counter()
+        try:
+            self.websocket = await websockets.connect(
+                self.url, max_size=None, open_timeout=60
+            )
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+            self.stats.connect_errors += 1
+            return False
+        self.stats.latencies["connect"].append(time.perf_counter() - start)
+        self.stats.connected += 1
+        self._receiver = asyncio.ensure_future(self.receive())
+        return True
+
+    async def drive(self, deadline: float):
+        """
+        Send events at random intervals until the deadline.
+
+        Args:
+            deadline (float): The perf_counter time at which to stop sending.
+        """
+        try:
+            while True:
+                delay = random.expovariate(self.rate)
+                if time.perf_counter() + delay >= deadline:
+                    return
+                await asyncio.sleep(delay)
+                await self.send(random.choices(self.kinds, self.weights)[0])
+        except websockets.ConnectionClosed:
+            self.stats.disconnects += 1
+
+    async def send(self, kind: str):
+        """
+        Send one event of a kind and remember when it was sent.
+
+        Args:
+            kind (str): The event kind.
+        """
+        if kind == "broadcast":
+            message = {"event": BROADCAST_EVENT, "sent_at": time.time()}
+        elif kind == "pose":
+            message = {
+                "event": "pose",
+                "sent_at": time.time(),
+                "position": [random.random() for _ in range(3)],
+                "rotation": [random.random() for _ in range(4)],
+            }
+        elif kind == "hello":
+            message = {"event": "hello", "name": "loadgen"}
+        else:
+            message = {"event": kind}
+        if kind in REPLY_EVENTS.values():
+            self.pending[kind].append(time.perf_counter())
+        await self.websocket.send(json.dumps(message))
+        self.stats.sent[kind] += 1
+
+    async def receive(self):
+        """
+        Record the latency of every reply and broadcast received.
+        """
+        try:
+            async for frame in self.websocket:
+                received_at = time.perf_counter()
+                self.stats.received += 1
+                message = json.loads(frame)
+                event = message.get("event")
+                if event == BROADCAST_EVENT:
+                    # broadcasts may come from other processes, so use the wall clock
+                    sent_at = message.get("data", {}).get("sent_at")
+                    if sent_at is not None:
+                        self.stats.latencies["broadcast"].append(time.time() - sent_at)
+                    continue
+                if event == "batch":
+                    now = time.time()
+                    for update in message.get("updates", ()):
+                        sent_at = update.get("data", {}).get("sent_at")
+                        if update.get("event") == "pose" and sent_at is not None:
+                            self.stats.latencies["pose"].append(now - sent_at)
+                    continue
+                kind = REPLY_EVENTS.get(event)
+                if kind is not None and self.pending[kind]:
+                    sent_at = self.pending[kind].popleft()
+                    self.stats.latencies[kind].append(received_at - sent_at)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def close(self):
+        """
+        Stop receiving and close the connection.
+        """
+        if self._receiver is not None:
+            self._receiver.cancel()
+        if self.websocket is not None:
+            await self.websocket.close()
+
+
+async def run_clients(
+    url: str,
+    clients: int,
+    mix: Dict[str, float],
+    rate: float,
+    duration: float,
+    drain: float,
+    connect_concurrency: int,
+) -> dict:
+    """
+    Run simulated clients in this process.
+
+    Args:
+        url (str): The WebSocket URL of the server.
+        clients (int): The number of clients.
+        mix (Dict[str, float]): Maps event kinds to their weights.
+        rate (float): Mean number of events each client sends per second.
+        duration (float): Seconds during which events are sent.
+        drain (float): Seconds to wait for outstanding replies after sending stopped.
+        connect_concurrency (int): Maximum number of connections opened at once.
+
+    Returns:
+        dict: The measurements of the clients, see RunStats.
+    """
+    stats = RunStats()
+    limiter = asyncio.Semaphore(connect_concurrency)
+    simulated = [SimulatedClient(url, mix, rate, stats) for _ in range(clients)]
+
+    async def connect(client: SimulatedClient) -> bool:
+        async with limiter:
+            return await client.connect()
+
+    connected = await asyncio.gather(*(connect(client) for client in simulated))
+    simulated = [client for client, ok in zip(simulated, connected) if ok]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client.drive(start + duration) for client in simulated))
+    await asyncio.sleep(drain)
+    await asyncio.gather(
+        *(client.close() for client in simulated), return_exceptions=True
+    )
+    return stats.to_dict()
+
+
+def raise_fd_limit():
+    """
+    Raise the soft limit of open files to the hard limit, as every client needs a socket.
+    """
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def run_client_process(args: tuple) -> dict:
+    """
+    Run simulated clients in a worker process.
+
+    Args:
+        args (tuple): The arguments of run_clients.
+
+    Returns:
+        dict: The measurements of the clients.
+    """
+    raise_fd_limit()
+    return asyncio.run(run_clients(*args))
+
+
+def merge_stats(results: List[dict]) -> dict:
+    """
+    Merge the measurements of several client processes.
+
+    Args:
+        results (List[dict]): The measurements of each process.
+
+    Returns:
+        dict: The combined measurements.
+    """
+    merged = {
+        "connected": 0,
+        "connect_errors": 0,
+        "disconnects": 0,
+        "received": 0,
+        "sent": defaultdict(int),
+        "latencies": defaultdict(list),
+    }
+    for result in results:
+        for key in ("connected", "connect_errors", "disconnects", "received"):
+            merged[key] += result[key]
+        for kind, count in result["sent"].items():
+            merged["sent"][kind] += count
+        for kind, values in result["latencies"].items():
+            merged["latencies"][kind].extend(values)
+    return merged
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """
+    Get the resident memory of a process and its descendants (Linux only).
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        Optional[int]: The resident set size in bytes, or None if unavailable.
+    """
+    total, stack = 0, [pid]
+    try:
+        while stack:
+            current = stack.pop()
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    stack.extend(int(child) for child in f.read().split())
+    except (OSError, ValueError):
+        return total or None
+    return total
+
+
+class RssSampler:
+    """
+    Samples the resident memory of the server process tree in the background.
+    """
+
+    def __init__(self, pid: Optional[int], interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.pid is not None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            rss = process_tree_rss(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    def stop(self) -> Dict[str, Optional[float]]:
+        """
+        Stop sampling.
+
+        Returns:
+            Dict[str, Optional[float]]: The first, peak and last sample in MiB.
+        """
+        if self._task is not None:
+            self._task.cancel()
+
+        def mib(value):
+            return round(value / 2**20, 1)
+
+        if not self.samples:
+            return {"rss_start_mib": None, "rss_peak_mib": None, "rss_end_mib": None}
+        return {
+            "rss_start_mib": mib(self.samples[0]),
+            "rss_peak_mib": mib(max(self.samples)),
+            "rss_end_mib": mib(self.samples[-1]),
+        }
+
+
+def free_port() -> int:
+    """
+    Find a free TCP port on localhost.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int, log_level: str) -> subprocess.Popen:
+    """
+    Start the application with uvicorn and wait until it accepts requests.
+
+    Args:
+        port (int): The port to listen on.
+        workers (int): The number of uvicorn worker processes.
+        log_level (str): The application's LOG_LEVEL.
+
+    Returns:
+        subprocess.Popen: The server process.
+
+    Raises:
+        RuntimeError: If the server does not start.
+    """
+    env = dict(os.environ, LOG_LEVEL=log_level)
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app:create_app",
+        "--factory",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--log-level",
+        "warning",
+    ]
+    if workers > 1:
+        env.setdefault("WS_BACKPLANE", "unix")
+        command += ["--workers", str(workers)]
+    server = subprocess.Popen(command, env=env, preexec_fn=_server_preexec())
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start within 30 seconds")
+
+
+def _server_preexec():
+    return raise_fd_limit if os.name == "posix" else None
+
+
+def git_commit() -> Optional[str]:
+    """
+    Get the commit the working tree is on, marked '-dirty' if it has changes.
+    """
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+        dirty = subprocess.call(
+            ["git", "diff", "--quiet", "HEAD"], stderr=subprocess.DEVNULL
+        )
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(args, merged: dict, elapsed: float, server: dict) -> dict:
+    """
+    Build the machine readable report of a run.
+    """
+    sent = sum(merged["sent"].values())
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "connections": {
+            "requested": args.clients,
+            "connected": merged["connected"],
+            "connect_errors": merged["connect_errors"],
+            "disconnects": merged["disconnects"],
+        },
+        "throughput": {
+            "elapsed_s": round(elapsed, 3),
+            "sent": dict(merged["sent"]),
+            "received": merged["received"],
+            "sent_per_s": round(sent / elapsed, 1) if elapsed else None,
+            "received_per_s": (
+                round(merged["received"] / elapsed, 1) if elapsed else None
+            ),
+        },
+        "latency_ms": {
+            kind: summarize(values)
+            for kind, values in sorted(merged["latencies"].items())
+        },
+        "server": server,
+    }
+
+
+def print_report(report: dict, baseline: Optional[dict] = None):
+    """
+    Print a report, with the change relative to a baseline report if given.
+    """
+    connections, throughput = report["connections"], report["throughput"]
+    print(
+        f"commit {report['meta']['commit']}: {connections['connected']}/"
+        f"{connections['requested']} clients connected, "
+        f"{connections['connect_errors']} connect errors, "
+        f"{connections['disconnects']} disconnects"
+    )
+
+    def change(new, old):
+        if new is None or old in (None, 0):
+            return ""
+        return f" ({(new - old) / old * 100:+.1f}%)"
+
+    base_throughput = (baseline or {}).get("throughput", {})
+    for key in ("sent_per_s", "received_per_s"):
+        print(
+            f"{key:<16}{throughput[key]:>12}"
+            + change(throughput[key], base_throughput.get(key))
+        )
+
+    print(f"{'latency ms':<12}{'count':>9}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    base_latency = (baseline or {}).get("latency_ms", {})
+    for kind, summary in report["latency_ms"].items():
+        row = f"{kind:<12}{summary['count']:>9}"
+        for key in ("p50", "p90", "p99", "max"):
+            value = summary[key]
+            row += f"{value:>10.2f}" if value is not None else f"{'-':>10}"
+        p99_change = change(summary["p99"], base_latency.get(kind, {}).get("p99"))
+        print(row + (f"  p99{p99_change}" if p99_change else ""))
+
+    server = report["server"]
+    if server.get("rss_peak_mib") is not None:
+        base_rss = (baseline or {}).get("server", {}).get("rss_peak_mib")
+        print(
+            f"server RSS MiB: start {server['rss_start_mib']}, peak "
+            f"{server['rss_peak_mib']}{change(server['rss_peak_mib'], base_rss)}, "
+            f"end {server['rss_end_mib']}"
+        )
+
+
+async def run(args, url: str, server_pid: Optional[int]) -> dict:
+    """
+    Run the client processes while sampling the server's memory.
+    """
+    mix = parse_mix(args.mix)
+    processes = max(1, min(args.client_processes, args.clients))
+    shares = [args.clients // processes] * processes
+    for i in range(args.clients % processes):
+        shares[i] += 1
+
+    sampler = RssSampler(server_pid)
+    sampler.start()
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    if processes == 1:
+        results = [
+            await run_clients(
+                url,
+                args.clients,
+                mix,
+                args.rate,
+                args.duration,
+                args.drain,
+                args.connect_concurrency,
+            )
+        ]
+    else:
+        concurrency = max(1, args.connect_concurrency // processes)
+        with ProcessPoolExecutor(processes) as pool:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        pool,
+                        run_client_process,
+                        (
+                            url,
+                            share,
+                            mix,
+                            args.rate,
+                            args.duration,
+                            args.drain,
+                            concurrency,
+                        ),
+                    )
+                    for share in shares
+                )
+            )
+    elapsed = time.perf_counter() - start
+    server = sampler.stop()
+
+    merged = merge_stats(results)
+    # throughput counts the sending phase only, not connecting and draining
+    sending = min(args.duration, elapsed) or elapsed
+    return build_report(args, merged, sending, server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=1000, help="simulated clients")
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="seconds of sending events"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=1.0, help="mean events per second per client"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="event kinds and weights")
+    parser.add_argument(
+        "--drain", type=float, default=2.0, help="seconds to wait for late replies"
+    )
+    parser.add_argument(
+        "--client-processes",
+        type=int,
+        default=os.cpu_count() // 2 or 1,
+        help="processes the clients are spread over",
+    )
+    parser.add_argument(
+        "--connect-concurrency",
+        type=int,
+        default=200,
+        help="connections opened at once",
+    )
+    parser.add_argument("--url", help="target a running server instead of booting one")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="uvicorn workers of the booted server"
+    )
+    parser.add_argument(
+        "--server-log-level", default="WARNING", help="LOG_LEVEL of the booted server"
+    )
+    parser.add_argument("--output", help="path of the JSON results file")
+    parser.add_argument("--compare", help="JSON results file of a baseline run")
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    raise_fd_limit()
+    server = None
+    url, server_pid = args.url, None
+    if url is None:
+        port = free_port()
+        server = start_server(port, args.workers, args.server_log_level)
+        url, server_pid = f"ws://127.0.0.1:{port}/ws", server.pid
+
+    try:
+        report = asyncio.run(run(args, url, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(
+            RESULTS_DIR, f"loadgen-{report['meta']['commit'] or 'unknown'}-{stamp}.json"
+        )
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,11 +23,12 @@ async def handle_hello(data: dict, websocket, client_info: dict):
         client_info (dict): Information about the client, not used in this handler.
     """
     name = data.get("name", "Guest")
-    logger.info(f"Handling hello event for {name}")
-    await websocket.send_json(
+    logger.info("Handling hello event for %s", name)
+    await ws_manager.send_message(
+        websocket,
         {
             "event": "hello",
             "sender_name": "handle_hello_function",
             "message": f"Hello {name}!",
-        }
+        },
     )
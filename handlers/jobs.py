@@ -0,0 +1,96 @@
+"""
+Job event handlers for the DataDiVR-Backend.
+
+This module defines the handlers that let clients follow and control their
+background jobs: 'job_status' to query a job, 'list_jobs' to list their active
+jobs, 'cancel_job' to cancel one, and 'subscribe_job' and 'unsubscribe_job' to
+start and stop receiving the events of any job.
+"""
+
+from utils.jobs import job_manager
+from utils.websocket import ws_manager
+
+
+@ws_manager.event("job_status")
+async def handle_job_status(data: dict, websocket):
+    """
+    Send the current state of a job to the client.
+
+    Args:
+        data (dict): The data sent with the event, expected to contain a 'job_id' field.
+        websocket (WebSocket): The WebSocket connection object for the client.
+    """
+    job = job_manager.get(data.get("job_id"))
+    if job is None:
+        await ws_manager.send_message(
+            websocket, {"event": "error", "message": "Unknown job"}
+        )
+        return
+    await ws_manager.send_message(websocket, {"event": "job_status", **job.to_dict()})
+
+
+@ws_manager.event("list_jobs")
+async def handle_list_jobs(websocket, client_info: dict):
+    """
+    Send the client the state of its queued and running jobs.
+
+    Args:
+        websocket (WebSocket): The WebSocket connection object for the client.
+        client_info (dict): Information about the client, including 'client_id'.
+    """
+    jobs = job_manager.active_jobs(client_info["client_id"])
+    await ws_manager.send_message(
+        websocket, {"event": "jobs", "jobs": [job.to_dict() for job in jobs]}
+    )
+
+
+@ws_manager.event("cancel_job")
+async def handle_cancel_job(data: dict, websocket, client_info: dict):
+    """
+    Cancel one of the client's jobs.
+
+    The client receives a 'job_status' event once the job is cancelled, or an
+    'error' event if the job is unknown, finished or owned by another client.
+
+    Args:
+        data (dict): The data sent with the event, expected to contain a 'job_id' field.
+        websocket (WebSocket): The WebSocket connection object for the client.
+        client_info (dict): Information about the client, including 'client_id'.
+    """
+    if not job_manager.cancel(data.get("job_id"), owner_id=client_info["client_id"]):
+        await ws_manager.send_message(
+            websocket, {"event": "error", "message": "No active job to cancel"}
+        )
+
+
+@ws_manager.event("subscribe_job")
+async def handle_subscribe_job(data: dict, websocket, client_info: dict):
+    """
+    Subscribe the client to the 'job_status' and 'job_progress' events of a job.
+
+    The client first receives the current state of the job.
+
+    Args:
+        data (dict): The data sent with the event, expected to contain a 'job_id' field.
+        websocket (WebSocket): The WebSocket connection object for the client.
+        client_info (dict): Information about the client, including 'client_id'.
+    """
+    job = job_manager.subscribe(data.get("job_id"), client_info["client_id"])
+    if job is None:
+        await ws_manager.send_message(
+            websocket, {"event": "error", "message": "Unknown job"}
+        )
+        return
+    await ws_manager.send_message(websocket, {"event": "job_status", **job.to_dict()})
+
+
+@ws_manager.event("unsubscribe_job")
+async def handle_unsubscribe_job(data: dict, client_info: dict):
+    """
+    Stop sending the events of a job to the client.
+
+    Args:
+        data (dict): The data sent with the event, expected to contain a 'job_id' field.
+        client_info (dict): Information about the client, including 'client_id'.
+    """
+    job_manager.unsubscribe(data.get("job_id"), client_info["client_id"])
@@ -0,0 +1,196 @@
+"""
+Layout event handlers for the DataDiVR-Backend.
+
+This module defines the handler for the 'layout' event, which computes a
+force-directed layout of a project as a background job. The iterations run in
+the job manager's process pool, a few at a time; after each batch the nodes
+that moved are sent to the room viewing the project as 'layout_positions'
+events. The state of each project's layout is kept, so a cancelled or finished
+layout can be continued instead of starting over.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from utils.jobs import JobLimitError, JobUpdate, job_manager
+from utils.project_data import project_store, to_wire
+from utils.project_data.layout import (
+    LayoutState,
+    layout_iterations,
+    moved_nodes,
+    start_layout,
+)
+from utils.websocket import ws_manager
+
+DEFAULT_ITERATIONS = 300
+MAX_ITERATIONS = 10000
+# Number of iterations between two layout_positions events
+DEFAULT_PUBLISH_EVERY = 10
+# Moves shorter than this fraction of the layout size are not sent
+TOLERANCE = 1e-4
+
+# The state of the last layout of each project, to resume it from
+layouts: Dict[str, LayoutState] = {}
+# The running layout job of each project
+_running: Dict[str, str] = {}
+
+
+@ws_manager.event("layout")
+async def handle_layout(data: dict, websocket, client_info: dict):
+    """
+    Start a force-directed layout of a project.
+
+    The data contains the 'project' and optionally the 'room' viewing it, which
+    the client must have joined and which receives the new positions, the
+    number of 'iterations' to run (default 300) and 'publish_every' how many
+    iterations positions are sent (default 10). The layout continues where the
+    last layout of the project stopped, with the same cooling schedule; with
+    'restart': true it starts over from random positions, with 'dimensions': 2
+    in the x-y plane.
+
+    The client receives the 'job_status' and 'job_progress' events of the
+    layout job, and the room 'layout_positions' events with the 'index' and new
+    'positions' of the nodes that moved. Only one layout per project runs at a
+    time; stop it with a 'cancel_job' event.
+
+    Args:
+        data (dict): The data sent with the event.
+        websocket (WebSocket): The WebSocket connection object for the client.
+        client_info (dict): Information about the client, including 'client_id'.
+    """
+    client_id = client_info["client_id"]
+    room = data.get("room")
+    if room is not None and not ws_manager.client_manager.is_member(client_id, room):
+        await _error(websocket, "Join the room before starting a layout for it")
+        return
+    try:
+        project = await project_store.load(data.get("project"))
+    except (ValueError, OSError) as e:
+        await _error(websocket, str(e))
+        return
+    running = job_manager.get(_running.get(project.name))
+    if running is not None and not running.status.finished:
+        await _error(
+            websocket, f"A layout of project {project.name} is already running"
+        )
+        return
+
+    try:
+        iterations = min(
+            max(int(data.get("iterations", DEFAULT_ITERATIONS)), 1), MAX_ITERATIONS
+        )
+        publish_every = max(int(data.get("publish_every", DEFAULT_PUBLISH_EVERY)), 1)
+        dimensions = int(data.get("dimensions", 3))
+        state = layouts.get(project.name)
+        if (
+            data.get("restart")
+            or state is None
+            or state.converged
+            or state.dimensions != dimensions
+            or len(state.positions) != project.node_count
+        ):
+            state = start_layout(
+                project.positions, bool(data.get("restart")), dimensions
+            )
+        else:
+            # continue the schedule from the positions clients last received
+            state.positions = project.positions
+    except (TypeError, ValueError) as e:
+        await _error(websocket, str(e))
+        return
+
+    try:
+        job = job_manager.submit(
+            run_layout,
+            project,
+            state,
+            room,
+            iterations,
+            publish_every,
+            name="layout",
+            owner_id=client_id,
+            room=room,
+        )
+    except JobLimitError as e:
+        await _error(websocket, str(e))
+        return
+    _running[project.name] = job.job_id
+
+
+async def run_layout(
+    project,
+    state,
+    room=None,
+    iterations=DEFAULT_ITERATIONS,
+    publish_every=DEFAULT_PUBLISH_EVERY,
+    executor="process",
+):
+    """
+    Run a layout in batches in the process pool and send the nodes that moved after each.
+
+    The positions of the project are updated after each batch, and its spatial
+    index is rebuilt once the layout stops, also if it is cancelled.
+
+    Args:
+        project (ProjectData): The project.
+        state (LayoutState): The state to start from.
+        room (Optional[str], optional): The room to send the positions to, None for all clients.
+        iterations (int, optional): The number of iterations. Defaults to 300.
+        publish_every (int, optional): The number of iterations per batch. Defaults to 10.
+        executor (str, optional): Where the batches run, "process" or "thread".
+                                  Defaults to "process".
+
+    Yields:
+        JobUpdate: The progress after each batch, then the iteration and
+        whether the layout converged as the result.
+    """
+    published = project.positions.copy()
+    tolerance = TOLERANCE * state.size
+    done = 0
+    try:
+        while done < iterations and not state.converged:
+            steps = min(publish_every, iterations - done)
+            state = await job_manager.run_in_executor(
+                executor, layout_iterations, state, project.links, steps
+            )
+            done += steps
+            layouts[project.name] = state
+            project.set_positions(state.positions, reindex=False)
+
+            index, positions = moved_nodes(
+                published, state.positions.astype(np.float32), tolerance
+            )
+            published[index] = positions
+            await ws_manager.broadcast(
+                to_wire(
+                    {
+                        "event": "layout_positions",
+                        "project": project.name,
+                        "iteration": state.iteration,
+                        "index": index,
+                        "positions": positions.ravel(),
+                    }
+                ),
+                include_sender=True,
+                room=room,
+            )
+            yield JobUpdate(
+                progress=done / iterations, message=f"Iteration {state.iteration}"
+            )
+    finally:
+        project.set_positions(state.positions)
+    yield JobUpdate(
+        result={
+            "project": project.name,
+            "iteration": state.iteration,
+            "converged": state.converged,
+        }
+    )
+
+
+async def _error(websocket, message):
+    """
+    Send the client an error event.
+    """
+    await ws_manager.send_message(websocket, {"event": "error", "message": message})
@@ -2,46 +2,82 @@
 Long task event handler for the DataDiVR-Backend.
 
 This module defines the handler for the 'long_task' event, demonstrating
-how to handle asynchronous long-running tasks and broadcast results using background tasks.
+how to run long-running tasks as background jobs and broadcast their results.
 """
 
 import asyncio
 
-from utils.API_framework import BackgroundTasks
 from utils.custom_logging import logger
+from utils.jobs import JobLimitError, JobUpdate, job_manager
 from utils.websocket import ws_manager
 
 
 @ws_manager.event("long_task")
-async def handle_long_task():
+async def handle_long_task(data, websocket, client_info):
     """
-    Handle a long-running task using background tasks and broadcast the result.
+    Start a long-running task as a background job.
 
-    This function initiates a long-running task as a background task,
-    allowing the WebSocket connection to remain responsive.
+    The handler returns immediately, so the client's connection stays responsive.
+    The client receives 'job_status' events as the job is queued, runs and completes,
+    and 'job_progress' events while it runs. The task broadcasts its result, so it
+    is not cached: every request runs the task.
+
+    Args:
+        data (dict): The data sent with the event, may contain a 'room' field to
+                     broadcast the result to instead of all clients.
+        websocket (WebSocket): The WebSocket connection object for the client.
+        client_info (dict): Information about the client, including 'client_id'.
     """
-    logger.debug("starting long task")
-    # Create a new BackgroundTasks instance and add the task
-    background_tasks = BackgroundTasks()
-    background_tasks.add_task(run_long_task)
+    client_id = client_info["client_id"]
+    room = data.get("room")
+    if room is not None and not ws_manager.client_manager.is_member(client_id, room):
+        await ws_manager.send_message(
+            websocket,
+            {"event": "error", "message": "Join the room before sending to it"},
+        )
+        return
+    try:
+        job = job_manager.submit(
+            run_long_task,
+            room,
+            name="long_task",
+            owner_id=client_id,
+        )
+    except JobLimitError as e:
+        await ws_manager.send_message(websocket, {"event": "error", "message": str(e)})
+        return
+    logger.debug("long task initiated as job %s", job.job_id)
 
-    await background_tasks()
 
-    logger.debug("long task initiated")
+async def run_long_task(room=None, steps=10, duration=5.0):
+    """
+    Perform the long-running task, reporting its progress, and broadcast the result.
 
+    This function simulates a long-running task using asyncio.sleep, yielding
+    the progress and the partial result after each step, then broadcasts a
+    completion message to all connected clients.
 
-async def run_long_task():
-    """
-    Perform the long-running task and broadcast the result.
+    Args:
+        room (Optional[str], optional): Broadcast to this room instead of all clients.
+        steps (int, optional): The number of steps. Defaults to 10.
+        duration (float, optional): The total duration in seconds. Defaults to 5.
 
-    This function simulates a long-running task using asyncio.sleep,
-    then broadcasts a completion message to all connected clients.
+    Yields:
+        JobUpdate: The progress after each step, then the result of the task.
     """
-    await asyncio.sleep(5)  # Simulate a long-running task
+    for step in range(1, steps + 1):
+        await asyncio.sleep(duration / steps)  # Simulate a step of the task
+        yield JobUpdate(
+            progress=step / steps,
+            message=f"Step {step} of {steps}",
+            partial={"steps_done": step},
+        )
+    result = {"result": "yolo!"}
     message = {
         "event": "long_task_completed",
         "sender_name": "long_task_batch_processing_system",
-        "data": {"result": "yolo!"},
+        "data": result,
     }
-    # Broadcast completion message to all clients
-    await ws_manager.broadcast(message)
+    # Broadcast completion message to all clients (or the room)
+    await ws_manager.broadcast(message, room=room)
+    yield JobUpdate(result=result)
@@ -19,4 +19,6 @@ async def handle_ping(websocket):
     Args:
         websocket (WebSocket): The WebSocket connection object for the client.
     """
-    await websocket.send_json({"event": "pong", "sender_name": "ping pong bot"})
+    await ws_manager.send_message(
+        websocket, {"event": "pong", "sender_name": "ping pong bot"}
+    )
@@ -0,0 +1,127 @@
+"""
+Project event handlers for the DataDiVR-Backend.
+
+This module defines the handlers that let clients query the node and link data
+of projects: 'list_projects' to list the available projects, 'project_info' to
+get the size and columns of a project, and 'select_nodes' to filter its nodes
+and get selected columns of the matching ones. Selections are deterministic,
+so their replies are kept in the result cache and identical queries of the
+same project revision are answered without filtering again.
+"""
+
+import numpy as np
+
+from utils.cache import cache_key, result_cache
+from utils.project_data import project_store, to_wire
+from utils.websocket import ws_manager
+
+# Maximum number of nodes returned by one select_nodes event
+MAX_SELECT_LIMIT = 100000
+DEFAULT_SELECT_LIMIT = 10000
+
+
+async def _load(websocket, name):
+    """
+    Load a project, sending the client an error event if that fails.
+    """
+    try:
+        return await project_store.load(name)
+    except (ValueError, OSError) as e:
+        await ws_manager.send_message(websocket, {"event": "error", "message": str(e)})
+        return None
+
+
+@ws_manager.event("list_projects")
+async def handle_list_projects(websocket):
+    """
+    Send the client the names of the available projects.
+
+    Args:
+        websocket (WebSocket): The WebSocket connection object for the client.
+    """
+    await ws_manager.send_message(
+        websocket, {"event": "projects", "projects": project_store.available()}
+    )
+
+
+@ws_manager.event("project_info")
+async def handle_project_info(data: dict, websocket):
+    """
+    Send the client the number of nodes and links of a project and its node columns.
+
+    Args:
+        data (dict): The data sent with the event, expected to contain a 'project' field.
+        websocket (WebSocket): The WebSocket connection object for the client.
+    """
+    project = await _load(websocket, data.get("project"))
+    if project is None:
+        return
+    await ws_manager.send_message(
+        websocket,
+        {
+            "event": "project_info",
+            "project": project.name,
+            "nodes": project.node_count,
+            "links": project.link_count,
+            "columns": project.columns(),
+        },
+    )
+
+
+@ws_manager.event("select_nodes")
+async def handle_select_nodes(data: dict, websocket):
+    """
+    Send the client selected columns of the nodes that match filters.
+
+    The data contains the 'project', a list of 'filters' such as
+    {"column": "degree", "op": "ge", "value": 3}, the 'columns' to return
+    (default: the node index), and optionally an 'offset' and 'limit' to page
+    through the matches and 'links': true to also get the links between the
+    returned nodes, as pairs of node indices. The reply's 'count' is the number
+    of all matching nodes.
+
+    Args:
+        data (dict): The data sent with the event.
+        websocket (WebSocket): The WebSocket connection object for the client.
+    """
+    project = await _load(websocket, data.get("project"))
+    if project is None:
+        return
+
+    try:
+        limit = min(
+            max(int(data.get("limit", DEFAULT_SELECT_LIMIT)), 0), MAX_SELECT_LIMIT
+        )
+        offset = max(int(data.get("offset", 0)), 0)
+        filters = data.get("filters") or []
+        columns = data.get("columns") or ["index"]
+        links = bool(data.get("links"))
+        key = cache_key(
+            "select_nodes",
+            [project.name, project.revision, filters, columns, offset, limit, links],
+        )
+        message = await result_cache.get_or_compute(
+            key, lambda: _select(project, filters, columns, offset, limit, links)
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        await ws_manager.send_message(websocket, {"event": "error", "message": str(e)})
+        return
+    await ws_manager.send_message(websocket, message)
+
+
+def _select(project, filters, columns, offset, limit, links) -> dict:
+    """
+    Build the reply to a select_nodes event.
+    """
+    matches = np.flatnonzero(project.mask(filters))
+    selected = matches[offset:][:limit]
+    message = {
+        "event": "nodes",
+        "project": project.name,
+        "count": len(matches),
+        "offset": offset,
+        "columns": to_wire(project.select(selected, columns)),
+    }
+    if links:
+        message["links"] = project.links[project.links_of(selected)].tolist()
+    return message
@@ -0,0 +1,93 @@
+"""
+Room event handlers for the DataDiVR-Backend.
+
+This module defines the handlers for the 'join_room' and 'leave_room' events,
+which let clients subscribe to the messages of a room, e.g. all users looking
+at the same project.
+"""
+
+from utils.scene_state import scene_state
+from utils.websocket import ws_manager
+from utils.websocket.client_manager import is_valid_room
+
+
+@ws_manager.event("join_room")
+async def handle_join_room(data: dict, websocket, client_info: dict):
+    """
+    Handle a client's request to join a room.
+
+    The client is confirmed with a 'room_joined' message listing the room's members
+    and carrying a snapshot of the room's scene 'state', and the other members are
+    notified with a 'room_member_joined' message. If this worker has no state for
+    the room, the other workers are asked for it; it arrives as 'state_delta'.
+
+    Args:
+        data (dict): The data sent with the event, expected to contain a 'room' field.
+        websocket (WebSocket): The WebSocket connection object for the client.
+        client_info (dict): Information about the client, including 'client_id' and 'first_name'.
+    """
+    room = data.get("room")
+    if not is_valid_room(room):
+        await ws_manager.send_message(
+            websocket, {"event": "error", "message": "join_room requires a 'room'"}
+        )
+        return
+
+    client_id = client_info["client_id"]
+    if room not in scene_state and ws_manager.backplane.has_peers:
+        # the room may be in use on other workers; they send its state
+        ws_manager.backplane.publish({"type": "state_request", "scene": room})
+    if ws_manager.join_room(client_id, room):
+        await ws_manager.broadcast(
+            {
+                "event": "room_member_joined",
+                "sender_id": client_id,
+                "sender_name": client_info["first_name"],
+                "room": room,
+            },
+            room=room,
+        )
+
+    members = [
+        member.first_name for member in ws_manager.client_manager.get_room_clients(room)
+    ]
+    await ws_manager.send_message(
+        websocket,
+        {
+            "event": "room_joined",
+            "room": room,
+            "members": members,
+            "state": scene_state.snapshot(room),
+        },
+    )
+
+
+@ws_manager.event("leave_room")
+async def handle_leave_room(data: dict, websocket, client_info: dict):
+    """
+    Handle a client's request to leave a room.
+
+    Args:
+        data (dict): The data sent with the event, expected to contain a 'room' field.
+        websocket (WebSocket): The WebSocket connection object for the client.
+        client_info (dict): Information about the client, including 'client_id' and 'first_name'.
+    """
+    room = data.get("room")
+    if not is_valid_room(room):
+        await ws_manager.send_message(
+            websocket, {"event": "error", "message": "leave_room requires a 'room'"}
+        )
+        return
+
+    client_id = client_info["client_id"]
+    if ws_manager.leave_room(client_id, room):
+        await ws_manager.broadcast(
+            {
+                "event": "room_member_left",
+                "sender_id": client_id,
+                "sender_name": client_info["first_name"],
+                "room": room,
+            },
+            room=room,
+        )
+    await ws_manager.send_message(websocket, {"event": "room_left", "room": room})
@@ -0,0 +1,169 @@
+"""
+Scene state event handlers for the DataDiVR-Backend.
+
+This module defines the handlers for the 'state_update' event, which changes
+the shared state of a scene, and the 'state_snapshot' event, which sends a
+client the current state of a scene. Changes reach the clients of the scene as
+versioned 'state_delta' events, and the writes behind them are exchanged with
+the other workers over the backplane. The state of a room's scene is kept
+while the room is in use and discarded when its last member left.
+"""
+
+from utils.custom_logging import logger
+from utils.scene_state import scene_state
+from utils.websocket import ws_manager
+from utils.websocket.client_manager import is_valid_room
+
+
+async def send_state_delta(scene, delta, sender_id=None):
+    """
+    Send the changes made to a scene to its clients connected to this worker.
+
+    Every worker applies the writes itself and numbers its own versions, so the
+    delta is not published on the backplane.
+
+    Args:
+        scene (Optional[str]): The room of the scene, None for the global scene.
+        delta (StateDelta): The changes.
+        sender_id (Optional[str], optional): The ID of the client that made the changes.
+    """
+    if not delta.ops:
+        return
+    await ws_manager.broadcast(
+        {
+            "event": "state_delta",
+            "scene": scene,
+            "version": delta.version,
+            "ops": delta.ops,
+            "sender_id": sender_id,
+        },
+        include_sender=True,
+        room=scene,
+        publish=False,
+    )
+
+
+@ws_manager.event("state_update")
+async def handle_state_update(data: dict, websocket, client_info: dict):
+    """
+    Apply a client's changes to the state of a scene.
+
+    The data contains the 'ops' to apply, a list of {"op": "set", "path": ...,
+    "value": ...} and {"op": "delete", "path": ...} operations, and optionally
+    the 'room' whose scene to change, which the client must have joined. All
+    clients of the scene, including the sender, receive a 'state_delta' event
+    with the new version of the scene and the changed paths. A client that
+    receives a version other than the next one missed a delta and should send a
+    'state_snapshot' event.
+
+    Args:
+        data (dict): The data sent with the event.
+        websocket (WebSocket): The WebSocket connection object for the client.
+        client_info (dict): Information about the client, including 'client_id'.
+    """
+    scene = data.get("room")
+    client_id = client_info["client_id"]
+    if scene is not None and not ws_manager.client_manager.is_member(client_id, scene):
+        await ws_manager.send_message(
+            websocket,
+            {"event": "error", "message": "Join the room before changing its state"},
+        )
+        return
+
+    try:
+        delta = scene_state.update(scene, data.get("ops"), client_id)
+    except ValueError as e:
+        await ws_manager.send_message(websocket, {"event": "error", "message": str(e)})
+        return
+
+    if delta.writes:
+        ws_manager.backplane.publish(
+            {"type": "state_writes", "scene": scene, "writes": delta.writes}
+        )
+    await send_state_delta(scene, delta, client_id)
+
+
+@ws_manager.event("state_snapshot")
+async def handle_state_snapshot(data: dict, websocket):
+    """
+    Send the client the current state of a scene.
+
+    Args:
+        data (dict): The data sent with the event, may contain the 'room' of the scene.
+        websocket (WebSocket): The WebSocket connection object for the client.
+    """
+    scene = data.get("room")
+    if scene is not None and not is_valid_room(scene):
+        await ws_manager.send_message(
+            websocket, {"event": "error", "message": "'room' must be a string"}
+        )
+        return
+    await ws_manager.send_message(
+        websocket, {"event": "state_snapshot", **scene_state.snapshot(scene)}
+    )
+
+
+async def merge_state_writes(message):
+    """
+    Apply the writes another worker published and send the changes to local clients.
+
+    Args:
+        message (dict): The backplane message with the 'scene' and its 'writes'.
+    """
+    scene = message.get("scene")
+    if scene is not None and not ws_manager.client_manager.has_room(scene):
+        # nobody here is in the room; its state is requested when someone joins
+        return
+    delta = scene_state.merge(scene, message.get("writes", ()))
+    await send_state_delta(scene, delta)
+
+
+async def send_scene_writes(message):
+    """
+    Publish the state of a scene another worker requested because a client joined its room.
+
+    Args:
+        message (dict): The backplane message with the 'scene'.
+    """
+    scene = message.get("scene")
+    writes = scene_state.export(scene)
+    if writes:
+        ws_manager.backplane.publish(
+            {"type": "state_writes", "scene": scene, "writes": writes}
+        )
+
+
+def release_scene(room):
+    """
+    Discard the state of a room's scene once the room is no longer in use.
+
+    Args:
+        room (str): The room.
+    """
+    scene_state.clear(room)
+
+
+async def publish_state(message):
+    """
+    Publish the state of all scenes, so a worker that (re)joined catches up.
+
+    Merging writes that were already applied changes nothing, so every worker
+    can publish its whole state.
+
+    Args:
+        message (dict): The backplane message announcing the worker.
+    """
+    for scene in scene_state.scenes():
+        writes = scene_state.export(scene)
+        if writes:
+            ws_manager.backplane.publish(
+                {"type": "state_writes", "scene": scene, "writes": writes}
+            )
+    logger.debug("Published the state of %d scenes", len(scene_state.scenes()))
+
+
+ws_manager.add_backplane_listener("state_writes", merge_state_writes)
+ws_manager.add_backplane_listener("state_request", send_scene_writes)
+ws_manager.add_backplane_listener("worker_joined", publish_state)
+ws_manager.add_backplane_listener("connected", publish_state)
+ws_manager.client_manager.add_room_listener(release_scene)
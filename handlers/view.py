@@ -0,0 +1,69 @@
+"""
+View event handlers for the DataDiVR-Backend.
+
+This module defines the handler for the 'view' event, with which clients send
+their camera while looking at a project. The client receives 'view_update'
+events with the nodes that came into view, at a level of detail chosen by their
+distance, and the cells that left the view, see utils.project_data.view.
+"""
+
+from utils.jobs import job_manager
+from utils.project_data import ViewState, project_store, to_wire, view_streamer
+from utils.project_data.view import camera_of
+from utils.websocket import ws_manager
+
+
+@ws_manager.event("view")
+async def handle_view(data: dict, websocket):
+    """
+    Send the client the changes to what it sees of a project.
+
+    The data contains the 'project' and the camera: its 'position', the
+    'forward' direction it looks in and optionally its 'up' direction, vertical
+    'fov' in degrees, 'aspect' ratio and 'near' and 'far' clipping distances.
+    With 'reset': true the client receives everything in view again, e.g. after
+    dropping its scene. A 'view' event without a project ends streaming.
+
+    Nothing is sent if the view did not change enough to show other nodes. An
+    update with 'complete': false was cut to the node budget; the rest follows
+    with the next 'view' event.
+
+    Args:
+        data (dict): The data sent with the event.
+        websocket (WebSocket): The WebSocket connection object for the client.
+    """
+    client = ws_manager.client_manager.get_client(websocket)
+    if client is None:
+        return
+    name = data.get("project")
+    if not name:
+        client.view = None
+        return
+
+    try:
+        project = await project_store.load(name)
+    except (ValueError, OSError) as e:
+        await ws_manager.send_message(websocket, {"event": "error", "message": str(e)})
+        return
+    grid = project.spatial_index(build=False)
+    if grid is None:
+        grid = await job_manager.run_in_executor("thread", project.spatial_index)
+
+    state = client.view
+    if (
+        state is None
+        or data.get("reset")
+        or state.project != project.name
+        or state.grid is not grid
+    ):
+        state = client.view = ViewState(project.name, grid)
+
+    try:
+        update = view_streamer.update(state, project, camera_of(data))
+    except (KeyError, TypeError, ValueError) as e:
+        await ws_manager.send_message(
+            websocket, {"event": "error", "message": f"Invalid view: {e}"}
+        )
+        return
+    if update is not None:
+        await ws_manager.send_message(websocket, to_wire(update))
@@ -2,34 +2,67 @@
 Welcome event handler for the DataDiVR-Backend.
 
 This module defines the handler for the 'welcome' event, which is triggered
-when a new client connects to the WebSocket server.
+when a new client connects to the WebSocket server. Clients can send the
+'welcome' event themselves to negotiate the wire protocol.
 """
 
-from utils.websocket import ws_manager
+from utils.scene_state import scene_state
+from utils.websocket import codec, ws_manager
 
 
 @ws_manager.event("welcome")
-async def handle_welcome(client_info, websocket):
+async def handle_welcome(client_info, websocket, data: dict = None):
     """
     Handle the welcome event for new clients.
 
     This function is called automatically when a new client connects to the
-    WebSocket server. It sends a personalized welcome message to the client.
+    WebSocket server. It sends a personalized welcome message to the client,
+    listing the wire protocols the server supports.
+
+    A client that wants a different protocol sends a 'welcome' event with a
+    'protocol' field ("json" or "msgpack"). If the protocol is supported, the
+    reply and all further messages to the client use it; otherwise the client
+    stays on its current protocol. The reply's 'protocol' field tells the client
+    which one is in effect.
+
+    Clients with a resumable session also receive their 'resume_token', whether
+    this connection 'resumed' the session and, if so, whether the replay of the
+    messages they missed is complete ('replay_complete'). If it is not, the
+    client should reload its state.
+
+    The message also carries a snapshot of the global scene 'state', with its
+    'version'; from then on the client receives only 'state_delta' events.
 
     Args:
         client_info (dict): A dictionary containing information about the client,
                             including 'client_id' and 'first_name'.
         websocket (WebSocket): The WebSocket connection object for the client.
+        data (dict, optional): The data sent with the event, may contain a 'protocol' field.
     """
     client_id = client_info["client_id"]
     client_name = client_info["first_name"]
 
+    requested = (data or {}).get("protocol")
+    if requested is not None:
+        protocol = ws_manager.set_protocol(websocket, requested)
+    else:
+        protocol = ws_manager.get_protocol(websocket)
+
     welcome_message = f"habedere! yo! we will call you {client_name}! ({client_id})"
+    message = {
+        "event": "welcome",
+        "sender_name": "handle_welcome()",
+        "message": welcome_message,
+        "protocol": protocol,
+        "protocols": codec.available_protocols(),
+        "state": scene_state.snapshot(),
+    }
+
+    session = ws_manager.get_session(websocket)
+    if session is not None:
+        message["resume_token"] = session.token
+        message["resumed"] = session.resumed
+        if session.resumed:
+            message["replay_complete"] = session.replay_complete
 
-    await websocket.send_json(
-        {
-            "event": "welcome",
-            "sender_name": "handle_welcome()",
-            "message": welcome_message,
-        }
-    )
+    await ws_manager.send_message(websocket, message)
@@ -0,0 +1,93 @@
+"""
+Aggregate API endpoint module for the DataDiVR-Backend.
+
+This module defines a REST API endpoint that computes statistics of large
+amounts of numbers sent in the request body, as a JSON array or as raw
+little-endian float64 values. The body is parsed chunk by chunk as it arrives,
+so it is never held in memory as text, and sums are compensated.
+"""
+
+import os
+
+from fastapi import Response
+
+from utils.aggregate import OPERATIONS, Aggregator, BinaryParser, JSONArrayParser
+from utils.API_framework import Request, Route
+from utils.custom_logging import logger
+from utils.jobs import job_manager
+
+route = Route()
+
+# Largest request body accepted, in bytes
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+BINARY_TYPES = ("application/octet-stream",)
+
+
+@route.post("/aggregate")
+async def aggregate(
+    request: Request,
+    response: Response,
+    ops: str = ",".join(OPERATIONS),
+    percentiles: str = "",
+):
+    """
+    Compute statistics of the numbers in the request body.
+
+    The body is a JSON array of numbers, or with the content type
+    application/octet-stream the numbers as little-endian float64 values.
+
+    Args:
+        request (Request): The incoming request object.
+        response (Response): FastAPI response object for setting status codes.
+        ops (str, optional): Comma-separated statistics to compute: count, sum,
+                             mean, min and max. Defaults to all of them.
+        percentiles (str, optional): Comma-separated percentiles from 0 to 100,
+                                     e.g. "50,90,99". Defaults to none.
+
+    Returns:
+        dict: The requested statistics, or an error message.
+    """
+    try:
+        operations = [name for name in ops.split(",") if name]
+        unknown = set(operations) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown operations: {', '.join(sorted(unknown))}")
+        levels = [float(p) for p in percentiles.split(",") if p]
+        if any(not 0 <= p <= 100 for p in levels):
+            raise ValueError("Percentiles must be between 0 and 100")
+    except ValueError as e:
+        response.status_code = 400
+        return {"detail": str(e)}
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    parser = BinaryParser() if content_type in BINARY_TYPES else JSONArrayParser()
+    aggregator = Aggregator(keep_values=bool(levels))
+    max_bytes = int(os.getenv("AGGREGATE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                response.status_code = 413
+                return {"detail": f"The body exceeds {max_bytes} bytes"}
+            aggregator.add(parser.feed(chunk))
+        aggregator.add(parser.close())
+    except ValueError as e:
+        logger.error("Error parsing numbers: %s", str(e))
+        response.status_code = 400
+        return {"detail": str(e)}
+
+    if not aggregator.count:
+        response.status_code = 400
+        return {"detail": "No numbers provided"}
+    try:
+        if not levels:
+            return aggregator.result(operations)
+        # percentiles of many values take a moment; keep the event loop free
+        return await job_manager.run_in_executor(
+            "thread", aggregator.result, operations, levels
+        )
+    except ValueError as e:
+        # e.g. the sum of finite values exceeds the range of float64
+        response.status_code = 400
+        return {"detail": str(e)}
@@ -1,10 +1,14 @@
 """
 Index API endpoint module for the DataDiVR-Backend.
 
-This module defines the root endpoint that serves the main HTML page.
+This module defines the root endpoint that serves the main HTML page. The page
+is rendered once and then served from the template cache, with an ETag so
+clients that poll it get 304 Not Modified until the template changes.
 """
 
-from utils.API_framework import Request, Route, Templates
+import html
+
+from utils.API_framework import HTMLResponse, Request, Route, Templates
 from utils.custom_logging import logger
 
 route = Route()
@@ -20,11 +24,12 @@ async def root(request: Request):
         request (Request): The incoming request object.
 
     Returns:
-        TemplateResponse: The rendered index.jinja template.
+        Response: The rendered index.jinja template, 304 Not Modified if the
+        client's copy is current, or an error page.
     """
     logger.debug("Serving index.jinja")
     try:
-        return templates.TemplateResponse("index.jinja", {"request": request})
+        return templates.CachedTemplateResponse(request, "index.jinja")
     except Exception as e:
         logger.error(f"Error serving index.jinja: {str(e)}")
-        return f"<h1>Error: {str(e)}</h1>"
+        return HTMLResponse(f"<h1>Error: {html.escape(str(e))}</h1>", status_code=500)
@@ -0,0 +1,25 @@
+"""
+Metrics API endpoint module for the DataDiVR-Backend.
+
+This module defines the endpoint that serves the metrics of the worker process
+in the Prometheus text exposition format.
+"""
+
+from utils.API_framework import PlainTextResponse, Route
+from utils.metrics import CONTENT_TYPE, metrics
+
+# register the WebSocket layer's gauges
+from utils.websocket import ws_manager  # noqa: F401
+
+route = Route()
+
+
+@route.get("/metrics")
+async def get_metrics():
+    """
+    Serve the current metrics for scraping.
+
+    Returns:
+        PlainTextResponse: The metrics in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
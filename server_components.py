@@ -5,17 +5,22 @@ This module contains functions for creating and configuring the DataDiVR-Backend
 including static file serving, event handlers, route handlers, and WebSocket endpoints.
 """
 
+import asyncio
 import importlib
 import json
 import os
 from typing import Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.staticfiles import StaticFiles
 from websockets.exceptions import ConnectionClosedOK
 
 from utils.custom_logging import logger
-from utils.websocket import ws_manager
+from utils.jobs import job_manager
+from utils.metrics import WS_RECEIVED_BYTES, WS_RECEIVED_FRAMES, frame_size
+from utils.static_files import CachedStaticFiles
+from utils.websocket import codec, ws_manager
+from utils.websocket.backplane import create_backplane
+from utils.websocket.rate_limiter import RATE_LIMIT_CLOSE_CODE, RateLimitExceeded
 
 
 def create_fastapi_app():
@@ -33,13 +38,49 @@ def add_static_files(app):
     """
     Add static file serving to the DataDiVR-Backend.
 
+    Files are served compressed, in ranges and with cache validators, see
+    utils.static_files.CachedStaticFiles.
+
     Args:
         app (FastAPI): The DataDiVR-Backend FastAPI instance.
     """
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    _mount_static(app, "/static", "static", "static")
     logger.debug("added static files route at %s", "/static")
 
 
+def _mount_static(app, route: str, directory: str, name: str):
+    """
+    Mount a static folder and compress its files in the background once the DataDiVR-Backend starts.
+
+    Set STATIC_PRECOMPRESS=0 to compress files on their first request only.
+    """
+    static_files = CachedStaticFiles(directory=directory)
+    app.mount(route, static_files, name=name)
+    if os.getenv("STATIC_PRECOMPRESS", "1").lower() in ("0", "false", "no"):
+        return
+
+    async def precompress():
+        try:
+            count = await job_manager.run_in_executor(
+                "thread", static_files.precompress
+            )
+            logger.debug("Precompressed %d static files in %s", count, directory)
+        except Exception as e:
+            logger.error("Error precompressing %s: %s", directory, str(e))
+
+    tasks = []
+
+    @app.on_event("startup")
+    async def start_precompress():
+        # the server accepts requests meanwhile; files not ready yet are compressed on request
+        tasks.append(asyncio.get_running_loop().create_task(precompress()))
+
+    @app.on_event("shutdown")
+    async def stop_precompress():
+        for task in tasks:
+            task.cancel()
+
+
 def load_event_handlers():
     """
     Load event handlers from the 'handlers' directory for the DataDiVR-Backend.
@@ -75,12 +116,25 @@ async def websocket_endpoint(websocket: WebSocket):
 
     This function manages the lifecycle of a WebSocket connection, including
     accepting the connection, handling events, and cleaning up on disconnect.
+    Clients connecting with the query parameter 'resumable=1' get a resumable
+    session; clients reconnecting with 'resume=<token>&last_seq=<n>' resume theirs.
+    Incoming text frames are decoded as JSON, binary frames with the wire
+    protocol the client negotiated in the welcome handshake. Events beyond the
+    client's rate limits are dropped, delayed or end the connection, depending
+    on the rate limit policy.
 
     Args:
         websocket (WebSocket): The WebSocket connection object.
     """
     await websocket.accept()
-    client_id = ws_manager.add_client(websocket)
+    params = websocket.query_params
+    last_seq = params.get("last_seq", "")
+    client_id = ws_manager.add_client(
+        websocket,
+        resumable=params.get("resumable") in ("1", "true"),
+        resume_token=params.get("resume"),
+        last_seq=int(last_seq) if last_seq.isdigit() else 0,
+    )
 
     try:
         # when user connects, send them the welcome event
@@ -88,16 +142,35 @@ async def websocket_endpoint(websocket: WebSocket):
         await ws_manager.handle_event("welcome", {}, websocket)
 
         while True:
-            data = await websocket.receive_json()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            raw = message.get("text")
+            WS_RECEIVED_FRAMES.inc()
+            if raw is not None:
+                WS_RECEIVED_BYTES.inc(frame_size(raw))
+                data = codec.decode(raw)
+            else:
+                WS_RECEIVED_BYTES.inc(len(message["bytes"]))
+                data = codec.decode_frame(
+                    message["bytes"], ws_manager.get_protocol(websocket)
+                )
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object")
             event_name = data.get("event")
-            await ws_manager.handle_event(event_name, data, websocket)
+            if not await ws_manager.rate_limiter.admit(client_id, event_name):
+                continue
+            await ws_manager.handle_event(event_name, data, websocket, raw)
 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for client {client_id}")
+    except RateLimitExceeded as e:
+        logger.warning(f"Disconnecting client {client_id}: {e}")
+        await websocket.close(code=RATE_LIMIT_CLOSE_CODE)
     except (ConnectionClosedOK, json.JSONDecodeError, ValueError) as e:
         logger.error(f"Error for client {client_id}: {e}")
     finally:
-        ws_manager.remove_client(client_id)
+        ws_manager.remove_client(client_id, websocket)
         logger.info(f"Removed client {client_id}")
 
 
@@ -111,6 +184,43 @@ def add_websocket_endpoint(app):
     app.add_api_websocket_route("/ws", websocket_endpoint)
 
 
+def add_backplane(app):
+    """
+    Connect the WebSocket manager to the other workers while the DataDiVR-Backend runs.
+
+    The backplane is selected with the WS_BACKPLANE environment variable, see
+    utils.websocket.backplane.create_backplane.
+
+    Args:
+        app (FastAPI): The DataDiVR-Backend FastAPI instance.
+    """
+    backplane = create_backplane()
+
+    @app.on_event("startup")
+    async def start_backplane():
+        await ws_manager.start_backplane(backplane)
+        logger.debug("Started %s", type(backplane).__name__)
+
+    @app.on_event("shutdown")
+    async def stop_backplane():
+        # send the batched updates still pending before disconnecting
+        await ws_manager.tick_broadcaster.close()
+        await ws_manager.stop_backplane()
+
+
+def add_job_manager(app):
+    """
+    Stop the background jobs and their worker pools when the DataDiVR-Backend shuts down.
+
+    Args:
+        app (FastAPI): The DataDiVR-Backend FastAPI instance.
+    """
+
+    @app.on_event("shutdown")
+    async def stop_jobs():
+        job_manager.shutdown()
+
+
 def add_custom_static_folder(
     app, route: str, directory: str, name: Optional[str] = None
 ):
@@ -126,7 +236,5 @@ def add_custom_static_folder(
     if not route.startswith("/"):
         route = f"/{route}"
 
-    app.mount(
-        route, StaticFiles(directory=directory), name=name or f"static_{directory}"
-    )
+    _mount_static(app, route, directory, name or f"static_{directory}")
     logger.debug("Added custom static folder: %s at route %s", directory, route)
@@ -0,0 +1,157 @@
+"""
+Unit tests for the WebSocket backplanes in the DataDiVR-Backend.
+
+This module contains test cases to verify that broadcasts and client registry
+events published on a backplane reach the WebSocketManagers of other workers.
+"""
+
+import asyncio
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import WebSocket
+
+from utils.names import name_manager
+from utils.websocket.backplane import Backplane, InProcessBackplane, UnixSocketBackplane
+from utils.websocket.websocket_manager import WebSocketManager
+
+
+async def wait_for(condition, timeout=2.0):
+    """
+    Wait until a condition becomes true.
+
+    Args:
+        condition (Callable): A function returning a truthy value once satisfied.
+        timeout (float, optional): Seconds to wait before failing. Defaults to 2.0.
+    """
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met"
+        await asyncio.sleep(0.01)
+
+
+def make_websocket():
+    """
+    Create a mock WebSocket whose send_text is awaitable.
+
+    Returns:
+        Mock: A mock WebSocket instance.
+    """
+    websocket = Mock(spec=WebSocket)
+    websocket.send_text = AsyncMock()
+    return websocket
+
+
+def test_backplanes_must_implement_publish():
+    """
+    Test that the Backplane base class cannot be used without a publish method.
+    """
+    with pytest.raises(TypeError):
+        Backplane()
+
+
+@pytest.mark.asyncio
+async def test_in_process_backplane_relays_broadcasts_and_registry():
+    """
+    Test that two managers on one channel share broadcasts and their client registry.
+    """
+    worker_a, worker_b = WebSocketManager(), WebSocketManager()
+    await worker_a.start_backplane(InProcessBackplane(channel="test_relay"))
+    await worker_b.start_backplane(InProcessBackplane(channel="test_relay"))
+
+    websocket = make_websocket()
+    client_id = worker_b.add_client(websocket)
+    worker_b.join_room(client_id, "project_1")
+    await wait_for(lambda: client_id in worker_a.client_manager.remote_clients)
+
+    await worker_a.broadcast({"event": "select"}, room="project_1")
+    await wait_for(lambda: websocket.send_text.called)
+    websocket.send_text.assert_called_once_with('{"event":"select"}')
+
+    worker_b.remove_client(client_id)
+    await wait_for(lambda: client_id not in worker_a.client_manager.remote_clients)
+    await worker_a.stop_backplane()
+    await worker_b.stop_backplane()
+
+
+@pytest.mark.asyncio
+async def test_backplane_listeners_and_unpublished_broadcasts():
+    """
+    Test that listeners receive backplane messages of their type, and that
+    broadcasts with publish=False stay on the worker that sent them.
+    """
+    worker_a, worker_b = WebSocketManager(), WebSocketManager()
+    received = []
+    worker_b.add_backplane_listener(
+        "state_writes", AsyncMock(side_effect=received.append)
+    )
+    await worker_a.start_backplane(InProcessBackplane(channel="test_listeners"))
+    await worker_b.start_backplane(InProcessBackplane(channel="test_listeners"))
+
+    websocket = make_websocket()
+    client_id = worker_b.add_client(websocket)
+    await wait_for(lambda: client_id in worker_a.client_manager.remote_clients)
+    await worker_a.broadcast({"event": "state_delta"}, publish=False)
+    worker_a.backplane.publish({"type": "state_writes", "writes": []})
+    await wait_for(lambda: received)
+    assert received[0]["writes"] == []
+    websocket.send_text.assert_not_called()
+
+    worker_b.remove_client(client_id)
+    await worker_a.stop_backplane()
+    await worker_b.stop_backplane()
+
+
+@pytest.mark.asyncio
+async def test_remote_client_names_stay_unique():
+    """
+    Test that names of clients on other workers are not handed out again.
+    """
+    worker = WebSocketManager()
+    names = set(name_manager.first_names)
+    for i, name in enumerate(names):
+        worker.client_manager.add_remote_client("other", f"remote_{i}", name)
+
+    client_id = worker.add_client(make_websocket())
+    assert worker.client_manager.connected_clients[client_id].first_name not in names
+    worker.remove_client(client_id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="requires Unix domain sockets")
+async def test_unix_socket_backplane_relays_and_reelects(tmp_path):
+    """
+    Test that workers connected over a Unix socket exchange messages and elect a
+    new hub when the current one exits.
+    """
+    path = str(tmp_path / "backplane.sock")
+    received = {"hub": [], "a": [], "b": []}
+
+    def collector(name):
+        async def on_message(message):
+            received[name].append(message)
+
+        return on_message
+
+    hub, spoke_a, spoke_b = (UnixSocketBackplane(path) for _ in range(3))
+    await hub.start(collector("hub"))
+    await spoke_a.start(collector("a"))
+    await spoke_b.start(collector("b"))
+    assert hub.is_hub and not spoke_a.is_hub
+
+    spoke_a.publish({"type": "broadcast", "data": {"event": "x"}})
+    await wait_for(lambda: any(m["type"] == "broadcast" for m in received["b"]))
+    await wait_for(lambda: any(m["type"] == "broadcast" for m in received["hub"]))
+    assert not any(m["type"] == "broadcast" for m in received["a"])
+
+    await hub.close()
+    await wait_for(lambda: spoke_a.is_hub or spoke_b.is_hub)
+    new_hub, other = (spoke_a, spoke_b) if spoke_a.is_hub else (spoke_b, spoke_a)
+    await wait_for(lambda: other._hub_writer is not None)
+
+    new_hub.publish({"type": "broadcast", "data": {"event": "y"}})
+    name = "a" if other is spoke_a else "b"
+    await wait_for(lambda: any(m.get("data") == {"event": "y"} for m in received[name]))
+    await spoke_a.close()
+    await spoke_b.close()
@@ -0,0 +1,138 @@
+"""
+Unit tests for the Broadcaster class in the DataDiVR-Backend.
+
+This module contains pytest fixtures and test cases to verify the functionality
+of the Broadcaster class, which sends messages to multiple WebSocket clients.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi import WebSocket
+
+from utils.websocket import codec
+from utils.websocket.broadcaster import Broadcaster
+from utils.websocket.client_info import ClientInfo
+
+
+def make_client(client_id):
+    """
+    Create a ClientInfo with a mock WebSocket whose send_text is awaitable.
+
+    Args:
+        client_id (str): The ID to assign to the client.
+
+    Returns:
+        ClientInfo: The client information for the mock client.
+    """
+    websocket = Mock(spec=WebSocket)
+    websocket.send_text = AsyncMock()
+    return ClientInfo(websocket=websocket, client_id=client_id, first_name=client_id)
+
+
+@pytest.fixture
+def broadcaster():
+    """
+    Fixture to create a Broadcaster instance.
+
+    Returns:
+        Broadcaster: A new instance of the Broadcaster class.
+    """
+    return Broadcaster(get_client_info=Mock())
+
+
+@pytest.mark.asyncio
+async def test_broadcast_encodes_once(broadcaster):
+    """
+    Test that a broadcast serializes the message once for all recipients.
+
+    Verifies that every client receives the same text frame and that the
+    sender is skipped.
+    """
+    clients = [make_client(f"client_{i}") for i in range(3)]
+    data = {"event": "moved", "sender_id": "client_0", "data": {"x": 1}}
+
+    with patch("utils.websocket.broadcaster.codec.encode", wraps=codec.encode) as enc:
+        result = await broadcaster.broadcast(data, clients)
+    for client in clients:
+        await client.outbound.join()
+
+    assert enc.call_count == 1
+    assert result.delivered == ["client_1", "client_2"]
+    assert result.skipped == ["client_0"]
+    frame = clients[1].websocket.send_text.call_args.args[0]
+    assert json.loads(frame) == data
+    clients[2].websocket.send_text.assert_called_once_with(frame)
+    clients[0].websocket.send_text.assert_not_called()
+    for client in clients:
+        client.outbound.close()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_slow_client_does_not_block_others(broadcaster):
+    """
+    Test that a client that does not accept a frame in time does not delay others.
+
+    Verifies that the other clients still receive the message and that the slow
+    client's writer gives up after the send timeout.
+    """
+
+    async def never_completes(_):
+        await asyncio.sleep(10)
+
+    slow_client = make_client("slow")
+    slow_client.outbound.send_timeout = 0.05
+    slow_client.websocket.send_text = AsyncMock(side_effect=never_completes)
+    fast_client = make_client("fast")
+
+    result = await broadcaster.broadcast(
+        {"event": "update"}, [slow_client, fast_client]
+    )
+    await fast_client.outbound.join()
+
+    assert result.delivered == ["slow", "fast"]
+    fast_client.websocket.send_text.assert_called_once()
+    fast_client.outbound.close()
+    await slow_client.outbound.join()
+    assert slow_client.outbound.failed == 1
+    assert slow_client.outbound.closed
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reports_closed_clients(broadcaster):
+    """
+    Test that clients whose outbound queue is closed are reported as failed.
+    """
+    closed_client = make_client("closed")
+    closed_client.outbound.close()
+
+    result = await broadcaster.broadcast({"event": "update"}, [closed_client])
+
+    assert result.delivered_count == 0
+    assert result.failed == {"closed": "Connection closed"}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_uses_each_clients_protocol(broadcaster):
+    """
+    Test that clients receive the broadcast in their negotiated wire protocol.
+    """
+    pytest.importorskip("msgpack")
+    json_client = make_client("json_client")
+    binary_client = make_client("binary_client")
+    binary_client.protocol = "msgpack"
+    binary_client.websocket.send_bytes = AsyncMock()
+    data = {"event": "nodes", "positions": codec.Float32Array([1.0, 2.0])}
+
+    await broadcaster.broadcast(data, [json_client, binary_client])
+    await json_client.outbound.join()
+    await binary_client.outbound.join()
+
+    frame = json_client.websocket.send_text.call_args.args[0]
+    assert json.loads(frame) == {"event": "nodes", "positions": [1.0, 2.0]}
+    binary = binary_client.websocket.send_bytes.call_args.args[0]
+    assert codec.decode_frame(binary, "msgpack") == data
+    json_client.outbound.close()
+    binary_client.outbound.close()
@@ -0,0 +1,102 @@
+"""
+Unit tests for the ResultCache in the DataDiVR-Backend.
+
+This module contains test cases to verify the canonical cache keys, the LRU,
+expiry and memory budget eviction, and that concurrent computations of the
+same key are deduplicated.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.cache import ResultCache, cache_key
+
+
+def test_cache_key_is_canonical():
+    """
+    Test that payloads differing only in key order get the same key.
+    """
+    assert cache_key("layout", {"a": 1, "b": [1, 2]}) == cache_key(
+        "layout", {"b": [1, 2], "a": 1}
+    )
+    assert cache_key("layout", {"a": 1}) != cache_key("layout", {"a": 2})
+    assert cache_key("layout", {"a": 1}) != cache_key("sum", {"a": 1})
+    with pytest.raises(TypeError):
+        cache_key("layout", object())
+
+
+def test_lru_eviction_and_memory_budget():
+    """
+    Test that the least recently used entries are evicted beyond the limits.
+    """
+    cache = ResultCache(max_entries=2, max_bytes=1000, ttl=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.lookup("a") == (True, 1)
+    cache.set("c", 3)
+    assert cache.lookup("b") == (False, None)
+    assert cache.lookup("a") == (True, 1)
+
+    assert not cache.set("big", "x" * 2000)
+    cache.set("d", "x" * 600)
+    cache.set("e", "y" * 600)
+    assert cache.lookup("d") == (False, None)
+    assert cache.lookup("e")[0]
+    assert cache.size <= 1000
+
+
+def test_entries_expire():
+    """
+    Test that entries are no longer returned after their time to live.
+    """
+    cache = ResultCache(ttl=60)
+    cache.set("short", 1, ttl=0.001)
+    cache.set("long", 2)
+    time.sleep(0.01)
+    assert cache.lookup("short") == (False, None)
+    assert cache.lookup("long") == (True, 2)
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_computation():
+    """
+    Test that concurrent requests for the same key run the computation once.
+    """
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(
+        *(cache.get_or_compute("answer", compute) for _ in range(5))
+    )
+    assert results == [42] * 5
+    assert len(calls) == 1
+    assert await cache.get_or_compute("answer", compute) == 42
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_but_not_cached():
+    """
+    Test that a failed computation raises for all waiters and is retried later.
+    """
+    cache = ResultCache()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("no data")
+
+    results = await asyncio.gather(
+        cache.get_or_compute("key", fail),
+        cache.get_or_compute("key", fail),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert await cache.get_or_compute("key", lambda: 1) == 1
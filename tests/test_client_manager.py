@@ -67,3 +67,33 @@ def test_get_client_info(client_manager, mock_websocket):
     client_info = client_manager.get_client_info(mock_websocket)
     assert client_info["client_id"] == client_id
     assert "first_name" in client_info
+
+
+def test_join_and_leave_room(client_manager, mock_websocket):
+    """
+    Test joining and leaving rooms.
+
+    Verifies that the room index tracks members and discards empty rooms.
+    """
+    client_id = client_manager.add_client(mock_websocket)
+    assert client_manager.join_room(client_id, "project_1")
+    assert not client_manager.join_room(client_id, "project_1")
+    assert [c.client_id for c in client_manager.get_room_clients("project_1")] == [
+        client_id
+    ]
+    assert client_manager.get_rooms() == {"project_1": 1}
+
+    assert client_manager.leave_room(client_id, "project_1")
+    assert client_manager.get_room_clients("project_1") == []
+    assert client_manager.get_rooms() == {}
+
+
+def test_remove_client_leaves_rooms(client_manager, mock_websocket):
+    """
+    Test that removing a client also removes it from all of its rooms.
+    """
+    client_id = client_manager.add_client(mock_websocket)
+    client_manager.join_room(client_id, "project_1")
+    client_manager.join_room(client_id, "project_2")
+    client_manager.remove_client(client_id)
+    assert client_manager.get_rooms() == {}
@@ -0,0 +1,118 @@
+"""
+Unit tests for the WebSocket codec in the DataDiVR-Backend.
+
+This module contains test cases to verify encoding and decoding of WebSocket
+frames, including pass-through of already encoded JSON.
+"""
+
+import json
+import struct
+
+import pytest
+
+from utils.websocket import codec
+from utils.websocket.codec import Float32Array, RawJSON
+
+
+def test_roundtrip():
+    """
+    Test that encoded messages decode to the original data.
+    """
+    data = {"event": "hello", "name": "Jürgen", "values": [1, 2.5, None, True]}
+    frame = codec.encode(data)
+    assert isinstance(frame, str)
+    assert codec.decode(frame) == data
+    assert codec.decode(frame.encode("utf-8")) == data
+
+
+def test_raw_json_is_spliced_verbatim():
+    """
+    Test that RawJSON values at the top level are inserted without re-encoding.
+    """
+    raw = '{"event": "move",  "x": 1}'
+    frame = codec.encode({"event": "move", "sender_id": "a", "data": RawJSON(raw)})
+    assert frame.endswith(f'"data":{raw}}}')
+    assert json.loads(frame) == {
+        "event": "move",
+        "sender_id": "a",
+        "data": {"event": "move", "x": 1},
+    }
+    assert codec.encode({"data": RawJSON("[1]")}) == '{"data":[1]}'
+    assert codec.encode(RawJSON("[1, 2]")) == "[1, 2]"
+
+
+def test_large_integers_fall_back_to_stdlib():
+    """
+    Test that values the accelerated backend rejects are still encoded.
+    """
+    assert codec.decode(codec.encode({"n": 2**70})) == {"n": 2**70}
+
+
+def test_decode_invalid_frame_raises_value_error():
+    """
+    Test that invalid frames raise a ValueError.
+    """
+    with pytest.raises(ValueError):
+        codec.decode("{not json")
+
+
+def test_float32_array_json_and_bytes():
+    """
+    Test that Float32Array encodes as a list in JSON and as little-endian float32 bytes.
+    """
+    values = Float32Array([1.5, -2.0, 3.25])
+    assert codec.decode(codec.encode({"p": values})) == {"p": [1.5, -2.0, 3.25]}
+    assert values.to_bytes() == struct.pack("<3f", 1.5, -2.0, 3.25)
+    assert Float32Array.from_bytes(values.to_bytes()) == values
+
+
+def test_msgpack_roundtrip_keeps_typed_arrays():
+    """
+    Test that MessagePack frames carry Float32Array values as raw float32 bytes.
+    """
+    pytest.importorskip("msgpack")
+    positions = Float32Array(float(i) for i in range(1000))
+    frame = codec.encode_frame({"event": "nodes", "positions": positions}, "msgpack")
+
+    assert isinstance(frame, bytes)
+    assert len(frame) < 4 * len(positions) + 64
+    decoded = codec.decode_frame(frame, "msgpack")
+    assert decoded == {"event": "nodes", "positions": positions}
+
+    with pytest.raises(ValueError):
+        codec.decode_frame(b"\xc1", "msgpack")
+
+
+def test_encoded_message_encodes_once_per_protocol():
+    """
+    Test that an EncodedMessage encodes its data at most once per protocol.
+    """
+    pytest.importorskip("msgpack")
+    message = codec.EncodedMessage({"event": "x", "data": RawJSON('{"a": 1}')})
+    json_frame = message.frame("json")
+    assert message.frame("json") is json_frame
+    assert codec.decode_frame(message.frame("msgpack"), "msgpack") == {
+        "event": "x",
+        "data": {"a": 1},
+    }
+
+    relayed = codec.EncodedMessage(frames={"json": json_frame})
+    assert codec.decode_frame(relayed.frame("msgpack"), "msgpack")["data"] == {"a": 1}
+
+
+def test_add_sequence_number_to_encoded_frames():
+    """
+    Test that a sequence number is added to JSON and MessagePack frames without
+    decoding them.
+    """
+    numbered = codec.add_sequence_number('{"event":"x"}', 7)
+    assert json.loads(numbered) == {"seq": 7, "event": "x"}
+    assert json.loads(codec.add_sequence_number("{}", 1)) == {"seq": 1}
+    with pytest.raises(ValueError):
+        codec.add_sequence_number("[1]", 1)
+
+    pytest.importorskip("msgpack")
+    for size in (1, 15, 70000):
+        data = {str(i): i for i in range(size)}
+        frame = codec.add_sequence_number(codec.encode_frame(data, "msgpack"), 3)
+        assert codec.decode_frame(frame, "msgpack") == {"seq": 3, **data}
@@ -0,0 +1,252 @@
+"""
+Unit tests for the logging pipeline in the DataDiVR-Backend.
+
+This module contains test cases to verify that log records are queued without
+blocking, dropped and counted when the queue is full, and written in batches
+by the background listener to rotating log files.
+"""
+
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import time
+from datetime import datetime
+
+from utils.custom_logging import (
+    BatchedStreamHandler,
+    BatchingQueueListener,
+    DroppingQueueHandler,
+    JsonLinesFormatter,
+    RotatingLogFileHandler,
+)
+
+
+def make_logger(name, handler):
+    """
+    Create a logger that only writes to the given handler.
+
+    Returns:
+        logging.Logger: The logger.
+    """
+    test_logger = logging.getLogger(name)
+    test_logger.handlers = [handler]
+    test_logger.propagate = False
+    test_logger.setLevel(logging.DEBUG)
+    return test_logger
+
+
+def test_full_queue_drops_and_reports():
+    """
+    Test that records are dropped and counted when the queue is full, and that
+    the drop count is reported once the queue has room again.
+    """
+    log_queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    test_logger = make_logger("test_dropping", handler)
+
+    for i in range(5):
+        test_logger.info("record %d", i)
+    assert handler.dropped == 3
+    assert [log_queue.get_nowait().getMessage() for _ in range(2)] == [
+        "record 0",
+        "record 1",
+    ]
+
+    test_logger.info("record 5")
+    warning, record = log_queue.get_nowait(), log_queue.get_nowait()
+    assert warning.levelno == logging.WARNING
+    assert warning.getMessage() == "Log queue full, dropped 3 log records"
+    assert record.getMessage() == "record 5"
+
+
+def test_listener_writes_batches():
+    """
+    Test that the listener writes all queued records and flushes once per batch.
+    """
+    stream = io.StringIO()
+    output = BatchedStreamHandler(stream)
+    output.setFormatter(logging.Formatter("%(message)s"))
+    flushes = []
+    output.flush_batch = lambda: flushes.append(stream.getvalue().count("\n"))
+
+    log_queue = queue.Queue()
+    test_logger = make_logger("test_batching", DroppingQueueHandler(log_queue))
+    for i in range(100):
+        test_logger.info("record %d", i)
+
+    listener = BatchingQueueListener(log_queue, output)
+    listener.start()
+    listener.stop()
+
+    assert stream.getvalue().splitlines() == [f"record {i}" for i in range(100)]
+    assert flushes[0] == 100
+
+
+def test_records_are_formatted_when_logged():
+    """
+    Test that queued records keep the arguments and exception as they were when logged.
+    """
+    log_queue = queue.Queue()
+    test_logger = make_logger("test_prepare", DroppingQueueHandler(log_queue))
+    data = {"x": 1}
+    test_logger.info("data: %s", data)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        test_logger.exception("failed")
+    data["x"] = 2
+
+    record, failure = log_queue.get_nowait(), log_queue.get_nowait()
+    assert record.getMessage() == "data: {'x': 1}" and record.args is None
+    assert failure.exc_info is None and "ValueError: boom" in failure.exc_text
+    assert (
+        "ValueError: boom"
+        in json.loads(JsonLinesFormatter().format(failure))["exception"]
+    )
+    assert logging.Formatter("%(message)s").format(failure).startswith("failed\n")
+
+
+def test_file_rotates_compresses_and_prunes(tmp_path):
+    """
+    Test that the log file is rotated at its size limit, that rotated files are
+    gzipped, and that only the newest rotated files are kept.
+    """
+    log_file = tmp_path / "backend.log"
+    handler = RotatingLogFileHandler(str(log_file), max_bytes=100, backup_count=2)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    test_logger = make_logger("test_rotation", handler)
+
+    for i in range(5):
+        test_logger.info("%03d %s", i, "x" * 100)
+        handler.flush_batch()
+    handler.compressor.join(timeout=5)
+
+    rotated = handler.compressor.rotated_files()
+    assert len(rotated) == 2
+    assert all(path.endswith(".gz") for path in rotated)
+    with gzip.open(rotated[-1], "rt") as f:
+        assert f.read().startswith("003 ")
+    assert log_file.read_text().startswith("004 ")
+    handler.close()
+
+
+def test_rotations_in_the_same_second_keep_the_newest_files(tmp_path, monkeypatch):
+    """
+    Test that files rotated within one second sort by rotation, also after older ones were pruned.
+    """
+    log_file = tmp_path / "backend.log"
+    handler = RotatingLogFileHandler(str(log_file), max_bytes=10, backup_count=2)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    test_logger = make_logger("test_same_second", handler)
+    compressor = handler.compressor
+
+    def submit(path):
+        # prune before the next rotation, as the background thread usually does
+        compressor._gzip(path)
+        compressor._remove_old_files()
+
+    monkeypatch.setattr(compressor, "submit", submit)
+    start = time.time()
+
+    for i in range(6):
+        handler.interval_start = start
+        test_logger.info("%03d %s", i, "x" * 10)
+        handler.flush_batch()
+
+    rotated = handler.compressor.rotated_files()
+    assert len(rotated) == 2
+    contents = []
+    for path in rotated:
+        with gzip.open(path, "rt") as f:
+            contents.append(f.read()[:3])
+    assert contents == ["003", "004"]
+    handler.close()
+
+
+def test_midnight_rotation_is_named_after_the_previous_day(tmp_path):
+    """
+    Test that the file rotated at midnight is named with the time it was started, not the new day.
+    """
+    log_file = tmp_path / "backend.log"
+    handler = RotatingLogFileHandler(str(log_file), max_bytes=0, compress=False)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    test_logger = make_logger("test_midnight", handler)
+    test_logger.info("yesterday")
+    handler.flush_batch()
+
+    midnight = time.time() - 60
+    handler.interval_start = midnight - 3600
+    handler.rollover_at = midnight
+    test_logger.info("today")
+    handler.flush_batch()
+
+    (rotated,) = handler.compressor.rotated_files()
+    stamp = datetime.fromtimestamp(midnight - 3600).strftime("%Y%m%d-%H%M%S")
+    assert rotated.endswith(stamp)
+    assert handler.interval_start == midnight
+    assert log_file.read_text() == "today\n"
+    handler.close()
+
+
+def test_handlers_on_one_path_do_not_lose_records(tmp_path):
+    """
+    Test that handlers given the same path, as by several workers, each rotate their own file without losing records.
+    """
+    log_file = tmp_path / "backend.log"
+    handlers = [
+        RotatingLogFileHandler(str(log_file), max_bytes=200, backup_count=0)
+        for _ in range(2)
+    ]
+    assert [handler.baseFilename for handler in handlers] == [
+        str(log_file),
+        str(tmp_path / "backend-1.log"),
+    ]
+    loggers = []
+    for i, handler in enumerate(handlers):
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        loggers.append(make_logger(f"test_worker_{i}", handler))
+
+    expected = set()
+    for i in range(50):
+        for worker, test_logger in enumerate(loggers):
+            test_logger.info("%d-%03d %s", worker, i, "x" * 20)
+            expected.add(f"{worker}-{i:03d}")
+            handlers[worker].flush_batch()
+    for handler in handlers:
+        assert handler.compressor.rotated_files()
+        handler.compressor.join(timeout=5)
+        handler.close()
+
+    written = []
+    for name in os.listdir(tmp_path):
+        path = str(tmp_path / name)
+        if name.endswith(".gz"):
+            with gzip.open(path, "rt") as f:
+                written += f.read().splitlines()
+        elif name.endswith(".log"):
+            with open(path) as f:
+                written += f.read().splitlines()
+    assert sorted(line.split()[0] for line in written) == sorted(expected)
+
+    # a released file is claimed again, e.g. by a restarted worker
+    handler = RotatingLogFileHandler(str(log_file))
+    assert handler.baseFilename == str(log_file)
+    handler.close()
+
+
+def test_json_lines_formatter():
+    """
+    Test that the JSON lines formatter writes one parseable object per record.
+    """
+    record = logging.LogRecord(
+        "backend", logging.INFO, __file__, 7, "hello %s", ("world",), None
+    )
+
+    entry = json.loads(JsonLinesFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "hello world"
+    assert entry["line"] == 7
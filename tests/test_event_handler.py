@@ -5,12 +5,15 @@ This module contains pytest fixtures and test cases to verify the functionality
 of the EventHandler class, which manages WebSocket event handling.
 """
 
+import logging
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 from fastapi import WebSocket
 
 from utils.websocket import ws_manager
+from utils.websocket.codec import RawJSON
+from utils.websocket.event_decorator import event_decorator
 from utils.websocket.event_handler import EventHandler
 
 
@@ -44,7 +47,7 @@ def mock_broadcast():
     Returns:
         function: A mock function for broadcasting messages.
     """
-    return lambda data, include_sender=False: None
+    return lambda data, include_sender=False, room=None: None
 
 
 @pytest.fixture
@@ -104,5 +107,94 @@ async def test_broadcast(event_handler, mock_websocket, mocker):
             "sender_id": "test_id",
             "sender_name": "Test",
             "data": {"data": "test"},
-        }
+        },
+        room=None,
     )
+
+
+@pytest.mark.asyncio
+async def test_broadcast_to_room(event_handler, mock_websocket):
+    """
+    Test that unknown events naming a room are only broadcast to that room.
+    """
+    mock_broadcast = AsyncMock()
+    event_handler.broadcast_func = mock_broadcast
+    data = {"event": "select", "room": "project_1"}
+
+    await event_handler.handle_event("select", data, mock_websocket)
+
+    assert mock_broadcast.call_args.kwargs["room"] == "project_1"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("room", ["project_2", ["project_1"], ""])
+async def test_broadcast_to_other_rooms_is_rejected(
+    mock_handlers, mock_get_client_info, mock_websocket, room
+):
+    """
+    Test that unknown events naming a room the sender has not joined, or no valid room, are not broadcast.
+    """
+    mock_broadcast, send_message = AsyncMock(), AsyncMock()
+    event_handler = EventHandler(
+        mock_handlers,
+        mock_get_client_info,
+        mock_broadcast,
+        is_member=lambda client_id, room: room == "project_1",
+        send_message=send_message,
+    )
+
+    await event_handler.handle_event("select", {"room": room}, mock_websocket)
+
+    mock_broadcast.assert_not_called()
+    assert send_message.call_args.args[1]["event"] == "error"
+
+    await event_handler.handle_event("select", {"room": "project_1"}, mock_websocket)
+    assert mock_broadcast.call_args.kwargs["room"] == "project_1"
+
+
+@pytest.mark.asyncio
+async def test_broadcast_forwards_raw_frame(event_handler, mock_websocket):
+    """
+    Test that unknown events are forwarded from their raw frame without re-encoding.
+    """
+    mock_broadcast = AsyncMock()
+    event_handler.broadcast_func = mock_broadcast
+    raw = '{"event": "unknown_event", "x": 1}'
+
+    await event_handler.handle_event(
+        "unknown_event", {"event": "unknown_event", "x": 1}, mock_websocket, raw
+    )
+
+    message = mock_broadcast.call_args.args[0]
+    assert isinstance(message["data"], RawJSON)
+    assert message["data"] == raw
+
+
+@pytest.mark.asyncio
+async def test_client_info_is_looked_up_lazily(mock_websocket, caplog):
+    """
+    Test that decorated handlers without a client_info parameter do not trigger
+    a client lookup, and that handlers with one receive the dispatcher's lookup.
+    """
+    get_client_info = Mock(return_value={"client_id": "test_id", "first_name": "Test"})
+    handlers = {}
+    event = event_decorator(handlers, get_client_info)
+    received = []
+
+    @event("plain")
+    async def plain(websocket):
+        received.append(websocket)
+
+    @event("with_info")
+    async def with_info(client_info, data):
+        received.append((client_info["client_id"], data))
+
+    handler = EventHandler(handlers, get_client_info, AsyncMock())
+    caplog.set_level(logging.INFO)
+
+    await handler.handle_event("plain", {}, mock_websocket)
+    get_client_info.assert_not_called()
+
+    await handler.handle_event("with_info", {"x": 1}, mock_websocket)
+    get_client_info.assert_called_once_with(mock_websocket)
+    assert received == [mock_websocket, ("test_id", {"x": 1})]
@@ -5,6 +5,7 @@ This module contains pytest fixtures and test cases to verify the functionality
 of various WebSocket event handlers, including welcome, hello, and ping handlers.
 """
 
+import json
 from unittest.mock import AsyncMock
 
 import pytest
@@ -12,7 +13,9 @@ from fastapi import WebSocket
 
 from handlers.hello import handle_hello
 from handlers.ping import handle_ping
+from handlers.rooms import handle_join_room, handle_leave_room
 from handlers.welcome import handle_welcome
+from utils.websocket import codec, ws_manager
 
 
 @pytest.mark.asyncio
@@ -26,7 +29,33 @@ async def test_handle_welcome():
     mock_websocket = AsyncMock(spec=WebSocket)
     client_info = {"client_id": "test_id", "first_name": "Test"}
     await handle_welcome(client_info, mock_websocket)
-    mock_websocket.send_json.assert_called_once()
+    mock_websocket.send_text.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_handle_welcome_negotiates_protocol():
+    """
+    Test that a client can switch to the MessagePack protocol with a welcome event.
+
+    Verifies that the reply is a binary frame and that unsupported protocols
+    are rejected.
+    """
+    pytest.importorskip("msgpack")
+    mock_websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(mock_websocket)
+    client = ws_manager.client_manager.connected_clients[client_id]
+    client_info = ws_manager.get_client_info(mock_websocket)
+
+    await handle_welcome(client_info, mock_websocket, {"protocol": "carrier-pigeon"})
+    assert client.protocol == "json"
+
+    await handle_welcome(client_info, mock_websocket, {"protocol": "msgpack"})
+    await client.outbound.join()
+    assert client.protocol == "msgpack"
+    reply = codec.decode_frame(mock_websocket.send_bytes.call_args.args[0], "msgpack")
+    assert reply["event"] == "welcome"
+    assert reply["protocol"] == "msgpack"
+    ws_manager.remove_client(client_id)
 
 
 @pytest.mark.asyncio
@@ -41,13 +70,12 @@ async def test_handle_hello():
     data = {"name": "John"}
     client_info = {"client_id": "test_id", "first_name": "Test"}
     await handle_hello(data, mock_websocket, client_info)
-    mock_websocket.send_json.assert_called_once_with(
-        {
-            "event": "hello",
-            "sender_name": "handle_hello_function",
-            "message": "Hello John!",
-        }
-    )
+    mock_websocket.send_text.assert_called_once()
+    assert json.loads(mock_websocket.send_text.call_args.args[0]) == {
+        "event": "hello",
+        "sender_name": "handle_hello_function",
+        "message": "Hello John!",
+    }
 
 
 @pytest.mark.asyncio
@@ -60,6 +88,45 @@ async def test_handle_ping():
     """
     mock_websocket = AsyncMock(spec=WebSocket)
     await handle_ping(mock_websocket)
-    mock_websocket.send_json.assert_called_once_with(
-        {"event": "pong", "sender_name": "ping pong bot"}
-    )
+    mock_websocket.send_text.assert_called_once()
+    assert json.loads(mock_websocket.send_text.call_args.args[0]) == {
+        "event": "pong",
+        "sender_name": "ping pong bot",
+    }
+
+
+@pytest.mark.asyncio
+async def test_handle_join_and_leave_room():
+    """
+    Test the join_room and leave_room event handlers.
+
+    Verifies that the client is added to and removed from the room.
+    """
+    mock_websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(mock_websocket)
+    client_info = ws_manager.get_client_info(mock_websocket)
+
+    await handle_join_room({"room": "project_1"}, mock_websocket, client_info)
+    assert ws_manager.client_manager.get_rooms()["project_1"] == 1
+
+    await handle_leave_room({"room": "project_1"}, mock_websocket, client_info)
+    assert "project_1" not in ws_manager.client_manager.get_rooms()
+    ws_manager.remove_client(client_id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("event", ["join_room", "leave_room"])
+@pytest.mark.parametrize("data", [{}, {"room": ""}, {"room": ["a"]}, {"room": {}}])
+async def test_room_events_require_a_room_name(event, data, mocker):
+    """
+    Test that joining or leaving without a room name answers with an error and keeps the connection.
+    """
+    mock_websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(mock_websocket)
+    send_message = mocker.patch.object(ws_manager, "send_message", AsyncMock())
+    try:
+        await ws_manager.handle_event(event, data, mock_websocket)
+        assert send_message.call_args.args[1]["event"] == "error"
+        assert ws_manager.client_manager.connected_clients[client_id].rooms == set()
+    finally:
+        ws_manager.remove_client(client_id)
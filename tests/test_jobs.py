@@ -0,0 +1,335 @@
+"""
+Unit tests for the JobManager in the DataDiVR-Backend.
+
+This module contains test cases to verify that jobs run in the background on
+the event loop, in the thread pool and in the process pool, respect the
+concurrency limits, can be cancelled and report their state changes, and that
+async generator jobs stream throttled progress to their subscribers, and that
+identical jobs share their computation and cached result.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import WebSocket
+
+from handlers import long_task
+from handlers.jobs import handle_subscribe_job
+from handlers.long_task import handle_long_task, run_long_task
+from utils.jobs import JobLimitError, JobManager, JobStatus, JobUpdate, job_manager
+from utils.websocket import ws_manager
+
+
+def make_manager(**kwargs):
+    """
+    Create a JobManager that records the statuses it reports.
+
+    Returns:
+        Tuple[JobManager, List[Tuple[str, str]]]: The manager and the reported
+        (job name, status) pairs.
+    """
+    reported = []
+
+    async def notify(job, event):
+        if event["event"] == "job_status":
+            reported.append((job.name, event["status"]))
+
+    return JobManager(notify=notify, **kwargs), reported
+
+
+@pytest.mark.asyncio
+async def test_async_job_reports_status_changes():
+    """
+    Test that an async job completes in the background and reports each state.
+    """
+    manager, reported = make_manager()
+
+    async def work(x):
+        await asyncio.sleep(0)
+        return x * 2
+
+    job = manager.submit(work, 21)
+    assert job.status == JobStatus.QUEUED
+    await job.task
+
+    assert job.result == 42
+    assert reported == [("work", "queued"), ("work", "running"), ("work", "completed")]
+    assert job.to_dict()["result"] == 42
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_queues_jobs():
+    """
+    Test that jobs beyond the concurrency limit wait until a slot is free.
+    """
+    manager, _ = make_manager(max_concurrent=1)
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+
+    first, second = manager.submit(blocker), manager.submit(blocker)
+    await asyncio.sleep(0.01)
+    assert (first.status, second.status) == (JobStatus.RUNNING, JobStatus.QUEUED)
+
+    release.set()
+    await asyncio.gather(first.task, second.task)
+    assert second.status == JobStatus.COMPLETED
+
+
+@pytest.mark.asyncio
+async def test_cancel_and_per_client_limit():
+    """
+    Test that only the owner can cancel a job and that clients have a job limit.
+    """
+    manager, reported = make_manager(max_per_client=1)
+    job = manager.submit(asyncio.sleep, 10, owner_id="alice")
+
+    with pytest.raises(JobLimitError):
+        manager.submit(asyncio.sleep, 10, owner_id="alice")
+    assert not manager.cancel(job.job_id, owner_id="bob")
+    assert manager.cancel(job.job_id, owner_id="alice")
+    await asyncio.gather(job.task, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert job.status == JobStatus.CANCELLED
+    assert reported[-1] == ("sleep", "cancelled")
+    assert manager.active_jobs("alice") == []
+
+
+@pytest.mark.asyncio
+async def test_failing_job_reports_error():
+    """
+    Test that an exception in a job marks it failed with the error message.
+    """
+    manager, _ = make_manager()
+
+    def fail():
+        raise ValueError("no data")
+
+    job = manager.submit(fail, executor="thread")
+    await job.task
+
+    assert job.status == JobStatus.FAILED
+    assert job.to_dict()["error"] == "no data"
+    manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_thread_and_process_jobs_do_not_block_the_loop():
+    """
+    Test that blocking and CPU-bound jobs run off the event loop.
+    """
+    manager, _ = make_manager(process_workers=1)
+
+    thread_job = manager.submit(time.sleep, 0.2, executor="thread")
+    process_job = manager.submit(sum, range(1000), executor="process")
+    start = time.perf_counter()
+    await asyncio.sleep(0.01)
+    assert time.perf_counter() - start < 0.15
+
+    await asyncio.gather(thread_job.task, process_job.task)
+    assert thread_job.status == JobStatus.COMPLETED
+    assert process_job.result == 499500
+    manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_generator_job_progress_is_throttled_and_coalesced():
+    """
+    Test that a generator job's updates are coalesced into few progress events,
+    that no chunk is lost and that the last update arrives before completion.
+    """
+    events = []
+
+    async def notify(job, event):
+        events.append(event)
+
+    manager = JobManager(notify=notify, progress_interval=0.05)
+
+    async def analysis(n):
+        for i in range(n):
+            await asyncio.sleep(0.001)
+            yield JobUpdate(progress=(i + 1) / n, partial={"done": i + 1}, chunk=i)
+        yield JobUpdate(result="done")
+
+    job = manager.submit(analysis, 100)
+    await job.task
+
+    progress = [event for event in events if event["event"] == "job_progress"]
+    assert 1 < len(progress) < 50
+    assert [chunk for event in progress for chunk in event["chunks"]] == list(
+        range(100)
+    )
+    assert progress[-1]["progress"] == 1.0
+    assert progress[-1]["partial"] == {"done": 100}
+    assert events[-1]["status"] == "completed"
+    assert job.result == "done"
+    assert job.progress == 1.0
+
+
+@pytest.mark.asyncio
+async def test_trailing_progress_is_sent_after_the_interval():
+    """
+    Test that an update held back by the throttle is sent once the interval
+    passes, even if the job does not yield again.
+    """
+    events = []
+
+    async def notify(job, event):
+        events.append(event)
+
+    manager = JobManager(notify=notify, progress_interval=0.02)
+    resume = asyncio.Event()
+
+    async def work():
+        yield 0.1
+        yield 0.2
+        await resume.wait()
+
+    job = manager.submit(work)
+    await asyncio.sleep(0.05)
+    partials = [
+        event["partial"] for event in events if event["event"] == "job_progress"
+    ]
+    assert partials == [0.1, 0.2]
+
+    resume.set()
+    await job.task
+
+
+@pytest.mark.asyncio
+async def test_subscribers_receive_job_events():
+    """
+    Test that subscribed clients receive a job's events until they unsubscribe.
+    """
+    events = []
+
+    async def notify(job, event):
+        events.append((set(job.subscribers), event["event"]))
+
+    manager = JobManager(notify=notify)
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        yield JobUpdate(progress=1.0)
+
+    job = manager.submit(work, owner_id="alice")
+    assert manager.subscribe(job.job_id, "bob") is job
+    assert manager.subscribe("unknown", "bob") is None
+    await asyncio.sleep(0)
+    assert manager.unsubscribe(job.job_id, "alice")
+    assert not manager.unsubscribe(job.job_id, "alice")
+    release.set()
+    await job.task
+
+    assert events[-1] == ({"bob"}, "job_status")
+    assert ({"bob"}, "job_progress") in events
+
+
+@pytest.mark.asyncio
+async def test_identical_jobs_share_a_computation_and_cache_the_result():
+    """
+    Test that a job submitted while an identical one runs joins it, and that a
+    later identical job completes from the cache without running.
+    """
+    manager, reported = make_manager()
+    calls = []
+
+    async def analysis(n):
+        calls.append(n)
+        await asyncio.sleep(0.01)
+        return n * 2
+
+    first = manager.submit(analysis, 21, owner_id="alice", cache_key="k")
+    joined = manager.submit(analysis, 21, owner_id="bob", cache_key="k")
+    assert joined is first
+    assert first.subscribers == {"alice", "bob"}
+    await first.task
+
+    cached = manager.submit(analysis, 21, owner_id="carol", cache_key="k")
+    await cached.task
+    assert (cached.status, cached.result) == (JobStatus.COMPLETED, 42)
+    assert calls == [21]
+    assert reported[-2:] == [("analysis", "queued"), ("analysis", "completed")]
+
+
+@pytest.mark.asyncio
+async def test_long_task_handler_returns_immediately():
+    """
+    Test that the long_task handler submits a job and sends its status to the requester.
+    """
+    websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(websocket)
+    client_info = ws_manager.get_client_info(websocket)
+
+    await asyncio.wait_for(handle_long_task({}, websocket, client_info), timeout=1)
+    (job,) = job_manager.active_jobs(client_id)
+    await asyncio.sleep(0.01)
+    job_manager.cancel(job.job_id)
+    await asyncio.gather(job.task, return_exceptions=True)
+    await ws_manager.client_manager.connected_clients[client_id].outbound.join()
+
+    statuses = [call.args[0] for call in websocket.send_text.call_args_list]
+    assert all('"event":"job_status"' in status for status in statuses)
+    assert '"status":"cancelled"' in statuses[-1]
+    ws_manager.remove_client(client_id)
+
+
+@pytest.mark.asyncio
+async def test_long_task_streams_progress_to_subscribers():
+    """
+    Test that a client subscribing to a long task receives its progress.
+    """
+    owner, watcher = AsyncMock(spec=WebSocket), AsyncMock(spec=WebSocket)
+    owner_id, watcher_id = ws_manager.add_client(owner), ws_manager.add_client(watcher)
+
+    job = job_manager.submit(
+        run_long_task, None, 4, 0.04, name="long_task", owner_id=owner_id
+    )
+    await handle_subscribe_job(
+        {"job_id": job.job_id}, watcher, ws_manager.get_client_info(watcher)
+    )
+    await job.task
+    await ws_manager.client_manager.connected_clients[watcher_id].outbound.join()
+
+    messages = [call.args[0] for call in watcher.send_text.call_args_list]
+    assert any('"event":"job_progress"' in message for message in messages)
+    assert '"status":"completed"' in messages[-1]
+    assert job.result == {"result": "yolo!"}
+    ws_manager.remove_client(owner_id)
+    ws_manager.remove_client(watcher_id)
+
+
+@pytest.mark.asyncio
+async def test_repeated_long_tasks_broadcast_every_time(monkeypatch):
+    """
+    Test that requesting the same long task twice runs it twice, so both completions are broadcast.
+    """
+
+    async def quick_long_task(room=None):
+        async for update in run_long_task(room, steps=1, duration=0):
+            yield update
+
+    monkeypatch.setattr(long_task, "run_long_task", quick_long_task)
+    broadcast = AsyncMock()
+    monkeypatch.setattr(ws_manager, "broadcast", broadcast)
+    websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(websocket)
+    client_info = ws_manager.get_client_info(websocket)
+
+    for _ in range(2):
+        await handle_long_task({}, websocket, client_info)
+        (job,) = job_manager.active_jobs(client_id)
+        await job.task
+
+    completed = [
+        call.args[0]
+        for call in broadcast.call_args_list
+        if call.args[0]["event"] == "long_task_completed"
+    ]
+    assert len(completed) == 2
+    ws_manager.remove_client(client_id)
@@ -0,0 +1,164 @@
+"""
+Unit tests for the force-directed layout in the DataDiVR-Backend.
+
+This module contains test cases to verify that the layout pulls linked nodes
+together and pushes unlinked groups apart, that it can be resumed, and that
+layout jobs send the nodes that moved to the room viewing the project.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+from fastapi import WebSocket
+
+from handlers.layout import handle_layout, layouts, run_layout
+from utils.jobs import job_manager
+from utils.project_data import ProjectData, project_store
+from utils.project_data.layout import layout_iterations, start_layout
+from utils.websocket import ws_manager
+
+
+def make_project(name="layout_project", groups=2, size=200, seed=0):
+    """
+    Build a project of groups of randomly linked nodes, without links between groups.
+
+    Returns:
+        ProjectData: The project, with all nodes at the origin.
+    """
+    rng = np.random.default_rng(seed)
+    links = np.vstack(
+        [rng.integers(0, size, (4 * size, 2)) + group * size for group in range(groups)]
+    )
+    count = groups * size
+    return ProjectData(name, np.arange(count), links=links)
+
+
+def test_layout_separates_groups():
+    """
+    Test that linked nodes end up close together and unlinked groups apart.
+    """
+    project = make_project()
+    state = start_layout(project.positions, seed=1)
+    state = layout_iterations(state, project.links, 200)
+    positions = state.positions
+    assert state.converged and state.iteration < 200
+
+    first, second = positions[:200], positions[200:]
+    separation = np.linalg.norm(first.mean(axis=0) - second.mean(axis=0))
+    assert separation > 2 * first.std(axis=0).mean()
+    link_length = np.linalg.norm(
+        positions[project.links[:, 0]] - positions[project.links[:, 1]], axis=1
+    )
+    assert link_length.mean() < separation
+
+    flat = layout_iterations(start_layout(positions, dimensions=2), project.links, 20)
+    assert (flat.positions[:, 2] == 0).all() and np.ptp(flat.positions[:, 0]) > 0
+
+
+def test_layout_resumes_where_it_stopped():
+    """
+    Test that running a layout in two parts gives the same result as in one.
+    """
+    project = make_project(groups=1)
+    state = start_layout(project.positions, seed=3)
+    whole = layout_iterations(state, project.links, 40)
+    half = layout_iterations(state, project.links, 20)
+    resumed = layout_iterations(half, project.links, 20)
+    assert resumed.iteration == whole.iteration == 40
+    assert resumed.temperature == whole.temperature
+    np.testing.assert_array_equal(resumed.positions, whole.positions)
+    assert state.iteration == 0
+
+
+def test_set_positions_copies_and_reindexes():
+    """
+    Test that new positions are copied and the spatial index is rebuilt for them.
+    """
+    project = make_project(groups=1)
+    grid = project.spatial_index()
+    positions = np.ones((200, 3), dtype=np.float32)
+    positions.flags.writeable = False
+    project.set_positions(positions, reindex=False)
+    assert project.spatial_index() is grid
+    assert project.positions.flags.writeable
+    project.set_positions(positions)
+    assert project.spatial_index() is not grid
+    with pytest.raises(ValueError):
+        project.set_positions(positions[:10])
+
+
+@pytest.mark.asyncio
+async def test_layout_job_sends_positions_to_the_room():
+    """
+    Test that a layout job sends the moved nodes to the room after each batch.
+    """
+    project = make_project("layout_room_project")
+    websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(websocket)
+    ws_manager.join_room(client_id, "layout_room")
+    client = ws_manager.client_manager.connected_clients[client_id]
+    try:
+        state = start_layout(project.positions, seed=1)
+        job = job_manager.submit(
+            run_layout, project, state, "layout_room", 30, 10, "thread"
+        )
+        await job.task
+        await client.outbound.join()
+        assert job.result == {
+            "project": "layout_room_project",
+            "iteration": 30,
+            "converged": False,
+        }
+        updates = [
+            json.loads(call.args[0])
+            for call in websocket.send_text.call_args_list
+            if '"event":"layout_positions"' in call.args[0]
+        ]
+        assert [update["iteration"] for update in updates] == [10, 20, 30]
+        assert len(updates[0]["index"]) == 400
+        np.testing.assert_allclose(
+            np.reshape(updates[-1]["positions"], (-1, 3)),
+            project.positions[updates[-1]["index"]],
+        )
+        assert layouts["layout_room_project"].iteration == 30
+    finally:
+        layouts.pop("layout_room_project", None)
+        ws_manager.remove_client(client_id)
+
+
+@pytest.mark.asyncio
+async def test_layout_handler_runs_one_layout_per_project():
+    """
+    Test that the handler starts a layout in the process pool, once per project.
+    """
+    project_store.add(make_project("layout_handler_project"))
+    websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(websocket)
+    client_info = ws_manager.get_client_info(websocket)
+    client = ws_manager.client_manager.connected_clients[client_id]
+    request = {"project": "layout_handler_project", "iterations": 20}
+    try:
+        await handle_layout({**request, "room": "elsewhere"}, websocket, client_info)
+        await client.outbound.join()
+        assert "Join the room" in websocket.send_text.call_args.args[0]
+
+        await handle_layout(request, websocket, client_info)
+        (job,) = job_manager.active_jobs(client_id)
+        await handle_layout(request, websocket, client_info)
+        await client.outbound.join()
+        messages = [call.args[0] for call in websocket.send_text.call_args_list]
+        assert any("already running" in message for message in messages)
+
+        await asyncio.wait_for(job.task, timeout=60)
+        assert job.result["iteration"] == 20
+        await handle_layout(request, websocket, client_info)
+        (job,) = job_manager.active_jobs(client_id)
+        await asyncio.wait_for(job.task, timeout=60)
+        assert job.result["iteration"] == 40
+    finally:
+        layouts.pop("layout_handler_project", None)
+        project_store.unload("layout_handler_project")
+        ws_manager.remove_client(client_id)
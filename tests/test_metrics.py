@@ -0,0 +1,74 @@
+"""
+Unit tests for the metrics registry in the DataDiVR-Backend.
+
+This module contains test cases to verify that counters, gauges and histograms
+are recorded and rendered in the Prometheus text exposition format.
+"""
+
+from utils.metrics import OVERFLOW_LABEL, MetricsRegistry, frame_size
+
+
+def test_render_counter_and_gauge():
+    """
+    Test that labelled counters and function gauges are rendered with their help and type.
+    """
+    registry = MetricsRegistry()
+    events = registry.counter("events_total", "Events received.", ["event"])
+    registry.gauge("clients", "Connected clients.", function=lambda: 3)
+
+    events.labels("ping").inc()
+    events.labels("ping").inc()
+    events.labels('say "hi"').inc(0.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP events_total Events received.",
+        "# TYPE events_total counter",
+        'events_total{event="ping"} 2',
+        'events_total{event="say \\"hi\\""} 0.5',
+        "# HELP clients Connected clients.",
+        "# TYPE clients gauge",
+        "clients 3",
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    """
+    Test that histogram buckets are rendered cumulatively with sum and count.
+    """
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()[2:]
+    assert lines == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 2.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_series_are_capped():
+    """
+    Test that label combinations beyond the limit are counted in one overflow series.
+    """
+    registry = MetricsRegistry()
+    events = registry.counter("events_total", "Events.", ["event"], max_series=2)
+
+    for name in ("a", "b", "c", "d"):
+        events.labels(name).inc()
+
+    assert events.labels("a").value == 1
+    assert events.labels(OVERFLOW_LABEL).value == 2
+
+
+def test_frame_size_counts_utf8_bytes():
+    """
+    Test that text frames are measured in UTF-8 encoded bytes, not characters.
+    """
+    assert frame_size('{"name": "Zoë"}') == 16
+    assert frame_size("abc") == 3
+    assert frame_size(b"\x00\x01") == 2
@@ -0,0 +1,125 @@
+"""
+Unit tests for the OutboundQueue class in the DataDiVR-Backend.
+
+This module contains test cases to verify the bounded per-client outbound
+queue and its overflow policies.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import WebSocket
+
+from utils.websocket.outbound_queue import OutboundQueue, OverflowPolicy
+
+
+def make_websocket():
+    """
+    Create a mock WebSocket with awaitable send and close methods.
+
+    Returns:
+        Mock: A mock WebSocket instance.
+    """
+    websocket = Mock(spec=WebSocket)
+    websocket.send_text = AsyncMock()
+    websocket.send_bytes = AsyncMock()
+    websocket.close = AsyncMock()
+    return websocket
+
+
+def sent_frames(websocket):
+    """
+    Collect the frames written to a mock WebSocket in order.
+    """
+    return [call.args[0] for call in websocket.send_text.call_args_list]
+
+
+def test_put_without_event_loop_keeps_frames():
+    """
+    Test that frames queued before an event loop runs wait for the writer.
+    """
+    queue = OutboundQueue(make_websocket(), maxsize=2)
+    assert queue.put("a")
+    assert queue.depth == 1
+
+
+@pytest.mark.asyncio
+async def test_writer_sends_in_order():
+    """
+    Test that the writer task sends text and binary frames in order.
+    """
+    websocket = make_websocket()
+    queue = OutboundQueue(websocket)
+    queue.put("a")
+    queue.put(b"b")
+    queue.put("c")
+    await queue.join()
+
+    assert sent_frames(websocket) == ["a", "c"]
+    websocket.send_bytes.assert_called_once_with(b"b")
+    assert queue.stats()["sent"] == 3
+    queue.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "policy, expected, dropped",
+    [
+        (OverflowPolicy.DROP_OLDEST, ["b", "c"], 1),
+        (OverflowPolicy.DROP_NEWEST, ["a", "b"], 1),
+    ],
+)
+async def test_drop_policies(policy, expected, dropped):
+    """
+    Test that a full queue drops the oldest or the newest frame depending on the policy.
+    """
+    websocket = make_websocket()
+    queue = OutboundQueue(websocket, maxsize=2, policy=policy)
+    queue._ensure_writer = Mock()  # keep frames queued while filling
+    for frame in ("a", "b", "c"):
+        queue.put(frame)
+    del queue._ensure_writer
+    await queue.join()
+
+    assert sent_frames(websocket) == expected
+    assert queue.dropped == dropped
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_replaces_pending_frame_with_same_key():
+    """
+    Test that the coalesce policy replaces the pending frame of the same event.
+    """
+    websocket = make_websocket()
+    queue = OutboundQueue(websocket, maxsize=2, policy=OverflowPolicy.COALESCE)
+    queue._ensure_writer = Mock()
+    queue.put("pose 1", key="pose")
+    queue.put("chat", key="chat")
+    assert queue.put("pose 2", key="pose")
+    del queue._ensure_writer
+    await queue.join()
+
+    assert sent_frames(websocket) == ["pose 2", "chat"]
+    assert queue.coalesced == 1
+    assert queue.dropped == 0
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_consumer():
+    """
+    Test that the disconnect policy closes the connection when the queue overflows.
+    """
+    websocket = make_websocket()
+    queue = OutboundQueue(websocket, maxsize=1, policy=OverflowPolicy.DISCONNECT)
+    queue._ensure_writer = Mock()
+    queue.put("a")
+    assert not queue.put("b")
+    await asyncio.sleep(0)
+
+    assert queue.closed
+    assert not queue.put("c")
+    websocket.close.assert_called_once()
+    websocket.send_text.assert_not_called()
@@ -0,0 +1,309 @@
+"""
+Unit tests for the columnar project data in the DataDiVR-Backend.
+
+This module contains test cases to verify that node and link lists are loaded
+into NumPy columns, that filters and selections work on those columns, and that
+projects can be queried by clients.
+"""
+
+import json
+import os
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+from fastapi import WebSocket
+
+from handlers.project import handle_project_info, handle_select_nodes
+from utils.project_data import (
+    ProjectData,
+    ProjectStore,
+    from_records,
+    open_project,
+    project_store,
+    write_project,
+)
+from utils.project_data.binary import PROJECT_FILE
+from utils.project_data.convert import convert
+from utils.project_data.loaders import parse_colors, parse_column, parse_ids
+
+NODES = [
+    {"id": "a", "x": 0, "y": 0, "z": 0, "color": "#ff0000", "group": "x", "size": 1},
+    {"id": "b", "x": 1, "y": 2, "z": 3, "color": [0, 255, 0], "group": "y", "size": 2},
+    {"id": "c", "pos": [5, 5, 5], "group": "x", "size": 3.5},
+    {"id": "d", "x": -1, "y": -1, "z": -1, "group": "z"},
+]
+LINKS = [
+    {"source": "a", "target": "b", "weight": 0.5},
+    {"source": "b", "target": "c", "weight": 1.0},
+    {"source": "c", "target": "missing", "weight": 2.0},
+]
+
+
+def make_project(name="test_project"):
+    """
+    Build a small project from records.
+
+    Returns:
+        ProjectData: Four nodes and two valid links.
+    """
+    return from_records(name, NODES, LINKS)
+
+
+def test_from_records_builds_columns():
+    """
+    Test that records are split into typed columns and links into index pairs.
+    """
+    project = make_project()
+    assert project.node_count == 4 and project.link_count == 2
+    assert project.node_ids.tolist() == ["a", "b", "c", "d"]
+    assert project.positions.dtype == np.float32
+    assert project.positions[2].tolist() == [5, 5, 5]
+    assert project.colors.tolist()[:3] == [
+        [255, 0, 0, 255],
+        [0, 255, 0, 255],
+        [255, 255, 255, 255],
+    ]
+    assert project.attributes["group"].tolist() == ["x", "y", "x", "z"]
+    assert np.isnan(project.attributes["size"][3])
+    assert project.links.tolist() == [[0, 1], [1, 2]]
+    assert project.link_attributes["weight"].tolist() == [0.5, 1.0]
+    assert project.degree.tolist() == [1, 2, 1, 0]
+    assert project.columns()["size"] == "float64"
+
+
+def test_parse_columns_and_colors():
+    """
+    Test the type detection of text and JSON values and the parsing of colors.
+    """
+    assert parse_column(["1", "2"], from_text=True).dtype == np.int64
+    assert np.isnan(parse_column(["1.5", ""], from_text=True)[1])
+    assert parse_column(["1", "a"], from_text=True).tolist() == ["1", "a"]
+    assert parse_column([1, None]).dtype == np.float64
+    assert parse_column([True, False]).dtype == bool
+    assert parse_colors(["#01020304", None]).tolist() == [
+        [1, 2, 3, 4],
+        [255, 255, 255, 255],
+    ]
+    with pytest.raises(ValueError):
+        parse_colors(["#123"])
+
+
+@pytest.mark.asyncio
+async def test_ids_are_kept_as_text_across_file_formats(tmp_path):
+    """
+    Test that node IDs and link endpoints are compared as written, whether read from CSV or JSON.
+    """
+    csv_project = tmp_path / "csv_nodes"
+    csv_project.mkdir()
+    (csv_project / "nodes.csv").write_text("id,x\n007,1\n8,2\n")
+    (csv_project / "links.json").write_text(
+        json.dumps([{"source": "007", "target": 8}])
+    )
+    json_project = tmp_path / "json_nodes"
+    json_project.mkdir()
+    (json_project / "nodes.json").write_text(
+        json.dumps([{"id": 10}, {"x": 2}, {"id": 30.0}])
+    )
+    (json_project / "links.csv").write_text("source,target\n10,30\n10,1\n10,30.0\n")
+    store = ProjectStore(str(tmp_path))
+
+    project = await store.load("csv_nodes")
+    assert project.node_ids.tolist() == ["007", "8"]
+    assert project.links.tolist() == [[0, 1]]
+
+    project = await store.load("json_nodes")
+    assert project.node_ids.tolist() == ["10", "1", "30"]
+    assert project.links.tolist() == [[0, 2], [0, 1]]
+    assert parse_ids([None, "", 2.5, "x"]).tolist() == ["", "", "2.5", "x"]
+
+
+def test_filters_and_selections():
+    """
+    Test vectorized filters, selections, ID lookups and link queries.
+    """
+    project = make_project()
+    mask = project.mask(
+        [
+            {"column": "group", "op": "in", "value": ["x", "y"]},
+            {"column": "x", "op": "between", "value": [0, 2]},
+        ]
+    )
+    assert np.flatnonzero(mask).tolist() == [0, 1]
+    assert np.flatnonzero(
+        project.mask([{"column": "degree", "op": "ge", "value": 2}])
+    ).tolist() == [1]
+    assert project.select(mask, ["id", "y"])["y"].tolist() == [0, 2]
+
+    assert project.index_of(["c", "a", "nope"]).tolist() == [2, 0, -1]
+    assert project.links_of([0, 1]).tolist() == [0]
+    assert project.links_of([0], both=False).tolist() == [0]
+    assert project.neighbors([1]).tolist() == [0, 2]
+
+    for filters in (
+        [{"column": "unknown", "value": 1}],
+        [{"column": "x", "op": "like", "value": 1}],
+        [{"column": "group", "op": "lt", "value": 1}],
+    ):
+        with pytest.raises(ValueError):
+            project.mask(filters)
+
+
+def test_invalid_columns_are_rejected():
+    """
+    Test that columns must have one value per node and reserved names are refused.
+    """
+    with pytest.raises(ValueError):
+        ProjectData("p", ["a", "b"], positions=np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        ProjectData("p", ["a"], attributes={"x": np.zeros(1)})
+    with pytest.raises(ValueError):
+        ProjectData("p", ["a"], links=[[0, 1]])
+
+
+@pytest.mark.asyncio
+async def test_store_loads_projects_from_files(tmp_path):
+    """
+    Test that the store loads CSV and JSON project files once and rejects bad names.
+    """
+    project_dir = tmp_path / "demo"
+    project_dir.mkdir()
+    (project_dir / "nodes.csv").write_text(
+        "id,x,y,z,color,label\n1,0,0,0,#00ff00,n1\n2,1,1,1,,n2\n"
+    )
+    (project_dir / "links.json").write_text(
+        json.dumps({"links": [{"source": 1, "target": 2}]})
+    )
+    store = ProjectStore(str(tmp_path))
+
+    assert store.available() == ["demo"]
+    first, second = await store.load("demo"), await store.load("demo")
+    assert first is second
+    assert first.node_ids.tolist() == ["1", "2"]
+    assert first.links.tolist() == [[0, 1]]
+    assert first.attributes["label"].tolist() == ["n1", "n2"]
+
+    with pytest.raises(ValueError):
+        await store.load("../demo")
+    with pytest.raises(ValueError):
+        await store.load(["demo"])
+    with pytest.raises(FileNotFoundError):
+        await store.load("other")
+
+
+def test_binary_files_are_mapped_lazily(tmp_path):
+    """
+    Test that a project written in the binary format is opened as read-only
+    views of the mapped file with the same columns.
+    """
+    project = make_project()
+    path = str(tmp_path / PROJECT_FILE)
+    write_project(project, path)
+    opened = open_project(path)
+
+    assert opened.name == "test_project"
+    assert opened.node_ids.tolist() == project.node_ids.tolist()
+    assert np.array_equal(opened.positions, project.positions)
+    assert np.array_equal(opened.colors, project.colors)
+    assert opened.links.tolist() == project.links.tolist()
+    assert np.array_equal(
+        opened.attributes["size"], project.attributes["size"], equal_nan=True
+    )
+    assert opened.link_attributes["weight"].tolist() == [0.5, 1.0]
+    assert not opened.positions.flags.writeable
+    assert opened.positions.ctypes.data % 64 == 0
+    assert np.flatnonzero(
+        opened.mask([{"column": "group", "value": "x"}])
+    ).tolist() == [0, 2]
+
+    with open(path, "r+b") as file:
+        file.write(b"NOTAPROJ")
+    with pytest.raises(ValueError):
+        open_project(path)
+
+
+@pytest.mark.asyncio
+async def test_store_prefers_current_binary_files(tmp_path):
+    """
+    Test that the store maps converted projects, unless their source files changed.
+    """
+    project_dir = tmp_path / "converted"
+    project_dir.mkdir()
+    (project_dir / "nodes.json").write_text(json.dumps([{"id": "a"}, {"id": "b"}]))
+    output = convert(str(project_dir))
+    assert output == str(project_dir / PROJECT_FILE)
+
+    project = await ProjectStore(str(tmp_path)).load("converted")
+    assert not project.node_ids.flags.writeable
+
+    stat = os.stat(output)
+    os.utime(project_dir / "nodes.json", (stat.st_atime, stat.st_mtime + 10))
+    project = await ProjectStore(str(tmp_path)).load("converted")
+    assert project.node_ids.flags.writeable
+
+
+@pytest.mark.asyncio
+async def test_select_nodes_handler():
+    """
+    Test that clients get the project info and the columns of matching nodes.
+    """
+    project_store.add(make_project("handler_project"))
+    websocket = AsyncMock(spec=WebSocket)
+    try:
+        await handle_project_info({"project": "handler_project"}, websocket)
+        info = json.loads(websocket.send_text.call_args.args[0])
+        assert info["nodes"] == 4 and info["links"] == 2
+
+        await handle_select_nodes(
+            {
+                "project": "handler_project",
+                "filters": [{"column": "group", "value": "x"}],
+                "columns": ["id", "x"],
+                "links": True,
+            },
+            websocket,
+        )
+        reply = json.loads(websocket.send_text.call_args.args[0])
+        assert reply["count"] == 2
+        assert reply["columns"] == {"id": ["a", "c"], "x": [0.0, 5.0]}
+        assert reply["links"] == []
+
+        await handle_select_nodes(
+            {"project": "handler_project", "columns": ["nope"]}, websocket
+        )
+        assert json.loads(websocket.send_text.call_args.args[0])["event"] == "error"
+    finally:
+        project_store.unload("handler_project")
+
+
+@pytest.mark.asyncio
+async def test_select_nodes_replies_are_cached_per_revision(monkeypatch):
+    """
+    Test that identical selections are filtered once until the project changes.
+    """
+    project = make_project("cached_project")
+    project_store.add(project)
+    masks = []
+    mask = project.mask
+    monkeypatch.setattr(
+        project, "mask", lambda filters: masks.append(1) or mask(filters)
+    )
+    websocket = AsyncMock(spec=WebSocket)
+    query = {
+        "project": "cached_project",
+        "filters": [{"column": "x", "op": "ge", "value": 1}],
+        "columns": ["id"],
+    }
+    try:
+        for _ in range(2):
+            await handle_select_nodes(query, websocket)
+            reply = json.loads(websocket.send_text.call_args.args[0])
+            assert reply["columns"] == {"id": ["b", "c"]}
+        assert len(masks) == 1
+
+        project.set_positions(np.zeros((project.node_count, 3)))
+        await handle_select_nodes(query, websocket)
+        reply = json.loads(websocket.send_text.call_args.args[0])
+        assert reply["count"] == 0 and len(masks) == 2
+    finally:
+        project_store.unload("cached_project")
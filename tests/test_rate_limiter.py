@@ -0,0 +1,125 @@
+"""
+Unit tests for the RateLimiter in the DataDiVR-Backend.
+
+This module contains test cases to verify the token bucket limits per client
+and per event, the drop, delay and disconnect policies, and that the WebSocket
+endpoint applies them.
+"""
+
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import WebSocket
+
+from server_components import websocket_endpoint
+from utils.metrics import WS_THROTTLED
+from utils.websocket import ws_manager
+from utils.websocket.rate_limiter import (
+    RATE_LIMIT_CLOSE_CODE,
+    RateLimiter,
+    RateLimitExceeded,
+    TokenBucket,
+    parse_event_limits,
+)
+
+
+def test_token_bucket_allows_bursts_and_refills():
+    """
+    Test that a bucket allows its burst at once and refills at its rate.
+    """
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.updated
+    for _ in range(2):
+        assert bucket.wait_time(now) == 0
+        bucket.tokens -= 1
+    assert bucket.wait_time(now) == pytest.approx(0.1)
+    assert bucket.wait_time(now + 0.11) == 0
+
+
+def test_parse_event_limits():
+    """
+    Test that per-event limits are parsed with the burst defaulting to the rate.
+    """
+    assert parse_event_limits("pose=120:240, long_task=0.5") == {
+        "pose": (120.0, 240.0),
+        "long_task": (0.5, 0.5),
+    }
+
+
+@pytest.mark.asyncio
+async def test_client_and_event_limits_are_separate():
+    """
+    Test that an event's own limit does not use up the client's other events,
+    and that events without a limit of their own create no buckets.
+    """
+    limiter = RateLimiter(rate=0, event_limits={"long_task": (1, 1)}, policy="drop")
+    assert await limiter.admit("alice", "long_task")
+    assert not await limiter.admit("alice", "long_task")
+    assert await limiter.admit("bob", "long_task")
+    for _ in range(100):
+        assert await limiter.admit("alice", "pose")
+    assert set(limiter._clients["alice"].event_buckets) == {"long_task"}
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_counts_throttled_events():
+    """
+    Test that events beyond the client's limit are dropped and counted.
+    """
+    limiter = RateLimiter(rate=1, burst=3, event_limits={}, policy="drop")
+    before = WS_THROTTLED.labels("spam", "dropped").value
+    admitted = [await limiter.admit("alice", "spam") for _ in range(10)]
+
+    assert admitted.count(True) == 3
+    assert WS_THROTTLED.labels("spam", "dropped").value - before == 7
+    limiter.remove_client("alice")
+    assert "alice" not in limiter._clients
+
+
+@pytest.mark.asyncio
+async def test_delay_policy_waits_for_a_token():
+    """
+    Test that the delay policy holds events back until they are within the limit,
+    and drops them if that would take longer than the maximum delay.
+    """
+    limiter = RateLimiter(
+        rate=50, burst=1, event_limits={}, policy="delay", max_delay=0.1
+    )
+    assert await limiter.admit("alice", "pose")
+    start = time.perf_counter()
+    assert await limiter.admit("alice", "pose")
+    assert time.perf_counter() - start >= 0.015
+
+    slow = RateLimiter(rate=1, burst=1, event_limits={}, policy="delay", max_delay=0.1)
+    assert await slow.admit("alice", "pose")
+    assert not await slow.admit("alice", "pose")
+
+
+@pytest.mark.asyncio
+async def test_endpoint_disconnects_clients_over_the_limit(monkeypatch):
+    """
+    Test that the endpoint closes the connection of a client that exceeds its
+    limit under the disconnect policy, without handling the excess event.
+    """
+    limiter = RateLimiter(rate=1, burst=1, event_limits={}, policy="disconnect")
+    monkeypatch.setattr(ws_manager, "rate_limiter", limiter)
+    handle_event = AsyncMock()
+    monkeypatch.setattr(ws_manager, "handle_event", handle_event)
+    websocket = AsyncMock(spec=WebSocket)
+    websocket.query_params = {}
+    websocket.receive.side_effect = [
+        {"type": "websocket.receive", "text": '{"event": "spam"}'},
+        {"type": "websocket.receive", "text": '{"event": "spam"}'},
+        {"type": "websocket.receive", "text": '{"event": "spam"}'},
+    ]
+
+    await websocket_endpoint(websocket)
+
+    # the welcome event plus the one event within the limit
+    assert handle_event.await_count == 2
+    websocket.close.assert_awaited_once_with(code=RATE_LIMIT_CLOSE_CODE)
+    assert len(ws_manager.client_manager.connected_clients) == 0
+    assert await limiter.admit("alice", "spam")
+    with pytest.raises(RateLimitExceeded):
+        await limiter.admit("alice", "spam")
@@ -0,0 +1,124 @@
+"""
+Integration tests for the aggregate API endpoint in the DataDiVR-Backend.
+
+This module contains test cases to verify that the aggregate endpoint parses
+JSON and binary bodies in chunks, computes accurate statistics and rejects
+invalid input.
+"""
+
+import math
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from routes.aggregate import route
+from utils.aggregate import Aggregator, BinaryParser, JSONArrayParser, compensated_sum
+
+app = FastAPI()
+app.include_router(route)
+
+
+def feed_in_chunks(parser, data, size):
+    """
+    Feed data to a parser in chunks of the given size.
+
+    Returns:
+        np.ndarray: All parsed values.
+    """
+    starts = range(0, len(data), size)
+    parts = [parser.feed(data[start:][:size]) for start in starts]
+    return np.concatenate(parts + [parser.close()])
+
+
+def test_compensated_sum_is_accurate():
+    """
+    Test that sums stay exact where plain floating-point summation cancels.
+    """
+    assert sum(compensated_sum(np.array([1e16, 1.0, -1e16]))) == 1.0
+    values = np.random.default_rng(0).normal(0, 1e6, 100_001)
+    aggregator = Aggregator()
+    for chunk in np.array_split(values, 7):
+        aggregator.add(chunk)
+    assert aggregator.sum == math.fsum(values)
+    assert aggregator.count == len(values)
+    assert aggregator.minimum == values.min() and aggregator.maximum == values.max()
+
+
+def test_parsers_handle_values_split_across_chunks():
+    """
+    Test that numbers split across chunk boundaries are parsed correctly.
+    """
+    values = [1.5, -2.0, 3e10, 0.125, 42.0]
+    text = ("[" + ", ".join(map(repr, values)) + "]\n").encode()
+    for size in (1, 3, 7, len(text)):
+        assert feed_in_chunks(JSONArrayParser(), text, size).tolist() == values
+    binary = np.array(values, dtype="<f8").tobytes()
+    assert feed_in_chunks(BinaryParser(), binary, 5).tolist() == values
+
+    for invalid in (b"[1, 2", b"[1,,2]", b"{}", b"[1, NaN]", b"[1] 2"):
+        with pytest.raises(ValueError):
+            feed_in_chunks(JSONArrayParser(), invalid, 2)
+    with pytest.raises(ValueError):
+        feed_in_chunks(BinaryParser(), binary[:-1], 8)
+
+
+@pytest.mark.asyncio
+async def test_aggregate_json_and_binary_bodies():
+    """
+    Test that JSON and binary bodies give the same statistics and percentiles.
+    """
+    values = np.arange(1, 101, dtype=np.float64)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(
+            "/aggregate?percentiles=50,90", content=str(values.tolist())
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "count": 100,
+            "sum": 5050.0,
+            "mean": 50.5,
+            "min": 1.0,
+            "max": 100.0,
+            "percentiles": {"50": 50.5, "90": pytest.approx(90.1)},
+        }
+
+        response = await client.post(
+            "/aggregate?ops=sum,max",
+            content=values.tobytes(),
+            headers={"content-type": "application/octet-stream"},
+        )
+        assert response.json() == {"sum": 5050.0, "max": 100.0}
+
+
+@pytest.mark.asyncio
+# overflows are reported as errors, not as NumPy warnings
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+async def test_aggregate_rejects_invalid_requests():
+    """
+    Test that invalid bodies and parameters are answered with status 400 without warnings.
+    """
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        for url, body in [
+            ("/aggregate", "[]"),
+            ("/aggregate", "[1, two]"),
+            ("/aggregate?ops=median", "[1]"),
+            ("/aggregate?percentiles=101", "[1]"),
+            # valid in Python's float(), but not JSON numbers
+            ("/aggregate", "[1_000]"),
+            ("/aggregate", "[1, .5]"),
+            ("/aggregate", "[0x10]"),
+            ("/aggregate", "[Infinity]"),
+            # finite values whose sum overflows
+            ("/aggregate", "[1e308, 1e308]"),
+            ("/aggregate?ops=mean", "[-1e308, -1e308]"),
+            ("/aggregate?ops=count&percentiles=50", "[-1.7e308, 1.7e308]"),
+        ]:
+            response = await client.post(url, content=body)
+            assert response.status_code == 400
+            assert "detail" in response.json()
@@ -0,0 +1,134 @@
+"""
+Integration tests for the index page and template caching in the DataDiVR-Backend.
+
+This module contains test cases to verify that rendered pages are cached until
+one of their templates changes, that responses carry ETags answered with
+304 Not Modified, and that errors are escaped.
+"""
+
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from httpx import ASGITransport, AsyncClient
+
+from routes import index
+from routes.index import route
+from utils.API_framework import Request, Templates
+from utils.static_files import CachedStaticFiles
+
+app = FastAPI()
+app.include_router(route)
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
+
+def write_templates(directory, title):
+    """
+    Write a base template and a page extending it.
+    """
+    (directory / "base.jinja").write_text(
+        "<title>{{ title }}</title>{% block content %}{% endblock %}"
+    )
+    (directory / "page.jinja").write_text(
+        '{% extends "base.jinja" %}{% block content %}' + title + "{% endblock %}"
+    )
+
+
+@pytest.mark.asyncio
+async def test_index_is_served_with_etag_and_304():
+    """
+    Test that the index page carries an ETag and repeated requests get 304 Not Modified.
+    """
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/")
+        assert response.status_code == 200
+        assert "text/html" in response.headers["content-type"]
+        assert "/static/client.html" in response.text
+        etag = response.headers["etag"]
+        assert etag.startswith('"') and not etag.startswith("W/")
+
+        response = await client.get("/", headers={"If-None-Match": etag})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = await client.get("/", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+
+
+def test_rendered_pages_are_reused_until_a_template_changes(tmp_path):
+    """
+    Test that pages are rendered once per context and again when a parent template changes.
+    """
+    write_templates(tmp_path, "first")
+    templates = Templates(str(tmp_path), bytecode_cache_dir=str(tmp_path))
+    page = templates.render("page.jinja", {"title": "A"})
+    assert page.body == b"<title>A</title>first"
+    assert templates.render("page.jinja", {"title": "A"}) is page
+    assert templates.render("page.jinja", {"title": "B"}).etag != page.etag
+
+    base = tmp_path / "base.jinja"
+    base.write_text("<h1>{{ title }}</h1>{% block content %}{% endblock %}")
+    mtime = os.stat(base).st_mtime_ns + 1_000_000_000
+    os.utime(base, ns=(mtime, mtime))
+    changed = templates.render("page.jinja", {"title": "A"})
+    assert changed.body == b"<h1>A</h1>first"
+    assert changed.etag != page.etag
+
+
+@pytest.mark.asyncio
+async def test_static_urls_are_versioned(tmp_path):
+    """
+    Test that static_url() links files of CachedStaticFiles folders with their version and pages follow changes.
+    """
+    directory = tmp_path / "static"
+    directory.mkdir()
+    script = directory / "app.js"
+    script.write_text("// first\n")
+    (tmp_path / "page.jinja").write_text(
+        "{{ static_url('files', 'app.js') }} {{ static_url('plain', 'app.js') }}"
+    )
+    static = CachedStaticFiles(directory=str(directory), cache_dir=str(tmp_path))
+    templates = Templates(str(tmp_path), bytecode_cache_dir=str(tmp_path))
+    versioned_app = FastAPI()
+    versioned_app.mount("/files", static, name="files")
+    versioned_app.mount("/plain", StaticFiles(directory=str(directory)), name="plain")
+
+    @versioned_app.get("/")
+    async def page(request: Request):
+        return templates.CachedTemplateResponse(request, "page.jinja")
+
+    async with AsyncClient(
+        transport=ASGITransport(app=versioned_app), base_url="http://test"
+    ) as client:
+        response = await client.get("/")
+        version = static.version("app.js")
+        assert response.text == (
+            f"http://test/files/app.js?v={version} http://test/plain/app.js"
+        )
+
+        script.write_text("// second\n")
+        mtime = os.stat(script).st_mtime_ns + 1_000_000_000
+        os.utime(script, ns=(mtime, mtime))
+        response = await client.get("/")
+        assert static.version("app.js") != version
+        assert f"?v={static.version('app.js')}" in response.text
+
+
+@pytest.mark.asyncio
+async def test_template_errors_are_escaped(tmp_path, monkeypatch):
+    """
+    Test that the index route answers errors with status 500 and an escaped message.
+    """
+    (tmp_path / "index.jinja").write_text('{% include "<script>.jinja" %}')
+    monkeypatch.setattr(
+        index, "templates", Templates(str(tmp_path), bytecode_cache_dir=str(tmp_path))
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/")
+    assert response.status_code == 500
+    assert "&lt;script&gt;" in response.text and "<script>" not in response.text
@@ -0,0 +1,46 @@
+"""
+Integration tests for the metrics API endpoint in the DataDiVR-Backend.
+
+This module contains test cases to verify that the metrics endpoint serves the
+WebSocket layer's metrics in the Prometheus text exposition format.
+"""
+
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from httpx import ASGITransport, AsyncClient
+
+from routes.metrics import route
+from utils.websocket import ws_manager
+
+app = FastAPI()
+app.include_router(route)
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_events():
+    """
+    Test that handled events and connected clients appear in the scraped metrics.
+    """
+    websocket = Mock(spec=WebSocket)
+    websocket.send_text = AsyncMock()
+    client_id = ws_manager.add_client(websocket)
+    ws_manager.handlers["metrics_test"] = AsyncMock()
+    await ws_manager.handle_event("metrics_test", {}, websocket)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/metrics")
+
+    del ws_manager.handlers["metrics_test"]
+    ws_manager.remove_client(client_id)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'datadivr_ws_events_total{event="metrics_test"} 1' in response.text
+    assert 'datadivr_ws_event_duration_seconds_count{event="metrics_test"} 1' in (
+        response.text
+    )
+    assert "datadivr_ws_connected_clients 1" in response.text
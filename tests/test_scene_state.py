@@ -0,0 +1,207 @@
+"""
+Unit tests for the scene state in the DataDiVR-Backend.
+
+This module contains test cases to verify that the SceneStateStore resolves
+conflicting writes deterministically, that stores converge by merging their
+writes, and that the state handlers send snapshots and versioned deltas.
+"""
+
+import itertools
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import WebSocket
+
+from handlers.rooms import handle_join_room, handle_leave_room
+from handlers.state import (
+    handle_state_snapshot,
+    handle_state_update,
+    merge_state_writes,
+)
+from handlers.welcome import handle_welcome
+from utils.scene_state import SceneStateStore, parse_path, scene_state
+from utils.websocket import ws_manager
+
+
+def test_update_sets_and_deletes_paths():
+    """
+    Test that updates build a tree of documents and increase the version.
+    """
+    store = SceneStateStore()
+    delta = store.update(
+        None,
+        [
+            {"op": "set", "path": "camera.position", "value": [0, 1, 2]},
+            {"op": "set", "path": ["filters", "degree.min"], "value": 3},
+        ],
+        "a",
+    )
+    assert delta.version == 1
+    assert delta.ops == [
+        {"op": "set", "path": ["camera", "position"], "value": [0, 1, 2]},
+        {"op": "set", "path": ["filters", "degree.min"], "value": 3},
+    ]
+    assert store.snapshot()["state"] == {
+        "camera": {"position": [0, 1, 2]},
+        "filters": {"degree.min": 3},
+    }
+
+    delta = store.update(None, [{"op": "delete", "path": "camera"}], "a")
+    assert delta.version == 2
+    assert delta.ops == [{"op": "delete", "path": ["camera"]}]
+    assert store.snapshot() == {
+        "scene": None,
+        "version": 2,
+        "state": {"filters": {"degree.min": 3}},
+    }
+
+
+def test_invalid_updates_are_rejected():
+    """
+    Test that invalid operations raise ValueError and leave the state unchanged.
+    """
+    store = SceneStateStore()
+    for ops in (
+        None,
+        [],
+        [{"op": "move", "path": "a"}],
+        [{"op": "set", "path": "a"}],
+        [{"op": "set", "path": "a", "value": 1}, {"op": "set", "path": "", "value": 1}],
+        [{"op": "set", "path": "a..b", "value": 1}],
+    ):
+        with pytest.raises(ValueError):
+            store.update(None, ops, "a")
+    assert store.snapshot()["state"] == {}
+    assert parse_path(["a.b", "c"]) == ("a.b", "c")
+
+
+def test_stores_converge_whatever_the_order_of_writes():
+    """
+    Test that concurrent writes to a path, its parent and its children resolve
+    to the same state on every store, in whichever order they are merged.
+    """
+    writers = []
+    for writer, ops in (
+        ("a", [{"op": "set", "path": "camera", "value": {"zoom": 1}}]),
+        ("b", [{"op": "set", "path": "camera.position", "value": [1, 1, 1]}]),
+        ("c", [{"op": "delete", "path": "camera.zoom"}]),
+        ("d", [{"op": "set", "path": "selection", "value": ["n1"]}]),
+    ):
+        store = SceneStateStore()
+        writers.append(store.update("room", ops, writer).writes)
+
+    states = set()
+    for order in itertools.permutations(writers):
+        store = SceneStateStore()
+        for writes in order:
+            store.merge("room", writes)
+        # merging the same writes again changes nothing
+        assert not store.merge("room", store.export("room")).ops
+        states.add(json.dumps(store.snapshot("room")["state"], sort_keys=True))
+    assert len(states) == 1
+
+
+def test_later_writes_win():
+    """
+    Test that a write is superseded by a later write to the same path or a parent,
+    but not by an earlier one.
+    """
+    first, second = SceneStateStore(), SceneStateStore()
+    early = first.update(None, [{"op": "set", "path": "camera.zoom", "value": 1}], "a")
+    second.merge(None, early.writes)
+    late = second.update(None, [{"op": "set", "path": "camera", "value": {}}], "b")
+
+    assert first.merge(None, late.writes).ops == [
+        {"op": "set", "path": ["camera"], "value": {}}
+    ]
+    assert not second.merge(None, early.writes).ops
+    assert first.snapshot()["state"] == second.snapshot()["state"] == {"camera": {}}
+
+
+@pytest.mark.asyncio
+async def test_state_handlers_send_snapshots_and_deltas():
+    """
+    Test that room members receive a snapshot when they join and deltas when
+    the state changes, and that non-members cannot change the room's state.
+    """
+    websockets = [AsyncMock(spec=WebSocket) for _ in range(3)]
+    client_ids = [ws_manager.add_client(websocket) for websocket in websockets]
+    infos = [ws_manager.get_client_info(websocket) for websocket in websockets]
+    clients = [ws_manager.client_manager.connected_clients[c] for c in client_ids]
+
+    async def last_message(index):
+        await clients[index].outbound.join()
+        return json.loads(websockets[index].send_text.call_args.args[0])
+
+    try:
+        for index in (0, 1):
+            await handle_join_room(
+                {"room": "scene_test"}, websockets[index], infos[index]
+            )
+        assert (await last_message(1))["state"] == {
+            "scene": "scene_test",
+            "version": 0,
+            "state": {},
+        }
+
+        update = {"room": "scene_test", "ops": [{"path": "selection", "value": [4]}]}
+        await handle_state_update(update, websockets[0], infos[0])
+        for index in (0, 1):
+            assert await last_message(index) == {
+                "event": "state_delta",
+                "scene": "scene_test",
+                "version": 1,
+                "ops": [{"op": "set", "path": ["selection"], "value": [4]}],
+                "sender_id": client_ids[0],
+            }
+
+        await handle_state_update(update, websockets[2], infos[2])
+        assert (await last_message(2))["event"] == "error"
+
+        await handle_state_snapshot({"room": "scene_test"}, websockets[2])
+        assert (await last_message(2))["state"] == {"selection": [4]}
+
+        await handle_welcome(infos[2], websockets[2])
+        assert (await last_message(2))["state"]["scene"] is None
+    finally:
+        for client_id in client_ids:
+            ws_manager.remove_client(client_id)
+        scene_state.clear("scene_test")
+
+
+@pytest.mark.asyncio
+async def test_scene_is_released_when_its_room_is_no_longer_used():
+    """
+    Test that a room's scene is discarded when its last member left, but only once
+    disconnected members can no longer resume, and that writes from other workers
+    for rooms without members here are not kept.
+    """
+    websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(websocket)
+    info = ws_manager.get_client_info(websocket)
+    update = {"room": "released", "ops": [{"path": "selection", "value": [1]}]}
+
+    await handle_join_room({"room": "released"}, websocket, info)
+    await handle_state_update(update, websocket, info)
+    assert "released" in scene_state
+    await handle_leave_room({"room": "released"}, websocket, info)
+    assert "released" not in scene_state
+    ws_manager.remove_client(client_id)
+
+    resumable = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(resumable, resumable=True)
+    info = ws_manager.get_client_info(resumable)
+    await handle_join_room({"room": "released"}, resumable, info)
+    await handle_state_update(update, resumable, info)
+    session = ws_manager.client_manager.connected_clients[client_id].session
+    ws_manager.remove_client(client_id)
+    assert "released" in scene_state
+
+    session.expires = 0
+    ws_manager.client_manager.sessions.purge()
+    assert "released" not in scene_state
+
+    writes = [{"op": "set", "path": ["x"], "stamp": [1, "other"], "value": 1}]
+    await merge_state_writes({"scene": "released", "writes": writes})
+    assert "released" not in scene_state
@@ -12,7 +12,6 @@ from unittest.mock import AsyncMock
 
 import pytest
 from fastapi import WebSocket
-from fastapi.websockets import WebSocketDisconnect
 from httpx import ASGITransport, AsyncClient
 
 from server_components import (
@@ -101,7 +100,9 @@ async def test_load_route_handlers(app):
     Test the loading of route handlers.
 
     Verifies that route handlers are correctly loaded and registered with the app.
+    The index page links to the static files, so they are added as well.
     """
+    add_static_files(app)
     load_route_handlers(app)
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://testserver"
@@ -111,14 +112,26 @@ async def test_load_route_handlers(app):
 
 
 @pytest.mark.asyncio
-async def test_websocket_endpoint():
+async def test_websocket_endpoint(mocker):
+    """
+    Test the WebSocket endpoint.
+
+    Verifies that received frames are decoded and dispatched and that the client
+    is removed when the connection closes.
+    """
     mock_websocket = AsyncMock(spec=WebSocket)
-    mock_websocket.receive_json.side_effect = [
-        {"event": "hello", "name": "John"},
-        WebSocketDisconnect(),
+    mock_websocket.query_params = {}
+    mock_websocket.receive.side_effect = [
+        {"type": "websocket.receive", "text": '{"event": "hello", "name": "John"}'},
+        {"type": "websocket.disconnect", "code": 1000},
     ]
+    handle_event = mocker.spy(ws_manager, "handle_event")
 
     await websocket_endpoint(mock_websocket)
 
     mock_websocket.accept.assert_called_once()
+    assert handle_event.call_args_list[-1].args[:2] == (
+        "hello",
+        {"event": "hello", "name": "John"},
+    )
     assert len(ws_manager.client_manager.connected_clients) == 0
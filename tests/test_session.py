@@ -0,0 +1,124 @@
+"""
+Unit tests for resumable sessions in the DataDiVR-Backend.
+
+This module contains test cases to verify that clients with a resumable session
+get numbered frames, keep their identity and rooms when they reconnect, and
+receive exactly the messages they missed.
+"""
+
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import WebSocket
+
+from handlers.welcome import handle_welcome
+from utils.websocket import ws_manager
+from utils.websocket.session import SESSION_TAKEN_OVER_CLOSE_CODE, ReplayBuffer
+
+
+def sent_messages(websocket):
+    """
+    Get the decoded messages sent over a mocked WebSocket.
+    """
+    return [json.loads(call.args[0]) for call in websocket.send_text.call_args_list]
+
+
+async def flush(client_id):
+    """
+    Wait until the outbound queue of a client is written.
+    """
+    await ws_manager.client_manager.connected_clients[client_id].outbound.join()
+
+
+def test_replay_buffer_reports_evicted_frames():
+    """
+    Test that the replay buffer returns the frames after a sequence number and
+    reports whether older frames it would need were evicted.
+    """
+    buffer = ReplayBuffer(maxsize=3)
+    for i in range(5):
+        buffer.record(json.dumps({"i": i}))
+
+    frames, complete = buffer.since(2)
+    assert [json.loads(frame) for frame in frames] == [
+        {"seq": 3, "i": 2},
+        {"seq": 4, "i": 3},
+        {"seq": 5, "i": 4},
+    ]
+    assert complete
+    assert buffer.since(1) == (frames, False)
+    assert buffer.since(5) == ([], True)
+
+
+@pytest.mark.asyncio
+async def test_client_resumes_session_and_receives_missed_messages():
+    """
+    Test that a reconnecting client keeps its ID, name and rooms and receives
+    only the broadcasts it missed, followed by a welcome confirming the resume.
+    """
+    first = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(first, resumable=True)
+    name = ws_manager.get_client_info(first)["first_name"]
+    ws_manager.join_room(client_id, "project")
+    await handle_welcome(ws_manager.get_client_info(first), first)
+    await ws_manager.broadcast({"event": "update", "n": 1}, room="project")
+    await flush(client_id)
+
+    (welcome, update) = sent_messages(first)
+    assert (welcome["seq"], update["seq"]) == (1, 2)
+    token = welcome["resume_token"]
+    assert not welcome["resumed"]
+
+    ws_manager.remove_client(client_id, first)
+    await ws_manager.broadcast({"event": "update", "n": 2}, room="project")
+    await ws_manager.broadcast({"event": "update", "n": 3}, room="elsewhere")
+    await ws_manager.send_to({"event": "direct"}, client_id=client_id)
+
+    second = AsyncMock(spec=WebSocket)
+    assert ws_manager.add_client(second, resume_token=token, last_seq=2) == client_id
+    await handle_welcome(ws_manager.get_client_info(second), second)
+    await flush(client_id)
+
+    assert ws_manager.get_client_info(second)["first_name"] == name
+    assert ws_manager.client_manager.get_client(second).rooms == {"project"}
+    replayed, direct, welcome = sent_messages(second)
+    assert (replayed["seq"], replayed["n"]) == (3, 2)
+    assert (direct["seq"], direct["event"]) == (4, "direct")
+    assert welcome["resumed"] and welcome["replay_complete"]
+    ws_manager.remove_client(client_id)
+
+
+@pytest.mark.asyncio
+async def test_unknown_token_starts_a_new_session():
+    """
+    Test that a client presenting an unknown token is added as a new client.
+    """
+    websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(websocket, resume_token="bogus")
+    session = ws_manager.get_session(websocket)
+
+    assert session is not None and session.client_id == client_id
+    assert not session.resumed
+    ws_manager.remove_client(client_id)
+
+
+@pytest.mark.asyncio
+async def test_resume_takes_over_a_stale_connection():
+    """
+    Test that resuming a session still attached to a connection closes that
+    connection, and that its late cleanup does not remove the new one.
+    """
+    stale = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(stale, resumable=True)
+    token = ws_manager.get_session(stale).token
+
+    fresh = AsyncMock(spec=WebSocket)
+    assert ws_manager.add_client(fresh, resume_token=token) == client_id
+    await flush(client_id)
+    stale.close.assert_awaited_once_with(code=SESSION_TAKEN_OVER_CLOSE_CODE)
+
+    ws_manager.remove_client(client_id, stale)
+    assert ws_manager.client_manager.get_client(fresh) is not None
+    ws_manager.remove_client(client_id, fresh)
+    assert len(ws_manager.client_manager.connected_clients) == 0
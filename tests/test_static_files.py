@@ -0,0 +1,223 @@
+"""
+Integration tests for static file serving in the DataDiVR-Backend.
+
+This module contains test cases to verify that static files are served
+compressed to clients that accept it, that range requests get partial
+content, and that responses carry cache validators and, for versioned URLs,
+immutable cache headers.
+"""
+
+import gzip
+import os
+import stat
+import tempfile
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from utils.static_files import (
+    CachedStaticFiles,
+    default_cache_dir,
+    negotiate_encoding,
+    parse_range,
+)
+
+SCRIPT = b"const values = [" + b", ".join(b"%d" % i for i in range(2000)) + b"];\n"
+BINARY = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def static(tmp_path):
+    """
+    Fixture to create a static folder with a script and a binary file.
+
+    Returns:
+        CachedStaticFiles: The static files, with compressed files in a temporary directory.
+    """
+    directory = tmp_path / "static"
+    directory.mkdir()
+    (directory / "app.js").write_bytes(SCRIPT)
+    (directory / "model.glb").write_bytes(BINARY)
+    return CachedStaticFiles(
+        directory=str(directory), cache_dir=str(tmp_path / "cache")
+    )
+
+
+def client_for(static):
+    """
+    Create a client for an app serving the static files at /static.
+    """
+    app = FastAPI()
+    app.mount("/static", static, name="static")
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_files_are_served_compressed_when_accepted(static):
+    """
+    Test that compressible files are sent gzip-compressed to clients that accept it, and identity otherwise.
+    """
+    async with client_for(static) as client:
+        response = await client.get(
+            "/static/app.js", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(SCRIPT)
+        assert response.content == SCRIPT  # decoded by the client
+        compressed_etag = response.headers["etag"]
+
+        response = await client.get(
+            "/static/app.js", headers={"Accept-Encoding": "identity"}
+        )
+        assert "content-encoding" not in response.headers
+        assert response.content == SCRIPT
+        assert response.headers["etag"] != compressed_etag
+
+        response = await client.get(
+            "/static/model.glb", headers={"Accept-Encoding": "gzip"}
+        )
+        assert "content-encoding" not in response.headers
+        assert response.content == BINARY
+
+
+@pytest.mark.asyncio
+async def test_newer_precompressed_siblings_are_served(static):
+    """
+    Test that a precompressed sibling file newer than the file is served as it is.
+    """
+    sibling = os.path.join(static.directory, "app.js.gz")
+    with open(sibling, "wb") as file:
+        file.write(gzip.compress(b"// sibling\n" + SCRIPT))
+    async with client_for(static) as client:
+        response = await client.get(
+            "/static/app.js", headers={"Accept-Encoding": "gzip"}
+        )
+    assert response.content == b"// sibling\n" + SCRIPT
+
+
+@pytest.mark.asyncio
+async def test_conditional_requests_get_304(static):
+    """
+    Test that requests with a current ETag or modification date get 304 Not Modified.
+    """
+    async with client_for(static) as client:
+        response = await client.get("/static/model.glb")
+        etag, modified = response.headers["etag"], response.headers["last-modified"]
+        assert response.headers["cache-control"] == "no-cache"
+
+        response = await client.get(
+            "/static/model.glb", headers={"If-None-Match": f"W/{etag}"}
+        )
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = await client.get(
+            "/static/model.glb", headers={"If-Modified-Since": modified}
+        )
+        assert response.status_code == 304
+
+        response = await client.get(
+            "/static/model.glb", headers={"If-None-Match": '"other"'}
+        )
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_range_requests_get_partial_content(static):
+    """
+    Test that byte ranges are answered with 206, unsatisfiable ones with 416 and stale If-Range with the whole file.
+    """
+    async with client_for(static) as client:
+        response = await client.get(
+            "/static/model.glb", headers={"Range": "bytes=100-299"}
+        )
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 100-299/{len(BINARY)}"
+        assert response.content == BINARY[100:300]
+
+        response = await client.get("/static/model.glb", headers={"Range": "bytes=-10"})
+        assert response.status_code == 206 and response.content == BINARY[-10:]
+
+        response = await client.get(
+            "/static/model.glb", headers={"Range": f"bytes={len(BINARY)}-"}
+        )
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(BINARY)}"
+
+        response = await client.get(
+            "/static/model.glb",
+            headers={"Range": "bytes=0-9", "If-Range": '"outdated"'},
+        )
+        assert response.status_code == 200 and response.content == BINARY
+
+
+@pytest.mark.asyncio
+async def test_versioned_urls_are_immutable(static):
+    """
+    Test that URLs with the current version are cached without revalidation and change with the content.
+    """
+    version = static.version("app.js")
+    assert static.version("missing.js") is None
+    async with client_for(static) as client:
+        response = await client.get(f"/static/app.js?v={version}")
+        assert (
+            response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        )
+
+        response = await client.head(f"/static/app.js?v={version}")
+        assert response.status_code == 200 and response.content == b""
+
+        path = os.path.join(static.directory, "app.js")
+        with open(path, "ab") as file:
+            file.write(b"// changed\n")
+        response = await client.get(f"/static/app.js?v={version}")
+        assert response.headers["cache-control"] == "no-cache"
+        assert response.content.endswith(b"// changed\n")
+        assert static.version("app.js") != version
+
+
+def test_precompress_compresses_all_files(static, tmp_path):
+    """
+    Test that precompressing hashes every file and stores the compressed ones in the cache directory.
+    """
+    assert static.precompress() == 2
+    assert [name.endswith(".gz") for name in os.listdir(tmp_path / "cache")] == [True]
+
+
+def test_default_cache_dir_is_private(tmp_path, monkeypatch):
+    """
+    Test that the default cache directory is only accessible by the user and must be a directory of the user.
+    """
+    monkeypatch.setattr(tempfile, "gettempdir", lambda: str(tmp_path))
+    directory = default_cache_dir()
+    assert os.path.dirname(directory) == str(tmp_path)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+    os.chmod(directory, 0o777)
+    assert default_cache_dir() == directory
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+    os.rmdir(directory)
+    os.symlink(tmp_path, directory)
+    with pytest.raises(RuntimeError):
+        default_cache_dir()
+
+
+def test_negotiation_and_range_parsing():
+    """
+    Test Accept-Encoding negotiation and Range parsing.
+    """
+    assert negotiate_encoding("gzip, br", ["br", "gzip"]) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate_encoding("*", ["gzip"]) == "gzip"
+    assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+    assert negotiate_encoding("", ["gzip"]) is None
+
+    assert parse_range("bytes=0-99", 50) == (0, 49)
+    assert parse_range("bytes=10-", 50) == (10, 49)
+    assert parse_range("bytes=-100", 50) == (0, 49)
+    assert parse_range("bytes=0-1,5-6", 50) == (0, 49)
+    assert parse_range("bytes=20-10", 50) is None
@@ -0,0 +1,121 @@
+"""
+Unit tests for the TickBroadcaster in the DataDiVR-Backend.
+
+This module contains test cases to verify that high-frequency events are
+coalesced per sender, batched into one frame per room and tick, and routed to
+the tick broadcaster by the EventHandler.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import WebSocket
+
+from utils.websocket import ws_manager
+from utils.websocket.event_handler import EventHandler
+from utils.websocket.tick_broadcaster import TickBroadcaster
+
+
+@pytest.mark.asyncio
+async def test_latest_update_of_each_sender_wins():
+    """
+    Test that only the latest update of each sender is kept within a tick.
+    """
+    broadcast = AsyncMock()
+    ticker = TickBroadcaster(broadcast, tick_rate=1, events="pose")
+    for i in range(10):
+        ticker.submit("pose", "alice", "Alice", {"i": i})
+        ticker.submit("pose", "bob", "Bob", {"i": i})
+    await ticker.close()
+
+    broadcast.assert_awaited_once()
+    batch = broadcast.call_args.args[0]
+    assert batch["event"] == "batch"
+    assert [(u["sender_id"], u["data"]) for u in batch["updates"]] == [
+        ("alice", {"i": 9}),
+        ("bob", {"i": 9}),
+    ]
+    assert broadcast.call_args.kwargs == {"include_sender": True, "room": None}
+
+
+@pytest.mark.asyncio
+async def test_batches_are_sent_per_room_and_keep_all_updates_if_configured():
+    """
+    Test that rooms get separate batches and that events without the latest-wins
+    policy keep all their updates in order.
+    """
+    broadcast = AsyncMock()
+    ticker = TickBroadcaster(broadcast, tick_rate=1, events="")
+    ticker.register("stroke", latest_wins=False)
+    ticker.submit("stroke", "alice", "Alice", {"i": 1}, room="a")
+    ticker.submit("stroke", "alice", "Alice", {"i": 2}, room="a")
+    ticker.submit("stroke", "bob", "Bob", {"i": 3}, room="b")
+    await ticker.close()
+
+    batches = {call.kwargs["room"]: call.args[0] for call in broadcast.call_args_list}
+    assert [u["data"]["i"] for u in batches["a"]["updates"]] == [1, 2]
+    assert [u["data"]["i"] for u in batches["b"]["updates"]] == [3]
+
+
+@pytest.mark.asyncio
+async def test_tick_task_flushes_and_stops_when_idle():
+    """
+    Test that pending updates are sent on the next tick and that the tick task
+    stops once no updates arrive.
+    """
+    broadcast = AsyncMock()
+    ticker = TickBroadcaster(broadcast, tick_rate=100, events="cursor")
+    ticker.submit("cursor", "alice", "Alice", {"x": 1})
+    await asyncio.sleep(0.05)
+
+    broadcast.assert_awaited_once()
+    assert ticker._task is None
+
+
+@pytest.mark.asyncio
+async def test_event_handler_batches_registered_events():
+    """
+    Test that unknown events registered with the tick broadcaster are batched
+    instead of broadcast one by one.
+    """
+    broadcast = AsyncMock()
+    ticker = TickBroadcaster(broadcast, tick_rate=1, events="pose")
+    handler = EventHandler(
+        {},
+        lambda websocket: {"client_id": "c1", "first_name": "Ann"},
+        broadcast,
+        ticker,
+    )
+
+    for i in range(5):
+        await handler.handle_event("pose", {"event": "pose", "i": i}, None)
+    await handler.handle_event("chat", {"event": "chat"}, None)
+    assert broadcast.await_count == 1
+    await ticker.close()
+
+    assert broadcast.await_count == 2
+    assert broadcast.call_args.args[0]["updates"][0]["data"]["i"] == 4
+
+
+@pytest.mark.asyncio
+async def test_each_client_receives_one_frame_per_tick():
+    """
+    Test that poses of many senders reach every client as a single frame.
+    """
+    websockets = [AsyncMock(spec=WebSocket) for _ in range(3)]
+    client_ids = [ws_manager.add_client(websocket) for websocket in websockets]
+
+    for _ in range(10):
+        for websocket in websockets:
+            await ws_manager.handle_event("pose", {"event": "pose"}, websocket)
+    await ws_manager.tick_broadcaster.close()
+    for client_id in client_ids:
+        await ws_manager.client_manager.connected_clients[client_id].outbound.join()
+
+    for websocket in websockets:
+        (frame,) = [call.args[0] for call in websocket.send_text.call_args_list]
+        assert len(json.loads(frame)["updates"]) == 3
+    for client_id in client_ids:
+        ws_manager.remove_client(client_id)
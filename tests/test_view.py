@@ -0,0 +1,170 @@
+"""
+Unit tests for the spatial index and view streaming in the DataDiVR-Backend.
+
+This module contains test cases to verify that grid queries find the same
+nodes as a brute-force scan, and that clients receive the nodes in view at the
+right level of detail, only once and within the node budget.
+"""
+
+import json
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+from fastapi import WebSocket
+
+from handlers.view import handle_view
+from utils.project_data import (
+    ProjectData,
+    UniformGrid,
+    ViewState,
+    ViewStreamer,
+    frustum_planes,
+    project_store,
+)
+from utils.project_data.spatial import points_in_planes
+from utils.project_data.view import CLUSTERS, LABELS, NODES, NOT_SENT
+from utils.websocket import ws_manager
+
+
+def make_project(count=5000, name="view_project", seed=0):
+    """
+    Build a project with random positions in the unit cube.
+
+    Returns:
+        ProjectData: The project, without links.
+    """
+    rng = np.random.default_rng(seed)
+    return ProjectData(
+        name,
+        np.array([f"n{i}" for i in range(count)]),
+        rng.random((count, 3), dtype=np.float32),
+        np.full((count, 4), 255, dtype=np.uint8),
+    )
+
+
+def test_grid_queries_match_brute_force():
+    """
+    Test that box and frustum queries find exactly the nodes a full scan finds.
+    """
+    project = make_project()
+    grid = UniformGrid(project.positions, nodes_per_cell=32)
+    assert grid.order.shape == (project.node_count,)
+    assert sorted(grid.nodes(grid.occupied).tolist()) == list(range(project.node_count))
+
+    low, high = np.array([0.2, 0.1, 0.3]), np.array([0.5, 0.6, 0.4])
+    expected = np.flatnonzero(
+        np.all((project.positions >= low) & (project.positions <= high), axis=1)
+    )
+    found = grid.query_box(project.positions, low, high)
+    assert sorted(found.tolist()) == expected.tolist()
+
+    planes = frustum_planes((0.5, 0.5, -1.0), (0.2, 0.0, 1.0), fov=40, far=1.8)
+    expected = np.flatnonzero(points_in_planes(project.positions, planes))
+    found = grid.query_frustum(project.positions, planes)
+    assert 0 < len(found) < project.node_count
+    assert sorted(found.tolist()) == expected.tolist()
+
+
+def test_grid_of_flat_layout_and_invalid_cameras():
+    """
+    Test that 2D layouts get a flat grid and that invalid cameras are rejected.
+    """
+    positions = np.random.default_rng(1).random((1000, 3), dtype=np.float32)
+    positions[:, 2] = 0
+    grid = UniformGrid(positions)
+    assert grid.shape[2] == 1 and grid.shape[0] > 1
+    planes = frustum_planes((0.5, 0.5, -1.0), (0.0, 0.0, 1.0))
+    assert len(grid.query_frustum(positions, planes)) == 1000
+
+    with pytest.raises(ValueError):
+        frustum_planes((0, 0, 0), (0, 1, 0), up=(0, 1, 0))
+    with pytest.raises(ValueError):
+        frustum_planes((0, 0, 0), (0, 0, 1), fov=180)
+
+
+def test_view_updates_send_changes_only():
+    """
+    Test that cells are sent once per level and removed when they leave the view.
+    """
+    project = make_project()
+    grid = project.spatial_index()
+    streamer = ViewStreamer(lod_distances=(0.3, 0.8), max_nodes=10**6)
+    state = ViewState(project.name, grid)
+    camera = {"position": (0.5, 0.5, -0.2), "forward": (0, 0, 1), "fov": 60}
+
+    update = streamer.update(state, project, camera)
+    assert update["complete"] and len(update["removed"]) == 0
+    nodes, clusters = update["nodes"], update["clusters"]
+    assert set(nodes["levels"].tolist()) <= {LABELS, NODES}
+    assert len(nodes["index"]) == nodes["counts"].sum()
+    assert len(nodes["positions"]) == 3 * len(nodes["index"])
+    assert len(clusters["positions"]) == 3 * len(clusters["cells"])
+    assert set(update["labels"]["index"].tolist()) <= set(nodes["index"].tolist())
+    assert update["labels"]["text"][0].startswith("n")
+    assert (state.levels[clusters["cells"]] == CLUSTERS).all()
+    held = state.holds(nodes["index"])
+    assert held.all() and not state.holds(grid.nodes(clusters["cells"])).any()
+
+    assert streamer.update(state, project, camera) is None
+
+    camera["forward"] = (0, 0, -1)
+    update = streamer.update(state, project, camera)
+    assert len(update["removed"]) > 0
+    assert (state.levels[update["removed"]] == NOT_SENT).all()
+
+
+def test_view_updates_respect_the_budget():
+    """
+    Test that updates are cut to the node budget, closest cells first.
+    """
+    project = make_project()
+    streamer = ViewStreamer(lod_distances=(10.0, 10.0), max_nodes=500)
+    state = ViewState(project.name, project.spatial_index())
+    camera = {"position": (0.5, 0.5, 0.5), "forward": (1, 0, 0), "fov": 170}
+
+    sent = 0
+    for _ in range(100):
+        update = streamer.update(state, project, camera)
+        assert len(update["nodes"]["index"]) <= 500
+        assert (update["nodes"]["levels"] == LABELS).all()
+        sent += len(update["nodes"]["index"])
+        if update["complete"]:
+            break
+    assert update["complete"]
+    camera_planes = frustum_planes(camera["position"], camera["forward"], fov=170)
+    visible = state.grid.cells_in_frustum(camera_planes)
+    assert sent == state.grid.counts(visible).sum()
+    assert set(np.flatnonzero(state.levels != NOT_SENT)) == set(visible)
+    assert NODES not in state.levels
+
+
+@pytest.mark.asyncio
+async def test_view_handler():
+    """
+    Test that clients receive view updates and errors for invalid cameras.
+    """
+    project_store.add(make_project(500, "view_handler_project"))
+    websocket = AsyncMock(spec=WebSocket)
+    client_id = ws_manager.add_client(websocket)
+    client = ws_manager.client_manager.connected_clients[client_id]
+    try:
+        camera = {"position": [0.5, 0.5, -1], "forward": [0, 0, 1]}
+        await handle_view({"project": "view_handler_project", **camera}, websocket)
+        await client.outbound.join()
+        update = json.loads(websocket.send_text.call_args.args[0])
+        assert update["event"] == "view_update"
+        assert sum(update["nodes"]["counts"]) + sum(update["clusters"]["counts"]) == 500
+        assert client.view.project == "view_handler_project"
+
+        await handle_view(
+            {"project": "view_handler_project", "position": [0, 0, 0]}, websocket
+        )
+        await client.outbound.join()
+        assert json.loads(websocket.send_text.call_args.args[0])["event"] == "error"
+
+        await handle_view({}, websocket)
+        assert client.view is None
+    finally:
+        ws_manager.remove_client(client_id)
+        project_store.unload("view_handler_project")
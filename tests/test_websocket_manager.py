@@ -103,6 +103,24 @@ async def test_handle_event(mock_websocket, mocker):
     mock_send.assert_called_once_with({"message": "Hello"})
 
 
+@pytest.mark.asyncio
+async def test_send_message_uses_outbound_queue(mock_websocket, mocker):
+    """
+    Test that send_message writes to registered clients through their outbound queue.
+    """
+    mock_send = mocker.patch.object(mock_websocket, "send_text", new_callable=AsyncMock)
+
+    client_id = ws_manager.add_client(mock_websocket)
+    client = ws_manager.client_manager.connected_clients[client_id]
+    assert await ws_manager.send_message(mock_websocket, {"event": "pong"})
+    await client.outbound.join()
+
+    mock_send.assert_called_once_with('{"event":"pong"}')
+    assert client.outbound.stats()["sent"] == 1
+    ws_manager.remove_client(client_id)
+    assert client.outbound.closed
+
+
 @pytest.mark.asyncio
 async def test_broadcast(mock_websocket, mocker):
     """
@@ -110,9 +128,33 @@ async def test_broadcast(mock_websocket, mocker):
 
     Verifies that messages are correctly broadcast to all connected clients.
     """
-    mock_send = mocker.patch.object(mock_websocket, "send_json", new_callable=AsyncMock)
+    mock_send = mocker.patch.object(mock_websocket, "send_text", new_callable=AsyncMock)
+
+    client_id = ws_manager.add_client(mock_websocket)
+    result = await ws_manager.broadcast({"message": "Broadcast test"})
+    await ws_manager.client_manager.connected_clients[client_id].outbound.join()
 
-    ws_manager.add_client(mock_websocket)
-    await ws_manager.broadcast({"message": "Broadcast test"})
+    mock_send.assert_called_once_with('{"message":"Broadcast test"}')
+    assert client_id in result.delivered
 
-    mock_send.assert_called_once_with({"message": "Broadcast test"})
+
+@pytest.mark.asyncio
+async def test_broadcast_to_room(mocker):
+    """
+    Test that a broadcast to a room only reaches the members of that room.
+    """
+    member, outsider = Mock(spec=WebSocket), Mock(spec=WebSocket)
+    member.send_text = AsyncMock()
+    outsider.send_text = AsyncMock()
+    member_id = ws_manager.add_client(member)
+    outsider_id = ws_manager.add_client(outsider)
+    ws_manager.join_room(member_id, "project_1")
+
+    result = await ws_manager.broadcast({"event": "select"}, room="project_1")
+    await ws_manager.client_manager.connected_clients[member_id].outbound.join()
+
+    assert result.delivered == [member_id]
+    member.send_text.assert_called_once_with('{"event":"select"}')
+    outsider.send_text.assert_not_called()
+    ws_manager.remove_client(member_id)
+    ws_manager.remove_client(outsider_id)
@@ -5,13 +5,40 @@ This module provides abstractions for web framework components to make it easy
 to switch between different web frameworks. It currently wraps FastAPI components.
 """
 
+import hashlib
+import os
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Optional
+
 from fastapi import APIRouter
 from fastapi import BackgroundTasks as FastAPIBackgroundTasks
 from fastapi import HTTPException as FastAPIHTTPException
 from fastapi import Query as FastAPIQuery
 from fastapi import Request as FastAPIRequest
 from fastapi.responses import HTMLResponse as FastAPIHTMLResponse
+from fastapi.responses import PlainTextResponse as FastAPIPlainTextResponse
+from fastapi.responses import Response as FastAPIResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache, meta, pass_context
+
+from .cache import cache_key
+from .metrics import metrics
+
+# Number of rendered pages kept by Templates
+DEFAULT_MAX_RENDERED = 128
+
+TEMPLATE_RENDERS = metrics.counter(
+    "datadivr_template_renders_total",
+    "Template responses, by whether the page was rendered, reused or not modified.",
+    ["result"],
+)
+
+# The static files linked by the page being rendered, which the page depends on
+_static_files: ContextVar[Optional[List[str]]] = ContextVar(
+    "static_files", default=None
+)
 
 
 class Route(APIRouter):
@@ -28,6 +55,8 @@ class Route(APIRouter):
 Query = FastAPIQuery
 HTTPException = FastAPIHTTPException
 HTMLResponse = FastAPIHTMLResponse
+PlainTextResponse = FastAPIPlainTextResponse
+Response = FastAPIResponse
 BackgroundTasks = FastAPIBackgroundTasks
 Request = FastAPIRequest
 
@@ -36,10 +65,46 @@ Request = FastAPIRequest
 class Templates:
     """
     Wrapper class for templating engine to abstract template rendering specifics.
+
+    Compiled templates are kept in a bytecode cache on disk, so workers and
+    restarts do not compile them again. CachedTemplateResponse() additionally
+    caches the rendered pages, keyed on the template, the context and the
+    modification times of the template and the templates it extends or
+    includes, and answers conditional requests with 304 Not Modified.
+
+    Templates link to static files with static_url(name, path), which adds the
+    file's version to the URL if the folder is served by CachedStaticFiles, so
+    clients cache the file until it changes; pages are rendered again then.
     """
 
-    def __init__(self, directory: str):
-        self._engine = Jinja2Templates(directory=directory)
+    def __init__(
+        self,
+        directory: str,
+        bytecode_cache_dir: Optional[str] = None,
+        max_rendered: Optional[int] = None,
+    ):
+        """
+        Initialize the Templates.
+
+        Args:
+            directory (str): The directory of the templates.
+            bytecode_cache_dir (Optional[str], optional): Where compiled templates are
+                cached. Defaults to the environment variable TEMPLATE_CACHE_DIR, or
+                a directory in the system's temporary directory.
+            max_rendered (Optional[int], optional): The number of rendered pages to
+                keep. Defaults to the environment variable TEMPLATE_RENDER_CACHE_SIZE,
+                or 128.
+        """
+        bytecode_cache_dir = bytecode_cache_dir or os.getenv("TEMPLATE_CACHE_DIR")
+        self._engine = Jinja2Templates(
+            directory=directory,
+            bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir),
+        )
+        self._engine.env.globals["static_url"] = static_url
+        self.max_rendered = max_rendered or int(
+            os.getenv("TEMPLATE_RENDER_CACHE_SIZE", DEFAULT_MAX_RENDERED)
+        )
+        self._rendered: "OrderedDict[str, RenderedTemplate]" = OrderedDict()
 
     def TemplateResponse(self, name: str, context: dict, status_code: int = 200):
         """
@@ -54,3 +119,196 @@ class Templates:
             TemplateResponse: The rendered template response.
         """
         return self._engine.TemplateResponse(name, context, status_code=status_code)
+
+    def CachedTemplateResponse(
+        self, request, name: str, context: Optional[dict] = None, status_code: int = 200
+    ):
+        """
+        Render a template, or reuse the page rendered for the same context before.
+
+        The response carries a strong ETag of the page. If the request's
+        If-None-Match header lists it, the response is 304 Not Modified without
+        a body, so clients polling the page only download it after it changed.
+
+        Args:
+            request (Request): The incoming request, passed to the template as 'request'.
+            name (str): The name of the template file.
+            context (Optional[dict], optional): Further context data; must be JSON
+                serializable for the page to be cached.
+            status_code (int, optional): The HTTP status code. Defaults to 200.
+
+        Returns:
+            Response: The page, or 304 Not Modified.
+        """
+        page = self.render(name, context or {}, request)
+        headers = {"ETag": page.etag, "Cache-Control": "no-cache"}
+        if status_code == 200 and etag_matches(
+            request.headers.get("if-none-match"), page.etag
+        ):
+            TEMPLATE_RENDERS.labels("not_modified").inc()
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(page.body, status_code=status_code, headers=headers)
+
+    def render(self, name: str, context: dict, request=None) -> "RenderedTemplate":
+        """
+        Render a template, reusing the page rendered for the same inputs if its templates did not change.
+
+        Args:
+            name (str): The name of the template file.
+            context (dict): The context data, without the request.
+            request (Optional[Request], optional): The request; pages depend on its
+                base URL, which url_for() uses.
+
+        Returns:
+            RenderedTemplate: The page and its ETag.
+        """
+        base_url = str(request.base_url) if request is not None else None
+        try:
+            key = cache_key("template", [name, base_url, context])
+        except TypeError:
+            key = None
+        page = self._rendered.get(key) if key is not None else None
+        if page is not None and page.is_current():
+            self._rendered.move_to_end(key)
+            TEMPLATE_RENDERS.labels("hit").inc()
+            return page
+
+        TEMPLATE_RENDERS.labels("miss").inc()
+        files = self._template_files(name)
+        linked: List[str] = []
+        token = _static_files.set(linked)
+        try:
+            template = self._engine.get_template(name)
+            body = template.render({**context, "request": request})
+        finally:
+            _static_files.reset(token)
+        files += linked
+        mtimes = _mtimes(files)
+        body = body.encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        page = RenderedTemplate(body, etag, files, mtimes)
+        if key is not None:
+            self._rendered[key] = page
+            self._rendered.move_to_end(key)
+            while len(self._rendered) > self.max_rendered:
+                self._rendered.popitem(last=False)
+        return page
+
+    def _template_files(self, name: str) -> List[str]:
+        """
+        Get the files of a template and of the templates it extends, includes or imports.
+        """
+        env = self._engine.env
+        files, pending, seen = [], [name], set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            source, filename, _ = env.loader.get_source(env, current)
+            if filename:
+                files.append(filename)
+            references = meta.find_referenced_templates(env.parse(source))
+            # references computed at render time (None) cannot be followed
+            pending.extend(ref for ref in references if ref is not None)
+        return files
+
+
+@dataclass
+class RenderedTemplate:
+    """
+    A rendered page.
+
+    Attributes:
+        body (bytes): The page, UTF-8 encoded.
+        etag (str): The strong entity tag of the page.
+        files (List[str]): The template files the page was rendered from, and
+                           the static files it links with versioned URLs.
+        mtimes (List[Optional[int]]): Their modification times in nanoseconds when the
+                                     page was rendered.
+    """
+
+    body: bytes
+    etag: str
+    files: List[str]
+    mtimes: List[Optional[int]]
+
+    def is_current(self) -> bool:
+        """
+        Check whether none of the template or linked static files changed since the page was rendered.
+
+        Returns:
+            bool: True if the page is still current.
+        """
+        return _mtimes(self.files) == self.mtimes
+
+
+@pass_context
+def static_url(context, name: str, path: str) -> str:
+    """
+    Get the URL of a static file, versioned if its folder is served by CachedStaticFiles.
+
+    Available in templates, e.g. {{ static_url('static', 'client.html') }}.
+    Versioned URLs, path?v=<version>, are cached by clients without
+    revalidation; the version changes with the content of the file.
+
+    Args:
+        context (Context): The template context, which holds the request.
+        name (str): The name of the mounted static folder.
+        path (str): The path of the file within the folder.
+
+    Returns:
+        str: The URL.
+    """
+    request = context["request"]
+    url = str(request.url_for(name, path=path))
+    static = next(
+        (
+            route.app
+            for route in request.app.routes
+            if getattr(route, "name", None) == name
+        ),
+        None,
+    )
+    # only CachedStaticFiles (utils.static_files) versions its files
+    if static is None or not hasattr(static, "version"):
+        return url
+    version = static.version(path)
+    if version is None:
+        return url
+    linked = _static_files.get()
+    if linked is not None:
+        linked.append(static.lookup_path(path)[0])
+    return f"{url}?v={version}"
+
+
+def _mtimes(files: List[str]) -> List[Optional[int]]:
+    """
+    Get the modification times of files, None for those that do not exist.
+    """
+    mtimes: List[Optional[int]] = []
+    for path in files:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return mtimes
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Check whether an If-None-Match header lists an entity tag, comparing weakly.
+
+    Args:
+        header (Optional[str]): The If-None-Match header of the request.
+        etag (str): The quoted entity tag of the current representation.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in tags)
@@ -0,0 +1,313 @@
+"""
+Numeric aggregation module for the DataDiVR-Backend.
+
+This module provides the Aggregator class, which computes the count, sum,
+mean, minimum, maximum and percentiles of numbers arriving in chunks, and the
+parsers that turn the chunks of a request body into NumPy arrays: a JSON array
+of numbers, or raw little-endian float64 values.
+
+Sums are compensated: each chunk is summed pairwise with error-free
+transformations, so the rounding error of every addition is kept and added
+back, and chunk totals are combined with Neumaier summation. The result is
+accurate even when large values cancel, e.g. [1e16, 1, -1e16] sums to 1.
+"""
+
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+OPERATIONS = ("count", "sum", "mean", "min", "max")
+# Comma-separated numbers in the JSON number grammar, with optional whitespace
+_NUMBER = r"[ \t\r\n]*-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?[ \t\r\n]*"
+JSON_NUMBERS = re.compile(f"{_NUMBER}(?:,{_NUMBER})*")
+
+
+def compensated_sum(values: np.ndarray) -> Tuple[float, float]:
+    """
+    Sum values with vectorized error-free transformations.
+
+    The values are added in pairs, level by level. The rounding error of each
+    addition is computed exactly (TwoSum) and summed separately.
+
+    Args:
+        values (np.ndarray): The float64 values.
+
+    Returns:
+        Tuple[float, float]: The sum and the accumulated rounding error; their
+        sum is the compensated result.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    error = 0.0
+    # finite values may overflow; Aggregator.result() rejects non-finite results
+    with np.errstate(over="ignore", invalid="ignore"):
+        while len(values) > 1:
+            odd = values[-1:] if len(values) % 2 else values[:0]
+            paired = len(values) - len(odd)
+            a, b = values[:paired:2], values[1::2]
+            total = a + b
+            b_virtual = total - a
+            error += float(np.sum((a - (total - b_virtual)) + (b - b_virtual)))
+            values = np.concatenate([total, odd])
+    return (float(values[0]) if len(values) else 0.0), error
+
+
+class Aggregator:
+    """
+    Accumulates statistics of numbers that arrive in chunks.
+
+    Attributes:
+        count (int): The number of values added.
+        minimum (float): The smallest value added, inf if none.
+        maximum (float): The largest value added, -inf if none.
+        keep_values (bool): Whether the values are kept to compute percentiles.
+    """
+
+    def __init__(self, keep_values: bool = False):
+        """
+        Initialize an empty Aggregator.
+
+        Args:
+            keep_values (bool, optional): Keep the values, which percentiles() needs.
+                                          Defaults to False.
+        """
+        self.count = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.keep_values = keep_values
+        self._sum = 0.0
+        self._compensation = 0.0
+        self._chunks: List[np.ndarray] = []
+
+    def add(self, values: np.ndarray):
+        """
+        Add a chunk of values.
+
+        Args:
+            values (np.ndarray): The values, float64.
+        """
+        if not len(values):
+            return
+        self.count += len(values)
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        total, error = compensated_sum(values)
+        self._compensation += error
+        # Neumaier summation of the chunk totals
+        running = self._sum + total
+        if abs(self._sum) >= abs(total):
+            self._compensation += (self._sum - running) + total
+        else:
+            self._compensation += (total - running) + self._sum
+        self._sum = running
+        if self.keep_values:
+            self._chunks.append(values)
+
+    @property
+    def sum(self) -> float:
+        """
+        float: The compensated sum of the values.
+        """
+        return self._sum + self._compensation
+
+    @property
+    def mean(self) -> Optional[float]:
+        """
+        Optional[float]: The mean of the values, None if there are none.
+        """
+        return self.sum / self.count if self.count else None
+
+    def percentiles(self, percentiles: Iterable[float]) -> Dict[str, float]:
+        """
+        Compute percentiles of the values, interpolating linearly between them.
+
+        Args:
+            percentiles (Iterable[float]): Percentiles from 0 to 100.
+
+        Returns:
+            Dict[str, float]: Maps each percentile, formatted with %g, to its value.
+
+        Raises:
+            ValueError: If the values were not kept or there are none.
+        """
+        if not self.keep_values:
+            raise ValueError("The values were not kept")
+        if not self.count:
+            raise ValueError("No values")
+        percentiles = list(percentiles)
+        values = np.concatenate(self._chunks)
+        # np.percentile partitions instead of sorting all values; interpolating
+        # between values far apart may overflow, which result() rejects
+        with np.errstate(over="ignore", invalid="ignore"):
+            results = np.percentile(values, percentiles)
+        return {f"{p:g}": float(value) for p, value in zip(percentiles, results)}
+
+    def result(
+        self, operations: Iterable[str] = OPERATIONS, percentiles: Iterable[float] = ()
+    ) -> Dict[str, object]:
+        """
+        Get the requested statistics.
+
+        Args:
+            operations (Iterable[str], optional): Names from OPERATIONS. Defaults to all.
+            percentiles (Iterable[float], optional): Percentiles to include. Defaults to none.
+
+        Returns:
+            Dict[str, object]: The statistics by name, and the percentiles under 'percentiles'.
+
+        Raises:
+            ValueError: If a statistic overflows, e.g. the sum of [1e308, 1e308].
+        """
+        values = {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.mean,
+            "min": self.minimum if self.count else None,
+            "max": self.maximum if self.count else None,
+        }
+        result: Dict[str, object] = {name: values[name] for name in operations}
+        percentiles = list(percentiles)
+        if percentiles:
+            result["percentiles"] = self.percentiles(percentiles)
+            checked = {**result, **result["percentiles"]}
+        else:
+            checked = result
+        # finite values can sum up to more than the largest float64
+        for name, value in checked.items():
+            if isinstance(value, float) and not math.isfinite(value):
+                raise ValueError(f"The {name} exceeds the range of float64")
+        return result
+
+
+class BinaryParser:
+    """
+    Parses a stream of little-endian float64 values.
+    """
+
+    def __init__(self):
+        self._rest = b""
+
+    def feed(self, chunk: bytes) -> np.ndarray:
+        """
+        Parse the complete values in a chunk, keeping a partial value for the next one.
+
+        Args:
+            chunk (bytes): The next bytes of the stream.
+
+        Returns:
+            np.ndarray: The values, float64.
+
+        Raises:
+            ValueError: If a value is not finite.
+        """
+        data = self._rest + chunk if self._rest else chunk
+        end = len(data) - len(data) % 8
+        self._rest = data[end:]
+        return _finite(np.frombuffer(data, dtype="<f8", count=end // 8))
+
+    def close(self) -> np.ndarray:
+        """
+        End the stream.
+
+        Returns:
+            np.ndarray: No further values.
+
+        Raises:
+            ValueError: If the stream ended within a value.
+        """
+        if self._rest:
+            raise ValueError("The body length is not a multiple of 8 bytes")
+        return np.empty(0)
+
+
+class JSONArrayParser:
+    """
+    Parses a stream holding a JSON array of numbers, e.g. "[1, 2.5, -3e4]".
+
+    Each chunk is parsed up to its last comma; the rest waits for the next chunk.
+    """
+
+    def __init__(self):
+        self._rest = ""
+        self._started = False
+        self._closed = False
+
+    def feed(self, chunk: bytes) -> np.ndarray:
+        """
+        Parse the complete numbers in a chunk.
+
+        Args:
+            chunk (bytes): The next bytes of the stream.
+
+        Returns:
+            np.ndarray: The values, float64.
+
+        Raises:
+            ValueError: If the chunk is not part of a JSON array of numbers.
+        """
+        if self._closed:
+            if chunk.strip():
+                raise ValueError("Unexpected data after the JSON array")
+            return np.empty(0)
+        try:
+            text = self._rest + chunk.decode("ascii")
+        except UnicodeDecodeError:
+            raise ValueError("Expected a JSON array of numbers") from None
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return np.empty(0)
+            if text[0] != "[":
+                raise ValueError("Expected a JSON array of numbers")
+            text, self._started = text[1:], True
+        if "]" in text:
+            text, _, trailing = text.partition("]")
+            if trailing.strip():
+                raise ValueError("Unexpected data after the JSON array")
+            self._closed = True
+            self._rest = ""
+            return _parse_numbers(text, last=True)
+        cut = text.rfind(",")
+        start = cut + 1
+        self._rest = text[start:]
+        return _parse_numbers(text[:cut], last=False) if cut >= 0 else np.empty(0)
+
+    def close(self) -> np.ndarray:
+        """
+        End the stream.
+
+        Returns:
+            np.ndarray: No further values.
+
+        Raises:
+            ValueError: If the array was not closed.
+        """
+        if self._started and not self._closed:
+            raise ValueError("The JSON array is not closed")
+        return np.empty(0)
+
+
+def _parse_numbers(text: str, last: bool) -> np.ndarray:
+    """
+    Parse comma-separated numbers; an empty text is allowed only for an empty array.
+    """
+    if not text.strip():
+        if last:
+            return np.empty(0)
+        raise ValueError("Invalid number in the JSON array")
+    # float() also accepts e.g. "1_000", "inf" and " 0x1p3"; only JSON numbers are valid
+    if JSON_NUMBERS.fullmatch(text) is None:
+        raise ValueError("Invalid number in the JSON array")
+    tokens = text.split(",")
+    values = np.fromiter(map(float, tokens), np.float64, len(tokens))
+    return _finite(values)
+
+
+def _finite(values: np.ndarray) -> np.ndarray:
+    """
+    Check that no value is NaN or infinite.
+    """
+    if not np.isfinite(values).all():
+        raise ValueError("Values must be finite numbers")
+    return values
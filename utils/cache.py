@@ -0,0 +1,302 @@
+"""
+Result cache module for the DataDiVR-Backend.
+
+This module provides the ResultCache class, which memoizes the results of
+deterministic computations such as analysis jobs and API routes. Results are
+keyed on a canonical hash of the computation's name and parameters, evicted
+least recently used first once the cache exceeds its entry or memory budget,
+and expire after a time to live. Concurrent requests for the same key share one
+in-flight computation instead of each starting their own.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from .metrics import metrics
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Time to live of entries in seconds, 0 to keep them until they are evicted
+DEFAULT_TTL = 600.0
+
+CACHE_REQUESTS = metrics.counter(
+    "datadivr_cache_requests_total",
+    "Result cache lookups, by result: hit, miss, or shared (joined an in-flight computation).",
+    ["result"],
+)
+CACHE_EVICTIONS = metrics.counter(
+    "datadivr_cache_evictions_total",
+    "Entries removed from the result cache, by reason.",
+    ["reason"],
+)
+
+
+def cache_key(name: str, payload: Any = None) -> str:
+    """
+    Get the cache key of a computation.
+
+    The payload is serialized canonically, so payloads that differ only in the
+    order of their keys get the same key.
+
+    Args:
+        name (str): The name of the computation, e.g. the event or route.
+        payload (Any, optional): The parameters of the computation; must be JSON
+                                 serializable, with sets and bytes also accepted.
+
+    Returns:
+        str: A hex digest identifying the computation.
+
+    Raises:
+        TypeError: If the payload cannot be serialized.
+    """
+    canonical = json.dumps(
+        [name, payload],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_canonical,
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _canonical(value: Any) -> Any:
+    """
+    Convert values the json module cannot serialize into a canonical form.
+    """
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory used by a value.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        int: The size of the pickled value, or the shallow size of values that
+        cannot be pickled.
+    """
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires: float
+
+
+class ResultCache:
+    """
+    An LRU cache with expiry, a memory budget and single-flight computations.
+
+    The cache is not thread-safe and must be used from the event loop.
+
+    Attributes:
+        max_entries (int): Maximum number of entries.
+        max_bytes (int): Maximum estimated size of all entries together.
+        ttl (float): Default time to live of entries in seconds, 0 for no expiry.
+        size (int): Estimated size of all entries together.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initialize the ResultCache.
+
+        Limits that are not given are read from the environment variables
+        CACHE_MAX_ENTRIES, CACHE_MAX_BYTES and CACHE_TTL.
+
+        Args:
+            max_entries (Optional[int], optional): Maximum number of entries. Defaults to 1024.
+            max_bytes (Optional[int], optional): Memory budget in bytes. Defaults to 64 MiB.
+            ttl (Optional[float], optional): Time to live in seconds. Defaults to 600.
+        """
+        if max_entries is None:
+            max_entries = int(os.getenv("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        if ttl is None:
+            ttl = float(os.getenv("CACHE_TTL", DEFAULT_TTL))
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """
+        Get a cached value, marking it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Tuple[bool, Any]: Whether the key was found, and its value.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry.expires and entry.expires <= time.monotonic():
+            self._remove(key, "expired")
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        Store a value, evicting the least recently used entries beyond the limits.
+
+        Args:
+            key (str): The cache key.
+            value (Any): The value.
+            ttl (Optional[float], optional): Time to live in seconds. Defaults to the cache's ttl.
+
+        Returns:
+            bool: False if the value is larger than the memory budget and was not stored.
+        """
+        if key in self._entries:
+            self._remove(key)
+        size = estimate_size(value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            CACHE_EVICTIONS.labels("size").inc()
+            return False
+
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl > 0 else 0.0
+        self._entries[key] = _Entry(value, size, expires)
+        self.size += size
+        self._evict()
+        return True
+
+    def invalidate(self, key: str) -> bool:
+        """
+        Remove an entry.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            bool: True if the entry existed.
+        """
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        return True
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self._entries.clear()
+        self.size = 0
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Get a cached value, or compute and store it.
+
+        If the same key is already being computed, the caller waits for that
+        computation instead of starting another one. Errors are passed to all
+        waiting callers and are not cached. The computation runs in its own task,
+        so it completes and is cached even if the caller that started it is cancelled.
+
+        Args:
+            key (str): The cache key.
+            compute (Callable[[], Any]): Computes the value; may return an awaitable.
+            ttl (Optional[float], optional): Time to live in seconds. Defaults to the cache's ttl.
+
+        Returns:
+            Any: The cached or computed value.
+        """
+        found, value = self.lookup(key)
+        if found:
+            CACHE_REQUESTS.labels("hit").inc()
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            CACHE_REQUESTS.labels("shared").inc()
+            return await asyncio.shield(future)
+
+        CACHE_REQUESTS.labels("miss").inc()
+        future = asyncio.ensure_future(self._compute(key, compute, ttl))
+        self._inflight[key] = future
+        return await asyncio.shield(future)
+
+    async def _compute(
+        self, key: str, compute: Callable[[], Any], ttl: Optional[float]
+    ):
+        """
+        Run a computation and store its value.
+        """
+        try:
+            value = compute()
+            if inspect.isawaitable(value):
+                value = await value
+            self.set(key, value, ttl)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def _evict(self):
+        """
+        Remove expired entries, then the least recently used ones, until within the limits.
+        """
+        if len(self._entries) <= self.max_entries and self.size <= self.max_bytes:
+            return
+        now = time.monotonic()
+        for key in [
+            k for k, e in self._entries.items() if e.expires and e.expires <= now
+        ]:
+            self._remove(key, "expired")
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)), "lru")
+
+    def _remove(self, key: str, reason: Optional[str] = None):
+        """
+        Remove an entry, counting the eviction if a reason is given.
+        """
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+        if reason is not None:
+            CACHE_EVICTIONS.labels(reason).inc()
+
+
+# Create a global instance of ResultCache
+result_cache = ResultCache()
+
+metrics.gauge(
+    "datadivr_cache_entries",
+    "Entries in the result cache.",
+    function=lambda: len(result_cache),
+)
+metrics.gauge(
+    "datadivr_cache_bytes",
+    "Estimated size of the entries in the result cache.",
+    function=lambda: result_cache.size,
+)
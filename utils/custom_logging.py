@@ -3,22 +3,531 @@ Custom logging configuration module for the DataDiVR-Backend.
 
 This module provides a function to configure colorful logging for the DataDiVR-Backend
 application with timestamps for all log levels, outputting to both console and file.
+
+Log records are not written on the thread that logs them. The root logger only
+puts records into a bounded queue; a background thread writes them to the console
+and the log file in batches and flushes once per batch. When the queue is full,
+records are dropped and counted instead of blocking the event loop.
+
+The log file is rotated at midnight and when it reaches a size limit. Rotated
+files are compressed and pruned to a retention limit in the background. Every
+process writes its own file: with several workers, the first process writes
+logs/datadivr_backend.log and the others logs/datadivr_backend-1.log and so on,
+so no process renames or compresses a file that another one still writes.
 """
 
+import atexit
+import copy
+import gzip
+import itertools
+import json
 import logging
 import os
-from datetime import datetime
+import queue
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
+from typing import IO, Dict, List, Optional, Tuple
 
 import colorlog
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+DEFAULT_LOG_QUEUE_SIZE = 10000
+DEFAULT_LOG_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 14
+# Maximum number of records written between two flushes
+MAX_BATCH_SIZE = 512
+
+_exception_formatter = logging.Formatter()
+
+
+class BatchFlushMixin:
+    """
+    Defers the flush after every record until the end of a batch.
+
+    Mixed into stream handlers used by a BatchingQueueListener.
+    """
+
+    def flush(self):
+        """
+        Do nothing; the listener calls flush_batch() once per batch instead.
+        """
+
+    def flush_batch(self):
+        """
+        Flush the records written since the last batch.
+        """
+        super().flush()
+
+
+class BatchedStreamHandler(BatchFlushMixin, colorlog.StreamHandler):
+    """
+    A console handler that flushes once per batch.
+    """
+
+
+def claim_log_file(filename: str) -> Tuple[str, Optional[IO]]:
+    """
+    Claim a log file that no other handler, in this or another process, writes to.
+
+    The first claim gets the file itself, further claims while it is held get
+    '<name>-1<ext>', '<name>-2<ext>' and so on. A claim is an exclusive lock on
+    a hidden lock file next to the log file, which is released when the lock
+    file is closed or the process exits, so restarted workers claim the same
+    files again and their retention limits keep applying.
+
+    Args:
+        filename (str): The path of the log file.
+
+    Returns:
+        Tuple[str, Optional[IO]]: The path of the claimed file, and the open lock
+        file that holds the claim, None where file locks are not available.
+    """
+    if fcntl is None:  # pragma: no cover - not available on Windows
+        return filename, None
+    root, extension = os.path.splitext(filename)
+    for slot in itertools.count():
+        path = f"{root}-{slot}{extension}" if slot else filename
+        directory, name = os.path.split(path)
+        # hidden, so the lock file is never taken for a rotated file
+        lock = open(os.path.join(directory, f".{name}.lock"), "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            continue
+        return path, lock
+
+
+class LogFileCompressor:
+    """
+    Compresses rotated log files and enforces their retention on a background thread.
+    """
+
+    def __init__(self, base_filename: str, backup_count: int, compress: bool):
+        """
+        Initialize the LogFileCompressor.
+
+        Args:
+            base_filename (str): The path of the active log file.
+            backup_count (int): The number of rotated files to keep, 0 to keep all.
+            compress (bool): Whether to gzip rotated files.
+        """
+        self.base_filename = base_filename
+        self.backup_count = backup_count
+        self.compress = compress
+        self._paths: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def rotated_files(self) -> List[str]:
+        """
+        Get the rotated log files, oldest first.
+
+        Returns:
+            List[str]: The paths of the rotated files.
+        """
+        directory, name = os.path.split(self.base_filename)
+        prefix = name + "."
+
+        def rotation_order(entry: str):
+            # '<date>-<time>[-<counter>][.gz]', sorted by time, then counter
+            stamp = entry.split(".")[-2 if entry.endswith(".gz") else -1]
+            date, _, rest = stamp.partition("-")
+            clock, _, counter = rest.partition("-")
+            return date, clock, int(counter) if counter.isdigit() else 0
+
+        entries = [
+            entry
+            for entry in os.listdir(directory or ".")
+            if entry.startswith(prefix) and not entry.endswith(".tmp")
+        ]
+        return [
+            os.path.join(directory, entry)
+            for entry in sorted(entries, key=rotation_order)
+        ]
+
+    def submit(self, path: str):
+        """
+        Compress a rotated file and remove the oldest files in the background.
+
+        Args:
+            path (str): The path of the rotated file.
+        """
+        with self._lock:
+            self._paths.put(path)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-compressor", daemon=True
+                )
+                self._thread.start()
+
+    def join(self, timeout: Optional[float] = None):
+        """
+        Wait until all submitted files are processed and the thread has exited.
+
+        Args:
+            timeout (Optional[float], optional): The maximum number of seconds to wait.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        """
+        Process submitted files until none are left.
+        """
+        while True:
+            try:
+                path = self._paths.get(timeout=1.0)
+            except queue.Empty:
+                with self._lock:
+                    if self._paths.empty():
+                        self._thread = None
+                        return
+                continue
+            try:
+                if self.compress and not path.endswith(".gz"):
+                    self._gzip(path)
+                self._remove_old_files()
+            except OSError as e:
+                sys.stderr.write(f"Failed to process rotated log file {path}: {e}\n")
+
+    @staticmethod
+    def _gzip(path: str):
+        """
+        Replace a file by its gzip compressed version.
+
+        Args:
+            path (str): The path of the file.
+        """
+        if not os.path.exists(path):
+            return
+        tmp_path = path + ".gz.tmp"
+        with open(path, "rb") as source, gzip.open(tmp_path, "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(tmp_path, path + ".gz")
+        os.remove(path)
+
+    def _remove_old_files(self):
+        """
+        Remove the oldest rotated files beyond the retention limit.
+        """
+        if self.backup_count <= 0:
+            return
+        rotated = self.rotated_files()
+        for path in rotated[: max(0, len(rotated) - self.backup_count)]:
+            os.remove(path)
+
+
+class RotatingLogFileHandler(BatchFlushMixin, BaseRotatingHandler):
+    """
+    A file handler that rotates its file at midnight and when it reaches a size limit.
+
+    Rotated files are renamed to '<filename>.<YYYYmmdd-HHMMSS>', the time the
+    file was started, e.g. the midnight of the day it covers, then compressed
+    with gzip and pruned to the retention limit by a LogFileCompressor, so neither
+    the writer thread nor the event loop waits for compression.
+
+    The handler claims its file with claim_log_file(), so handlers of other
+    processes given the same path write, rotate and prune files of their own.
+    baseFilename is the claimed file.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = DEFAULT_LOG_MAX_BYTES,
+        backup_count: int = DEFAULT_LOG_BACKUP_COUNT,
+        compress: bool = True,
+    ):
+        """
+        Initialize the RotatingLogFileHandler.
+
+        Args:
+            filename (str): The path of the active log file, if no other handler
+                            claimed it; see claim_log_file().
+            max_bytes (int, optional): The size at which the file is rotated, 0 for no limit.
+            backup_count (int, optional): The number of rotated files to keep, 0 to keep all.
+            compress (bool, optional): Whether to gzip rotated files. Defaults to True.
+        """
+        filename, self._claim = claim_log_file(filename)
+        super().__init__(filename, "a", encoding="utf-8")
+        self.max_bytes = max_bytes
+        self.compressor = LogFileCompressor(self.baseFilename, backup_count, compress)
+        self.rollover_at = self._next_midnight()
+        self._last_rotation = ("", 0)
+        # the start of the time the current file covers; a file continued after a
+        # restart is dated by its last write, the earliest time known
+        self.interval_start = time.time()
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            self.interval_start = os.path.getmtime(self.baseFilename)
+
+        # compress files rotated before the last shutdown that were not compressed yet
+        for path in self.compressor.rotated_files():
+            if compress and not path.endswith(".gz"):
+                self.compressor.submit(path)
+
+    def close(self):
+        """
+        Close the file and release the claim on it.
+        """
+        super().close()
+        if self._claim is not None:
+            self._claim.close()
+            self._claim = None
+
+    @staticmethod
+    def _next_midnight() -> float:
+        """
+        Get the time of the next local midnight.
+
+        Returns:
+            float: The time as a Unix timestamp.
+        """
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """
+        Check whether the file has to be rotated before writing a record.
+
+        Args:
+            record (logging.LogRecord): The record about to be written.
+
+        Returns:
+            bool: True if midnight has passed or the file reached the size limit.
+        """
+        if time.time() >= self.rollover_at:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        """
+        Rename the current file and start a new one.
+        """
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        # name the file by the start of the time it covers, so after the
+        # midnight rotation the file of the previous day carries its date
+        stamp = datetime.fromtimestamp(self.interval_start).strftime("%Y%m%d-%H%M%S")
+        rotated = f"{self.baseFilename}.{stamp}"
+        # continue after the last file of the same second, whose predecessors
+        # may already be pruned, so the new file always sorts as the newest
+        counter = self._last_rotation[1] + 1 if self._last_rotation[0] == stamp else 0
+        candidate = f"{rotated}-{counter}" if counter else rotated
+        while os.path.exists(candidate) or os.path.exists(candidate + ".gz"):
+            counter += 1
+            candidate = f"{rotated}-{counter}"
+        if os.path.exists(self.baseFilename):
+            os.rename(self.baseFilename, candidate)
+            self.compressor.submit(candidate)
+            self._last_rotation = (stamp, counter)
+
+        now = time.time()
+        self.interval_start = self.rollover_at if now >= self.rollover_at else now
+        self.stream = self._open()
+        self.rollover_at = self._next_midnight()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line.
+
+    Each object contains the record's 'time' (Unix timestamp), 'level', 'logger',
+    'message', 'module' and 'line', and 'exception' if exception information is attached.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a log record as a JSON line.
+
+        Args:
+            record (logging.LogRecord): The record to format.
+
+        Returns:
+            str: The JSON encoded record.
+        """
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Puts log records into a bounded queue without ever blocking.
+
+    Records that do not fit into the queue are dropped and counted. The number
+    of records dropped since the last report is logged as a warning as soon as
+    the queue has room again.
+
+    Attributes:
+        dropped (int): The number of records dropped in total.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        """
+        Initialize the DroppingQueueHandler.
+
+        Args:
+            log_queue (queue.Queue): The bounded queue the listener reads from.
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the message arguments and exception into a copy of the record.
+
+        The arguments may be mutable objects, e.g. the data of an event, that
+        change before the writer thread formats the record, so they are
+        formatted on the thread that logs. Exception information is kept as text
+        in exc_text, which formatters append, so tracebacks are not kept alive.
+
+        Args:
+            record (logging.LogRecord): The record to enqueue.
+
+        Returns:
+            logging.LogRecord: A copy of the record without arguments and exception objects.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        """
+        Put a record into the queue, or drop it if the queue is full.
+
+        Args:
+            record (logging.LogRecord): The record to enqueue.
+        """
+        if self._unreported:
+            self._report_dropped()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+
+    def _report_dropped(self):
+        """
+        Enqueue a warning about the records dropped since the last report.
+        """
+        with self._lock:
+            unreported, self._unreported = self._unreported, 0
+        warning = logging.LogRecord(
+            "logging",
+            logging.WARNING,
+            __file__,
+            0,
+            "Log queue full, dropped %d log records",
+            (unreported,),
+            None,
+        )
+        try:
+            self.queue.put_nowait(warning)
+        except queue.Full:
+            with self._lock:
+                self._unreported += unreported
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    Writes queued log records on a background thread in batches.
+
+    All records waiting in the queue are handled before the handlers are flushed,
+    so under load many records share one flush and an idle logger flushes
+    every record right away.
+    """
+
+    def _monitor(self):
+        """
+        Handle queued records until the stop sentinel is received.
+        """
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < MAX_BATCH_SIZE:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    self.handle(record)
+            self.flush()
+            if stop:
+                return
+
+    def flush(self):
+        """
+        Flush all handlers at the end of a batch.
+        """
+        for handler in self.handlers:
+            flush = getattr(handler, "flush_batch", handler.flush)
+            try:
+                flush()
+            # a failing stream must not stop the thread
+            except Exception:  # pragma: no cover
+                pass
+
+    def enqueue_sentinel(self):
+        """
+        Enqueue the stop sentinel, waiting for room if the queue is full.
+        """
+        self.queue.put(self._sentinel)
+
 
 def configure_logging():
     """
     Configure colorful logging for the DataDiVR-Backend with timestamps for all levels.
 
     This function sets up a colorlog logger with custom formatting and color schemes
-    for different log levels. It configures the root logger to use this setup and
-    outputs logs to both console and a file in the logs/ directory.
+    for different log levels. It configures the root logger to put records into a
+    bounded queue and starts a background listener that outputs them to both
+    console and a file in the logs/ directory.
+
+    The log level is read from LOG_LEVEL (default INFO) and the queue size from
+    LOG_QUEUE_SIZE (default 10000). The log file is logs/datadivr_backend.log, or
+    logs/datadivr_backend-<n>.log for further worker processes; it is rotated at
+    midnight and when it reaches LOG_MAX_BYTES (default 50 MiB), rotated files
+    are gzipped unless LOG_COMPRESS is false, and the newest LOG_BACKUP_COUNT
+    (default 14) of them are kept. LOG_FORMAT=json writes the
+    file as JSON lines instead of text.
 
     Returns:
         logging.Logger: The configured root logger with colorful output.
@@ -28,7 +537,7 @@ def configure_logging():
     os.makedirs(logs_dir, exist_ok=True)
 
     # Get log level from environment variable, default to INFO if not set
-    log_level = os.getenv("LOG_LEVEL", "DEBUG").upper()
+    log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 
     # Create a color formatter for console output
     console_formatter = colorlog.ColoredFormatter(
@@ -46,31 +555,59 @@ def configure_logging():
         style="%",
     )
 
-    # Create a formatter for file output (without colors)
-    file_formatter = logging.Formatter(
-        "%(asctime)s - %(levelname)-8s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    # Create a formatter for file output (without colors, or as JSON lines)
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        file_formatter = JsonLinesFormatter()
+    else:
+        file_formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)-8s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
 
     # Get the root logger
     logger = colorlog.getLogger()
     logger.setLevel(log_level)
 
     # Create a stream handler for console output and set the formatter
-    console_handler = colorlog.StreamHandler()
+    console_handler = BatchedStreamHandler()
     console_handler.setFormatter(console_formatter)
 
-    # Create a file handler for file output
-    current_day = datetime.now().strftime("%Y%m%d")
-    log_file = os.path.join(logs_dir, f"datadivr_backend_{current_day}.log")
-    file_handler = logging.FileHandler(log_file)
+    # Create a rotating file handler for file output
+    file_handler = RotatingLogFileHandler(
+        os.path.join(logs_dir, "datadivr_backend.log"),
+        max_bytes=int(os.getenv("LOG_MAX_BYTES", DEFAULT_LOG_MAX_BYTES)),
+        backup_count=int(os.getenv("LOG_BACKUP_COUNT", DEFAULT_LOG_BACKUP_COUNT)),
+        compress=os.getenv("LOG_COMPRESS", "true").lower() not in ("0", "false", "no"),
+    )
     file_handler.setFormatter(file_formatter)
 
-    # Add the handlers to the logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # Write records on a background thread; the logger only enqueues them
+    queue_size = int(os.getenv("LOG_QUEUE_SIZE", DEFAULT_LOG_QUEUE_SIZE))
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    listener = BatchingQueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.addHandler(queue_handler)
 
     return logger
 
 
+def get_log_stats() -> Dict[str, int]:
+    """
+    Get statistics of the logging queue.
+
+    Returns:
+        Dict[str, int]: The number of records waiting to be written ('queued')
+        and the number of records dropped because the queue was full ('dropped').
+    """
+    for handler in logger.handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            return {"queued": handler.queue.qsize(), "dropped": handler.dropped}
+    return {"queued": 0, "dropped": 0}
+
+
 # Create a global logger instance
 logger = configure_logging()
@@ -0,0 +1,20 @@
+"""
+Job utilities initialization for the DataDiVR-Backend.
+
+This module imports and exposes the JobManager instance and the job types
+for use throughout the application.
+"""
+
+from .job import Job, JobExecutor, JobStatus, JobUpdate
+from .job_manager import JobLimitError, JobManager, job_manager
+
+# Specify which symbols should be accessible when using "from utils.jobs import *"
+__all__ = [
+    "Job",
+    "JobExecutor",
+    "JobLimitError",
+    "JobManager",
+    "JobStatus",
+    "JobUpdate",
+    "job_manager",
+]
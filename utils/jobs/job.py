@@ -0,0 +1,145 @@
+"""
+Job module for background work in the DataDiVR-Backend.
+
+This module defines the Job class, which represents one long-running task
+submitted to the JobManager, the states a job goes through, and the JobUpdate
+class jobs use to report progress and partial results.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Optional, Set
+
+
+class JobStatus(str, Enum):
+    """
+    The state of a job.
+
+    Attributes:
+        QUEUED: Waiting for a free slot.
+        RUNNING: Being executed.
+        COMPLETED: Finished with a result.
+        FAILED: Finished with an error.
+        CANCELLED: Cancelled before it finished.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        """
+        bool: Whether the job has reached a final state.
+        """
+        return self in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobExecutor(str, Enum):
+    """
+    Where the function of a job runs.
+
+    Attributes:
+        ASYNC: On the event loop; the function must be a coroutine function or an
+               async generator function yielding JobUpdates.
+        THREAD: In the thread pool, for blocking I/O.
+        PROCESS: In the process pool, for CPU-bound work. The function and its
+                 arguments must be picklable.
+    """
+
+    ASYNC = "async"
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+@dataclass
+class JobUpdate:
+    """
+    A progress report yielded by a job whose function is an async generator.
+
+    Progress, message and partial result are coalesced: if a job yields several
+    updates between two progress events, clients receive only the latest of each.
+    Chunks are never dropped; all chunks yielded since the last progress event
+    are sent together.
+
+    Attributes:
+        progress (Optional[float]): The fraction of the work done, from 0 to 1.
+        message (Optional[str]): A short description of the current step.
+        partial (Any): The current partial result, replacing the previous one,
+                       e.g. the node positions of a layout that is still refining.
+        chunk (Any): A piece of the result to append to the pieces sent before.
+        result (Any): The final result of the job, if the job has one.
+    """
+
+    progress: Optional[float] = None
+    message: Optional[str] = None
+    partial: Any = None
+    chunk: Any = None
+    result: Any = None
+
+
+@dataclass
+class Job:
+    """
+    Represents a task submitted to the JobManager.
+
+    Attributes:
+        job_id (str): A unique identifier for the job.
+        name (str): A descriptive name, e.g. the event that started the job.
+        executor (JobExecutor): Where the job's function runs.
+        owner_id (Optional[str]): The ID of the client that submitted the job.
+        room (Optional[str]): A room whose members receive the job's events.
+        status (JobStatus): The current state of the job.
+        created (float): When the job was submitted, as a Unix timestamp.
+        started (Optional[float]): When the job started running.
+        finished (Optional[float]): When the job reached a final state.
+        result (Any): The return value of the job's function once completed.
+        error (Optional[str]): A description of the error if the job failed.
+        progress (Optional[float]): The fraction of the work done, if the job reports it.
+        subscribers (Set[str]): IDs of the clients that receive the job's events.
+        cache_key (Optional[str]): The key the job's result is cached under, if it is cached.
+        task (Optional[asyncio.Task]): The task executing the job.
+    """
+
+    job_id: str
+    name: str
+    executor: JobExecutor = JobExecutor.ASYNC
+    owner_id: Optional[str] = None
+    room: Optional[str] = None
+    status: JobStatus = JobStatus.QUEUED
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    progress: Optional[float] = None
+    subscribers: Set[str] = field(default_factory=set)
+    cache_key: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the public state of the job, as sent in status events.
+
+        Returns:
+            Dict[str, Any]: The job's ID, name, status and timestamps, plus its
+            result once completed or its error once failed.
+        """
+        state = {
+            "job_id": self.job_id,
+            "name": self.name,
+            "status": self.status.value,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": self.progress,
+        }
+        if self.status == JobStatus.COMPLETED:
+            state["result"] = self.result
+        elif self.error is not None:
+            state["error"] = self.error
+        return state
@@ -0,0 +1,511 @@
+"""
+Job management module for the DataDiVR-Backend.
+
+This module provides the JobManager class, which runs long-running tasks in the
+background so WebSocket handlers can return immediately. Jobs run on the event
+loop, in a bounded thread pool or in a bounded process pool, at most a fixed
+number at a time, and can be cancelled. Every change of a job's state is sent
+to the job's subscribers and room as a 'job_status' event. Jobs written as async
+generators stream their progress and partial results as 'job_progress' events.
+Results of deterministic jobs can be cached, and identical jobs submitted while
+one is running share that job.
+"""
+
+import asyncio
+import inspect
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from uuid import uuid4
+
+from ..cache import CACHE_REQUESTS, ResultCache, result_cache
+from ..custom_logging import logger
+from ..metrics import metrics
+from ..websocket import ws_manager
+from .job import Job, JobExecutor, JobStatus, JobUpdate
+from .progress import DEFAULT_PROGRESS_INTERVAL, ProgressStream
+
+# Maximum number of jobs running at the same time
+DEFAULT_MAX_CONCURRENT = 8
+# Maximum number of queued or running jobs per client
+DEFAULT_MAX_PER_CLIENT = 4
+DEFAULT_THREAD_WORKERS = 4
+# Number of finished jobs kept so clients can still query their state
+DEFAULT_MAX_FINISHED = 1000
+
+JOBS = metrics.counter(
+    "datadivr_jobs_total",
+    "Jobs that reached a final state, by name and status.",
+    ["name", "status"],
+)
+JOB_DURATION = metrics.histogram(
+    "datadivr_job_duration_seconds", "Time jobs spent running, by name.", ["name"]
+)
+
+
+class JobLimitError(Exception):
+    """
+    Raised when a client submits a job while it already has the maximum number of active jobs.
+    """
+
+
+class JobManager:
+    """
+    Runs jobs in the background and reports their state.
+
+    Attributes:
+        jobs (Dict[str, Job]): Maps job IDs to the active and recently finished jobs.
+    """
+
+    def __init__(
+        self,
+        notify: Optional[Callable[[Job, Dict[str, Any]], Awaitable[Any]]] = None,
+        max_concurrent: Optional[int] = None,
+        max_per_client: Optional[int] = None,
+        thread_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+        progress_interval: Optional[float] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        """
+        Initialize the JobManager.
+
+        Limits that are not given are read from the environment variables
+        JOB_MAX_CONCURRENT, JOB_MAX_PER_CLIENT, JOB_THREAD_WORKERS,
+        JOB_PROCESS_WORKERS and JOB_PROGRESS_INTERVAL.
+
+        Args:
+            notify (Optional[Callable[[Job, Dict[str, Any]], Awaitable]], optional): Called
+                with the job and the event to send whenever its state changes or it
+                reports progress.
+            max_concurrent (Optional[int], optional): Maximum number of running jobs. Defaults to 8.
+            max_per_client (Optional[int], optional): Maximum number of active jobs per client,
+                0 for no limit. Defaults to 4.
+            thread_workers (Optional[int], optional): Size of the thread pool. Defaults to 4.
+            process_workers (Optional[int], optional): Size of the process pool.
+                Defaults to the number of CPUs.
+            max_finished (int, optional): Number of finished jobs to keep. Defaults to 1000.
+            progress_interval (Optional[float], optional): Minimum time in seconds between
+                two progress events of a job. Defaults to 0.1.
+            cache (Optional[ResultCache], optional): Stores the results of jobs submitted
+                with a cache key. Defaults to a cache of its own.
+        """
+        self.notify = notify
+        self.max_concurrent = max_concurrent or int(
+            os.getenv("JOB_MAX_CONCURRENT", DEFAULT_MAX_CONCURRENT)
+        )
+        if max_per_client is None:
+            max_per_client = int(
+                os.getenv("JOB_MAX_PER_CLIENT", DEFAULT_MAX_PER_CLIENT)
+            )
+        self.max_per_client = max_per_client
+        self.thread_workers = thread_workers or int(
+            os.getenv("JOB_THREAD_WORKERS", DEFAULT_THREAD_WORKERS)
+        )
+        self.process_workers = process_workers or int(
+            os.getenv("JOB_PROCESS_WORKERS", os.cpu_count() or 1)
+        )
+        self.max_finished = max_finished
+        if progress_interval is None:
+            progress_interval = float(
+                os.getenv("JOB_PROGRESS_INTERVAL", DEFAULT_PROGRESS_INTERVAL)
+            )
+        self.progress_interval = progress_interval
+        self.cache = cache if cache is not None else ResultCache()
+
+        self.jobs: Dict[str, Job] = {}
+        # cache key -> the active job computing it
+        self._computing: Dict[str, Job] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def submit(
+        self,
+        func: Callable,
+        *args,
+        name: Optional[str] = None,
+        executor: Union[JobExecutor, str] = JobExecutor.ASYNC,
+        owner_id: Optional[str] = None,
+        room: Optional[str] = None,
+        cache_key: Optional[str] = None,
+    ) -> Job:
+        """
+        Start a job in the background and return without waiting for it.
+
+        Must be called from the event loop. The owner is subscribed to the job.
+
+        Jobs with a cache key must be deterministic. If a job with the same key is
+        active, the owner is subscribed to it and it is returned instead of starting
+        a new one. If the result is cached, the job completes without running.
+
+        Args:
+            func (Callable): The function to run, a coroutine function or an async
+                             generator function for the "async" executor.
+            *args: The arguments passed to the function.
+            name (Optional[str], optional): The job's name. Defaults to the function's name.
+            executor (Union[JobExecutor, str], optional): "async", "thread" or "process".
+                                                          Defaults to "async".
+            owner_id (Optional[str], optional): The ID of the submitting client.
+            room (Optional[str], optional): A room whose members receive the job's events.
+            cache_key (Optional[str], optional): The key to cache the result under,
+                usually built with utils.cache.cache_key from the event name and payload.
+
+        Returns:
+            Job: The queued job, or the active job with the same cache key.
+
+        Raises:
+            JobLimitError: If the owner already has the maximum number of active jobs.
+        """
+        executor = JobExecutor(executor)
+        shared = self._computing.get(cache_key) if cache_key is not None else None
+        if shared is not None:
+            CACHE_REQUESTS.labels("shared").inc()
+            if owner_id is not None:
+                shared.subscribers.add(owner_id)
+            return shared
+
+        if owner_id is not None and self.max_per_client > 0:
+            if len(self.active_jobs(owner_id)) >= self.max_per_client:
+                raise JobLimitError(
+                    f"At most {self.max_per_client} jobs per client can be active"
+                )
+
+        job = Job(
+            job_id=str(uuid4()),
+            name=name or getattr(func, "__name__", "job"),
+            executor=executor,
+            owner_id=owner_id,
+            room=room,
+            cache_key=cache_key,
+        )
+        if cache_key is not None:
+            self._computing[cache_key] = job
+        if owner_id is not None:
+            job.subscribers.add(owner_id)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, func, args))
+        job.task.add_done_callback(partial(self._on_task_done, job))
+        self._prune()
+        logger.debug(
+            "Submitted job %s (%s) for client %s", job.job_id, job.name, owner_id
+        )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Get a job by its ID.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            Optional[Job]: The job, or None if it is unknown or was pruned.
+        """
+        return self.jobs.get(job_id)
+
+    def active_jobs(self, owner_id: Optional[str] = None) -> List[Job]:
+        """
+        Get the queued and running jobs, optionally only those of one client.
+
+        Args:
+            owner_id (Optional[str], optional): The ID of the client.
+
+        Returns:
+            List[Job]: The active jobs, oldest first.
+        """
+        return [
+            job
+            for job in self.jobs.values()
+            if not job.status.finished
+            and (owner_id is None or job.owner_id == owner_id)
+        ]
+
+    def subscribe(self, job_id: str, client_id: str) -> Optional[Job]:
+        """
+        Send the events of a job to a client.
+
+        Args:
+            job_id (str): The ID of the job.
+            client_id (str): The ID of the client.
+
+        Returns:
+            Optional[Job]: The job, or None if it is unknown.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.subscribers.add(client_id)
+        return job
+
+    def unsubscribe(self, job_id: str, client_id: str) -> bool:
+        """
+        Stop sending the events of a job to a client.
+
+        Args:
+            job_id (str): The ID of the job.
+            client_id (str): The ID of the client.
+
+        Returns:
+            bool: True if the client was subscribed.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or client_id not in job.subscribers:
+            return False
+        job.subscribers.discard(client_id)
+        return True
+
+    def cancel(self, job_id: str, owner_id: Optional[str] = None) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Jobs on the event loop are interrupted. Thread and process jobs that are
+        already running cannot be interrupted; they finish in the background and
+        their result is discarded.
+
+        Args:
+            job_id (str): The ID of the job.
+            owner_id (Optional[str], optional): If given, only a job of this client is cancelled.
+
+        Returns:
+            bool: True if the job was cancelled.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status.finished or job.task is None:
+            return False
+        if owner_id is not None and job.owner_id != owner_id:
+            return False
+        job.task.cancel()
+        return True
+
+    async def _run(self, job: Job, func: Callable, args: tuple):
+        """
+        Execute a job once a slot is free and report its state changes.
+
+        Args:
+            job (Job): The job.
+            func (Callable): The function to run.
+            args (tuple): The arguments passed to the function.
+        """
+        try:
+            await self._notify(job)
+            found, job.result = self._cached_result(job)
+            if not found:
+                async with self._get_semaphore():
+                    job.status = JobStatus.RUNNING
+                    job.started = time.time()
+                    await self._notify(job)
+                    job.result = await self._execute(job, func, args)
+                if job.cache_key is not None:
+                    self.cache.set(job.cache_key, job.result)
+            job.status = JobStatus.COMPLETED
+        except asyncio.CancelledError:
+            job.status = JobStatus.CANCELLED
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = str(e) or type(e).__name__
+            logger.warning("Job %s (%s) failed: %s", job.job_id, job.name, job.error)
+
+        self._record_finish(job)
+        await self._notify(job)
+
+    def _on_task_done(self, job: Job, task: asyncio.Task):
+        """
+        Finish a job whose task was cancelled before it started running.
+        """
+        if not job.status.finished:
+            job.status = JobStatus.CANCELLED
+            self._record_finish(job)
+            asyncio.ensure_future(self._notify(job))
+
+    def _cached_result(self, job: Job) -> Tuple[bool, Any]:
+        """
+        Look up the cached result of a job.
+
+        Returns:
+            Tuple[bool, Any]: Whether the result was found, and the result.
+        """
+        if job.cache_key is None:
+            return False, None
+        found, result = self.cache.lookup(job.cache_key)
+        CACHE_REQUESTS.labels("hit" if found else "miss").inc()
+        if found:
+            job.progress = 1.0
+        return found, result
+
+    def _record_finish(self, job: Job):
+        """
+        Record the time and metrics of a job that reached a final state.
+        """
+        if self._computing.get(job.cache_key) is job:
+            del self._computing[job.cache_key]
+        job.finished = time.time()
+        JOBS.labels(job.name, job.status.value).inc()
+        if job.started is not None:
+            JOB_DURATION.labels(job.name).observe(job.finished - job.started)
+
+    async def _execute(self, job: Job, func: Callable, args: tuple) -> Any:
+        """
+        Run a job's function with the job's executor.
+
+        Returns:
+            Any: The function's return value, or the last result an async generator yielded.
+        """
+        if job.executor != JobExecutor.ASYNC:
+            return await self.run_in_executor(job.executor, func, *args)
+        if inspect.isasyncgenfunction(func):
+            return await self._consume(job, func(*args))
+        return await func(*args)
+
+    async def _consume(self, job: Job, updates) -> Any:
+        """
+        Run a job's async generator, streaming the updates it yields to the subscribers.
+
+        Values that are not JobUpdates are sent as partial results.
+
+        Returns:
+            Any: The result of the last update that carried one.
+        """
+        stream = ProgressStream(job, partial(self._notify, job), self.progress_interval)
+        result = None
+        try:
+            async for update in updates:
+                if not isinstance(update, JobUpdate):
+                    update = JobUpdate(partial=update)
+                if update.progress is not None:
+                    job.progress = update.progress
+                if update.result is not None:
+                    result = update.result
+                await stream.push(update)
+            # deliver the last updates before the completion status
+            await stream.flush()
+        finally:
+            stream.close()
+            await updates.aclose()
+        return result
+
+    async def run_in_executor(
+        self, executor: Union[JobExecutor, str], func: Callable, *args
+    ) -> Any:
+        """
+        Run a function in the thread or process pool of the manager.
+
+        Async jobs use this to offload blocking or CPU-bound steps while still
+        reporting progress between them.
+
+        Args:
+            executor (Union[JobExecutor, str]): "thread" or "process".
+            func (Callable): The function to run.
+            *args: The arguments passed to the function.
+
+        Returns:
+            Any: The function's return value.
+        """
+        executor = JobExecutor(executor)
+        loop = asyncio.get_running_loop()
+        if executor == JobExecutor.THREAD:
+            return await loop.run_in_executor(
+                self._get_thread_pool(), partial(func, *args)
+            )
+        if executor != JobExecutor.PROCESS:
+            raise ValueError(f"Cannot run a function in the {executor.value} executor")
+
+        try:
+            return await loop.run_in_executor(
+                self._get_process_pool(), partial(func, *args)
+            )
+        except BrokenProcessPool:
+            # a worker died; start a new pool for the next job
+            self._process_pool = None
+            raise
+
+    async def _notify(self, job: Job, event: Optional[Dict[str, Any]] = None):
+        """
+        Send an event about a job, logging errors of the notify callback.
+
+        Args:
+            job (Job): The job.
+            event (Optional[Dict[str, Any]], optional): The event. Defaults to a
+                'job_status' event with the current state of the job.
+        """
+        if self.notify is None:
+            return
+        if event is None:
+            event = {"event": "job_status", **job.to_dict()}
+        try:
+            await self.notify(job, event)
+        except Exception as e:
+            logger.warning("Failed to report the state of job %s: %s", job.job_id, e)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """
+        Get the semaphore limiting running jobs, creating it for the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers, thread_name_prefix="job"
+            )
+        return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # spawn, as forking a process with running threads is unsafe
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._process_pool
+
+    def _prune(self):
+        """
+        Forget the oldest finished jobs beyond the retention limit.
+        """
+        finished = [job_id for job_id, job in self.jobs.items() if job.status.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        """
+        Cancel all active jobs and stop the thread and process pools.
+        """
+        for job in self.active_jobs():
+            job.task.cancel()
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+
+
+async def send_job_event(job: Job, event: Dict[str, Any]):
+    """
+    Send an event about a job to its room and to its subscribers.
+
+    Subscribers that are members of the room receive the event only once.
+
+    Args:
+        job (Job): The job.
+        event (Dict[str, Any]): The event to send.
+    """
+    if job.room is not None:
+        await ws_manager.send_to(event, room=job.room)
+    clients = ws_manager.client_manager.connected_clients
+    for client_id in list(job.subscribers):
+        client = clients.get(client_id)
+        if client is not None and job.room not in client.rooms:
+            await ws_manager.send_to(event, client_id=client_id)
+
+
+# Create a global instance of JobManager
+job_manager = JobManager(notify=send_job_event, cache=result_cache)
@@ -0,0 +1,118 @@
+"""
+Job progress module for the DataDiVR-Backend.
+
+This module provides the ProgressStream class, which turns the updates a job
+yields into throttled 'job_progress' events. However fast a job yields, its
+subscribers receive at most one event per interval, carrying the latest
+progress, message and partial result and all chunks yielded since the last event.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..metrics import metrics
+from .job import Job, JobUpdate
+
+# Minimum time in seconds between two progress events of a job
+DEFAULT_PROGRESS_INTERVAL = 0.1
+
+JOB_PROGRESS_EVENTS = metrics.counter(
+    "datadivr_job_progress_events_total", "Progress events sent for jobs."
+)
+JOB_PROGRESS_COALESCED = metrics.counter(
+    "datadivr_job_progress_coalesced_total",
+    "Job updates that were replaced by a later update before being sent.",
+)
+
+
+class ProgressStream:
+    """
+    Throttles and coalesces the updates of one job into progress events.
+    """
+
+    def __init__(
+        self,
+        job: Job,
+        send: Callable[[Dict[str, Any]], Awaitable[Any]],
+        interval: float = DEFAULT_PROGRESS_INTERVAL,
+    ):
+        """
+        Initialize the ProgressStream.
+
+        Args:
+            job (Job): The job whose updates are streamed.
+            send (Callable[[Dict[str, Any]], Awaitable]): Sends an event to the job's subscribers.
+            interval (float, optional): Minimum time between two events. Defaults to 0.1.
+        """
+        self.job = job
+        self.send = send
+        self.interval = interval
+        self._pending: Dict[str, Any] = {}
+        self._chunks: List[Any] = []
+        self._last_sent: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def push(self, update: JobUpdate):
+        """
+        Add an update, sending an event if the interval has passed since the last one.
+
+        Otherwise a send is scheduled for the end of the interval, so the latest
+        update is delivered even if the job does not yield again for a while.
+
+        Args:
+            update (JobUpdate): The update yielded by the job.
+        """
+        for name in ("progress", "message", "partial"):
+            value = getattr(update, name)
+            if value is not None:
+                if name in self._pending:
+                    JOB_PROGRESS_COALESCED.inc()
+                self._pending[name] = value
+        if update.chunk is not None:
+            self._chunks.append(update.chunk)
+        if not self._pending and not self._chunks:
+            return
+
+        loop = asyncio.get_running_loop()
+        wait = 0.0
+        if self._last_sent is not None:
+            wait = self._last_sent + self.interval - loop.time()
+        if wait <= 0:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(wait, self._flush_later)
+
+    def _flush_later(self):
+        """
+        Send the pending update from a timer.
+        """
+        self._timer = None
+        asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """
+        Send the pending update now, if there is one.
+        """
+        self.close()
+        if not self._pending and not self._chunks:
+            return
+        event = {
+            "event": "job_progress",
+            "job_id": self.job.job_id,
+            "name": self.job.name,
+        }
+        event.update(self._pending)
+        if self._chunks:
+            event["chunks"] = self._chunks
+        self._pending, self._chunks = {}, []
+        self._last_sent = asyncio.get_running_loop().time()
+        JOB_PROGRESS_EVENTS.inc()
+        await self.send(event)
+
+    def close(self):
+        """
+        Cancel a scheduled send.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,478 @@
+"""
+Metrics module for the DataDiVR-Backend.
+
+This module provides a small in-process metrics registry with counters, gauges
+and histograms, and the metrics of the WebSocket layer. The registry renders
+its metrics in the Prometheus text exposition format, which is served by the
+/metrics route.
+
+Each worker process has its own registry, so with several workers every scrape
+shows the metrics of the worker that answered it.
+"""
+
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .custom_logging import get_log_stats
+
+# Maximum number of label combinations per metric; further ones are counted as OVERFLOW_LABEL
+DEFAULT_MAX_SERIES = 500
+OVERFLOW_LABEL = "__other__"
+
+# Histogram buckets for durations in seconds
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Histogram buckets for numbers of recipients
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def frame_size(frame) -> int:
+    """
+    Get the size of a WebSocket frame on the wire, in bytes.
+
+    Args:
+        frame (Union[str, bytes]): The frame; text frames are sent UTF-8 encoded.
+
+    Returns:
+        int: The size in bytes.
+    """
+    if isinstance(frame, str) and not frame.isascii():
+        return len(frame.encode("utf-8"))
+    return len(frame)
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Value:
+    """
+    The value of one series of a counter or gauge.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        """
+        Increase the value.
+
+        Args:
+            amount (float, optional): The amount to add. Defaults to 1.
+        """
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        """
+        Decrease the value.
+
+        Args:
+            amount (float, optional): The amount to subtract. Defaults to 1.
+        """
+        self.value -= amount
+
+    def set(self, value: float):
+        """
+        Set the value.
+
+        Args:
+            value (float): The new value.
+        """
+        self.value = value
+
+
+class _HistogramValue:
+    """
+    The bucket counts, sum and count of one series of a histogram.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+        Record an observation.
+
+        Args:
+            value (float): The observed value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """
+    Base class of the metric types.
+
+    A metric has one series per combination of label values. Series are created
+    on first use; once a metric has max_series of them, further combinations
+    are counted in a single series whose label values are all OVERFLOW_LABEL.
+
+    Attributes:
+        name (str): The name of the metric.
+        documentation (str): The help text of the metric.
+        labelnames (Tuple[str, ...]): The names of the metric's labels.
+    """
+
+    type_name = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        function: Optional[Callable] = None,
+        max_series: int = DEFAULT_MAX_SERIES,
+    ):
+        """
+        Initialize the metric.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labelnames (Iterable[str], optional): The names of the metric's labels.
+            function (Optional[Callable], optional): A function returning the current
+                value, or a dictionary mapping label value tuples to values, when the
+                metric is rendered.
+            max_series (int, optional): The maximum number of label combinations.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self.max_series = max_series
+        self._series: Dict[Tuple, object] = {}
+        self._overflow = (OVERFLOW_LABEL,) * len(self.labelnames)
+
+    def _new_series(self):
+        return _Value()
+
+    def labels(self, *values):
+        """
+        Get the series of a combination of label values.
+
+        Args:
+            *values: The label values, in the order of the label names.
+
+        Returns:
+            The series, which has the methods of the metric type (e.g. inc or observe).
+        """
+        series = self._series.get(values)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                values = self._overflow
+                series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = self._new_series()
+        return series
+
+    def collect(self) -> List[str]:
+        """
+        Render the metric's samples.
+
+        Returns:
+            List[str]: The sample lines in the Prometheus text format.
+        """
+        if self.function is not None:
+            result = self.function()
+            values = result if isinstance(result, dict) else {(): result}
+        else:
+            values = {key: series.value for key, series in self._series.items()}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Counter(Metric):
+    """
+    A value that only goes up, e.g. the number of received events.
+    """
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1):
+        """
+        Increase the counter without labels.
+
+        Args:
+            amount (float, optional): The amount to add. Defaults to 1.
+        """
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down, e.g. the number of connected clients.
+    """
+
+    type_name = "gauge"
+
+    def set(self, value: float):
+        """
+        Set the gauge without labels.
+
+        Args:
+            value (float): The new value.
+        """
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    """
+    Counts observations in buckets, e.g. the durations of event handlers.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        max_series: int = DEFAULT_MAX_SERIES,
+    ):
+        """
+        Initialize the histogram.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labelnames (Iterable[str], optional): The names of the metric's labels.
+            buckets (Sequence[float], optional): The upper bounds of the buckets.
+            max_series (int, optional): The maximum number of label combinations.
+        """
+        super().__init__(name, documentation, labelnames, max_series=max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        """
+        Record an observation without labels.
+
+        Args:
+            value (float): The observed value.
+        """
+        self.labels().observe(value)
+
+    def collect(self) -> List[str]:
+        """
+        Render the histogram's bucket, sum and count samples.
+
+        Returns:
+            List[str]: The sample lines in the Prometheus text format.
+        """
+        names = self.labelnames + ("le",)
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series.counts):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the process and renders them for scraping.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty MetricsRegistry.
+        """
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric to the registry.
+
+        Registering a metric under a name that is already taken returns the
+        metric registered first, so modules can be imported more than once.
+
+        Args:
+            metric (Metric): The metric to add.
+
+        Returns:
+            Metric: The registered metric.
+        """
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self, name: str, documentation: str, labelnames=(), **kwargs
+    ) -> Counter:
+        """
+        Create and register a Counter. See Metric for the arguments.
+        """
+        return self.register(Counter(name, documentation, labelnames, **kwargs))
+
+    def gauge(self, name: str, documentation: str, labelnames=(), **kwargs) -> Gauge:
+        """
+        Create and register a Gauge. See Metric for the arguments.
+        """
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), **kwargs
+    ) -> Histogram:
+        """
+        Create and register a Histogram. See Histogram for the arguments.
+        """
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def get(self, name: str) -> Optional[Metric]:
+        """
+        Get a registered metric by name.
+
+        Args:
+            name (str): The name of the metric.
+
+        Returns:
+            Optional[Metric]: The metric, or None if no metric has that name.
+        """
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# Create a global registry instance
+metrics = MetricsRegistry()
+
+WS_EVENTS = metrics.counter(
+    "datadivr_ws_events_total", "WebSocket events received, by event.", ["event"]
+)
+WS_EVENT_ERRORS = metrics.counter(
+    "datadivr_ws_event_errors_total",
+    "WebSocket event handlers that raised an exception, by event.",
+    ["event"],
+)
+WS_EVENT_DURATION = metrics.histogram(
+    "datadivr_ws_event_duration_seconds",
+    "Time spent in WebSocket event handlers, by event.",
+    ["event"],
+)
+WS_RECEIVED_FRAMES = metrics.counter(
+    "datadivr_ws_received_frames_total", "WebSocket frames received."
+)
+WS_RECEIVED_BYTES = metrics.counter(
+    "datadivr_ws_received_bytes_total",
+    "Bytes of the WebSocket frames received, text frames UTF-8 encoded.",
+)
+WS_SENT_FRAMES = metrics.counter(
+    "datadivr_ws_sent_frames_total", "WebSocket frames sent."
+)
+WS_SENT_BYTES = metrics.counter(
+    "datadivr_ws_sent_bytes_total",
+    "Bytes of the WebSocket frames sent, text frames UTF-8 encoded.",
+)
+WS_BROADCAST_RECIPIENTS = metrics.histogram(
+    "datadivr_ws_broadcast_recipients",
+    "Number of local clients a broadcast was queued for.",
+    buckets=FANOUT_BUCKETS,
+)
+WS_BROADCAST_DURATION = metrics.histogram(
+    "datadivr_ws_broadcast_duration_seconds",
+    "Time spent queueing a broadcast for its local recipients.",
+)
+WS_OUTBOUND_DROPPED = metrics.counter(
+    "datadivr_ws_outbound_dropped_total",
+    "Frames dropped from outbound queues because a client fell behind or disconnected.",
+)
+WS_OUTBOUND_COALESCED = metrics.counter(
+    "datadivr_ws_outbound_coalesced_total",
+    "Frames that replaced a pending frame of the same event in a full outbound queue.",
+)
+WS_SEND_FAILURES = metrics.counter(
+    "datadivr_ws_send_failures_total",
+    "Frames that could not be sent because the client timed out or the connection failed.",
+)
+WS_TICK_UPDATES = metrics.counter(
+    "datadivr_ws_tick_updates_total",
+    "Updates of batched events collected for the tick broadcaster.",
+)
+WS_TICK_COALESCED = metrics.counter(
+    "datadivr_ws_tick_coalesced_total",
+    "Batched updates replaced by a newer update of the same sender within a tick.",
+)
+WS_TICK_BATCH_SIZE = metrics.histogram(
+    "datadivr_ws_tick_batch_updates",
+    "Number of updates in a batch sent by the tick broadcaster.",
+    buckets=FANOUT_BUCKETS,
+)
+WS_THROTTLED = metrics.counter(
+    "datadivr_ws_throttled_events_total",
+    "Events that exceeded a client's rate limit, by event and action taken.",
+    ["event", "action"],
+)
+
+metrics.gauge(
+    "datadivr_log_queue_records",
+    "Log records waiting for the background writer.",
+    function=lambda: get_log_stats()["queued"],
+)
+metrics.counter(
+    "datadivr_log_dropped_records_total",
+    "Log records dropped because the log queue was full.",
+    function=lambda: get_log_stats()["dropped"],
+)
@@ -0,0 +1,33 @@
+"""
+Project data utilities initialization for the DataDiVR-Backend.
+
+This module imports and exposes the ProjectStore instance, the columnar
+ProjectData class, the project loaders, the binary project file functions, the
+spatial index and the view streamer for use throughout the application.
+"""
+
+from .binary import open_project, write_project
+from .loaders import from_records, load_records
+from .project import FILTER_OPS, ProjectData
+from .spatial import UniformGrid, frustum_planes
+from .store import ProjectStore, project_store
+from .view import ViewState, ViewStreamer, view_streamer
+from .wire import to_wire
+
+# Specify which symbols should be accessible when using "from utils.project_data import *"
+__all__ = [
+    "FILTER_OPS",
+    "ProjectData",
+    "ProjectStore",
+    "UniformGrid",
+    "ViewState",
+    "ViewStreamer",
+    "frustum_planes",
+    "from_records",
+    "load_records",
+    "open_project",
+    "project_store",
+    "to_wire",
+    "view_streamer",
+    "write_project",
+]
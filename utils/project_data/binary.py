@@ -0,0 +1,205 @@
+"""
+Binary project file module for the DataDiVR-Backend.
+
+This module reads and writes projects in a binary file format that is opened
+with mmap instead of being parsed. A file starts with the magic bytes and the
+length of a JSON header that lists every column with its type, shape and
+offset, followed by the raw column blocks, each aligned to 64 bytes:
+
+    b"DDVRPRJ1" | uint32 header length | JSON header | padding | column blocks
+
+Opening a file only reads the header. The columns are NumPy views of the
+mapped file, so the operating system reads just the pages a query touches,
+and all worker processes share the same pages in the page cache.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .project import ProjectData
+
+MAGIC = b"DDVRPRJ1"
+FORMAT_VERSION = 1
+# File name of the binary file in a project directory
+PROJECT_FILE = "project.ddvr"
+# Alignment of column blocks in bytes, a cache line and enough for any SIMD load
+ALIGNMENT = 64
+
+_PREFIX = struct.Struct("<8sI")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _blocks(project: ProjectData) -> Iterator[Tuple[str, str, np.ndarray]]:
+    """
+    Iterate over the columns of a project as (section, name, array).
+    """
+    yield "nodes", "id", project.node_ids
+    yield "nodes", "positions", project.positions
+    yield "nodes", "colors", project.colors
+    for name, column in project.attributes.items():
+        yield "node_attributes", name, column
+    yield "links", "links", project.links
+    for name, column in project.link_attributes.items():
+        yield "link_attributes", name, column
+
+
+def write_project(project: ProjectData, path: str):
+    """
+    Write a project to a binary file.
+
+    The file is written next to the target and then renamed, so workers that
+    have the previous version mapped keep reading a consistent file.
+
+    Args:
+        project (ProjectData): The project.
+        path (str): The path of the file.
+
+    Raises:
+        ValueError: If a column holds Python objects, which cannot be stored.
+    """
+    columns: List[Dict[str, Any]] = []
+    arrays: List[np.ndarray] = []
+    for section, name, column in _blocks(project):
+        if column.dtype.hasobject:
+            raise ValueError(f"Column {name!r} holds Python objects")
+        # store little-endian, so files can be moved between machines
+        column = np.ascontiguousarray(column, column.dtype.newbyteorder("<"))
+        columns.append(
+            {
+                "section": section,
+                "name": name,
+                "dtype": column.dtype.str,
+                "shape": list(column.shape),
+                "nbytes": column.nbytes,
+            }
+        )
+        arrays.append(column)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "name": project.name,
+        "nodes": project.node_count,
+        "links": project.link_count,
+        "columns": columns,
+    }
+    # the offsets depend on the header size, which depends on the offsets' digits
+    for column in columns:
+        column["offset"] = 0
+    while True:
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        offset = _aligned(_PREFIX.size + len(encoded))
+        changed = False
+        for column in columns:
+            if column["offset"] != offset:
+                column["offset"], changed = offset, True
+            offset = _aligned(offset + column["nbytes"])
+        if not changed:
+            break
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as file:
+            file.write(_PREFIX.pack(MAGIC, len(encoded)))
+            file.write(encoded)
+            for column, array in zip(columns, arrays):
+                _pad(file, column["offset"])
+                file.write(array.tobytes())
+            _pad(file, _aligned(file.tell()))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _pad(file: BinaryIO, offset: int):
+    """
+    Write zero bytes up to an offset.
+    """
+    file.write(b"\0" * (offset - file.tell()))
+
+
+def read_header(buffer: Any) -> Dict[str, Any]:
+    """
+    Read the header of a binary project file.
+
+    Args:
+        buffer (Any): The mapped file, or any buffer holding its start.
+
+    Returns:
+        Dict[str, Any]: The header, listing the columns.
+
+    Raises:
+        ValueError: If the buffer does not hold a supported project file.
+    """
+    if len(buffer) < _PREFIX.size:
+        raise ValueError("Not a DataDiVR project file")
+    magic, length = _PREFIX.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("Not a DataDiVR project file")
+    start, end = _PREFIX.size, _PREFIX.size + length
+    header = json.loads(bytes(buffer[start:end]))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported project file version: {header.get('version')}")
+    return header
+
+
+def open_project(path: str, name: Optional[str] = None) -> ProjectData:
+    """
+    Open a binary project file without reading its columns.
+
+    The columns are read-only views of the mapped file; the mapping is closed
+    once no column refers to it anymore. Links are not checked against the
+    number of nodes, which would read the whole link list.
+
+    Args:
+        path (str): The path of the file.
+        name (Optional[str], optional): The name of the project. Defaults to the
+                                        name stored in the file.
+
+    Returns:
+        ProjectData: The project.
+
+    Raises:
+        ValueError: If the file is not a valid project file.
+    """
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    header = read_header(mapped)
+
+    sections: Dict[str, Dict[str, np.ndarray]] = {
+        "nodes": {},
+        "node_attributes": {},
+        "links": {},
+        "link_attributes": {},
+    }
+    try:
+        for column in header["columns"]:
+            dtype = np.dtype(column["dtype"])
+            shape = tuple(column["shape"])
+            count = int(np.prod(shape, dtype=np.int64))
+            if column["offset"] + count * dtype.itemsize > len(mapped):
+                raise ValueError(f"Column {column['name']!r} exceeds the file")
+            array = np.frombuffer(mapped, dtype, count, column["offset"])
+            sections[column["section"]][column["name"]] = array.reshape(shape)
+
+        nodes = sections["nodes"]
+        return ProjectData(
+            name or header["name"],
+            nodes["id"],
+            nodes["positions"],
+            nodes["colors"],
+            attributes=sections["node_attributes"],
+            links=sections["links"]["links"],
+            link_attributes=sections["link_attributes"],
+            check_links=False,
+        )
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid project file {path}: {e!r}") from None
@@ -0,0 +1,66 @@
+"""
+Project converter for the DataDiVR-Backend.
+
+Converts the JSON or CSV node and link lists of a project into the binary
+project format, which the server maps into memory instead of parsing:
+
+    python -m utils.project_data.convert project_files/projects/<project>
+
+By default the binary file is written into the project directory, where the
+server picks it up the next time the project is loaded.
+"""
+
+import argparse
+import os
+import time
+from typing import Optional
+
+from .binary import PROJECT_FILE, write_project
+from .loaders import load_records
+
+
+def convert(
+    directory: str, output: Optional[str] = None, name: Optional[str] = None
+) -> str:
+    """
+    Convert the node and link files of a project directory to a binary project file.
+
+    Args:
+        directory (str): The project directory with a nodes.json or nodes.csv file.
+        output (Optional[str], optional): The path of the binary file. Defaults to
+                                          project.ddvr in the project directory.
+        name (Optional[str], optional): The name of the project. Defaults to the directory name.
+
+    Returns:
+        str: The path of the binary file.
+    """
+    project = load_records(directory, name)
+    output = output or os.path.join(directory, PROJECT_FILE)
+    write_project(project, output)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "directory", help="project directory with the node and link files"
+    )
+    parser.add_argument(
+        "--output",
+        help=f"path of the binary file (default: {PROJECT_FILE} in the directory)",
+    )
+    parser.add_argument(
+        "--name", help="name of the project (default: the directory name)"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    output = convert(args.directory, args.output, args.name)
+    print(
+        f"Wrote {output} ({os.path.getsize(output)} bytes) "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Force-directed layout module for the DataDiVR-Backend.
+
+This module provides a vectorized Fruchterman-Reingold layout over the columns
+of a project. Linked nodes attract each other; all nodes repel each other.
+Repulsion is approximated on a grid: the number of nodes per cell is convolved
+with the force between cells by FFT, so an iteration costs about
+nodes + cells * log(cells) instead of nodes x nodes operations.
+
+The state of a layout is a LayoutState, which layout_iterations() advances by a
+number of iterations. It is plain data, so the iterations can run in a worker
+process, and it can be kept to resume the layout later instead of starting
+over.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Maximum number of grid cells repulsion is approximated with
+DEFAULT_MAX_CELLS = 32768
+# Average number of nodes per grid cell for small layouts
+NODES_PER_CELL = 4
+# The temperature is the maximum distance a node moves in one iteration,
+# as fractions of the layout size
+START_TEMPERATURE = 0.1
+MIN_TEMPERATURE = 0.001
+COOLING = 0.97
+
+
+@dataclass
+class LayoutState:
+    """
+    The state of a force-directed layout.
+
+    Attributes:
+        positions (np.ndarray): The current node positions, float64 of shape (nodes, 3).
+        size (float): The edge length of the cube the layout spreads over.
+        temperature (float): The maximum distance a node moves in the next iteration.
+        iteration (int): The number of iterations run so far.
+        dimensions (int): 3, or 2 for layouts in the x-y plane.
+    """
+
+    positions: np.ndarray
+    size: float
+    temperature: float
+    iteration: int = 0
+    dimensions: int = 3
+
+    @property
+    def converged(self) -> bool:
+        """
+        bool: Whether the layout has cooled down, so further iterations hardly move nodes.
+        """
+        return self.temperature <= MIN_TEMPERATURE * self.size
+
+    @property
+    def k(self) -> float:
+        """
+        float: The ideal distance between linked nodes.
+        """
+        count = max(len(self.positions), 1)
+        return self.size / count ** (1 / self.dimensions)
+
+
+def start_layout(
+    positions: np.ndarray,
+    restart: bool = False,
+    dimensions: int = 3,
+    seed: Optional[int] = None,
+) -> LayoutState:
+    """
+    Start a layout from the current node positions, or from random ones.
+
+    Args:
+        positions (np.ndarray): The current node positions, of shape (nodes, 3).
+        restart (bool, optional): Start from random positions. Defaults to False.
+        dimensions (int, optional): 3, or 2 to lay the nodes out in the x-y plane.
+                                    Defaults to 3.
+        seed (Optional[int], optional): The seed of the random positions.
+
+    Returns:
+        LayoutState: The state before the first iteration.
+
+    Raises:
+        ValueError: If dimensions is not 2 or 3.
+    """
+    if dimensions not in (2, 3):
+        raise ValueError("A layout has 2 or 3 dimensions")
+    positions = np.array(positions, dtype=np.float64).reshape(-1, 3)
+    size = float(np.ptp(positions, axis=0).max()) if len(positions) else 0.0
+    if restart or size == 0:
+        size = size or 1.0
+        rng = np.random.default_rng(seed)
+        positions = rng.random(positions.shape) * size
+    if dimensions == 2:
+        positions[:, 2] = 0
+    return LayoutState(positions, size, START_TEMPERATURE * size, 0, dimensions)
+
+
+def layout_iterations(
+    state: LayoutState,
+    links: np.ndarray,
+    iterations: int,
+    max_cells: int = DEFAULT_MAX_CELLS,
+) -> LayoutState:
+    """
+    Advance a layout by a number of iterations, or until it converged.
+
+    This is CPU-bound; run it in the process pool of the job manager.
+
+    Args:
+        state (LayoutState): The state to start from; it is not changed.
+        links (np.ndarray): The source and target node index of each link.
+        iterations (int): The number of iterations.
+        max_cells (int, optional): The maximum number of grid cells. Defaults to 32768.
+
+    Returns:
+        LayoutState: The state after the iterations.
+    """
+    positions = np.array(state.positions, dtype=np.float64)
+    links = np.asarray(links, dtype=np.int64).reshape(-1, 2)
+    k = state.k
+    temperature, iteration = state.temperature, state.iteration
+    minimum = MIN_TEMPERATURE * state.size
+    # pulls all nodes towards the center, so the layout keeps its size
+    gravity = k * k * len(positions) / state.size**3
+
+    for _ in range(iterations):
+        if temperature <= minimum or not len(positions):
+            break
+        force = _repulsion(positions, k, max_cells)
+        force += _attraction(positions, links, k)
+        force -= gravity * (positions - positions.mean(axis=0))
+        if state.dimensions == 2:
+            force[:, 2] = 0
+
+        length = np.linalg.norm(force, axis=1, keepdims=True)
+        positions += force * (
+            np.minimum(length, temperature) / np.maximum(length, 1e-12)
+        )
+        temperature = max(temperature * COOLING, minimum)
+        iteration += 1
+
+    return LayoutState(positions, state.size, temperature, iteration, state.dimensions)
+
+
+def _repulsion(positions: np.ndarray, k: float, max_cells: int) -> np.ndarray:
+    """
+    Approximate the repulsive forces, k^2 / distance, on a grid.
+
+    The node counts of the cells are convolved with the force between two cells
+    by FFT, which gives the force of all other cells on each cell. Nodes in the
+    same cell are additionally pushed away from the centroid of their cell.
+    """
+    count = len(positions)
+    low = positions.min(axis=0)
+    extent = positions.max(axis=0) - low
+    spread = extent > max(extent.max(), 1e-12) * 1e-6
+    cells = min(max(count // NODES_PER_CELL, 1), max_cells)
+    per_axis = max(int(round(cells ** (1 / max(int(spread.sum()), 1)))), 1)
+    shape = tuple(per_axis if axis else 1 for axis in spread)
+    cell_size = np.where(spread, extent / per_axis, 1.0)
+
+    coordinates = np.floor((positions - low) / cell_size).astype(np.int64)
+    coordinates = np.clip(coordinates, 0, np.array(shape) - 1)
+    cell_of = np.ravel_multi_index(coordinates.T, shape)
+    counts = np.bincount(cell_of, minlength=int(np.prod(shape))).astype(np.float64)
+    # softening keeps the force between close nodes finite
+    softening = float((cell_size[spread] ** 2).sum() / 4) if spread.any() else k * k
+
+    # the force between cells offset by -(n - 1) ... n - 1 cells along each axis
+    padded = tuple(2 * n for n in shape)
+    offsets = np.meshgrid(
+        *[
+            np.fft.fftfreq(2 * n, 1 / (2 * n)) * size
+            for n, size in zip(shape, cell_size)
+        ],
+        indexing="ij",
+    )
+    distance2 = sum(offset * offset for offset in offsets) + softening
+    spectrum = np.fft.rfftn(counts.reshape(shape), padded)
+    inside = tuple(slice(0, n) for n in shape)
+    force = np.empty_like(positions)
+    for axis in range(3):
+        if not spread[axis]:
+            force[:, axis] = 0
+            continue
+        kernel = np.fft.rfftn(offsets[axis] / distance2, padded)
+        field = np.fft.irfftn(spectrum * kernel, padded)[inside]
+        force[:, axis] = field.ravel()[cell_of]
+
+    # within a cell, push nodes away from the cell's centroid
+    centroids = np.column_stack(
+        [np.bincount(cell_of, positions[:, axis], len(counts)) for axis in range(3)]
+    )
+    centroids /= np.maximum(counts, 1)[:, None]
+    delta = positions - centroids[cell_of]
+    weight = counts[cell_of] / (np.einsum("ij,ij->i", delta, delta) + softening)
+    force += delta * weight[:, None]
+    return force * (k * k)
+
+
+def _attraction(positions: np.ndarray, links: np.ndarray, k: float) -> np.ndarray:
+    """
+    Compute the attractive forces along links, distance^2 / k.
+    """
+    force = np.zeros_like(positions)
+    if not len(links):
+        return force
+    sources, targets = links[:, 0], links[:, 1]
+    delta = positions[targets] - positions[sources]
+    pull = delta * (np.linalg.norm(delta, axis=1, keepdims=True) / k)
+    count = len(positions)
+    for axis in range(3):
+        force[:, axis] += np.bincount(sources, pull[:, axis], count)
+        force[:, axis] -= np.bincount(targets, pull[:, axis], count)
+    return force
+
+
+def moved_nodes(
+    before: np.ndarray, after: np.ndarray, tolerance: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the nodes that moved further than a tolerance.
+
+    Args:
+        before (np.ndarray): The previous positions.
+        after (np.ndarray): The new positions.
+        tolerance (float): The distance below which moves are ignored.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The indices and new positions of the moved nodes.
+    """
+    distance = np.linalg.norm(after - before, axis=1)
+    moved = np.flatnonzero(distance > tolerance)
+    return moved, after[moved]
@@ -0,0 +1,290 @@
+"""
+Project loading module for the DataDiVR-Backend.
+
+This module reads node and link lists from JSON and CSV files and converts
+them into the columns of a ProjectData. Each field of the records becomes one
+NumPy array: 'id', the position ('x', 'y', 'z' or 'pos') and the color ('color'
+as "#rrggbb[aa]" or a list, or 'r', 'g', 'b', 'a') are recognized, all other
+fields become attributes.
+"""
+
+import csv
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ..custom_logging import logger
+from .project import COLOR_COLUMNS, POSITION_COLUMNS, ProjectData
+
+NODE_FILES = ("nodes.json", "nodes.csv")
+LINK_FILES = ("links.json", "links.csv")
+
+
+def parse_column(values: Sequence[Any], from_text: bool = False) -> np.ndarray:
+    """
+    Convert the values of one field into a NumPy array of the narrowest fitting type.
+
+    Args:
+        values (Sequence[Any]): The values, None where a record lacks the field.
+        from_text (bool, optional): Whether the values were read as text, as
+            from CSV, and numbers should be parsed. Defaults to False.
+
+    Returns:
+        np.ndarray: An int64, float64 (NaN for missing numbers), bool or string array.
+    """
+    if from_text:
+        text = np.asarray(["" if v is None else v for v in values], dtype=str)
+        try:
+            return text.astype(np.int64)
+        except ValueError:
+            pass
+        try:
+            return np.where(text == "", "nan", text).astype(np.float64)
+        except ValueError:
+            return text
+
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, bool) for v in present):
+        return np.asarray([bool(v) for v in values])
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        if len(present) == len(values) and all(isinstance(v, int) for v in present):
+            return np.asarray(values, dtype=np.int64)
+        return np.asarray([np.nan if v is None else v for v in values], np.float64)
+    return np.asarray(["" if v is None else str(v) for v in values], dtype=str)
+
+
+def parse_ids(values: Sequence[Any], by_position: bool = False) -> np.ndarray:
+    """
+    Convert node IDs or link endpoints to strings, as they were written.
+
+    IDs are never parsed as numbers, so "007" stays "007"; JSON numbers become
+    their shortest text, e.g. 7 and 7.0 both become "7".
+
+    Args:
+        values (Sequence[Any]): The IDs, None or "" where a record lacks one.
+        by_position (bool, optional): Whether missing IDs are replaced by the
+            position of the record. Defaults to False, leaving them empty.
+
+    Returns:
+        np.ndarray: The IDs as a string array.
+    """
+    ids = []
+    for row, value in enumerate(values):
+        if value is None or value == "":
+            ids.append(str(row) if by_position else "")
+        elif isinstance(value, float) and value.is_integer():
+            ids.append(str(int(value)))
+        else:
+            ids.append(str(value))
+    return np.asarray(ids, dtype=str)
+
+
+def parse_colors(values: Sequence[Any]) -> np.ndarray:
+    """
+    Convert colors given as hex strings or lists of 0-255 channels to RGBA.
+
+    Args:
+        values (Sequence[Any]): "#rrggbb", "#rrggbbaa", [r, g, b] or [r, g, b, a]
+                                per node; None for white.
+
+    Returns:
+        np.ndarray: uint8 array of shape (nodes, 4).
+
+    Raises:
+        ValueError: If a color cannot be parsed.
+    """
+    colors = np.full((len(values), 4), 255, dtype=np.uint8)
+    hex_rows, hex_values = [], []
+    for row, value in enumerate(values):
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            digits = value.lstrip("#")
+            if len(digits) not in (6, 8):
+                raise ValueError(f"Invalid color: {value!r}")
+            hex_rows.append(row)
+            hex_values.append(digits if len(digits) == 8 else digits + "ff")
+        else:
+            channels = list(value)[:4]
+            colors[row, : len(channels)] = channels
+    if hex_rows:
+        # decode all hex colors at once instead of one by one
+        decoded = np.frombuffer(bytes.fromhex("".join(hex_values)), dtype=np.uint8)
+        colors[hex_rows] = decoded.reshape(-1, 4)
+    return colors
+
+
+def _columns(
+    records: Sequence[Dict[str, Any]], from_text: bool, raw: Sequence[str] = ()
+) -> Dict[str, Any]:
+    """
+    Split records into one array per field, or one list for the fields in raw.
+    """
+    keys: Dict[str, None] = {}
+    for record in records:
+        keys.update(dict.fromkeys(record))
+    return {
+        key: (
+            [record.get(key) for record in records]
+            if key in raw
+            else parse_column([record.get(key) for record in records], from_text)
+        )
+        for key in keys
+    }
+
+
+def from_records(
+    name: str,
+    nodes: Sequence[Dict[str, Any]],
+    links: Sequence[Dict[str, Any]] = (),
+    from_text: bool = False,
+    links_from_text: Optional[bool] = None,
+) -> ProjectData:
+    """
+    Build a ProjectData from node and link records.
+
+    Links need a 'source' and a 'target' node ID; links to unknown nodes are
+    skipped with a warning. IDs are compared as text (see parse_ids). Nodes
+    without an 'id' are identified by their position in the list.
+
+    Args:
+        name (str): The name of the project.
+        nodes (Sequence[Dict[str, Any]]): One dict per node.
+        links (Sequence[Dict[str, Any]], optional): One dict per link.
+        from_text (bool, optional): Whether the node values were read as text and
+            numbers should be parsed. Defaults to False.
+        links_from_text (Optional[bool], optional): Whether the link values were
+            read as text. Defaults to from_text.
+
+    Returns:
+        ProjectData: The project.
+
+    Raises:
+        ValueError: If a position or color cannot be parsed.
+    """
+    columns = _columns(nodes, from_text, raw=("id", "pos", "position", "color"))
+    count = len(nodes)
+    node_ids = parse_ids(columns.pop("id", [None] * count), by_position=True)
+
+    positions = np.zeros((count, 3), dtype=np.float32)
+    for key in ("pos", "position"):
+        if key in columns:
+            values = [(0.0, 0.0, 0.0) if v is None else v for v in columns.pop(key)]
+            positions[:] = np.asarray(values, dtype=np.float32).reshape(count, 3)
+    for axis, key in enumerate(POSITION_COLUMNS):
+        if key in columns:
+            values = columns.pop(key).astype(np.float32)
+            present = ~np.isnan(values)
+            positions[present, axis] = values[present]
+
+    colors = parse_colors(columns.pop("color", [None] * count))
+    for channel, key in enumerate(COLOR_COLUMNS):
+        if key in columns:
+            colors[:, channel] = columns.pop(key)
+
+    if links_from_text is None:
+        links_from_text = from_text
+    link_columns = _columns(links, links_from_text, raw=("source", "target"))
+    if links and ("source" not in link_columns or "target" not in link_columns):
+        raise ValueError("Links require a 'source' and a 'target'")
+    pairs = np.empty((0, 2), dtype=np.int32)
+    if links:
+        lookup = ProjectData(name, node_ids)
+        source = lookup.index_of(parse_ids(link_columns.pop("source")))
+        target = lookup.index_of(parse_ids(link_columns.pop("target")))
+        valid = (source >= 0) & (target >= 0)
+        if not valid.all():
+            logger.warning(
+                "Skipped %d links to unknown nodes in project %s",
+                int((~valid).sum()),
+                name,
+            )
+        pairs = np.stack([source[valid], target[valid]], axis=1)
+        link_columns = {key: v[valid] for key, v in link_columns.items()}
+    return ProjectData(
+        name,
+        node_ids,
+        positions,
+        colors,
+        attributes=columns,
+        links=pairs,
+        link_attributes=link_columns,
+    )
+
+
+def read_records(path: str, key: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Read records from a JSON or CSV file.
+
+    Args:
+        path (str): The file; JSON files contain a list of objects, or an object
+                    with the list under the given key.
+        key (Optional[str], optional): The key of the list in JSON objects, e.g. "nodes".
+
+    Returns:
+        List[Dict[str, Any]]: The records.
+
+    Raises:
+        ValueError: If the file does not contain a list of records.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as file:
+            return list(csv.DictReader(file))
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    if isinstance(data, dict) and key is not None:
+        data = data.get(key)
+    if not isinstance(data, list):
+        raise ValueError(f"{path} does not contain a list of records")
+    return data
+
+
+def find_file(directory: str, names: Iterable[str]) -> Optional[str]:
+    """
+    Find the first of several files that exists in a directory.
+
+    Args:
+        directory (str): The directory.
+        names (Iterable[str]): The file names, in order of preference.
+
+    Returns:
+        Optional[str]: The path of the file, or None if none exists.
+    """
+    for file_name in names:
+        path = os.path.join(directory, file_name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_records(directory: str, name: Optional[str] = None) -> ProjectData:
+    """
+    Load a project from the nodes.json or nodes.csv and the optional links.json
+    or links.csv file in a directory.
+
+    Args:
+        directory (str): The project directory.
+        name (Optional[str], optional): The name of the project. Defaults to the
+                                        directory name.
+
+    Returns:
+        ProjectData: The project.
+
+    Raises:
+        FileNotFoundError: If the directory has no node file.
+    """
+    nodes_path = find_file(directory, NODE_FILES)
+    if nodes_path is None:
+        raise FileNotFoundError(f"No node file in {directory}")
+    links_path = find_file(directory, LINK_FILES)
+    nodes = read_records(nodes_path, "nodes")
+    links = read_records(links_path, "links") if links_path else []
+    return from_records(
+        name or os.path.basename(os.path.normpath(directory)),
+        nodes,
+        links,
+        from_text=nodes_path.endswith(".csv"),
+        links_from_text=bool(links_path) and links_path.endswith(".csv"),
+    )
@@ -0,0 +1,376 @@
+"""
+Project data module for the DataDiVR-Backend.
+
+This module provides the ProjectData class, which holds the nodes and links of
+a network in contiguous NumPy arrays, one array per column: node IDs, positions,
+colors and attributes, and the link list as pairs of node indices. Filters and
+selections are evaluated on whole columns at once, so they take milliseconds
+even for projects with millions of nodes.
+"""
+
+import itertools
+from typing import Any, Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from .spatial import UniformGrid
+
+# Columns derived from the positions, colors and links of the nodes
+POSITION_COLUMNS = ("x", "y", "z")
+COLOR_COLUMNS = ("r", "g", "b", "a")
+DERIVED_COLUMNS = ("index", "id", "degree") + POSITION_COLUMNS + COLOR_COLUMNS
+FILTER_OPS = ("eq", "ne", "lt", "le", "gt", "ge", "in", "between", "contains")
+
+Selection = Union[np.ndarray, Sequence[int], None]
+
+# Revisions are unique across projects, so a reloaded project never reuses one
+_revisions = itertools.count(1)
+
+
+def _compare(column: np.ndarray, op: str, value: Any) -> np.ndarray:
+    """
+    Compare a column with a value.
+    """
+    if op == "eq":
+        return column == value
+    if op == "ne":
+        return column != value
+    if op == "lt":
+        return column < value
+    if op == "le":
+        return column <= value
+    if op == "gt":
+        return column > value
+    if op == "ge":
+        return column >= value
+    if op == "in":
+        return np.isin(column, np.asarray(list(value)))
+    if op == "between":
+        low, high = value
+        return (column >= low) & (column <= high)
+    if op == "contains":
+        return np.char.find(column.astype(str), str(value)) >= 0
+    raise ValueError(f"Unknown filter operator: {op!r}")
+
+
+class ProjectData:
+    """
+    The nodes and links of a project, stored column by column.
+
+    Attributes:
+        name (str): The name of the project.
+        node_ids (np.ndarray): The IDs of the nodes, as strings.
+        positions (np.ndarray): The node positions, float32 of shape (nodes, 3).
+        colors (np.ndarray): The node colors as RGBA, uint8 of shape (nodes, 4).
+        attributes (Dict[str, np.ndarray]): Further node columns, one value per node.
+        links (np.ndarray): The source and target node index of each link, int32
+                            of shape (links, 2).
+        link_attributes (Dict[str, np.ndarray]): Further link columns, one value per link.
+        revision (int): Changes whenever the data changes, so cached query results
+                        can be keyed on it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        node_ids: Iterable[Any],
+        positions: Optional[np.ndarray] = None,
+        colors: Optional[np.ndarray] = None,
+        attributes: Optional[Dict[str, np.ndarray]] = None,
+        links: Optional[np.ndarray] = None,
+        link_attributes: Optional[Dict[str, np.ndarray]] = None,
+        check_links: bool = True,
+    ):
+        """
+        Initialize the ProjectData from columns.
+
+        Args:
+            name (str): The name of the project.
+            node_ids (Iterable[Any]): The IDs of the nodes.
+            positions (Optional[np.ndarray], optional): The node positions. Defaults to the origin.
+            colors (Optional[np.ndarray], optional): The RGBA node colors. Defaults to white.
+            attributes (Optional[Dict[str, np.ndarray]], optional): Further node columns.
+            links (Optional[np.ndarray], optional): Pairs of node indices. Defaults to no links.
+            link_attributes (Optional[Dict[str, np.ndarray]], optional): Further link columns.
+            check_links (bool, optional): Check that all links refer to existing nodes,
+                which reads the whole link list. Defaults to True.
+
+        Raises:
+            ValueError: If a column does not have one value per node or link, or a
+                        link refers to a node that does not exist.
+        """
+        self.name = name
+        self.revision = next(_revisions)
+        self.node_ids = np.asarray(node_ids)
+        if self.node_ids.dtype.kind != "U":
+            self.node_ids = self.node_ids.astype(str)
+        count = len(self.node_ids)
+
+        if positions is None:
+            positions = np.zeros((count, 3), dtype=np.float32)
+        self.positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        if colors is None:
+            colors = np.full((count, 4), 255, dtype=np.uint8)
+        self.colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 4)
+        if links is None:
+            links = np.empty((0, 2), dtype=np.int32)
+        self.links = np.asarray(links, dtype=np.int32).reshape(-1, 2)
+        self.attributes = {key: np.asarray(v) for key, v in (attributes or {}).items()}
+        self.link_attributes = {
+            key: np.asarray(v) for key, v in (link_attributes or {}).items()
+        }
+
+        for label, column in [("positions", self.positions), ("colors", self.colors)]:
+            if len(column) != count:
+                raise ValueError(f"Expected {count} {label}, got {len(column)}")
+        for key, column in self.attributes.items():
+            if key in DERIVED_COLUMNS:
+                raise ValueError(f"Node attribute name {key!r} is reserved")
+            if len(column) != count:
+                raise ValueError(f"Node attribute {key!r} has {len(column)} values")
+        for key, column in self.link_attributes.items():
+            if len(column) != len(self.links):
+                raise ValueError(f"Link attribute {key!r} has {len(column)} values")
+        if (
+            check_links
+            and len(self.links)
+            and (self.links.min() < 0 or self.links.max() >= count)
+        ):
+            raise ValueError("Links refer to nodes that do not exist")
+
+        self._degree: Optional[np.ndarray] = None
+        self._id_order: Optional[np.ndarray] = None
+        self._sorted_ids: Optional[np.ndarray] = None
+        self._spatial_index: Optional[UniformGrid] = None
+
+    @property
+    def node_count(self) -> int:
+        """
+        int: The number of nodes.
+        """
+        return len(self.node_ids)
+
+    @property
+    def link_count(self) -> int:
+        """
+        int: The number of links.
+        """
+        return len(self.links)
+
+    @property
+    def degree(self) -> np.ndarray:
+        """
+        np.ndarray: The number of links of each node, computed on first use.
+        """
+        if self._degree is None:
+            self._degree = np.bincount(
+                self.links.ravel(), minlength=self.node_count
+            ).astype(np.int32)
+        return self._degree
+
+    def spatial_index(self, build: bool = True) -> Optional[UniformGrid]:
+        """
+        Get the spatial index of the node positions, building it on first use.
+
+        Building the index of a large project takes a moment, so callers on the
+        event loop build it in a thread, e.g. with
+        job_manager.run_in_executor("thread", project.spatial_index).
+
+        Args:
+            build (bool, optional): Build the index if it does not exist yet. Defaults to True.
+
+        Returns:
+            Optional[UniformGrid]: The index, or None if it was not built and build is False.
+        """
+        if self._spatial_index is None and build:
+            self._spatial_index = UniformGrid(self.positions)
+        return self._spatial_index
+
+    def set_positions(self, positions: np.ndarray, reindex: bool = True):
+        """
+        Replace the node positions, e.g. with those of a new layout.
+
+        The new positions are copied, so the positions of a memory-mapped
+        project are never written to its file.
+
+        Args:
+            positions (np.ndarray): The new positions, of shape (nodes, 3).
+            reindex (bool, optional): Drop the spatial index, so it is rebuilt for
+                the new positions on next use. Layouts that are still moving the
+                nodes keep the old index. Defaults to True.
+
+        Raises:
+            ValueError: If there is not one position per node.
+        """
+        positions = np.array(positions, dtype=np.float32).reshape(-1, 3)
+        if len(positions) != self.node_count:
+            raise ValueError(
+                f"Expected {self.node_count} positions, got {len(positions)}"
+            )
+        self.positions = positions
+        self.revision = next(_revisions)
+        if reindex:
+            self._spatial_index = None
+
+    def columns(self) -> Dict[str, str]:
+        """
+        Get the names and types of the node columns that can be filtered and selected.
+
+        Returns:
+            Dict[str, str]: Maps column names to their NumPy dtype names.
+        """
+        names = list(DERIVED_COLUMNS) + list(self.attributes)
+        return {name: self.column(name).dtype.name for name in names}
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get a node column.
+
+        Besides the attributes, the columns 'index', 'id', 'degree', 'x', 'y',
+        'z', 'r', 'g', 'b' and 'a' are available. Position and color columns are
+        views, not copies.
+
+        Args:
+            name (str): The name of the column.
+
+        Returns:
+            np.ndarray: One value per node.
+
+        Raises:
+            KeyError: If the project has no such column.
+        """
+        if name in self.attributes:
+            return self.attributes[name]
+        if name in POSITION_COLUMNS:
+            return self.positions[:, POSITION_COLUMNS.index(name)]
+        if name in COLOR_COLUMNS:
+            return self.colors[:, COLOR_COLUMNS.index(name)]
+        if name == "id":
+            return self.node_ids
+        if name == "index":
+            return np.arange(self.node_count, dtype=np.int64)
+        if name == "degree":
+            return self.degree
+        raise KeyError(f"Unknown node column: {name!r}")
+
+    def mask(self, filters: Iterable[Dict[str, Any]]) -> np.ndarray:
+        """
+        Find the nodes that match all filters.
+
+        Each filter is a dict with a 'column', an 'op' (one of FILTER_OPS, e.g.
+        "ge" or "between") and a 'value'.
+
+        Args:
+            filters (Iterable[Dict[str, Any]]): The filters.
+
+        Returns:
+            np.ndarray: A boolean array, True for the matching nodes.
+
+        Raises:
+            ValueError: If a filter is invalid or refers to an unknown column.
+        """
+        mask = np.ones(self.node_count, dtype=bool)
+        for condition in filters:
+            try:
+                column = self.column(condition["column"])
+                op, value = condition.get("op", "eq"), condition["value"]
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"Invalid filter {condition!r}: {e}") from None
+            try:
+                mask &= _compare(column, op, value)
+            except TypeError as e:
+                raise ValueError(f"Cannot apply filter {condition!r}: {e}") from None
+        return mask
+
+    def select(
+        self, selection: Selection, columns: Sequence[str]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Get columns of selected nodes.
+
+        Args:
+            selection (Union[np.ndarray, Sequence[int], None]): A boolean mask, an
+                array of node indices, or None for all nodes.
+            columns (Sequence[str]): The names of the columns.
+
+        Returns:
+            Dict[str, np.ndarray]: Maps the column names to the values of the selected nodes.
+        """
+        if selection is None:
+            return {name: self.column(name) for name in columns}
+        selection = np.asarray(selection)
+        return {name: self.column(name)[selection] for name in columns}
+
+    def index_of(self, node_ids: Iterable[Any]) -> np.ndarray:
+        """
+        Look up the indices of nodes by their IDs.
+
+        Args:
+            node_ids (Iterable[Any]): The node IDs.
+
+        Returns:
+            np.ndarray: The index of each node, -1 for unknown IDs.
+        """
+        wanted = np.asarray(list(node_ids)).astype(str)
+        if not self.node_count:
+            return np.full(len(wanted), -1, dtype=np.int64)
+        if self._id_order is None:
+            self._id_order = np.argsort(self.node_ids, kind="stable")
+            self._sorted_ids = self.node_ids[self._id_order]
+        sorted_ids = self._sorted_ids
+        found = np.minimum(np.searchsorted(sorted_ids, wanted), self.node_count - 1)
+        indices = self._id_order[found].astype(np.int64)
+        indices[sorted_ids[found] != wanted] = -1
+        return indices
+
+    def links_of(self, selection: Selection, both: bool = True) -> np.ndarray:
+        """
+        Find the links of selected nodes.
+
+        Args:
+            selection (Union[np.ndarray, Sequence[int], None]): A boolean mask or
+                an array of node indices, None for all nodes.
+            both (bool, optional): Only links between two selected nodes if True,
+                links with at least one selected node if False. Defaults to True.
+
+        Returns:
+            np.ndarray: The indices of the links.
+        """
+        if selection is None:
+            return np.arange(self.link_count, dtype=np.int64)
+        selected = self._as_mask(selection)
+        source, target = selected[self.links[:, 0]], selected[self.links[:, 1]]
+        return np.flatnonzero(source & target if both else source | target)
+
+    def neighbors(self, selection: Selection) -> np.ndarray:
+        """
+        Find the nodes linked to selected nodes.
+
+        Args:
+            selection (Union[np.ndarray, Sequence[int], None]): A boolean mask or
+                an array of node indices.
+
+        Returns:
+            np.ndarray: The sorted indices of the neighbors that are not selected themselves.
+        """
+        selected = self._as_mask(selection)
+        links = self.links[self.links_of(selected, both=False)]
+        neighbors = np.zeros(self.node_count, dtype=bool)
+        neighbors[links.ravel()] = True
+        return np.flatnonzero(neighbors & ~selected)
+
+    def _as_mask(self, selection: Selection) -> np.ndarray:
+        """
+        Convert a selection into a boolean mask over the nodes.
+        """
+        if selection is None:
+            return np.ones(self.node_count, dtype=bool)
+        selection = np.asarray(selection)
+        if selection.dtype == bool:
+            return selection
+        mask = np.zeros(self.node_count, dtype=bool)
+        mask[selection] = True
+        return mask
+
+    def __repr__(self) -> str:
+        return f"ProjectData({self.name!r}, {self.node_count} nodes, {self.link_count} links)"
@@ -0,0 +1,296 @@
+"""
+Spatial index module for the DataDiVR-Backend.
+
+This module provides the UniformGrid class, a spatial index that sorts the
+nodes of a project into the cells of a uniform grid over their positions, and
+the view frustum helpers used to find the cells a client can see. Queries
+first test whole cells against a box or frustum and only then the nodes in the
+cells that intersect it, all with vectorized NumPy operations.
+"""
+
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Average number of nodes per cell the grid aims for
+DEFAULT_NODES_PER_CELL = 64
+
+
+def frustum_planes(
+    position: Sequence[float],
+    forward: Sequence[float],
+    up: Sequence[float] = (0.0, 1.0, 0.0),
+    fov: float = 90.0,
+    aspect: float = 1.0,
+    near: float = 0.01,
+    far: float = 1000.0,
+) -> np.ndarray:
+    """
+    Get the planes of the view frustum of a perspective camera.
+
+    Args:
+        position (Sequence[float]): The position of the camera.
+        forward (Sequence[float]): The direction the camera looks in.
+        up (Sequence[float], optional): The up direction of the camera. Defaults to +y.
+        fov (float, optional): The vertical field of view in degrees. Defaults to 90.
+        aspect (float, optional): The width of the view divided by its height. Defaults to 1.
+        near (float, optional): The distance of the near plane. Defaults to 0.01.
+        far (float, optional): The distance of the far plane. Defaults to 1000.
+
+    Returns:
+        np.ndarray: Six planes (a, b, c, d) of shape (6, 4); a point p is inside
+        the frustum if a*p.x + b*p.y + c*p.z + d >= 0 for all planes.
+
+    Raises:
+        ValueError: If the directions are zero or parallel, or the angles invalid.
+    """
+    position = np.asarray(position, dtype=np.float64).reshape(3)
+    forward = np.asarray(forward, dtype=np.float64).reshape(3)
+    up = np.asarray(up, dtype=np.float64).reshape(3)
+    if not 0 < fov < 180 or aspect <= 0 or not 0 <= near < far:
+        raise ValueError("Invalid camera field of view, aspect or clipping distances")
+
+    length = np.linalg.norm(forward)
+    right = np.cross(forward, up)
+    if length == 0 or np.linalg.norm(right) == 0:
+        raise ValueError("The camera's forward and up directions must not be parallel")
+    forward = forward / length
+    right = right / np.linalg.norm(right)
+    up = np.cross(right, forward)
+
+    half_height = math.tan(math.radians(fov) / 2)
+    half_width = half_height * aspect
+    normals = np.array(
+        [
+            forward,
+            -forward,
+            right + half_width * forward,
+            -right + half_width * forward,
+            up + half_height * forward,
+            -up + half_height * forward,
+        ]
+    )
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    offsets = -normals @ position
+    offsets[0] = -forward @ (position + near * forward)
+    offsets[1] = forward @ (position + far * forward)
+    return np.column_stack([normals, offsets])
+
+
+def points_in_planes(points: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    """
+    Test which points are inside all planes.
+
+    Args:
+        points (np.ndarray): Points of shape (n, 3).
+        planes (np.ndarray): Planes (a, b, c, d) of shape (k, 4).
+
+    Returns:
+        np.ndarray: A boolean array, True for the points inside.
+    """
+    return np.all(points @ planes[:, :3].T + planes[:, 3] >= 0, axis=1)
+
+
+def boxes_in_planes(
+    lows: np.ndarray, highs: np.ndarray, planes: np.ndarray
+) -> np.ndarray:
+    """
+    Test which axis-aligned boxes are at least partly inside all planes.
+
+    The test is conservative: a box near a corner of a frustum may be reported
+    although it lies just outside.
+
+    Args:
+        lows (np.ndarray): The minimum corners of the boxes, of shape (n, 3).
+        highs (np.ndarray): The maximum corners of the boxes, of shape (n, 3).
+        planes (np.ndarray): Planes (a, b, c, d) of shape (k, 4).
+
+    Returns:
+        np.ndarray: A boolean array, True for the boxes that may intersect.
+    """
+    inside = np.ones(len(lows), dtype=bool)
+    for plane in planes:
+        # the corner furthest along the plane's normal
+        corner = np.where(plane[:3] >= 0, highs, lows)
+        inside &= corner @ plane[:3] + plane[3] >= 0
+    return inside
+
+
+class UniformGrid:
+    """
+    A uniform grid over node positions, with the nodes sorted by cell.
+
+    The cells are cubes sized for about nodes_per_cell nodes each on average;
+    axes along which all nodes lie in a plane, as in 2D layouts, get one cell.
+
+    Attributes:
+        low (np.ndarray): The minimum corner of the grid.
+        extent (np.ndarray): The size of the nodes' bounding box along each axis.
+        cell_size (float): The edge length of the cells.
+        shape (Tuple[int, int, int]): The number of cells along each axis.
+        cell_of (np.ndarray): The cell of each node.
+        order (np.ndarray): The node indices sorted by cell.
+        starts (np.ndarray): Where the nodes of each cell start in order; the
+                             nodes of cell c are order[starts[c]:starts[c + 1]].
+        occupied (np.ndarray): The cells that contain nodes.
+    """
+
+    def __init__(
+        self, positions: np.ndarray, nodes_per_cell: int = DEFAULT_NODES_PER_CELL
+    ):
+        """
+        Build the grid.
+
+        Args:
+            positions (np.ndarray): The node positions, of shape (nodes, 3).
+            nodes_per_cell (int, optional): The average number of nodes per cell
+                                            to aim for. Defaults to 64.
+        """
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        count = len(positions)
+        if count:
+            self.low = positions.min(axis=0).astype(np.float64)
+            extent = positions.max(axis=0).astype(np.float64) - self.low
+        else:
+            self.low, extent = np.zeros(3), np.zeros(3)
+        self.extent = extent
+
+        spread = extent > max(extent.max(), 1e-12) * 1e-6
+        cells = max(count / max(nodes_per_cell, 1), 1.0)
+        if spread.any():
+            volume = float(np.prod(extent[spread]))
+            self.cell_size = (volume / cells) ** (1 / int(spread.sum()))
+        else:
+            self.cell_size = 1.0
+        shape = np.where(spread, np.ceil(extent / self.cell_size), 1)
+        self.shape: Tuple[int, int, int] = tuple(int(n) for n in np.maximum(shape, 1))
+
+        coordinates = np.floor((positions - self.low) / self.cell_size).astype(np.int64)
+        coordinates = np.clip(coordinates, 0, np.array(self.shape) - 1)
+        self.cell_of = np.ravel_multi_index(coordinates.T, self.shape)
+        self.order = np.argsort(self.cell_of, kind="stable")
+        counts = np.bincount(self.cell_of, minlength=self.cell_count)
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+        self.occupied = np.flatnonzero(counts)
+
+        corners = np.array(np.unravel_index(self.occupied, self.shape)).T
+        self._lows = self.low + corners * self.cell_size
+        self._highs = self._lows + self.cell_size
+        # the grid of a flat layout is flat, too
+        self._highs[:, ~spread] = self._lows[:, ~spread] + extent[~spread]
+
+    @property
+    def cell_count(self) -> int:
+        """
+        int: The number of cells, including empty ones.
+        """
+        return int(np.prod(self.shape))
+
+    def counts(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Get the number of nodes in cells.
+
+        Args:
+            cells (np.ndarray): The cells.
+
+        Returns:
+            np.ndarray: The number of nodes in each cell.
+        """
+        return self.starts[cells + 1] - self.starts[cells]
+
+    def nodes(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Get the nodes in cells.
+
+        Args:
+            cells (np.ndarray): The cells.
+
+        Returns:
+            np.ndarray: The node indices, grouped by cell in the order of the cells.
+        """
+        cells = np.asarray(cells, dtype=np.int64)
+        counts = self.counts(cells)
+        total = int(counts.sum())
+        # positions in order: each cell's start, plus the running index within the cell
+        shifts = np.repeat(self.starts[cells] - (np.cumsum(counts) - counts), counts)
+        return self.order[shifts + np.arange(total)]
+
+    def cell_bounds(
+        self, cells: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the boxes of occupied cells.
+
+        Args:
+            cells (Optional[np.ndarray], optional): Occupied cells. Defaults to all of them.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The minimum and maximum corners, of shape (cells, 3).
+        """
+        if cells is None:
+            return self._lows, self._highs
+        rows = np.searchsorted(self.occupied, cells)
+        return self._lows[rows], self._highs[rows]
+
+    def cells_in_box(self, low: Sequence[float], high: Sequence[float]) -> np.ndarray:
+        """
+        Find the occupied cells that intersect a box.
+
+        Args:
+            low (Sequence[float]): The minimum corner of the box.
+            high (Sequence[float]): The maximum corner of the box.
+
+        Returns:
+            np.ndarray: The cells.
+        """
+        low, high = np.asarray(low, dtype=np.float64), np.asarray(
+            high, dtype=np.float64
+        )
+        overlap = np.all((self._lows <= high) & (self._highs >= low), axis=1)
+        return self.occupied[overlap]
+
+    def cells_in_frustum(self, planes: np.ndarray) -> np.ndarray:
+        """
+        Find the occupied cells that intersect a view frustum.
+
+        Args:
+            planes (np.ndarray): The planes of the frustum, see frustum_planes().
+
+        Returns:
+            np.ndarray: The cells.
+        """
+        return self.occupied[boxes_in_planes(self._lows, self._highs, planes)]
+
+    def query_box(
+        self, positions: np.ndarray, low: Sequence[float], high: Sequence[float]
+    ) -> np.ndarray:
+        """
+        Find the nodes inside a box.
+
+        Args:
+            positions (np.ndarray): The node positions the grid was built from.
+            low (Sequence[float]): The minimum corner of the box.
+            high (Sequence[float]): The maximum corner of the box.
+
+        Returns:
+            np.ndarray: The node indices, grouped by cell.
+        """
+        candidates = self.nodes(self.cells_in_box(low, high))
+        points = positions[candidates]
+        inside = np.all((points >= low) & (points <= high), axis=1)
+        return candidates[inside]
+
+    def query_frustum(self, positions: np.ndarray, planes: np.ndarray) -> np.ndarray:
+        """
+        Find the nodes inside a view frustum.
+
+        Args:
+            positions (np.ndarray): The node positions the grid was built from.
+            planes (np.ndarray): The planes of the frustum, see frustum_planes().
+
+        Returns:
+            np.ndarray: The node indices, grouped by cell.
+        """
+        candidates = self.nodes(self.cells_in_frustum(planes))
+        return candidates[points_in_planes(positions[candidates], planes)]
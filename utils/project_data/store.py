@@ -0,0 +1,175 @@
+"""
+Project store module for the DataDiVR-Backend.
+
+This module provides the ProjectStore class, which loads projects from the
+projects directory on first use and keeps them in memory, so handlers query
+the same columns instead of parsing project files per request. Projects that
+were converted to the binary format are memory-mapped instead of parsed.
+"""
+
+import asyncio
+import os
+import re
+from typing import Dict, List, Optional
+
+from ..custom_logging import logger
+from ..jobs import job_manager
+from .binary import PROJECT_FILE, open_project
+from .loaders import LINK_FILES, NODE_FILES, find_file, load_records
+from .project import ProjectData
+
+DEFAULT_PROJECTS_DIR = "project_files/projects"
+# Project names are directory names; they must not reach outside the projects directory
+PROJECT_NAME = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$")
+
+
+class ProjectStore:
+    """
+    Loads projects by name and keeps them in memory.
+
+    Attributes:
+        directory (str): The directory with one subdirectory per project.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Initialize the ProjectStore.
+
+        Args:
+            directory (Optional[str], optional): The projects directory. Defaults to
+                the environment variable PROJECTS_DIR, or "project_files/projects".
+        """
+        self.directory = directory or os.getenv("PROJECTS_DIR", DEFAULT_PROJECTS_DIR)
+        self._projects: Dict[str, ProjectData] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._projects
+
+    def add(self, project: ProjectData):
+        """
+        Keep a project that was built in memory.
+
+        Args:
+            project (ProjectData): The project, stored under its name.
+        """
+        self._projects[project.name] = project
+
+    def get(self, name: str) -> Optional[ProjectData]:
+        """
+        Get a project that is already loaded.
+
+        Args:
+            name (str): The name of the project.
+
+        Returns:
+            Optional[ProjectData]: The project, or None if it is not loaded.
+        """
+        return self._projects.get(name)
+
+    def available(self) -> List[str]:
+        """
+        List the loaded projects and those in the projects directory.
+
+        Returns:
+            List[str]: The sorted project names.
+        """
+        names = set(self._projects)
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.is_dir() and PROJECT_NAME.match(entry.name):
+                    if find_file(entry.path, (PROJECT_FILE,) + NODE_FILES):
+                        names.add(entry.name)
+        return sorted(names)
+
+    async def load(self, name: str) -> ProjectData:
+        """
+        Get a project, loading it from the projects directory if needed.
+
+        A project converted to the binary format is mapped into memory, unless
+        its node or link files changed since. Otherwise its node and link files
+        are parsed, in the thread pool of the job manager, so the event loop
+        stays responsive. Concurrent calls for the same project share one load.
+
+        Args:
+            name (str): The name of the project.
+
+        Returns:
+            ProjectData: The project.
+
+        Raises:
+            ValueError: If the name is not a valid project name.
+            FileNotFoundError: If the project does not exist.
+        """
+        # validate first: names sent by clients may be unhashable
+        if not isinstance(name, str) or not PROJECT_NAME.match(name):
+            raise ValueError(f"Invalid project name: {name!r}")
+        project = self._projects.get(name)
+        if project is not None:
+            return project
+
+        future = self._loading.get(name)
+        if future is None:
+            future = asyncio.ensure_future(self._load(name))
+            self._loading[name] = future
+        return await asyncio.shield(future)
+
+    async def _load(self, name: str) -> ProjectData:
+        """
+        Load a project in the thread pool and keep it.
+        """
+        try:
+            path = os.path.join(self.directory, name)
+            if not os.path.isdir(path):
+                raise FileNotFoundError(f"Unknown project: {name}")
+            loader, source = load_records, path
+            binary_path = os.path.join(path, PROJECT_FILE)
+            if os.path.isfile(binary_path):
+                if _is_stale(binary_path, path):
+                    logger.warning(
+                        "%s is older than the node or link files of project %s; "
+                        "convert the project again to use it",
+                        PROJECT_FILE,
+                        name,
+                    )
+                else:
+                    loader, source = open_project, binary_path
+            project = await job_manager.run_in_executor("thread", loader, source, name)
+            self._projects[name] = project
+            logger.info(
+                "Loaded project %s (%d nodes, %d links)",
+                name,
+                project.node_count,
+                project.link_count,
+            )
+            return project
+        finally:
+            del self._loading[name]
+
+    def unload(self, name: str) -> bool:
+        """
+        Forget a loaded project, freeing its memory once no handler uses it.
+
+        Args:
+            name (str): The name of the project.
+
+        Returns:
+            bool: True if the project was loaded.
+        """
+        return self._projects.pop(name, None) is not None
+
+
+def _is_stale(binary_path: str, directory: str) -> bool:
+    """
+    Check whether a node or link file is newer than the binary file converted from it.
+    """
+    converted = os.path.getmtime(binary_path)
+    for names in (NODE_FILES, LINK_FILES):
+        source = find_file(directory, names)
+        if source is not None and os.path.getmtime(source) > converted:
+            return True
+    return False
+
+
+# Create a global instance of ProjectStore
+project_store = ProjectStore()
@@ -0,0 +1,261 @@
+"""
+View streaming module for the DataDiVR-Backend.
+
+This module streams the nodes of a project that a client can see. Clients send
+their camera; the ViewStreamer finds the cells of the project's spatial index
+inside the view frustum and chooses a level of detail for each cell by its
+distance from the camera:
+
+- LABELS (0): the nodes of the cell with their labels,
+- NODES (1): the nodes of the cell, without labels,
+- CLUSTERS (2): a single point for the cell, at the centroid of its nodes.
+
+Each client's ViewState remembers the level each cell was sent at, so an update
+only contains the cells that came into view or changed their level, and the
+cells that left the view. Updates are limited to a budget of nodes, closest
+cells first; the rest follows with the next camera update.
+"""
+
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from ..metrics import metrics
+from .project import ProjectData
+from .spatial import UniformGrid, frustum_planes
+
+LABELS, NODES, CLUSTERS = 0, 1, 2
+NOT_SENT = -1
+# Distances up to which cells are sent with labels and as nodes, as fractions of
+# the diagonal of the project's bounding box
+DEFAULT_LOD_DISTANCES = "0.2,0.6"
+# Maximum number of nodes and clusters in one update
+DEFAULT_MAX_NODES = 20000
+
+VIEW_UPDATE_NODES = metrics.histogram(
+    "datadivr_view_update_nodes",
+    "Nodes and clusters sent per view update.",
+    buckets=(0, 10, 100, 1000, 5000, 10000, 20000, 50000, 100000),
+)
+
+
+class ViewState:
+    """
+    What a client received of a project.
+
+    Attributes:
+        project (str): The name of the project the client looks at.
+        grid (UniformGrid): The spatial index the levels refer to.
+        levels (np.ndarray): The level each cell was sent at, NOT_SENT if none.
+    """
+
+    def __init__(self, project: str, grid: UniformGrid):
+        """
+        Initialize a ViewState in which nothing was sent yet.
+
+        Args:
+            project (str): The name of the project.
+            grid (UniformGrid): The spatial index of the project.
+        """
+        self.project = project
+        self.grid = grid
+        self.levels = np.full(grid.cell_count, NOT_SENT, dtype=np.int8)
+
+    def holds(self, nodes: np.ndarray) -> np.ndarray:
+        """
+        Check which nodes the client received individually, at the LABELS or NODES level.
+
+        Updates of other nodes, e.g. new positions, need not be sent to the client.
+
+        Args:
+            nodes (np.ndarray): Node indices.
+
+        Returns:
+            np.ndarray: A boolean array, True for the nodes the client holds.
+        """
+        levels = self.levels[self.grid.cell_of[nodes]]
+        return (levels == LABELS) | (levels == NODES)
+
+
+class ViewStreamer:
+    """
+    Computes the view updates of clients.
+
+    Attributes:
+        lod_distances (List[float]): The distances up to which cells are sent at the
+            LABELS and NODES levels, as fractions of the project's diagonal.
+        max_nodes (int): The maximum number of nodes and clusters in one update.
+    """
+
+    def __init__(
+        self,
+        lod_distances: Optional[Sequence[float]] = None,
+        max_nodes: Optional[int] = None,
+    ):
+        """
+        Initialize the ViewStreamer.
+
+        Settings that are not given are read from the environment variables
+        VIEW_LOD_DISTANCES and VIEW_MAX_NODES.
+
+        Args:
+            lod_distances (Optional[Sequence[float]], optional): The two distance
+                thresholds. Defaults to 0.2 and 0.6.
+            max_nodes (Optional[int], optional): The budget of an update. Defaults to 20000.
+        """
+        if lod_distances is None:
+            text = os.getenv("VIEW_LOD_DISTANCES", DEFAULT_LOD_DISTANCES)
+            lod_distances = [float(part) for part in text.split(",")]
+        if len(lod_distances) != 2:
+            raise ValueError("Two level of detail distances are required")
+        self.lod_distances = list(lod_distances)
+        self.max_nodes = max_nodes or int(
+            os.getenv("VIEW_MAX_NODES", DEFAULT_MAX_NODES)
+        )
+
+    def update(
+        self, state: ViewState, project: ProjectData, camera: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Compute the update for a client's new camera and record what it receives.
+
+        Args:
+            state (ViewState): What the client received so far.
+            project (ProjectData): The project, whose spatial index is state.grid.
+            camera (Dict[str, Any]): The camera: 'position' and 'forward', and
+                optionally 'up', 'fov' (vertical, in degrees), 'aspect', 'near'
+                and 'far', see frustum_planes().
+
+        Returns:
+            Optional[Dict[str, Any]]: The 'view_update' message, with NumPy arrays,
+            or None if nothing changed.
+
+        Raises:
+            ValueError: If the camera is invalid.
+            TypeError: If the camera is invalid.
+        """
+        position = np.asarray(camera["position"], dtype=np.float64).reshape(3)
+        planes = frustum_planes(
+            position,
+            camera["forward"],
+            camera.get("up", (0.0, 1.0, 0.0)),
+            float(camera.get("fov", 90.0)),
+            float(camera.get("aspect", 1.0)),
+            float(camera.get("near", 0.01)),
+            float(camera.get("far", 1000.0)),
+        )
+        grid = state.grid
+
+        visible = grid.cells_in_frustum(planes)
+        lows, highs = grid.cell_bounds(visible)
+        # distance to the closest point of each cell
+        gaps = np.maximum(np.maximum(lows - position, position - highs), 0)
+        distances = np.linalg.norm(gaps, axis=1)
+        diagonal = max(float(np.linalg.norm(grid.extent)), 1e-12)
+        thresholds = np.array(self.lod_distances) * diagonal
+        wanted = np.searchsorted(thresholds, distances, side="right").astype(np.int8)
+
+        sent = np.flatnonzero(state.levels != NOT_SENT)
+        removed = np.setdiff1d(sent, visible, assume_unique=True)
+        state.levels[removed] = NOT_SENT
+
+        changed = state.levels[visible] != wanted
+        order = np.argsort(distances[changed], kind="stable")
+        cells, levels = visible[changed][order], wanted[changed][order]
+        costs = np.where(levels == CLUSTERS, 1, grid.counts(cells))
+        # the closest cells within the budget, and always at least one
+        taken = max(int(np.searchsorted(np.cumsum(costs), self.max_nodes, "right")), 1)
+        cells, levels = cells[:taken], levels[:taken]
+        complete = taken >= len(order)
+        if not len(cells) and not len(removed):
+            return None
+        state.levels[cells] = levels
+        VIEW_UPDATE_NODES.observe(int(costs[:taken].sum()))
+
+        message = {
+            "event": "view_update",
+            "project": state.project,
+            "removed": removed,
+            "complete": complete,
+        }
+        message.update(
+            self._nodes(
+                project, grid, cells[levels != CLUSTERS], levels[levels != CLUSTERS]
+            )
+        )
+        message["clusters"] = self._clusters(project, grid, cells[levels == CLUSTERS])
+        return message
+
+    def _nodes(
+        self,
+        project: ProjectData,
+        grid: UniformGrid,
+        cells: np.ndarray,
+        levels: np.ndarray,
+    ) -> Dict[str, Any]:
+        """
+        Get the nodes of cells sent individually, and the labels of those at the LABELS level.
+        """
+        nodes = grid.nodes(cells)
+        labelled = grid.nodes(cells[levels == LABELS])
+        label_column = "label" if "label" in project.attributes else "id"
+        return {
+            "nodes": {
+                "cells": cells,
+                "levels": levels,
+                "counts": grid.counts(cells),
+                "index": nodes,
+                "positions": project.positions[nodes].ravel(),
+                "colors": project.colors[nodes].ravel(),
+            },
+            "labels": {
+                "index": labelled,
+                "text": project.column(label_column)[labelled].astype(str),
+            },
+        }
+
+    def _clusters(
+        self, project: ProjectData, grid: UniformGrid, cells: np.ndarray
+    ) -> Dict[str, Any]:
+        """
+        Get one point per cell, at the centroid of its nodes and with their mean color.
+        """
+        counts = grid.counts(cells)
+        nodes = grid.nodes(cells)
+        if not len(cells):
+            centroids = np.empty((0, 3), dtype=np.float32)
+            colors = np.empty((0, 4), dtype=np.uint8)
+        else:
+            offsets = np.cumsum(counts) - counts
+            divisor = counts[:, None]
+            positions = project.positions[nodes].astype(np.float64)
+            centroids = (np.add.reduceat(positions, offsets) / divisor).astype(
+                np.float32
+            )
+            colors = np.add.reduceat(project.colors[nodes].astype(np.int64), offsets)
+            colors = (colors // divisor).astype(np.uint8)
+        return {
+            "cells": cells,
+            "counts": counts,
+            "positions": centroids.ravel(),
+            "colors": colors.ravel(),
+        }
+
+
+def camera_of(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the camera fields of a 'view' event.
+
+    Args:
+        data (Dict[str, Any]): The data sent with the event.
+
+    Returns:
+        Dict[str, Any]: The camera settings.
+    """
+    keys = ("position", "forward", "up", "fov", "aspect", "near", "far")
+    return {key: data[key] for key in keys if key in data}
+
+
+# Create a global instance of ViewStreamer
+view_streamer = ViewStreamer()
@@ -0,0 +1,37 @@
+"""
+Wire conversion module for project data in the DataDiVR-Backend.
+
+This module converts NumPy columns into values the WebSocket codec can encode.
+float32 columns, such as coordinates, become Float32Arrays, which MessagePack
+clients receive as raw bytes; other columns become lists.
+"""
+
+from typing import Any
+
+import numpy as np
+
+from ..websocket.codec import Float32Array
+
+
+def to_wire(value: Any) -> Any:
+    """
+    Convert the NumPy arrays in a value into encodable values.
+
+    Args:
+        value (Any): An array, or a dict or list that may contain arrays.
+
+    Returns:
+        Any: The value with float32 arrays replaced by Float32Arrays and other
+        arrays and NumPy scalars by lists and Python numbers.
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype == np.float32:
+            return Float32Array.from_bytes(value.astype("<f4").tobytes())
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {key: to_wire(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_wire(item) for item in value]
+    return value
@@ -0,0 +1,359 @@
+"""
+Scene state module for the DataDiVR-Backend.
+
+This module provides the SceneStateStore class, the authoritative copy of the
+shared state of each scene, such as the selection, camera, filters and layout
+the users of a project look at. A scene is a tree of keyed documents that
+clients change by setting or deleting values at paths like 'camera.position'.
+Every change is stamped with a Lamport clock and the ID of its writer, and
+conflicting writes resolve last-writer-wins on that stamp: a write only takes
+effect if no later write replaced the same path or one of its parents. The
+result is the same whatever the order in which writes arrive, so the workers
+of a multi-worker deployment converge by exchanging their writes.
+
+Clients receive a snapshot of the state once and then only versioned deltas
+with the paths that changed.
+"""
+
+import copy
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .metrics import metrics
+
+# Maximum number of keys in a path
+MAX_PATH_DEPTH = 16
+# Maximum number of operations in one update
+MAX_OPS = 256
+
+STATE_WRITES = metrics.counter(
+    "datadivr_state_writes_total",
+    "Writes to the scene state, by result: applied, or superseded by a later write.",
+    ["result"],
+)
+
+Path = Tuple[str, ...]
+Stamp = Tuple[int, str]
+
+
+class _Write(NamedTuple):
+    stamp: Stamp
+    op: str
+    value: Any
+
+
+class StateDelta(NamedTuple):
+    """
+    The changes an update made to a scene.
+
+    Attributes:
+        version (int): The version of the scene after the update.
+        ops (List[Dict[str, Any]]): The changed paths with their new values, as sent to clients.
+        writes (List[Dict[str, Any]]): The applied writes with their stamps, as
+                                       exchanged with other workers.
+    """
+
+    version: int
+    ops: List[Dict[str, Any]]
+    writes: List[Dict[str, Any]]
+
+
+def parse_path(path: Any) -> Path:
+    """
+    Parse the path of a value in a scene.
+
+    Args:
+        path (Any): A dotted string like 'camera.position', or a list of keys
+                    for keys that contain dots.
+
+    Returns:
+        Tuple[str, ...]: The keys of the path.
+
+    Raises:
+        ValueError: If the path is empty, too deep or contains keys that are not
+                    non-empty strings.
+    """
+    keys = tuple(path.split(".")) if isinstance(path, str) else path
+    if (
+        not isinstance(keys, (list, tuple))
+        or not keys
+        or not all(isinstance(key, str) and key for key in keys)
+    ):
+        raise ValueError(f"Invalid state path: {path!r}")
+    if len(keys) > MAX_PATH_DEPTH:
+        raise ValueError(f"State paths are limited to {MAX_PATH_DEPTH} keys")
+    return tuple(keys)
+
+
+class Scene:
+    """
+    The state of one scene and the writes that produced it.
+
+    Only the latest write of each path is kept, and writes below a path are
+    discarded once the path itself is overwritten by a later write.
+
+    Attributes:
+        version (int): Increased by one for every update that changed the state.
+        data (Dict[str, Any]): The current state.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.data: Dict[str, Any] = {}
+        self._writes: Dict[Path, _Write] = {}
+
+    def apply(self, path: Path, write: _Write) -> bool:
+        """
+        Apply a write unless a later write to the path or one of its parents exists.
+
+        Args:
+            path (Tuple[str, ...]): The path of the write.
+            write (_Write): The write.
+
+        Returns:
+            bool: True if the write was applied.
+        """
+        for depth in range(1, len(path) + 1):
+            existing = self._writes.get(path[:depth])
+            if existing is not None and existing.stamp >= write.stamp:
+                return False
+
+        # writes below the path are replaced, unless they are later than this one
+        later = []
+        for child, existing in list(self._writes.items()):
+            if len(child) > len(path) and child[: len(path)] == path:
+                if existing.stamp < write.stamp:
+                    del self._writes[child]
+                else:
+                    later.append((existing.stamp, child, existing))
+        self._writes[path] = write
+        self._materialize(path, write)
+        for _, child, existing in sorted(later):
+            self._materialize(child, existing)
+        return True
+
+    def get(self, path: Path) -> Tuple[bool, Any]:
+        """
+        Get the value at a path.
+
+        Args:
+            path (Tuple[str, ...]): The path.
+
+        Returns:
+            Tuple[bool, Any]: Whether the path exists, and its value.
+        """
+        node: Any = self.data
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                return False, None
+            node = node[key]
+        return True, node
+
+    def writes(self) -> Iterable[Tuple[Path, _Write]]:
+        """
+        Iterate over the writes that make up the state.
+
+        Returns:
+            Iterable[Tuple[Tuple[str, ...], _Write]]: The paths and their latest writes.
+        """
+        return list(self._writes.items())
+
+    def _materialize(self, path: Path, write: _Write):
+        """
+        Set or delete the value at a path, creating or replacing the parents as needed.
+        """
+        node = self.data
+        for key in path[:-1]:
+            child = node.get(key)
+            if not isinstance(child, dict):
+                if write.op == "delete":
+                    return
+                child = node[key] = {}
+            node = child
+        if write.op == "delete":
+            node.pop(path[-1], None)
+        else:
+            # keep the state independent of the write, which may be sent to other workers
+            node[path[-1]] = copy.deepcopy(write.value)
+
+
+class SceneStateStore:
+    """
+    Holds the state of all scenes: one per room, plus the global scene (None).
+
+    The store is not thread-safe and must be used from the event loop.
+
+    Attributes:
+        clock (int): The Lamport clock, the highest stamp seen so far.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty SceneStateStore.
+        """
+        self.clock = 0
+        self._scenes: Dict[Optional[str], Scene] = {}
+
+    def __contains__(self, scene: Optional[str]) -> bool:
+        return scene in self._scenes
+
+    def scenes(self) -> List[Optional[str]]:
+        """
+        Get the names of the scenes that have state.
+
+        Returns:
+            List[Optional[str]]: The room names, None for the global scene.
+        """
+        return list(self._scenes)
+
+    def snapshot(self, scene: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get the current state of a scene, as sent to clients that join it.
+
+        Args:
+            scene (Optional[str], optional): The room of the scene. Defaults to
+                                             None (the global scene).
+
+        Returns:
+            Dict[str, Any]: The scene, its version and its state.
+        """
+        state = self._scenes.get(scene)
+        if state is None:
+            return {"scene": scene, "version": 0, "state": {}}
+        return {"scene": scene, "version": state.version, "state": state.data}
+
+    def update(
+        self, scene: Optional[str], ops: Sequence[Dict[str, Any]], writer: str
+    ) -> StateDelta:
+        """
+        Apply the operations a client sent to a scene.
+
+        Each operation is a dict with an 'op' ("set" or "delete"), a 'path' and,
+        for "set", a 'value'. Later operations of an update win over earlier ones.
+
+        Args:
+            scene (Optional[str]): The room of the scene, None for the global scene.
+            ops (Sequence[Dict[str, Any]]): The operations.
+            writer (str): The ID of the client that sent the operations.
+
+        Returns:
+            StateDelta: The changes made to the scene.
+
+        Raises:
+            ValueError: If an operation is invalid; no operation is applied then.
+        """
+        if not isinstance(ops, (list, tuple)) or not ops:
+            raise ValueError("A state update requires a list of 'ops'")
+        if len(ops) > MAX_OPS:
+            raise ValueError(f"State updates are limited to {MAX_OPS} operations")
+
+        writes = []
+        for op in ops:
+            kind = op.get("op", "set") if isinstance(op, dict) else None
+            if kind not in ("set", "delete"):
+                raise ValueError(f"Invalid state operation: {op!r}")
+            if kind == "set" and "value" not in op:
+                raise ValueError("A 'set' operation requires a 'value'")
+            writes.append((parse_path(op.get("path")), kind, op.get("value")))
+
+        stamped = []
+        for path, kind, value in writes:
+            self.clock += 1
+            stamped.append((path, _Write((self.clock, writer), kind, value)))
+        return self._apply(scene, stamped)
+
+    def merge(
+        self, scene: Optional[str], writes: Iterable[Dict[str, Any]]
+    ) -> StateDelta:
+        """
+        Apply writes exported by another worker.
+
+        Writes that were already applied, or were superseded by later writes, are
+        ignored, so merging the same writes again changes nothing.
+
+        Args:
+            scene (Optional[str]): The room of the scene, None for the global scene.
+            writes (Iterable[Dict[str, Any]]): The writes, as returned by export().
+
+        Returns:
+            StateDelta: The changes made to the scene.
+        """
+        stamped = []
+        for write in writes:
+            lamport, writer = write["stamp"]
+            self.clock = max(self.clock, lamport)
+            stamped.append(
+                (
+                    tuple(write["path"]),
+                    _Write((lamport, writer), write["op"], write.get("value")),
+                )
+            )
+        return self._apply(scene, stamped)
+
+    def export(self, scene: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the writes that make up the state of a scene.
+
+        Args:
+            scene (Optional[str], optional): The room of the scene. Defaults to
+                                             None (the global scene).
+
+        Returns:
+            List[Dict[str, Any]]: The writes, which merge() accepts.
+        """
+        state = self._scenes.get(scene)
+        if state is None:
+            return []
+        return [_export(path, write) for path, write in state.writes()]
+
+    def clear(self, scene: Optional[str] = None):
+        """
+        Discard the state of a scene.
+
+        Args:
+            scene (Optional[str], optional): The room of the scene. Defaults to
+                                             None (the global scene).
+        """
+        self._scenes.pop(scene, None)
+
+    def _apply(
+        self, scene: Optional[str], stamped: List[Tuple[Path, _Write]]
+    ) -> StateDelta:
+        """
+        Apply stamped writes to a scene and collect the resulting changes.
+        """
+        state = self._scenes.get(scene)
+        if state is None:
+            state = self._scenes[scene] = Scene()
+
+        applied = []
+        for path, write in stamped:
+            if state.apply(path, write):
+                applied.append((path, write))
+                STATE_WRITES.labels("applied").inc()
+            else:
+                STATE_WRITES.labels("superseded").inc()
+        if not applied:
+            return StateDelta(state.version, [], [])
+
+        state.version += 1
+        ops = []
+        for path in dict.fromkeys(path for path, _ in applied):
+            found, value = state.get(path)
+            if found:
+                ops.append({"op": "set", "path": list(path), "value": value})
+            else:
+                ops.append({"op": "delete", "path": list(path)})
+        return StateDelta(
+            state.version, ops, [_export(path, write) for path, write in applied]
+        )
+
+
+def _export(path: Path, write: _Write) -> Dict[str, Any]:
+    exported = {"op": write.op, "path": list(path), "stamp": list(write.stamp)}
+    if write.op == "set":
+        exported["value"] = write.value
+    return exported
+
+
+# Create a global instance of SceneStateStore
+scene_state = SceneStateStore()
@@ -0,0 +1,611 @@
+"""
+Static file serving module for the DataDiVR-Backend.
+
+This module provides the CachedStaticFiles class, a StaticFiles application
+that serves files the way browsers and headsets can cache best:
+
+- Compressible files are compressed once, with gzip and, if the brotli package
+  is installed, brotli, and the variant the client accepts (Accept-Encoding)
+  is served. Variants are stored under the content hash of the file in a cache
+  directory shared by all workers, by default a directory in the system's
+  temporary directory that only the current user can access; precompressed siblings such as app.js.br
+  that are newer than the file are used as they are.
+- Range requests are answered with 206 Partial Content, so large binaries can
+  be downloaded in parts and resumed.
+- Every response carries a strong ETag derived from the content hash, and
+  conditional requests get 304 Not Modified. Requests for a versioned URL,
+  with ?v=<version> (see CachedStaticFiles.version()), are cached by clients
+  for a year without revalidation. Templates link to them with static_url()
+  (see utils.API_framework.Templates).
+"""
+
+import errno
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, QueryParams
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+
+from .API_framework import etag_matches
+from .custom_logging import logger
+from .metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Files smaller than this are not worth compressing
+DEFAULT_MIN_SIZE = 1024
+# Files larger than this are served uncompressed, to bound the work of the first request
+DEFAULT_MAX_COMPRESS_SIZE = 64 * 1024 * 1024
+# Variants must save at least this fraction of the size to be kept
+MIN_SAVING = 0.1
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Content types compressed besides text/*
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/wasm",
+    "application/xml",
+    "image/svg+xml",
+    "model/gltf+json",
+    "model/obj",
+}
+COMPRESSIBLE_EXTENSIONS = {".bin", ".csv", ".ddvr", ".obj", ".ply", ".tsv"}
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+READ_CHUNK = 1024 * 1024
+
+STATIC_RESPONSES = metrics.counter(
+    "datadivr_static_responses_total",
+    "Static file responses, by status code and content encoding.",
+    ["status", "encoding"],
+)
+
+mimetypes.add_type("model/gltf+json", ".gltf")
+mimetypes.add_type("model/gltf-binary", ".glb")
+
+
+def available_encodings() -> List[str]:
+    """
+    Get the content encodings static files are compressed with, preferred first.
+
+    Returns:
+        List[str]: "br" if brotli is installed, and "gzip".
+    """
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+
+def default_cache_dir() -> str:
+    """
+    Get the default directory for compressed variants, creating it if needed.
+
+    The directory is in the system's temporary directory and named after the
+    user, who must own it and be the only one allowed to access it. Otherwise
+    another user could plant variants that would be served in place of the
+    files.
+
+    Returns:
+        str: The path of the directory.
+
+    Raises:
+        RuntimeError: If the directory is not a directory owned by the user.
+    """
+    tmpdir = tempfile.gettempdir()
+    # the temporary directory is private to the user on Windows
+    if os.name == "nt":  # pragma: no cover - depends on the platform
+        return os.path.join(tmpdir, "datadivr-static")
+    directory = os.path.join(tmpdir, f"datadivr-static-{os.getuid()}")
+    try:
+        os.mkdir(directory, stat.S_IRWXU)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    stat_result = os.lstat(directory)
+    if stat_result.st_uid != os.getuid() or not stat.S_ISDIR(stat_result.st_mode):
+        raise RuntimeError(
+            f"Cannot use {directory} as the static file cache; set STATIC_CACHE_DIR"
+        )
+    if stat.S_IMODE(stat_result.st_mode) != stat.S_IRWXU:
+        os.chmod(directory, stat.S_IRWXU)
+    return directory
+
+
+@dataclass
+class Asset:
+    """
+    A static file and its compressed variants.
+
+    Attributes:
+        path (str): The path of the file.
+        size (int): The size of the file in bytes.
+        mtime_ns (int): The modification time of the file.
+        media_type (str): The content type of the file.
+        digest (str): The content hash of the file.
+        variants (Dict[str, str]): Maps content encodings to the paths of the
+                                   compressed variants that were worth keeping.
+    """
+
+    path: str
+    size: int
+    mtime_ns: int
+    media_type: str
+    digest: str
+    variants: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def version(self) -> str:
+        """
+        str: The version of the file for versioned URLs, a prefix of its content hash.
+        """
+        return self.digest[:16]
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """
+        Get the strong entity tag of the file or of one of its variants.
+
+        Args:
+            encoding (Optional[str], optional): The content encoding. Defaults to none.
+
+        Returns:
+            str: The quoted entity tag.
+        """
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    Serves static files compressed, in ranges and with cache validators.
+
+    Attributes:
+        cache_dir (str): Where compressed variants are stored.
+        min_size (int): The minimum size of files that are compressed.
+        max_compress_size (int): The maximum size of files that are compressed.
+    """
+
+    def __init__(
+        self,
+        *args,
+        cache_dir: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_compress_size: Optional[int] = None,
+        **kwargs,
+    ):
+        """
+        Initialize the CachedStaticFiles.
+
+        Settings that are not given are read from the environment variables
+        STATIC_CACHE_DIR and STATIC_MAX_COMPRESS_BYTES. Other arguments are
+        passed to StaticFiles, e.g. directory.
+
+        Args:
+            cache_dir (Optional[str], optional): Where compressed variants are stored.
+                Defaults to default_cache_dir().
+            min_size (Optional[int], optional): The minimum size of files that are
+                compressed. Defaults to 1024 bytes.
+            max_compress_size (Optional[int], optional): The maximum size of files
+                that are compressed. Defaults to 64 MiB.
+        """
+        super().__init__(*args, **kwargs)
+        self.cache_dir = (
+            cache_dir or os.getenv("STATIC_CACHE_DIR") or default_cache_dir()
+        )
+        self.min_size = DEFAULT_MIN_SIZE if min_size is None else min_size
+        self.max_compress_size = max_compress_size or int(
+            os.getenv("STATIC_MAX_COMPRESS_BYTES", DEFAULT_MAX_COMPRESS_SIZE)
+        )
+        self._assets: Dict[str, Asset] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    async def get_response(self, path: str, scope) -> Response:
+        """
+        Get the response for a static file, falling back to StaticFiles for directories and errors.
+
+        Args:
+            path (str): The path of the file within the directory.
+            scope (Scope): The ASGI scope of the request.
+
+        Returns:
+            Response: The response.
+        """
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        try:
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path
+            )
+        except PermissionError:
+            raise HTTPException(status_code=401)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            return await super().get_response(path, scope)
+        asset = await anyio.to_thread.run_sync(self.asset, full_path, stat_result)
+        return self.asset_response(asset, scope)
+
+    def asset(self, full_path: str, stat_result: os.stat_result) -> Asset:
+        """
+        Get a file's content hash and compressed variants, computing them if the file is new or changed.
+
+        Blocks while hashing and compressing; call it from a thread.
+
+        Args:
+            full_path (str): The path of the file.
+            stat_result (os.stat_result): The file's status.
+
+        Returns:
+            Asset: The file.
+        """
+        asset = self._assets.get(full_path)
+        if _unchanged(asset, stat_result):
+            return asset
+        with self._lock_for(full_path):
+            asset = self._assets.get(full_path)
+            if _unchanged(asset, stat_result):
+                return asset
+            asset = Asset(
+                full_path,
+                stat_result.st_size,
+                stat_result.st_mtime_ns,
+                mimetypes.guess_type(full_path)[0] or "text/plain",
+                _hash_file(full_path),
+            )
+            if self._compressible(asset):
+                for encoding in available_encodings():
+                    variant = self._variant(asset, encoding)
+                    if variant is not None:
+                        asset.variants[encoding] = variant
+            self._assets[full_path] = asset
+            return asset
+
+    def version(self, path: str) -> Optional[str]:
+        """
+        Get the version of a file for versioned URLs, path?v=<version>.
+
+        Blocks while hashing the file the first time; call it from a thread.
+
+        Args:
+            path (str): The path of the file within the directory.
+
+        Returns:
+            Optional[str]: The version, or None if there is no such file.
+        """
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            return None
+        return self.asset(full_path, stat_result).version
+
+    def precompress(self) -> int:
+        """
+        Hash and compress all files of the directory ahead of the first requests.
+
+        Blocks; call it from a thread.
+
+        Returns:
+            int: The number of files.
+        """
+        count = 0
+        for directory in self.all_directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    full_path = os.path.join(root, name)
+                    if name.endswith((".gz", ".br")):
+                        continue
+                    try:
+                        self.asset(full_path, os.stat(full_path))
+                        count += 1
+                    except OSError as e:
+                        logger.warning("Cannot precompress %s: %s", full_path, e)
+        return count
+
+    def asset_response(self, asset: Asset, scope) -> Response:
+        """
+        Build the response for a file, negotiating its encoding and handling conditional and range requests.
+
+        Args:
+            asset (Asset): The file.
+            scope (Scope): The ASGI scope of the request.
+
+        Returns:
+            Response: The file, a part of it, 304 Not Modified or 416 Range Not Satisfiable.
+        """
+        request_headers = Headers(scope=scope)
+        method = scope["method"]
+        ranged = method == "GET" and "range" in request_headers
+        encoding = None
+        if not ranged:
+            encoding = negotiate_encoding(
+                request_headers.get("accept-encoding", ""), list(asset.variants)
+            )
+        versioned = QueryParams(scope.get("query_string", b"")).get("v")
+        headers = {
+            "etag": asset.etag(encoding),
+            "last-modified": formatdate(asset.mtime_ns / 1e9, usegmt=True),
+            "accept-ranges": "bytes",
+            "cache-control": IMMUTABLE if versioned == asset.version else REVALIDATE,
+        }
+        if asset.variants:
+            headers["vary"] = "Accept-Encoding"
+
+        if _not_modified(request_headers, headers):
+            STATIC_RESPONSES.labels("304", encoding or "identity").inc()
+            return Response(status_code=304, headers=headers)
+
+        if ranged and _if_range_matches(request_headers.get("if-range"), asset):
+            byte_range = parse_range(request_headers["range"], asset.size)
+            if byte_range is None:
+                STATIC_RESPONSES.labels("416", "identity").inc()
+                headers["content-range"] = f"bytes */{asset.size}"
+                return Response(status_code=416, headers=headers)
+            if byte_range != (0, asset.size - 1):
+                STATIC_RESPONSES.labels("206", "identity").inc()
+                return RangeFileResponse(
+                    asset.path, byte_range, asset.size, asset.media_type, headers
+                )
+
+        STATIC_RESPONSES.labels("200", encoding or "identity").inc()
+        path = asset.variants[encoding] if encoding else asset.path
+        if encoding:
+            headers["content-encoding"] = encoding
+        return FileResponse(
+            path,
+            headers=headers,
+            media_type=asset.media_type,
+            stat_result=os.stat(path),
+            method=method,
+        )
+
+    def _compressible(self, asset: Asset) -> bool:
+        """
+        Check whether a file is worth compressing.
+        """
+        if not self.min_size <= asset.size <= self.max_compress_size:
+            return False
+        extension = os.path.splitext(asset.path)[1].lower()
+        return (
+            asset.media_type.startswith("text/")
+            or asset.media_type in COMPRESSIBLE_TYPES
+            or extension in COMPRESSIBLE_EXTENSIONS
+        )
+
+    def _variant(self, asset: Asset, encoding: str) -> Optional[str]:
+        """
+        Get the compressed variant of a file, compressing it if no current one exists.
+
+        Returns:
+            Optional[str]: The path of the variant, or None if compression does not pay off.
+        """
+        suffix = ".br" if encoding == "br" else ".gz"
+        sibling = asset.path + suffix
+        try:
+            if os.stat(sibling).st_mtime_ns >= asset.mtime_ns:
+                return sibling
+        except OSError:
+            pass
+
+        cached = os.path.join(self.cache_dir, asset.digest + suffix)
+        if os.path.exists(cached):
+            return cached
+        with open(asset.path, "rb") as file:
+            data = file.read()
+        compressed = _compress(data, encoding)
+        if len(compressed) > len(data) * (1 - MIN_SAVING):
+            return None
+        os.makedirs(self.cache_dir, mode=stat.S_IRWXU, exist_ok=True)
+        # write atomically, as other workers may read the same variant
+        fd, temporary = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(compressed)
+            os.replace(temporary, cached)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        logger.debug(
+            "Compressed %s with %s: %d -> %d bytes",
+            asset.path,
+            encoding,
+            len(data),
+            len(compressed),
+        )
+        return cached
+
+    def _lock_for(self, full_path: str) -> threading.Lock:
+        """
+        Get the lock that keeps several threads from compressing the same file.
+        """
+        with self._locks_lock:
+            return self._locks.setdefault(full_path, threading.Lock())
+
+
+class RangeFileResponse(Response):
+    """
+    A 206 Partial Content response with one byte range of a file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        byte_range: Tuple[int, int],
+        size: int,
+        media_type: str,
+        headers: Dict[str, str],
+    ):
+        """
+        Initialize the RangeFileResponse.
+
+        Args:
+            path (str): The path of the file.
+            byte_range (Tuple[int, int]): The first and last byte to send, inclusive.
+            size (int): The size of the file.
+            media_type (str): The content type of the file.
+            headers (Dict[str, str]): Further headers.
+        """
+        self.path = path
+        self.start, self.end = byte_range
+        self.status_code = 206
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(
+            {
+                **headers,
+                "content-range": f"bytes {self.start}-{self.end}/{size}",
+                "content-length": str(self.end - self.start + 1),
+            }
+        )
+
+    async def __call__(self, scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    }
+                )
+        if remaining > 0:
+            # the file shrank while it was sent
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def negotiate_encoding(header: str, encodings: List[str]) -> Optional[str]:
+    """
+    Choose the content encoding a client accepts best.
+
+    Args:
+        header (str): The Accept-Encoding header.
+        encodings (List[str]): The available encodings, preferred first.
+
+    Returns:
+        Optional[str]: The encoding, or None to send the file uncompressed.
+    """
+    weights: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, parameters = part.strip().partition(";")
+        weight = 1.0
+        match = re.search(r"q=([0-9.]+)", parameters)
+        if match:
+            try:
+                weight = float(match.group(1))
+            except ValueError:
+                weight = 0.0
+        if name:
+            weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header with a single byte range.
+
+    Args:
+        header (str): The Range header, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-512".
+        size (int): The size of the file.
+
+    Returns:
+        Optional[Tuple[int, int]]: The first and last byte, inclusive, the whole
+        file for headers that are not single byte ranges, or None if the range
+        is not satisfiable.
+    """
+    match = RANGE.match(header.strip())
+    if match is None or match.groups() == ("", ""):
+        # other units and multiple ranges are answered with the whole file
+        return (0, size - 1) if size else None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _unchanged(asset: Optional[Asset], stat_result: os.stat_result) -> bool:
+    """
+    Check whether a file is still the same as when it was hashed.
+    """
+    return (
+        asset is not None
+        and asset.size == stat_result.st_size
+        and asset.mtime_ns == stat_result.st_mtime_ns
+    )
+
+
+def _hash_file(path: str) -> str:
+    """
+    Get the content hash of a file.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(READ_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    """
+    Compress data with gzip or brotli, at the highest level for files of a few MiB.
+    """
+    if encoding == "br":
+        quality = 11 if len(data) <= 4 * 1024 * 1024 else 5
+        return brotli.compress(data, quality=quality)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _not_modified(request_headers: Headers, headers: Dict[str, str]) -> bool:
+    """
+    Check whether the client's copy is current; If-None-Match takes precedence over If-Modified-Since.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, headers["etag"])
+    since = parsedate(request_headers.get("if-modified-since", ""))
+    modified = parsedate(headers["last-modified"])
+    return since is not None and modified is not None and since >= modified
+
+
+def _if_range_matches(if_range: Optional[str], asset: Asset) -> bool:
+    """
+    Check whether a range may be sent: without If-Range, or if it names the current file.
+    """
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == asset.etag()
+    since = parsedate(if_range)
+    return since is not None and since >= parsedate(
+        formatdate(asset.mtime_ns / 1e9, usegmt=True)
+    )
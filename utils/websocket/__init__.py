@@ -1,11 +1,12 @@
 """
 WebSocket utilities initialization for the DataDiVR-Backend.
 
-This module imports and exposes the WebSocketManager instance for use
-throughout the application.
+This module imports and exposes the WebSocketManager instance and the
+message codec for use throughout the application.
 """
 
+from . import codec
 from .websocket_manager import ws_manager
 
 # Specify which symbols should be accessible when using "from utils.websocket import *"
-__all__ = ["ws_manager"]
+__all__ = ["codec", "ws_manager"]
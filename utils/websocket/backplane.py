@@ -0,0 +1,434 @@
+"""
+Backplane module for WebSocket communication in the DataDiVR-Backend.
+
+This module provides pub/sub backplanes that connect the WebSocketManager
+instances of several worker processes, so broadcasts and client registry
+events reach clients connected to any worker.
+
+Two backends are available:
+
+- InProcessBackplane: connects managers living in the same process. With a
+  single manager it delivers nothing and is the default for single worker setups.
+- UnixSocketBackplane: connects worker processes on the same host over a Unix
+  domain socket. The first worker to take the lock file becomes the hub and
+  relays messages between all other workers; when the hub exits, the remaining
+  workers elect a new one. No external broker is required.
+"""
+
+import abc
+import asyncio
+import os
+import struct
+import uuid
+from typing import Any, Awaitable, Callable, ClassVar, Dict, Optional, Set
+
+from ..custom_logging import logger
+from . import codec
+
+DEFAULT_SOCKET_PATH = "/tmp/datadivr_backplane.sock"
+# Seconds to wait before retrying to connect to or become the hub
+RETRY_DELAY = 0.2
+# Largest message accepted from another worker, in bytes
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+# Workers whose unsent data exceeds this many bytes are disconnected from the hub
+MAX_WRITE_BUFFER = 64 * 1024 * 1024
+
+_HEADER = struct.Struct(">I")
+
+MessageCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """
+    Serialize a backplane message.
+
+    Messages are encoded with MessagePack when it is installed, so binary frames
+    can be relayed, and as JSON otherwise.
+
+    Args:
+        message (Dict[str, Any]): The message to serialize.
+
+    Returns:
+        bytes: The encoded message.
+    """
+    if codec.msgpack is not None:
+        return codec.encode_msgpack(message)
+    return codec.encode(message).encode("utf-8")
+
+
+def decode_message(payload: bytes) -> Dict[str, Any]:
+    """
+    Deserialize a backplane message.
+
+    Args:
+        payload (bytes): The encoded message.
+
+    Returns:
+        Dict[str, Any]: The decoded message.
+    """
+    if codec.msgpack is not None:
+        return codec.decode_msgpack(payload)
+    return codec.decode(payload)
+
+
+class Backplane(abc.ABC):
+    """
+    Base class for backplanes connecting WebSocketManagers.
+
+    Messages are dictionaries with a 'type' field. Every published message is
+    tagged with the publishing worker's ID in its 'origin' field and delivered
+    to the message callback of every other connected worker, in order.
+    Publishing never blocks.
+    """
+
+    def __init__(self):
+        """
+        Initialize the Backplane with a random worker ID.
+        """
+        self.worker_id = uuid.uuid4().hex
+        self.running = False
+        self._on_message: Optional[MessageCallback] = None
+        self._inbox: Optional[asyncio.Queue] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    async def start(self, on_message: MessageCallback):
+        """
+        Connect the backplane and start delivering messages.
+
+        Args:
+            on_message (Callable): Coroutine function called with every message
+                                   received from another worker.
+        """
+        self._on_message = on_message
+        self._inbox = asyncio.Queue()
+        self._dispatch_task = asyncio.get_running_loop().create_task(self._dispatch())
+        self.running = True
+
+    @property
+    def has_peers(self) -> bool:
+        """
+        bool: Whether other workers may currently receive published messages.
+        """
+        return False
+
+    @abc.abstractmethod
+    def publish(self, message: Dict[str, Any]):
+        """
+        Send a message to all other workers without blocking.
+
+        Args:
+            message (Dict[str, Any]): The message to send.
+        """
+
+    async def close(self):
+        """
+        Disconnect the backplane and stop delivering messages.
+        """
+        self.running = False
+        if self._dispatch_task is not None:
+            self._dispatch_task.cancel()
+            self._dispatch_task = None
+
+    def _deliver(self, message: Dict[str, Any]):
+        """
+        Queue a received message for delivery to the message callback.
+
+        Args:
+            message (Dict[str, Any]): The received message.
+        """
+        if self._inbox is not None:
+            self._inbox.put_nowait(message)
+
+    async def _dispatch(self):
+        """
+        Deliver received messages to the message callback one at a time.
+        """
+        while True:
+            message = await self._inbox.get()
+            try:
+                await self._on_message(message)
+            except Exception:
+                logger.exception(
+                    "Error handling backplane message of type %s", message.get("type")
+                )
+
+
+class InProcessBackplane(Backplane):
+    """
+    Backplane connecting managers that live in the same process.
+
+    All started instances using the same channel name receive each other's
+    messages. Messages are serialized on publish, exactly as they would be
+    between processes.
+    """
+
+    _channels: ClassVar[Dict[str, Set["InProcessBackplane"]]] = {}
+
+    def __init__(self, channel: str = "default"):
+        """
+        Initialize the InProcessBackplane.
+
+        Args:
+            channel (str, optional): Name of the channel to join. Defaults to "default".
+        """
+        super().__init__()
+        self.channel = channel
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, on_message: MessageCallback):
+        await super().start(on_message)
+        self._loop = asyncio.get_running_loop()
+        self._channels.setdefault(self.channel, set()).add(self)
+        self._deliver({"type": "connected", "origin": self.worker_id})
+
+    @property
+    def has_peers(self) -> bool:
+        return self.running and len(self._channels.get(self.channel, ())) > 1
+
+    def publish(self, message: Dict[str, Any]):
+        if not self.running:
+            return
+        payload = encode_message({**message, "origin": self.worker_id})
+        for peer in self._channels.get(self.channel, ()):
+            if peer is not self:
+                peer._loop.call_soon_threadsafe(peer._deliver, decode_message(payload))
+
+    async def close(self):
+        peers = self._channels.get(self.channel)
+        if peers is not None:
+            peers.discard(self)
+            if not peers:
+                del self._channels[self.channel]
+        await super().close()
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    """
+    Read one length-prefixed message from a stream.
+
+    Args:
+        reader (asyncio.StreamReader): The stream to read from.
+
+    Returns:
+        bytes: The encoded message.
+
+    Raises:
+        asyncio.IncompleteReadError: If the stream ended.
+        ValueError: If the announced message is larger than MAX_MESSAGE_SIZE.
+    """
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Backplane message of {length} bytes is too large")
+    return await reader.readexactly(length)
+
+
+class UnixSocketBackplane(Backplane):
+    """
+    Backplane connecting worker processes on one host over a Unix domain socket.
+
+    The workers elect a hub by taking an exclusive lock on '<path>.lock'. The hub
+    listens on the socket, relays every message it receives to all other workers
+    and tells them when a worker disconnects. All other workers connect to the
+    hub and re-run the election when the connection is lost.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET_PATH):
+        """
+        Initialize the UnixSocketBackplane.
+
+        Args:
+            path (str, optional): Path of the Unix domain socket shared by all workers.
+                                  Defaults to /tmp/datadivr_backplane.sock.
+        """
+        super().__init__()
+        self.path = path
+        self.is_hub = False
+        self._lock_file = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._spokes: Dict[asyncio.StreamWriter, Optional[str]] = {}
+        self._hub_writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self, on_message: MessageCallback):
+        await super().start(on_message)
+        await self._elect()
+
+    async def _elect(self):
+        """
+        Become the hub if the lock is free, otherwise connect to the current hub.
+        """
+        while not self._closing:
+            if self._try_lock():
+                await self._serve()
+                return
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # the hub holds the lock but is not listening yet
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            self._hub_writer = writer
+            self._reader_task = asyncio.get_running_loop().create_task(
+                self._read_from_hub(reader, writer)
+            )
+            logger.info("Backplane worker %s connected to hub", self.worker_id)
+            self._deliver({"type": "connected", "origin": self.worker_id})
+            return
+
+    def _try_lock(self) -> bool:
+        """
+        Try to take the hub lock without blocking.
+
+        Returns:
+            bool: True if this worker now holds the lock.
+        """
+        import fcntl
+
+        lock_file = open(f"{self.path}.lock", "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def _serve(self):
+        """
+        Listen on the socket as the hub.
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left behind by a hub that exited
+        self._server = await asyncio.start_unix_server(
+            self._handle_spoke, path=self.path
+        )
+        self.is_hub = True
+        logger.info("Backplane worker %s is the hub at %s", self.worker_id, self.path)
+        self._deliver({"type": "connected", "origin": self.worker_id})
+
+    async def _handle_spoke(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Relay the messages of one connected worker.
+
+        Args:
+            reader (asyncio.StreamReader): The stream of the worker's messages.
+            writer (asyncio.StreamWriter): The stream to the worker.
+        """
+        self._spokes[writer] = None
+        try:
+            while True:
+                payload = await _read_frame(reader)
+                message = decode_message(payload)
+                self._spokes[writer] = message.get("origin")
+                self._send_to_spokes(_HEADER.pack(len(payload)) + payload, writer)
+                self._deliver(message)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            if not isinstance(e, asyncio.IncompleteReadError):
+                logger.warning("Backplane connection to worker failed: %s", e)
+        finally:
+            origin = self._spokes.pop(writer, None)
+            writer.close()
+            if origin is not None and not self._closing:
+                logger.info("Backplane worker %s disconnected", origin)
+                message = {"type": "worker_left", "worker_id": origin}
+                self.publish(message)
+                self._deliver({**message, "origin": self.worker_id})
+
+    async def _read_from_hub(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Deliver the messages relayed by the hub and re-elect when it goes away.
+
+        Args:
+            reader (asyncio.StreamReader): The stream of the hub's messages.
+            writer (asyncio.StreamWriter): The stream to the hub.
+        """
+        try:
+            while True:
+                self._deliver(decode_message(await _read_frame(reader)))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._hub_writer = None
+            writer.close()
+        if not self._closing:
+            logger.warning("Backplane hub disconnected, electing a new hub")
+            await self._elect()
+
+    def _send_to_spokes(self, frame: bytes, exclude=None):
+        """
+        Write a frame to all connected workers, dropping workers that fall behind.
+
+        Args:
+            frame (bytes): The length-prefixed message.
+            exclude (asyncio.StreamWriter, optional): A worker not to send the frame to.
+        """
+        for writer in list(self._spokes):
+            if writer is exclude:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                logger.warning("Backplane worker is not reading, disconnecting it")
+                writer.close()
+                continue
+            writer.write(frame)
+
+    @property
+    def has_peers(self) -> bool:
+        if not self.running:
+            return False
+        return bool(self._spokes) if self.is_hub else self._hub_writer is not None
+
+    def publish(self, message: Dict[str, Any]):
+        if not self.running:
+            return
+        payload = encode_message({**message, "origin": self.worker_id})
+        frame = _HEADER.pack(len(payload)) + payload
+        if self.is_hub:
+            self._send_to_spokes(frame)
+        elif self._hub_writer is not None:
+            self._hub_writer.write(frame)
+        else:
+            logger.warning(
+                "Backplane not connected, dropping %s message", message.get("type")
+            )
+
+    async def close(self):
+        self._closing = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._hub_writer is not None:
+            self._hub_writer.close()
+        for writer in list(self._spokes):
+            writer.close()
+        if self._server is not None:
+            self._server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the lock
+            self._lock_file = None
+        self.is_hub = False
+        await super().close()
+
+
+def create_backplane() -> Backplane:
+    """
+    Create the backplane selected by the environment.
+
+    The WS_BACKPLANE environment variable selects the backend ('inprocess',
+    the default, or 'unix'); WS_BACKPLANE_PATH sets the socket path of the
+    'unix' backend.
+
+    Returns:
+        Backplane: A new, not yet started backplane.
+    """
+    kind = os.getenv("WS_BACKPLANE", "inprocess").lower()
+    if kind == "unix":
+        return UnixSocketBackplane(os.getenv("WS_BACKPLANE_PATH", DEFAULT_SOCKET_PATH))
+    if kind != "inprocess":
+        logger.warning("Unknown WS_BACKPLANE %r, using the in-process backplane", kind)
+    return InProcessBackplane()
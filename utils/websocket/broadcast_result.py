@@ -0,0 +1,50 @@
+"""
+Broadcast result module for WebSocket communication in the DataDiVR-Backend.
+
+This module defines the BroadcastResult class, which records the per-client
+outcome of a single broadcast in the DataDiVR-Backend system.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+@dataclass
+class BroadcastResult:
+    """
+    Represents the outcome of broadcasting one message to multiple clients.
+
+    Attributes:
+        delivered (List[str]): IDs of the clients the message was queued for.
+        failed (Dict[str, str]): Maps IDs of clients the message could not be queued
+                                 for to a short description of the failure.
+        skipped (List[str]): IDs of clients that were intentionally left out,
+                             e.g. the sender of the message.
+        duration (float): Wall-clock time spent on the broadcast in seconds.
+    """
+
+    delivered: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def delivered_count(self) -> int:
+        """
+        int: The number of clients the message was queued for.
+        """
+        return len(self.delivered)
+
+    @property
+    def failed_count(self) -> int:
+        """
+        int: The number of clients the message could not be queued for.
+        """
+        return len(self.failed)
+
+    @property
+    def recipients(self) -> int:
+        """
+        int: The number of clients a send was attempted for.
+        """
+        return len(self.delivered) + len(self.failed)
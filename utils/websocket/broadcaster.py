@@ -5,11 +5,15 @@ This module provides a Broadcaster class for sending messages to multiple
 WebSocket clients in the DataDiVR-Backend system.
 """
 
-from typing import Any, Callable, Dict, List
-
-from websockets.exceptions import ConnectionClosed
+import time
+from typing import Any, Callable, Dict, List, Optional
 
 from ..custom_logging import logger
+from ..metrics import WS_BROADCAST_DURATION, WS_BROADCAST_RECIPIENTS
+from . import codec
+from .broadcast_result import BroadcastResult
+from .codec import EncodedMessage
+from .outbound_queue import send_frame
 
 
 class Broadcaster:
@@ -17,7 +21,9 @@ class Broadcaster:
     Manages broadcasting of messages to multiple WebSocket clients.
 
     This class provides functionality to send messages to all connected clients
-    or a subset of clients, with options to exclude specific clients.
+    or a subset of clients, with options to exclude specific clients. Each message
+    is serialized once and the resulting frame is put into the outbound queue of
+    every recipient, so a slow client does not delay delivery to the others.
     """
 
     def __init__(self, get_client_info: Callable):
@@ -34,12 +40,15 @@ class Broadcaster:
         data: Dict[Any, Any],
         clients: List[Any],
         include_sender: bool = False,
-    ):
+    ) -> BroadcastResult:
         """
         Broadcast a message to multiple clients.
 
-        This method sends the provided data to all specified clients, with an option
-        to exclude the sender of the message.
+        This method serializes the provided data once per wire protocol in use and
+        queues the resulting frames for all specified clients, with an option to
+        exclude the sender of the message.
+        The frames are written by each client's writer task, which applies the
+        per-send timeout.
 
         Args:
             data (Dict[Any, Any]): The message data to be broadcast.
@@ -47,28 +56,68 @@ class Broadcaster:
             include_sender (bool, optional): Whether to include the sender in the broadcast. Defaults to False.
 
         Returns:
-            int: The number of clients the message was successfully sent to.
+            BroadcastResult: The per-client outcome of the broadcast.
+        """
+        return self.broadcast_encoded(
+            EncodedMessage(data),
+            clients,
+            key=data.get("event"),
+            sender_id=data.get("sender_id"),
+            include_sender=include_sender,
+        )
+
+    def broadcast_encoded(
+        self,
+        message: EncodedMessage,
+        clients: List[Any],
+        key: Optional[str] = None,
+        sender_id: Optional[str] = None,
+        include_sender: bool = False,
+    ) -> BroadcastResult:
+        """
+        Queue a message for multiple clients, in the wire protocol of each client.
+
+        Args:
+            message (EncodedMessage): The message, encoded at most once per protocol.
+            clients (List[Any]): A list of client objects to broadcast to.
+            key (Optional[str], optional): The event name, used to coalesce queued frames.
+            sender_id (Optional[str], optional): The ID of the client that sent the message.
+            include_sender (bool, optional): Whether to include the sender in the broadcast. Defaults to False.
+
+        Returns:
+            BroadcastResult: The per-client outcome of the broadcast.
         """
-        sender_id = data.get("sender_id")
-        successful_broadcasts = 0
+        start_time = time.perf_counter()
+        result = BroadcastResult()
 
         for client in clients:
-            client_id = self.get_client_info(client.websocket)["client_id"]
-            if client_id != sender_id or include_sender:
-                try:
-                    await client.websocket.send_json(data)
-                    successful_broadcasts += 1
-                except ConnectionClosed:
-                    logger.warning(
-                        f"Failed to send message to client {client_id}: Connection closed"
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Error sending message to client {client_id}: {str(e)}"
-                    )
-
-        logger.debug(f"Broadcast message to {successful_broadcasts} clients")
-        return successful_broadcasts
-
-    async def send_message(self, websocket, data):
-        await websocket.send_json(data)
+            if client.client_id == sender_id and not include_sender:
+                result.skipped.append(client.client_id)
+            elif client.outbound.put(message.frame(client.protocol), key=key):
+                result.delivered.append(client.client_id)
+            elif client.outbound.closed:
+                result.failed[client.client_id] = "Connection closed"
+            else:
+                result.failed[client.client_id] = "Outbound queue full"
+
+        result.duration = time.perf_counter() - start_time
+        WS_BROADCAST_RECIPIENTS.observe(result.delivered_count)
+        WS_BROADCAST_DURATION.observe(result.duration)
+        logger.debug(
+            "Broadcast message to %d clients (%d failed) in %.5f seconds",
+            result.delivered_count,
+            result.failed_count,
+            result.duration,
+        )
+        return result
+
+    async def send_message(self, websocket, data: Dict[Any, Any], protocol="json"):
+        """
+        Encode a message and send it directly to a single WebSocket.
+
+        Args:
+            websocket (WebSocket): The WebSocket connection to send on.
+            data (Dict[Any, Any]): The message data.
+            protocol (str, optional): The wire protocol to encode with. Defaults to "json".
+        """
+        await send_frame(websocket, codec.encode_frame(data, protocol))
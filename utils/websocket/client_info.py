@@ -5,10 +5,14 @@ This module defines the ClientInfo class, which represents the information
 associated with a connected WebSocket client in the DataDiVR-Backend system.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Optional, Set
 
 from fastapi import WebSocket
 
+from .outbound_queue import OutboundQueue
+from .session import Session
+
 
 @dataclass
 class ClientInfo:
@@ -17,14 +21,32 @@ class ClientInfo:
 
     This dataclass stores essential information about a client connected
     to the DataDiVR-Backend via WebSocket, including the WebSocket connection,
-    client ID, and the client's assigned name.
+    client ID, the client's assigned name, the rooms the client has joined and
+    the queue of frames waiting to be sent to the client.
 
     Attributes:
         websocket (WebSocket): The WebSocket connection object for the client.
         client_id (str): A unique identifier for the client.
         first_name (str): The assigned name for the client.
+        outbound (OutboundQueue): The bounded queue of frames waiting to be written
+                                  to the client. A queue with default settings is
+                                  created if none is given.
+        rooms (Set[str]): The names of the rooms the client has joined.
+        protocol (str): The wire protocol negotiated by the client, "json" or "msgpack".
+        session (Optional[Session]): The client's resumable session, if it has one.
+        view (Optional[Any]): What the client received of the project it views, a
+                              ViewState, if it sent a 'view' event.
     """
 
     websocket: WebSocket
     client_id: str
     first_name: str
+    outbound: Optional[OutboundQueue] = None
+    rooms: Set[str] = field(default_factory=set)
+    protocol: str = "json"
+    session: Optional[Session] = None
+    view: Optional[Any] = None
+
+    def __post_init__(self):
+        if self.outbound is None:
+            self.outbound = OutboundQueue(self.websocket, client_id=self.client_id)
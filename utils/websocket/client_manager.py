@@ -2,17 +2,35 @@
 Client management module for WebSocket connections in the DataDiVR-Backend.
 
 This module provides a ClientManager class to handle client connections,
-including adding, removing, and retrieving client information.
+including adding, removing, and retrieving client information, and the
+membership of clients in rooms.
 """
 
+import os
 import uuid
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from fastapi import WebSocket
 
 from ..custom_logging import logger
 from ..names import name_manager
+from . import codec
 from .client_info import ClientInfo
+from .outbound_queue import DEFAULT_QUEUE_SIZE, OutboundQueue, OverflowPolicy
+from .session import Session, SessionManager
+
+
+def is_valid_room(room: Any) -> bool:
+    """
+    Check whether a value sent by a client can name a room.
+
+    Args:
+        room (Any): The value.
+
+    Returns:
+        bool: True if the value is a non-empty string.
+    """
+    return isinstance(room, str) and bool(room)
 
 
 class ClientManager:
@@ -20,15 +38,43 @@ class ClientManager:
     Manages WebSocket client connections for the DataDiVR-Backend.
 
     This class keeps track of connected clients, their WebSocket connections,
-    and associated information such as client IDs and names.
+    and associated information such as client IDs and names. It also keeps an
+    index from room names to the IDs of their members, so messages for a room
+    can be delivered without scanning all connected clients. Clients connected
+    to other worker processes are tracked separately as remote clients, so names
+    stay unique across workers. Clients with a resumable session keep their ID,
+    name and rooms when they reconnect within the session's time to live.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        overflow_policy: Optional[OverflowPolicy] = None,
+    ):
         """
         Initialize the ClientManager with empty dictionaries for client tracking.
+
+        Args:
+            queue_size (Optional[int], optional): Capacity of each client's outbound queue.
+                Defaults to the WS_QUEUE_SIZE environment variable or 256.
+            overflow_policy (Optional[OverflowPolicy], optional): What a full outbound queue
+                does with new frames. Defaults to the WS_OVERFLOW_POLICY environment
+                variable or drop_oldest.
         """
         self.connected_clients: Dict[str, ClientInfo] = {}
         self._client_lookup: Dict[WebSocket, str] = {}
+        self._rooms: Dict[str, Set[str]] = {}
+        # client_id -> (worker_id, first_name) of clients connected to other workers
+        self.remote_clients: Dict[str, Tuple[str, str]] = {}
+        self.queue_size = queue_size or int(
+            os.getenv("WS_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)
+        )
+        self.overflow_policy = OverflowPolicy(
+            overflow_policy
+            or os.getenv("WS_OVERFLOW_POLICY", OverflowPolicy.DROP_OLDEST.value)
+        )
+        self.sessions = SessionManager(on_expire=self._session_expired)
+        self._room_listeners: List[Callable[[str], None]] = []
 
     def get_client_info(self, websocket: WebSocket) -> Dict[str, Any]:
         """
@@ -47,40 +93,136 @@ class ClientManager:
             return {"client_id": client_id, "first_name": client_info.first_name}
         return {"client_id": None, "first_name": None}
 
-    def add_client(self, client: WebSocket) -> str:
+    def get_client(self, websocket: WebSocket) -> Optional[ClientInfo]:
+        """
+        Retrieve the ClientInfo for a given WebSocket connection.
+
+        Args:
+            websocket (WebSocket): The WebSocket connection to look up.
+
+        Returns:
+            Optional[ClientInfo]: The client's information, or None if the client is not found.
+        """
+        client_id = self._client_lookup.get(websocket)
+        if client_id:
+            return self.connected_clients[client_id]
+        return None
+
+    def add_client(
+        self,
+        client: WebSocket,
+        resumable: bool = False,
+        resume_token: Optional[str] = None,
+        last_seq: int = 0,
+    ) -> str:
         """
         Add a new client to the manager and assign a unique name.
 
+        A client presenting the token of a disconnected session gets back the
+        session's ID, name, protocol and rooms, and the frames recorded after
+        last_seq are queued for it. Otherwise it is added as a new client.
+
         Args:
             client (WebSocket): The WebSocket connection of the new client.
+            resumable (bool, optional): Start a resumable session for the client. Defaults to False.
+            resume_token (Optional[str], optional): The token of the session to resume.
+            last_seq (int, optional): The sequence number of the last frame the
+                                      client received in that session. Defaults to 0.
 
         Returns:
             str: The unique client ID assigned to the new client.
         """
-        client_id = str(uuid.uuid4())
-        used_names = {
-            client_info.first_name for client_info in self.connected_clients.values()
-        }
-        first_name = name_manager.get_unique_name(used_names)
+        session = self.sessions.resume(resume_token) if resume_token else None
+        if session is not None:
+            client_id, first_name = session.client_id, session.first_name
+        else:
+            client_id = str(uuid.uuid4())
+            used_names = {
+                client_info.first_name
+                for client_info in self.connected_clients.values()
+            }
+            used_names.update(name for _, name in self.remote_clients.values())
+            used_names.update(self.sessions.reserved_names())
+            first_name = name_manager.get_unique_name(used_names)
+        outbound = OutboundQueue(
+            client,
+            maxsize=self.queue_size,
+            policy=self.overflow_policy,
+            client_id=client_id,
+        )
         self.connected_clients[client_id] = ClientInfo(
-            websocket=client, client_id=client_id, first_name=first_name
+            websocket=client,
+            client_id=client_id,
+            first_name=first_name,
+            outbound=outbound,
         )
         self._client_lookup[client] = client_id
-        logger.info("New client connected. ID: %s, Name: %s", client_id, first_name)
+
+        if session is not None:
+            self._resume_session(self.connected_clients[client_id], session, last_seq)
+            logger.info(
+                "Client resumed session. ID: %s, Name: %s", client_id, first_name
+            )
+        else:
+            if resumable or resume_token:
+                session = self.sessions.create(client_id, first_name)
+                self.connected_clients[client_id].session = session
+                outbound.history = session.history
+            logger.info("New client connected. ID: %s, Name: %s", client_id, first_name)
         logger.debug("Total connected clients: %d", len(self.connected_clients))
         return client_id
 
-    def remove_client(self, client_id: str):
+    def _resume_session(self, client_info: ClientInfo, session: Session, last_seq: int):
+        """
+        Restore the state of a resumed session and queue the frames the client missed.
+        """
+        client_info.session = session
+        client_info.protocol = session.protocol
+        client_info.outbound.history = session.history
+        for room in session.rooms:
+            self.join_room(client_info.client_id, room)
+
+        frames, session.replay_complete = session.history.since(last_seq)
+        session.resumed = True
+        for frame in frames:
+            client_info.outbound.put(frame, sequenced=True)
+        logger.debug(
+            "Replayed %d frames to client %s (complete: %s)",
+            len(frames),
+            client_info.client_id,
+            session.replay_complete,
+        )
+
+    def remove_client(self, client_id: str, websocket: Optional[WebSocket] = None):
         """
         Remove a client from the manager.
 
+        The session of a client with a resumable session is kept, so the client
+        can resume it when it reconnects.
+
         Args:
             client_id (str): The unique ID of the client to remove.
+            websocket (Optional[WebSocket], optional): Only remove the client if it is
+                still connected through this WebSocket, not through a newer
+                connection that resumed its session.
         """
-        if client_id in self.connected_clients:
-            client_info = self.connected_clients[client_id]
+        client_info = self.connected_clients.get(client_id)
+        if (
+            websocket is not None
+            and client_info is not None
+            and client_info.websocket is not websocket
+        ):
+            return
+        if client_info is not None:
+            if client_info.session is not None:
+                self.sessions.detach(
+                    client_info.session, client_info.rooms, client_info.protocol
+                )
             del self.connected_clients[client_id]
             del self._client_lookup[client_info.websocket]
+            for room in list(client_info.rooms):
+                self._remove_from_room(client_info, room)
+            client_info.outbound.close()
             logger.info(
                 "Client disconnected. ID: %s, Name: %s",
                 client_id,
@@ -98,3 +240,214 @@ class ClientManager:
             List[ClientInfo]: A list of ClientInfo objects representing all connected clients.
         """
         return list(self.connected_clients.values())
+
+    def is_member(self, client_id: str, room: Any) -> bool:
+        """
+        Check whether a client is a member of a room.
+
+        Args:
+            client_id (str): The unique ID of the client.
+            room (Any): The name of the room, as sent by a client.
+
+        Returns:
+            bool: True if the room is valid and the client has joined it.
+        """
+        client_info = self.connected_clients.get(client_id)
+        return (
+            client_info is not None
+            and is_valid_room(room)
+            and room in client_info.rooms
+        )
+
+    def join_room(self, client_id: str, room: str) -> bool:
+        """
+        Add a client to a room, creating the room if it does not exist.
+
+        Args:
+            client_id (str): The unique ID of the client.
+            room (str): The name of the room to join.
+
+        Returns:
+            bool: True if the client joined the room, False if the client is unknown
+                  or already a member.
+        """
+        client_info = self.connected_clients.get(client_id)
+        if client_info is None:
+            logger.warning(
+                "Attempted to add non-existent client %s to room %s", client_id, room
+            )
+            return False
+        if room in client_info.rooms:
+            return False
+        client_info.rooms.add(room)
+        self._rooms.setdefault(room, set()).add(client_id)
+        logger.debug(
+            "Client %s joined room %s (%d members)",
+            client_id,
+            room,
+            len(self._rooms[room]),
+        )
+        return True
+
+    def leave_room(self, client_id: str, room: str) -> bool:
+        """
+        Remove a client from a room. Empty rooms are discarded.
+
+        Args:
+            client_id (str): The unique ID of the client.
+            room (str): The name of the room to leave.
+
+        Returns:
+            bool: True if the client left the room, False if it was not a member.
+        """
+        client_info = self.connected_clients.get(client_id)
+        if client_info is None or room not in client_info.rooms:
+            return False
+        self._remove_from_room(client_info, room)
+        logger.debug("Client %s left room %s", client_id, room)
+        return True
+
+    def _remove_from_room(self, client_info: ClientInfo, room: str):
+        """
+        Remove a client from a room's member index.
+
+        Args:
+            client_info (ClientInfo): The client to remove.
+            room (str): The name of the room.
+        """
+        client_info.rooms.discard(room)
+        members = self._rooms.get(room)
+        if members is not None:
+            members.discard(client_info.client_id)
+            if not members:
+                del self._rooms[room]
+                self._room_maybe_released(room)
+
+    def add_room_listener(self, listener: Callable[[str], None]):
+        """
+        Call a function whenever a room is released.
+
+        A room is released when its last member left and no disconnected client
+        that may resume its session was in it, so the data kept for the room,
+        e.g. its scene state, can be discarded.
+
+        Args:
+            listener (Callable): A function taking the name of the room.
+        """
+        self._room_listeners.append(listener)
+
+    def has_room(self, room: str) -> bool:
+        """
+        Check whether a room has members or disconnected clients that may rejoin it.
+
+        Args:
+            room (str): The name of the room.
+
+        Returns:
+            bool: True if the room is in use on this worker.
+        """
+        return room in self._rooms or room in self.sessions.reserved_rooms()
+
+    def _room_maybe_released(self, room: str):
+        """
+        Notify the room listeners if a room is no longer in use.
+        """
+        if self.has_room(room):
+            return
+        logger.debug("Room %s released", room)
+        for listener in self._room_listeners:
+            listener(room)
+
+    def _session_expired(self, session: Session):
+        """
+        Release the rooms a disconnected client will no longer rejoin.
+        """
+        for room in session.rooms:
+            self._room_maybe_released(room)
+
+    def get_room_clients(self, room: str) -> List[ClientInfo]:
+        """
+        Retrieve the clients that are members of a room.
+
+        Args:
+            room (str): The name of the room.
+
+        Returns:
+            List[ClientInfo]: The members of the room, empty if the room does not exist.
+        """
+        return [
+            self.connected_clients[client_id] for client_id in self._rooms.get(room, ())
+        ]
+
+    def get_rooms(self) -> Dict[str, int]:
+        """
+        Retrieve all rooms that currently have members.
+
+        Returns:
+            Dict[str, int]: Maps room names to their number of members.
+        """
+        return {room: len(members) for room, members in self._rooms.items()}
+
+    def set_protocol(self, client_id: str, protocol: str) -> bool:
+        """
+        Set the wire protocol used for messages to a client.
+
+        Args:
+            client_id (str): The unique ID of the client.
+            protocol (str): "json" or, if msgpack is installed, "msgpack".
+
+        Returns:
+            bool: True if the protocol was set, False if the client is unknown or the
+                  protocol is not supported.
+        """
+        client_info = self.connected_clients.get(client_id)
+        if client_info is None or protocol not in codec.available_protocols():
+            return False
+        client_info.protocol = protocol
+        logger.debug("Client %s uses protocol %s", client_id, protocol)
+        return True
+
+    def add_remote_client(self, worker_id: str, client_id: str, first_name: str):
+        """
+        Record a client connected to another worker process.
+
+        Args:
+            worker_id (str): The ID of the worker the client is connected to.
+            client_id (str): The unique ID of the client.
+            first_name (str): The name assigned to the client.
+        """
+        self.remote_clients[client_id] = (worker_id, first_name)
+
+    def remove_remote_client(self, client_id: str):
+        """
+        Forget a client connected to another worker process.
+
+        Args:
+            client_id (str): The unique ID of the client.
+        """
+        self.remote_clients.pop(client_id, None)
+
+    def remove_remote_worker(self, worker_id: str):
+        """
+        Forget all clients connected to a worker process that went away.
+
+        Args:
+            worker_id (str): The ID of the worker.
+        """
+        self.remote_clients = {
+            client_id: entry
+            for client_id, entry in self.remote_clients.items()
+            if entry[0] != worker_id
+        }
+
+    def get_queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve the outbound queue counters of all connected clients.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Maps client IDs to their queue depth and drop counters.
+        """
+        return {
+            client_id: client_info.outbound.stats()
+            for client_id, client_info in self.connected_clients.items()
+        }
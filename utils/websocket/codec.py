@@ -0,0 +1,410 @@
+"""
+Codec module for WebSocket communication in the DataDiVR-Backend.
+
+This module provides the functions all inbound and outbound WebSocket messages
+are encoded and decoded with. Two wire protocols are supported:
+
+- "json": JSON text frames. Uses orjson when it is installed and falls back to
+  the standard library json module otherwise.
+- "msgpack": MessagePack binary frames, available when msgpack is installed.
+  Float32Array values are carried as raw little-endian float32 bytes in a
+  MessagePack extension type, so bulk node data is not converted to text.
+
+Already encoded JSON can be wrapped in RawJSON and placed in the top level of
+an outgoing message, in which case it is copied into the frame as-is instead
+of being decoded and encoded again.
+"""
+
+import json
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+#: Name of the JSON backend in use, "orjson" or "json"
+BACKEND = "orjson" if orjson is not None else "json"
+
+JSON = "json"
+MSGPACK = "msgpack"
+#: MessagePack extension type code of little-endian float32 arrays
+FLOAT32_ARRAY_EXT = 1
+
+Frame = Union[str, bytes]
+
+
+class RawJSON(str):
+    """
+    A string that already holds an encoded JSON value.
+
+    Values of this type at the top level of a message passed to encode() are
+    inserted into the frame verbatim.
+    """
+
+    __slots__ = ()
+
+
+class Float32Array:
+    """
+    An array of 32-bit floats, e.g. node positions or colors.
+
+    JSON clients receive the values as a list of numbers; MessagePack clients
+    receive the raw little-endian float32 bytes.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: Iterable[float] = ()):
+        """
+        Initialize the Float32Array.
+
+        Args:
+            values (Iterable[float], optional): The values of the array.
+        """
+        self.values = values if isinstance(values, array) else array("f", values)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Float32Array":
+        """
+        Create an array from little-endian float32 bytes.
+
+        Args:
+            data (bytes): The encoded values.
+
+        Returns:
+            Float32Array: The decoded array.
+        """
+        values = array("f")
+        values.frombytes(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return cls(values)
+
+    def to_bytes(self) -> bytes:
+        """
+        Encode the values as little-endian float32 bytes.
+
+        Returns:
+            bytes: The encoded values.
+        """
+        if sys.byteorder == "big":
+            swapped = array("f", self.values)
+            swapped.byteswap()
+            return swapped.tobytes()
+        return self.values.tobytes()
+
+    def tolist(self) -> List[float]:
+        """
+        Get the values as a list of Python floats.
+
+        Returns:
+            List[float]: The values of the array.
+        """
+        return self.values.tolist()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Float32Array):
+            return self.values == other.values
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Float32Array({len(self.values)} values)"
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Float32Array):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_stdlib(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def _dumps(data: Any) -> str:
+        try:
+            return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS).decode(
+                "utf-8"
+            )
+        except TypeError:
+            # e.g. integers larger than 64 bits, which the json module supports
+            return _dumps_stdlib(data)
+
+    def _loads(payload: Union[str, bytes]) -> Any:
+        return orjson.loads(payload)
+
+else:  # pragma: no cover - depends on the environment
+    _dumps = _dumps_stdlib
+
+    def _loads(payload: Union[str, bytes]) -> Any:
+        return json.loads(payload)
+
+
+def available_protocols() -> List[str]:
+    """
+    Get the wire protocols supported in this environment.
+
+    Returns:
+        List[str]: The protocol names, "json" first.
+    """
+    return [JSON, MSGPACK] if msgpack is not None else [JSON]
+
+
+def encode(data: Any) -> str:
+    """
+    Encode a message to a JSON text frame.
+
+    RawJSON values at the top level of a dictionary are inserted verbatim.
+
+    Args:
+        data (Any): The message to encode.
+
+    Returns:
+        str: The encoded frame.
+    """
+    if isinstance(data, RawJSON):
+        return str(data)
+    if isinstance(data, dict):
+        raw_items = [(k, v) for k, v in data.items() if isinstance(v, RawJSON)]
+        if raw_items:
+            return _encode_with_raw(data, raw_items)
+    return _dumps(data)
+
+
+def _encode_with_raw(data: Dict[Any, Any], raw_items) -> str:
+    """
+    Encode a dictionary, splicing its RawJSON values into the frame.
+
+    Args:
+        data (Dict[Any, Any]): The message to encode.
+        raw_items (List[Tuple[Any, RawJSON]]): The keys and values to splice.
+
+    Returns:
+        str: The encoded frame.
+    """
+    encoded = _dumps({k: v for k, v in data.items() if not isinstance(v, RawJSON)})
+    parts = [encoded[:-1]]
+    separator = "," if len(encoded) > 2 else ""
+    for key, raw in raw_items:
+        parts.append(f"{separator}{_dumps(str(key))}:{raw}")
+        separator = ","
+    parts.append("}")
+    return "".join(parts)
+
+
+def decode(payload: Union[str, bytes]) -> Any:
+    """
+    Decode a JSON text or binary frame.
+
+    Args:
+        payload (Union[str, bytes]): The received frame.
+
+    Returns:
+        Any: The decoded message.
+
+    Raises:
+        ValueError: If the frame is not valid JSON.
+    """
+    return _loads(payload)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, Float32Array):
+        return msgpack.ExtType(FLOAT32_ARRAY_EXT, obj.to_bytes())
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == FLOAT32_ARRAY_EXT:
+        return Float32Array.from_bytes(data)
+    return msgpack.ExtType(code, data)
+
+
+def encode_msgpack(data: Any) -> bytes:
+    """
+    Encode a message to a MessagePack binary frame.
+
+    RawJSON values at the top level of a dictionary are decoded first.
+
+    Args:
+        data (Any): The message to encode.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    if isinstance(data, RawJSON):
+        data = decode(str(data))
+    elif isinstance(data, dict) and any(isinstance(v, RawJSON) for v in data.values()):
+        data = {
+            k: decode(str(v)) if isinstance(v, RawJSON) else v for k, v in data.items()
+        }
+    return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+def decode_msgpack(payload: bytes) -> Any:
+    """
+    Decode a MessagePack binary frame.
+
+    Args:
+        payload (bytes): The received frame.
+
+    Returns:
+        Any: The decoded message.
+
+    Raises:
+        ValueError: If the frame is not valid MessagePack.
+    """
+    try:
+        return msgpack.unpackb(
+            payload, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False
+        )
+    except (msgpack.UnpackException, msgpack.ExtraData) as e:
+        raise ValueError(f"Invalid MessagePack frame: {e}") from e
+
+
+def encode_frame(data: Any, protocol: str = JSON) -> Frame:
+    """
+    Encode a message for a wire protocol.
+
+    Args:
+        data (Any): The message to encode.
+        protocol (str, optional): "json" or "msgpack". Defaults to "json".
+
+    Returns:
+        Union[str, bytes]: A text frame for JSON, a binary frame for MessagePack.
+    """
+    if protocol == MSGPACK:
+        return encode_msgpack(data)
+    return encode(data)
+
+
+def decode_frame(payload: Frame, protocol: str = JSON) -> Any:
+    """
+    Decode a received frame.
+
+    Text frames are always JSON. Binary frames are MessagePack if the sender
+    negotiated that protocol and UTF-8 encoded JSON otherwise.
+
+    Args:
+        payload (Union[str, bytes]): The received frame.
+        protocol (str, optional): The protocol negotiated by the sender. Defaults to "json".
+
+    Returns:
+        Any: The decoded message.
+
+    Raises:
+        ValueError: If the frame cannot be decoded.
+    """
+    if isinstance(payload, bytes) and protocol == MSGPACK:
+        return decode_msgpack(payload)
+    return decode(payload)
+
+
+def add_sequence_number(frame: Frame, seq: int) -> Frame:
+    """
+    Add a 'seq' field to an encoded message without decoding it.
+
+    The field is inserted at the start of the top-level object, so a frame
+    shared by many recipients can be numbered for each of them cheaply.
+
+    Args:
+        frame (Union[str, bytes]): A frame holding a JSON object or a MessagePack map.
+        seq (int): The sequence number.
+
+    Returns:
+        Union[str, bytes]: The frame with the sequence number.
+
+    Raises:
+        ValueError: If the frame does not hold an object.
+    """
+    if isinstance(frame, str):
+        if not frame.startswith("{"):
+            raise ValueError("Can only number frames holding a JSON object")
+        separator = "" if frame[1:].lstrip().startswith("}") else ","
+        return f'{{"seq":{seq}{separator}{frame[1:]}'
+
+    # MessagePack: increment the map size in the header, then prepend the field
+    marker = frame[0]
+    if 0x80 <= marker <= 0x8F:
+        size, body = marker & 0x0F, frame[1:]
+    elif marker == 0xDE:
+        size, body = int.from_bytes(frame[1:3], "big"), frame[3:]
+    elif marker == 0xDF:
+        size, body = int.from_bytes(frame[1:5], "big"), frame[5:]
+    else:
+        raise ValueError("Can only number frames holding a MessagePack map")
+    size += 1
+    if size <= 0x0F:
+        header = bytes([0x80 | size])
+    elif size <= 0xFFFF:
+        header = b"\xde" + size.to_bytes(2, "big")
+    else:
+        header = b"\xdf" + size.to_bytes(4, "big")
+    return header + msgpack.packb("seq") + msgpack.packb(seq) + body
+
+
+class EncodedMessage:
+    """
+    A message that is encoded at most once per wire protocol.
+
+    Broadcasts wrap their data in an EncodedMessage so every recipient using
+    the same protocol receives the same frame.
+    """
+
+    __slots__ = ("data", "_frames")
+
+    def __init__(self, data: Any = None, frames: Optional[Dict[str, Frame]] = None):
+        """
+        Initialize the EncodedMessage from its data or from already encoded frames.
+
+        Args:
+            data (Any, optional): The message data.
+            frames (Optional[Dict[str, Frame]], optional): Maps protocol names to
+                frames of the message that are already encoded.
+        """
+        self.data = data
+        self._frames: Dict[str, Frame] = dict(frames or {})
+
+    def frame(self, protocol: str = JSON) -> Frame:
+        """
+        Get the frame of the message for a wire protocol, encoding it on first use.
+
+        Args:
+            protocol (str, optional): "json" or "msgpack". Defaults to "json".
+
+        Returns:
+            Union[str, bytes]: The encoded frame.
+        """
+        frame = self._frames.get(protocol)
+        if frame is None:
+            if self.data is None:
+                known_protocol, known_frame = next(iter(self._frames.items()))
+                self.data = decode_frame(known_frame, known_protocol)
+            frame = self._frames[protocol] = encode_frame(self.data, protocol)
+        return frame
+
+    def frames(self, protocols: Iterable[str]) -> Dict[str, Frame]:
+        """
+        Get the frames of the message for several wire protocols.
+
+        Args:
+            protocols (Iterable[str]): The protocol names.
+
+        Returns:
+            Dict[str, Frame]: Maps protocol names to encoded frames.
+        """
+        return {protocol: self.frame(protocol) for protocol in protocols}
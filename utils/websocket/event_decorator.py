@@ -6,11 +6,104 @@ in the DataDiVR-Backend WebSocket system.
 """
 
 import inspect
-from functools import wraps
-from typing import Any, Callable, Dict
+from functools import update_wrapper
+from typing import Any, Callable, Dict, Optional
 
 from fastapi import WebSocket
 
+# Arguments a handler can ask for, in the order the dispatcher provides them
+HANDLER_ARGUMENTS = ("data", "websocket", "client_info")
+
+
+class HandlerAdapter:
+    """
+    Calls an event handler with the arguments its signature asks for.
+
+    The handler's signature is inspected once, when the adapter is created, and
+    turned into a call that passes exactly the requested arguments. Client
+    information is only looked up if the handler asks for it and the dispatcher
+    did not already provide it.
+
+    Attributes:
+        func (Callable): The wrapped event handler.
+        needs_client_info (bool): Whether the handler takes a 'client_info' argument.
+    """
+
+    def __init__(self, func: Callable, get_client_info: Callable):
+        """
+        Initialize the HandlerAdapter for an event handler.
+
+        Args:
+            func (Callable): The event handler coroutine function.
+            get_client_info (Callable): A function to retrieve client information.
+        """
+        update_wrapper(self, func)
+        self.func = func
+        self.get_client_info = get_client_info
+        parameters = inspect.signature(func).parameters
+        names = tuple(name for name in parameters if name in HANDLER_ARGUMENTS)
+        self.needs_client_info = "client_info" in names
+        self._call = _compile_call(func, parameters, names)
+
+    async def __call__(
+        self,
+        data: Dict[Any, Any],
+        websocket: WebSocket,
+        client_info: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Call the event handler with the arguments it expects.
+
+        Args:
+            data (Dict[Any, Any]): The event data.
+            websocket (WebSocket): The WebSocket connection.
+            client_info (Optional[Dict[str, Any]], optional): Client information already
+                looked up by the dispatcher.
+
+        Returns:
+            Any: The return value of the event handler function.
+        """
+        if client_info is None and self.needs_client_info:
+            client_info = self.get_client_info(websocket)
+        return await self._call(data, websocket, client_info)
+
+
+def _compile_call(func: Callable, parameters, names) -> Callable:
+    """
+    Build a function that calls the handler with the requested arguments.
+
+    Handlers whose requested arguments can be passed positionally get a call
+    without any per-event dictionary; all others are called with keywords.
+
+    Args:
+        func (Callable): The event handler.
+        parameters (Mapping[str, inspect.Parameter]): The handler's parameters.
+        names (Tuple[str, ...]): The requested argument names, in signature order.
+
+    Returns:
+        Callable: A function taking (data, websocket, client_info).
+    """
+    positional = list(parameters)[: len(names)] == list(names) and all(
+        parameters[name].kind
+        in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+        for name in names
+    )
+    if not positional:
+        indices = tuple((name, HANDLER_ARGUMENTS.index(name)) for name in names)
+        return lambda *args: func(**{name: args[i] for name, i in indices})
+
+    picks = tuple(HANDLER_ARGUMENTS.index(name) for name in names)
+    if not picks:
+        return lambda data, websocket, client_info: func()
+    if len(picks) == 1:
+        (i,) = picks
+        return lambda *args: func(args[i])
+    if len(picks) == 2:
+        i, j = picks
+        return lambda *args: func(args[i], args[j])
+    i, j, k = picks
+    return lambda *args: func(args[i], args[j], args[k])
+
 
 def event_decorator(handlers: Dict[str, Callable], get_client_info: Callable):
     """
@@ -18,8 +111,8 @@ def event_decorator(handlers: Dict[str, Callable], get_client_info: Callable):
 
     This function returns a decorator that can be used to register functions
     as handlers for specific WebSocket events. The decorator also wraps the
-    handler function to provide it with appropriate arguments based on its
-    signature.
+    handler function in a HandlerAdapter that provides it with appropriate
+    arguments based on its signature.
 
     Args:
         handlers (Dict[str, Callable]): A dictionary to store event handlers.
@@ -48,38 +141,9 @@ def event_decorator(handlers: Dict[str, Callable], get_client_info: Callable):
                 func (Callable): The event handler function to be wrapped and registered.
 
             Returns:
-                Callable: The wrapped event handler function.
+                Callable: The unwrapped event handler function.
             """
-
-            @wraps(func)
-            async def inner(data: Dict[Any, Any], websocket: WebSocket):
-                """
-                Inner function that calls the event handler with appropriate arguments.
-
-                This function inspects the handler's signature and calls it with the
-                arguments it expects, which may include 'data', 'websocket', and 'client_info'.
-
-                Args:
-                    data (Dict[Any, Any]): The event data.
-                    websocket (WebSocket): The WebSocket connection.
-
-                Returns:
-                    Any: The return value of the event handler function.
-                """
-                client_info = get_client_info(websocket)
-                sig = inspect.signature(func)
-                params = {
-                    param: value
-                    for param, value in {
-                        "data": data,
-                        "websocket": websocket,
-                        "client_info": client_info,
-                    }.items()
-                    if param in sig.parameters
-                }
-                return await func(**params)
-
-            handlers[event_name] = inner
+            handlers[event_name] = HandlerAdapter(func, get_client_info)
             return func
 
         return wrapper
@@ -5,12 +5,18 @@ This module provides an EventHandler class to manage and execute event handlers
 for different WebSocket events in the DataDiVR-Backend system.
 """
 
+import logging
 import time
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional
 
 from fastapi import WebSocket
 
 from ..custom_logging import logger
+from ..metrics import WS_EVENT_DURATION, WS_EVENT_ERRORS, WS_EVENTS
+from .client_manager import is_valid_room
+from .codec import RawJSON
+from .event_decorator import HandlerAdapter
+from .tick_broadcaster import TickBroadcaster
 
 
 class EventHandler:
@@ -19,7 +25,8 @@ class EventHandler:
 
     This class maintains a dictionary of event handlers and provides methods to
     handle incoming WebSocket events, either by executing a registered handler
-    or by broadcasting unknown events to all clients.
+    or by broadcasting unknown events to all clients. Unknown events registered
+    with the tick broadcaster are batched instead of broadcast one by one.
     """
 
     def __init__(
@@ -27,6 +34,9 @@ class EventHandler:
         handlers: Dict[str, Callable],
         get_client_info: Callable,
         broadcast: Callable,
+        tick_broadcaster: Optional[TickBroadcaster] = None,
+        is_member: Optional[Callable] = None,
+        send_message: Optional[Callable] = None,
     ):
         """
         Initialize the EventHandler with event handlers and utility functions.
@@ -35,60 +45,131 @@ class EventHandler:
             handlers (Dict[str, Callable]): A dictionary mapping event names to their handler functions.
             get_client_info (Callable): A function to retrieve client information given a WebSocket.
             broadcast (Callable): A function to broadcast messages to all clients.
+            tick_broadcaster (Optional[TickBroadcaster], optional): Batches the
+                high-frequency events registered with it.
+            is_member (Optional[Callable], optional): A function checking whether a
+                client ID is a member of a room. Without it, any room is accepted.
+            send_message (Optional[Callable], optional): A function sending a message
+                to a single WebSocket, used to reject broadcasts to other rooms.
         """
         self.handlers = handlers
         self.get_client_info = get_client_info
         self.broadcast_func = broadcast
+        self.tick_broadcaster = tick_broadcaster
+        self.is_member = is_member
+        self.send_message = send_message
 
     async def handle_event(
-        self, event_name: str, data: Dict[Any, Any], websocket: WebSocket
+        self,
+        event_name: str,
+        data: Dict[Any, Any],
+        websocket: WebSocket,
+        raw: Optional[str] = None,
     ):
         """
         Handle an incoming WebSocket event.
 
         This method either executes a registered handler for the event or
-        broadcasts the event to all clients if no handler is found.
+        broadcasts the event to all clients if no handler is found. If the
+        event data names a room, the broadcast only reaches the members of that
+        room, and the sender must be one of them.
+        When the frame the event was decoded from is given, it is forwarded as-is
+        instead of encoding the data again.
 
         Args:
             event_name (str): The name of the event to handle.
             data (Dict[Any, Any]): The data associated with the event.
             websocket (WebSocket): The WebSocket connection that received the event.
+            raw (Optional[str], optional): The JSON frame the data was decoded from.
         """
-        client_info = self.get_client_info(websocket)
-        client_id, client_name = client_info["client_id"], client_info["first_name"]
+        handler = self.handlers.get(event_name)
+        adapted = isinstance(handler, HandlerAdapter)
+        debug = logger.isEnabledFor(logging.DEBUG)
 
-        logger.debug(
-            "Received event: %s with data: %s from client %s (%s)",
-            event_name,
-            data,
-            client_id,
-            client_name,
-        )
+        # the client info is only looked up if it is needed, and then shared
+        # with handlers registered through the event decorator
+        client_info = None
+        if handler is None or debug or (adapted and handler.needs_client_info):
+            client_info = self.get_client_info(websocket)
 
-        # if we have an event handler for this event, execute it
-        # otherwise, broadcast the event to all clients except the sender
-        if event_name in self.handlers:
-            start_time = time.time()
-            await self.handlers[event_name](data, websocket)
-            duration = time.time() - start_time
-            logger.debug(
-                "Event handler '%s' took %.5f seconds to execute", event_name, duration
-            )
-        else:
+        if debug:
             logger.debug(
-                "Unknown event received: %s from client %s. Broadcasting to all clients except sender.",
+                "Received event: %s with data: %s from client %s (%s)",
                 event_name,
-                client_name,
+                data,
+                client_info["client_id"],
+                client_info["first_name"],
             )
+
+        # if we have an event handler for this event, execute it
+        # otherwise, broadcast the event to all clients (or the given room) except the sender
+        WS_EVENTS.labels(event_name).inc()
+        if handler is not None:
+            start_time = time.perf_counter()
+            try:
+                if adapted:
+                    await handler(data, websocket, client_info)
+                else:
+                    await handler(data, websocket)
+            except Exception:
+                WS_EVENT_ERRORS.labels(event_name).inc()
+                raise
+            finally:
+                duration = time.perf_counter() - start_time
+                WS_EVENT_DURATION.labels(event_name).observe(duration)
+            if debug:
+                logger.debug(
+                    "Event handler '%s' took %.5f seconds to execute",
+                    event_name,
+                    duration,
+                )
+        else:
+            client_id, client_name = client_info["client_id"], client_info["first_name"]
+            room = data.get("room")
+            if room is not None and not self._may_send_to(client_id, room):
+                logger.warning(
+                    "Client %s sent %s to a room it has not joined",
+                    client_id,
+                    event_name,
+                )
+                if self.send_message is not None:
+                    await self.send_message(
+                        websocket,
+                        {
+                            "event": "error",
+                            "message": "Join the room before sending to it",
+                        },
+                    )
+                return
+            if debug:
+                logger.debug(
+                    "Unknown event received: %s from client %s. Broadcasting to %s except sender.",
+                    event_name,
+                    client_name,
+                    f"room {room}" if room is not None else "all clients",
+                )
+            tick_broadcaster = self.tick_broadcaster
+            if tick_broadcaster is not None and tick_broadcaster.handles(event_name):
+                tick_broadcaster.submit(event_name, client_id, client_name, data, room)
+                return
             await self.broadcast_func(
                 {
                     "event": event_name,
                     "sender_id": client_id,
                     "sender_name": client_name,
-                    "data": data,
-                }
+                    "data": data if raw is None else RawJSON(raw),
+                },
+                room=room,
             )
 
+    def _may_send_to(self, client_id: str, room: Any) -> bool:
+        """
+        Check whether a client may broadcast to a room: a valid room the client has joined.
+        """
+        if not is_valid_room(room):
+            return False
+        return self.is_member is None or self.is_member(client_id, room)
+
     def register_handler(self, event_name: str, handler: Callable):
         """
         Register a new event handler.
@@ -0,0 +1,331 @@
+"""
+Outbound queue module for WebSocket connections in the DataDiVR-Backend.
+
+This module provides the OutboundQueue class, a bounded per-client queue of
+encoded frames that is drained by a dedicated writer task, and the overflow
+policies that decide what happens when a client falls behind.
+"""
+
+import asyncio
+from collections import deque
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Union
+
+from ..custom_logging import logger
+from ..metrics import (
+    WS_OUTBOUND_COALESCED,
+    WS_OUTBOUND_DROPPED,
+    WS_SEND_FAILURES,
+    WS_SENT_BYTES,
+    WS_SENT_FRAMES,
+    frame_size,
+)
+
+if TYPE_CHECKING:
+    from .session import ReplayBuffer
+
+# Maximum number of frames waiting to be written to a single client
+DEFAULT_QUEUE_SIZE = 256
+# Maximum time in seconds a single client may take to accept a frame
+DEFAULT_SEND_TIMEOUT = 5.0
+# Close code sent to clients that are disconnected for falling behind (Try Again Later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+Frame = Union[str, bytes]
+
+
+class OverflowPolicy(str, Enum):
+    """
+    What an OutboundQueue does with a new frame when it is full.
+
+    Attributes:
+        DROP_OLDEST: Discard the oldest pending frame to make room.
+        DROP_NEWEST: Discard the new frame.
+        COALESCE: Replace the pending frame with the same event key, falling back
+                  to DROP_OLDEST if there is none.
+        DISCONNECT: Close the connection of the slow consumer.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+async def send_frame(websocket, frame: Frame):
+    """
+    Send an already encoded frame over a WebSocket.
+
+    Args:
+        websocket (WebSocket): The WebSocket connection to send on.
+        frame (Union[str, bytes]): The encoded frame. Strings are sent as text
+                                   frames, bytes as binary frames.
+    """
+    if isinstance(frame, bytes):
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+    WS_SENT_FRAMES.inc()
+    WS_SENT_BYTES.inc(frame_size(frame))
+
+
+class OutboundQueue:
+    """
+    A bounded queue of frames waiting to be written to one WebSocket client.
+
+    Frames are put into the queue without blocking the caller and written to the
+    socket in order by a writer task owned by the queue. The writer is started
+    lazily on the first put made from a running event loop. When the queue is
+    full, the configured OverflowPolicy decides which frame is lost.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        send_timeout: float = DEFAULT_SEND_TIMEOUT,
+        client_id: Optional[str] = None,
+    ):
+        """
+        Initialize the OutboundQueue for a WebSocket connection.
+
+        Args:
+            websocket (WebSocket): The WebSocket connection the frames are written to.
+            maxsize (int, optional): Maximum number of pending frames. Defaults to 256.
+            policy (OverflowPolicy, optional): What to do when the queue is full.
+                                               Defaults to OverflowPolicy.DROP_OLDEST.
+            send_timeout (float, optional): Per-frame send timeout in seconds. Defaults to 5.0.
+            client_id (Optional[str], optional): The ID of the client, used for logging.
+        """
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.policy = OverflowPolicy(policy)
+        self.send_timeout = send_timeout
+        self.client_id = client_id
+        # numbers and keeps the frames of clients with a resumable session
+        self.history: Optional["ReplayBuffer"] = None
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.closed = False
+
+        # each entry is a [key, frame] pair so a coalesced frame keeps its position
+        self._entries: Deque[List[Any]] = deque()
+        self._latest_by_key: Dict[str, List[Any]] = {}
+        self._writer_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+
+    @property
+    def depth(self) -> int:
+        """
+        int: The number of frames currently waiting to be written.
+        """
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters of this queue.
+
+        Returns:
+            Dict[str, Any]: The queue depth, capacity, policy and frame counters.
+        """
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "policy": self.policy.value,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "closed": self.closed,
+        }
+
+    def put(
+        self, frame: Frame, key: Optional[str] = None, sequenced: bool = False
+    ) -> bool:
+        """
+        Queue a frame for writing without blocking.
+
+        If the client has a resumable session, the frame is numbered and kept
+        for replay, even if the queue then drops it.
+
+        Args:
+            frame (Union[str, bytes]): The encoded frame.
+            key (Optional[str], optional): The event key used by the COALESCE policy.
+            sequenced (bool, optional): The frame already carries its sequence number,
+                                        as replayed frames do. Defaults to False.
+
+        Returns:
+            bool: True if the frame was queued, False if it was dropped.
+        """
+        if self.closed:
+            return False
+        if self.history is not None and not sequenced:
+            frame = self.history.record(frame)
+
+        if len(self._entries) >= self.maxsize:
+            if self.policy == OverflowPolicy.COALESCE and key in self._latest_by_key:
+                # the frame takes the place of the pending one with the same key
+                self._latest_by_key[key][1] = frame
+                self.coalesced += 1
+                WS_OUTBOUND_COALESCED.inc()
+                return True
+
+            self.dropped += 1
+            WS_OUTBOUND_DROPPED.inc()
+            if self.policy == OverflowPolicy.DISCONNECT:
+                logger.warning(
+                    "Outbound queue of client %s is full, disconnecting slow consumer",
+                    self.client_id,
+                )
+                self.disconnect()
+                return False
+            if self.policy == OverflowPolicy.DROP_NEWEST:
+                logger.debug(
+                    "Outbound queue of client %s is full, dropping frame",
+                    self.client_id,
+                )
+                return False
+            self._pop_entry()
+
+        entry = [key, frame]
+        self._entries.append(entry)
+        if key is not None:
+            self._latest_by_key[key] = entry
+
+        self._ensure_writer()
+        if self._wakeup is not None:
+            self._idle.clear()
+            self._wakeup.set()
+        return True
+
+    def _pop_entry(self) -> List[Any]:
+        """
+        Remove and return the oldest entry, keeping the key index consistent.
+
+        Returns:
+            List[Any]: The [key, frame] pair of the oldest entry.
+        """
+        entry = self._entries.popleft()
+        key = entry[0]
+        if key is not None and self._latest_by_key.get(key) is entry:
+            del self._latest_by_key[key]
+        return entry
+
+    def _ensure_writer(self):
+        """
+        Start the writer task if it is not running and an event loop is available.
+        """
+        if self._writer_task is not None or self.closed:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._writer_task = loop.create_task(self._run())
+
+    async def _run(self):
+        """
+        Write queued frames to the socket until the queue is closed.
+        """
+        while True:
+            if not self._entries:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            frame = self._pop_entry()[1]
+            try:
+                await asyncio.wait_for(
+                    send_frame(self.websocket, frame), timeout=self.send_timeout
+                )
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self.failed += 1
+                WS_SEND_FAILURES.inc()
+                logger.warning(
+                    "Client %s did not accept a frame within %s seconds, disconnecting",
+                    self.client_id,
+                    self.send_timeout,
+                )
+                self.disconnect()
+                return
+            except Exception as e:
+                self.failed += 1
+                WS_SEND_FAILURES.inc()
+                logger.warning(
+                    "Failed to send message to client %s: %s",
+                    self.client_id,
+                    str(e) or type(e).__name__,
+                )
+                self._finish()
+                return
+
+    async def join(self):
+        """
+        Wait until all queued frames have been written or the queue is closed.
+        """
+        self._ensure_writer()
+        while self._idle is not None and not self._idle.is_set():
+            if self._writer_task.done():
+                return
+            waiter = asyncio.ensure_future(self._idle.wait())
+            try:
+                await asyncio.wait(
+                    {waiter, self._writer_task}, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                waiter.cancel()
+
+    def disconnect(self, code: int = SLOW_CONSUMER_CLOSE_CODE):
+        """
+        Close the queue and ask the client's connection to close.
+
+        Args:
+            code (int, optional): The WebSocket close code. Defaults to 1013 (Try Again Later).
+        """
+        self.close()
+        try:
+            asyncio.get_running_loop().create_task(self._close_websocket(code))
+        except RuntimeError:
+            pass
+
+    async def _close_websocket(self, code: int):
+        """
+        Close the WebSocket connection, ignoring errors on already closed sockets.
+        """
+        try:
+            await self.websocket.close(code=code)
+        except Exception as e:
+            logger.debug("Error closing connection of client %s: %s", self.client_id, e)
+
+    def _finish(self):
+        """
+        Mark the queue closed and discard pending frames.
+        """
+        self.closed = True
+        self.dropped += len(self._entries)
+        WS_OUTBOUND_DROPPED.inc(len(self._entries))
+        self._entries.clear()
+        self._latest_by_key.clear()
+        if self._idle is not None:
+            self._idle.set()
+
+    def close(self):
+        """
+        Close the queue, discarding pending frames and stopping the writer task.
+        """
+        if not self.closed:
+            self._finish()
+        task = self._writer_task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
@@ -0,0 +1,290 @@
+"""
+Rate limiting module for WebSocket connections in the DataDiVR-Backend.
+
+This module provides the RateLimiter class, which limits how fast each client
+may send events with token buckets: one bucket for all events of a client, plus
+one per client for each event with a limit of its own. The RateLimitPolicy
+decides what happens to events beyond the limits.
+"""
+
+import asyncio
+import os
+import time
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+from ..custom_logging import logger
+from ..metrics import WS_THROTTLED
+
+# Events per second allowed per client, over all events
+DEFAULT_RATE = 200.0
+# Longest a client's events are held back under the delay policy before they are dropped
+DEFAULT_MAX_DELAY = 1.0
+# Minimum time in seconds between two warnings about the same client
+LOG_INTERVAL = 10.0
+# Close code sent to clients that are disconnected for sending too fast (Policy Violation)
+RATE_LIMIT_CLOSE_CODE = 1008
+
+
+class RateLimitPolicy(str, Enum):
+    """
+    What happens to an event that exceeds a rate limit.
+
+    Attributes:
+        DROP: Discard the event.
+        DELAY: Stop reading from the client until the event is within the limit,
+               dropping it if that takes longer than the maximum delay.
+        DISCONNECT: Close the connection of the client.
+    """
+
+    DROP = "drop"
+    DELAY = "delay"
+    DISCONNECT = "disconnect"
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised for an event beyond the limits under the disconnect policy.
+    """
+
+
+class TokenBucket:
+    """
+    A token bucket that refills at a constant rate up to its burst size.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        """
+        Initialize a full TokenBucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            burst (float): Maximum number of tokens, at least 1.
+        """
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """
+        Refill the bucket and get the time until it holds a token.
+
+        Args:
+            now (float): The current time.monotonic().
+
+        Returns:
+            float: 0 if a token is available, else the seconds until one is.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _ClientState:
+    """
+    The buckets of one client and its throttling statistics for logging.
+    """
+
+    __slots__ = ("bucket", "event_buckets", "throttled", "logged_at")
+
+    def __init__(self, rate: float, burst: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.event_buckets: Dict[str, TokenBucket] = {}
+        self.throttled = 0
+        self.logged_at = 0.0
+
+
+def parse_event_limits(text: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse per-event limits like 'pose=120:240,long_task=0.2'.
+
+    Args:
+        text (str): Comma separated event=rate[:burst] pairs. The burst defaults to the rate.
+
+    Returns:
+        Dict[str, Tuple[float, float]]: Maps event names to their rate and burst.
+    """
+    limits = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        event_name, _, limit = part.partition("=")
+        rate, _, burst = limit.partition(":")
+        limits[event_name.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+class RateLimiter:
+    """
+    Limits the rate of the events each client sends.
+
+    Limits with a rate of 0 are disabled. Buckets are only created for events
+    with a limit of their own, so clients cannot grow the limiter's state by
+    sending events with arbitrary names.
+
+    Attributes:
+        rate (float): Events per second allowed per client over all events.
+        burst (float): Burst size of the per-client limit.
+        event_limits (Dict[str, Tuple[float, float]]): Rate and burst per event name.
+        policy (RateLimitPolicy): What happens to events beyond the limits.
+        max_delay (float): Longest an event is delayed under the delay policy.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        event_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        policy: Optional[RateLimitPolicy] = None,
+        max_delay: Optional[float] = None,
+    ):
+        """
+        Initialize the RateLimiter.
+
+        Settings that are not given are read from the environment variables
+        WS_RATE_LIMIT, WS_RATE_BURST, WS_EVENT_RATE_LIMITS, WS_RATE_LIMIT_POLICY
+        and WS_RATE_LIMIT_MAX_DELAY.
+
+        Args:
+            rate (Optional[float], optional): Events per second per client. Defaults to 200.
+            burst (Optional[float], optional): Burst size per client. Defaults to twice the rate.
+            event_limits (Optional[Dict[str, Tuple[float, float]]], optional): Rate and
+                burst per event name. Defaults to none.
+            policy (Optional[RateLimitPolicy], optional): What happens to events beyond
+                the limits. Defaults to RateLimitPolicy.DROP.
+            max_delay (Optional[float], optional): Longest delay under the delay policy.
+                Defaults to 1 second.
+        """
+        self.rate = (
+            rate
+            if rate is not None
+            else float(os.getenv("WS_RATE_LIMIT", DEFAULT_RATE))
+        )
+        self.burst = burst or float(os.getenv("WS_RATE_BURST", 2 * self.rate))
+        if event_limits is None:
+            event_limits = parse_event_limits(os.getenv("WS_EVENT_RATE_LIMITS", ""))
+        self.event_limits = event_limits
+        self.policy = RateLimitPolicy(
+            policy or os.getenv("WS_RATE_LIMIT_POLICY", RateLimitPolicy.DROP)
+        )
+        self.max_delay = (
+            max_delay
+            if max_delay is not None
+            else float(os.getenv("WS_RATE_LIMIT_MAX_DELAY", DEFAULT_MAX_DELAY))
+        )
+        self._clients: Dict[str, _ClientState] = {}
+
+    def wait_time(self, client_id: str, event_name: str) -> float:
+        """
+        Take a token for an event if the client is within its limits.
+
+        Args:
+            client_id (str): The ID of the client that sent the event.
+            event_name (str): The name of the event.
+
+        Returns:
+            float: 0 if the event is allowed and a token was taken, else the
+            seconds until it would be allowed.
+        """
+        state = self._clients.get(client_id)
+        if state is None:
+            state = self._clients[client_id] = _ClientState(self.rate, self.burst)
+
+        buckets = []
+        if self.rate > 0:
+            buckets.append(state.bucket)
+        limit = self.event_limits.get(event_name)
+        if limit is not None and limit[0] > 0:
+            bucket = state.event_buckets.get(event_name)
+            if bucket is None:
+                bucket = state.event_buckets[event_name] = TokenBucket(*limit)
+            buckets.append(bucket)
+
+        now = time.monotonic()
+        wait = max((bucket.wait_time(now) for bucket in buckets), default=0.0)
+        if wait == 0:
+            # only take tokens once all buckets allow the event
+            for bucket in buckets:
+                bucket.tokens -= 1
+        return wait
+
+    async def admit(self, client_id: str, event_name: str) -> bool:
+        """
+        Apply the limits to an event received from a client.
+
+        Under the delay policy this waits until the event is within the limits,
+        which stops reading from the client meanwhile.
+
+        Args:
+            client_id (str): The ID of the client that sent the event.
+            event_name (str): The name of the event.
+
+        Returns:
+            bool: True if the event may be handled, False if it is dropped.
+
+        Raises:
+            RateLimitExceeded: If the event exceeds the limits under the disconnect policy.
+        """
+        wait = self.wait_time(client_id, event_name)
+        if wait == 0:
+            return True
+
+        if self.policy == RateLimitPolicy.DELAY:
+            waited = 0.0
+            while 0 < wait and waited + wait <= self.max_delay:
+                await asyncio.sleep(wait)
+                waited += wait
+                wait = self.wait_time(client_id, event_name)
+            if wait == 0:
+                self._record(client_id, event_name, "delayed")
+                return True
+            self._record(client_id, event_name, "dropped")
+            return False
+
+        if self.policy == RateLimitPolicy.DISCONNECT:
+            self._record(client_id, event_name, "disconnected")
+            raise RateLimitExceeded(
+                f"Client exceeded the rate limit for '{event_name}'"
+            )
+
+        self._record(client_id, event_name, "dropped")
+        return False
+
+    def remove_client(self, client_id: str):
+        """
+        Forget the buckets of a client that disconnected.
+
+        Args:
+            client_id (str): The ID of the client.
+        """
+        state = self._clients.pop(client_id, None)
+        if state is not None and state.throttled:
+            logger.info(
+                "Client %s was throttled %d times since the last warning",
+                client_id,
+                state.throttled,
+            )
+
+    def _record(self, client_id: str, event_name: str, action: str):
+        """
+        Count a throttled event and warn about the client at most every LOG_INTERVAL seconds.
+        """
+        WS_THROTTLED.labels(event_name, action).inc()
+        state = self._clients[client_id]
+        state.throttled += 1
+        now = time.monotonic()
+        if now - state.logged_at >= LOG_INTERVAL:
+            logger.warning(
+                "Client %s exceeded its rate limit (last event '%s', %s); %d events throttled",
+                client_id,
+                event_name,
+                action,
+                state.throttled,
+            )
+            state.logged_at = now
+            state.throttled = 0
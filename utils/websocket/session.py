@@ -0,0 +1,256 @@
+"""
+Session module for WebSocket connections in the DataDiVR-Backend.
+
+This module provides resumable sessions. A client that opts in receives a
+resume token in its welcome message, and every frame sent to it carries a 'seq'
+number and is kept in a bounded replay buffer. When the connection drops, the
+session is kept for a while and keeps recording the frames meant for the
+client. A client that reconnects with its token and the last sequence number it
+received gets back its ID, name and rooms, and only the frames it missed.
+"""
+
+import os
+import secrets
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from .codec import Frame, add_sequence_number
+
+# Number of recent frames kept per session for replay
+DEFAULT_REPLAY_BUFFER_SIZE = 256
+# Time in seconds a disconnected session can be resumed
+DEFAULT_SESSION_TTL = 60.0
+# Close code sent to a connection whose session was resumed by a new connection
+SESSION_TAKEN_OVER_CLOSE_CODE = 4001
+
+
+class ReplayBuffer:
+    """
+    Numbers the frames sent to a client and keeps the most recent ones.
+
+    Attributes:
+        seq (int): The sequence number of the last recorded frame, 0 if none.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_REPLAY_BUFFER_SIZE):
+        """
+        Initialize the ReplayBuffer.
+
+        Args:
+            maxsize (int, optional): Number of frames to keep. Defaults to 256.
+        """
+        self.seq = 0
+        self._frames: Deque[Tuple[int, Frame]] = deque(maxlen=maxsize)
+
+    def record(self, frame: Frame) -> Frame:
+        """
+        Number a frame and keep it.
+
+        Args:
+            frame (Union[str, bytes]): The encoded frame.
+
+        Returns:
+            Union[str, bytes]: The frame with its sequence number.
+        """
+        self.seq += 1
+        frame = add_sequence_number(frame, self.seq)
+        self._frames.append((self.seq, frame))
+        return frame
+
+    def since(self, last_seq: int) -> Tuple[List[Frame], bool]:
+        """
+        Get the frames recorded after a sequence number.
+
+        Args:
+            last_seq (int): The sequence number of the last frame the client received.
+
+        Returns:
+            Tuple[List[Union[str, bytes]], bool]: The frames, oldest first, and whether
+            they are all frames after last_seq, i.e. none was evicted from the buffer.
+        """
+        frames = [frame for seq, frame in self._frames if seq > last_seq]
+        oldest = self._frames[0][0] if self._frames else self.seq + 1
+        return frames, oldest <= last_seq + 1
+
+
+@dataclass
+class Session:
+    """
+    The resumable state of a client.
+
+    Attributes:
+        token (str): The secret the client presents to resume the session.
+        client_id (str): The ID of the client.
+        first_name (str): The name assigned to the client.
+        history (ReplayBuffer): The recent frames sent to the client.
+        rooms (Set[str]): The rooms the client was in when it disconnected.
+        protocol (str): The wire protocol the client used when it disconnected.
+        expires (Optional[float]): When the disconnected session is discarded, as a
+                                   time.monotonic() value; None while connected.
+        resumed (bool): Whether the current connection resumed the session.
+        replay_complete (bool): Whether all frames missed while disconnected were replayed.
+    """
+
+    token: str
+    client_id: str
+    first_name: str
+    history: ReplayBuffer
+    rooms: Set[str] = field(default_factory=set)
+    protocol: str = "json"
+    expires: Optional[float] = None
+    resumed: bool = False
+    replay_complete: bool = True
+
+
+class SessionManager:
+    """
+    Keeps the sessions of connected and recently disconnected clients.
+    """
+
+    def __init__(
+        self,
+        buffer_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        on_expire: Optional[Callable[[Session], None]] = None,
+    ):
+        """
+        Initialize the SessionManager.
+
+        Settings that are not given are read from the environment variables
+        WS_REPLAY_BUFFER_SIZE and WS_SESSION_TTL.
+
+        Args:
+            buffer_size (Optional[int], optional): Frames kept per session. Defaults to 256.
+            ttl (Optional[float], optional): Seconds a disconnected session can be
+                                             resumed. Defaults to 60.
+            on_expire (Optional[Callable], optional): Called with every detached
+                session that expired, after it was discarded.
+        """
+        self.buffer_size = buffer_size or int(
+            os.getenv("WS_REPLAY_BUFFER_SIZE", DEFAULT_REPLAY_BUFFER_SIZE)
+        )
+        self.ttl = (
+            ttl
+            if ttl is not None
+            else float(os.getenv("WS_SESSION_TTL", DEFAULT_SESSION_TTL))
+        )
+        self.on_expire = on_expire
+        self._sessions: Dict[str, Session] = {}
+        self._detached: Dict[str, Session] = {}
+
+    def create(self, client_id: str, first_name: str) -> Session:
+        """
+        Start a session for a connected client.
+
+        Args:
+            client_id (str): The ID of the client.
+            first_name (str): The name assigned to the client.
+
+        Returns:
+            Session: The new session.
+        """
+        session = Session(
+            token=secrets.token_urlsafe(24),
+            client_id=client_id,
+            first_name=first_name,
+            history=ReplayBuffer(self.buffer_size),
+        )
+        self._sessions[session.token] = session
+        return session
+
+    def resume(self, token: str) -> Optional[Session]:
+        """
+        Reattach a disconnected session.
+
+        Args:
+            token (str): The resume token presented by the client.
+
+        Returns:
+            Optional[Session]: The session, or None if the token is unknown, the
+            session expired or it is still attached to a connection.
+        """
+        self.purge()
+        session = self._detached.pop(token, None)
+        if session is not None:
+            session.expires = None
+        return session
+
+    def get_attached(self, token: str) -> Optional[Session]:
+        """
+        Get a session that is still attached to a connection.
+
+        Args:
+            token (str): The resume token.
+
+        Returns:
+            Optional[Session]: The session, or None if it is unknown or disconnected.
+        """
+        session = self._sessions.get(token)
+        if session is None or session.expires is not None:
+            return None
+        return session
+
+    def detach(self, session: Session, rooms: Set[str], protocol: str):
+        """
+        Keep the session of a client that disconnected until it expires.
+
+        Args:
+            session (Session): The session.
+            rooms (Set[str]): The rooms the client was in.
+            protocol (str): The wire protocol the client used.
+        """
+        session.rooms = set(rooms)
+        session.protocol = protocol
+        session.expires = time.monotonic() + self.ttl
+        self._detached[session.token] = session
+        self.purge()
+
+    def detached(self) -> Iterator[Session]:
+        """
+        Iterate over the sessions of disconnected clients that can still be resumed.
+
+        Returns:
+            Iterator[Session]: The detached sessions.
+        """
+        self.purge()
+        return iter(list(self._detached.values()))
+
+    def reserved_names(self) -> Set[str]:
+        """
+        Get the names of disconnected clients, which must not be given to new clients.
+
+        Returns:
+            Set[str]: The names.
+        """
+        return {session.first_name for session in self._detached.values()}
+
+    def reserved_rooms(self) -> Set[str]:
+        """
+        Get the rooms of disconnected clients, which they rejoin when they resume.
+
+        Returns:
+            Set[str]: The room names.
+        """
+        return {room for session in self._detached.values() for room in session.rooms}
+
+    def purge(self):
+        """
+        Discard the detached sessions that expired.
+        """
+        if not self._detached:
+            return
+        now = time.monotonic()
+        expired = []
+        for token, session in list(self._detached.items()):
+            if session.expires <= now:
+                del self._detached[token]
+                del self._sessions[token]
+                expired.append(session)
+        if self.on_expire is not None:
+            for session in expired:
+                self.on_expire(session)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,193 @@
+"""
+Tick broadcaster module for WebSocket communication in the DataDiVR-Backend.
+
+This module provides a TickBroadcaster class that batches high-frequency events,
+such as the head and controller poses VR clients send at 60-90 Hz. Instead of
+broadcasting every update as it arrives, updates are collected and sent once per
+tick as a single 'batch' frame per room, keeping only the latest update of each
+sender for events with a latest-wins policy. The number of frames sent then grows
+with the number of receivers and the tick rate, no longer with the number of
+senders and their update rate.
+"""
+
+import asyncio
+import os
+from itertools import count
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..custom_logging import logger
+from ..metrics import WS_TICK_BATCH_SIZE, WS_TICK_COALESCED, WS_TICK_UPDATES
+
+DEFAULT_TICK_RATE = 20.0
+DEFAULT_COALESCED_EVENTS = "pose,cursor"
+BATCH_EVENT = "batch"
+
+
+class TickBroadcaster:
+    """
+    Collects updates of registered events and broadcasts them in batches once per tick.
+
+    Each batch is encoded once per room and sent to all members, including the
+    senders of the updates; clients recognize their own updates by 'sender_id'.
+    The tick task only runs while updates are pending.
+
+    Attributes:
+        tick_rate (float): The number of ticks per second.
+        policies (Dict[str, bool]): Maps the names of batched events to whether
+                                    only the latest update of each sender is kept.
+    """
+
+    def __init__(
+        self,
+        broadcast: Callable,
+        tick_rate: Optional[float] = None,
+        events: Optional[str] = None,
+    ):
+        """
+        Initialize the TickBroadcaster.
+
+        Settings that are not given are read from the environment variables
+        WS_TICK_RATE and WS_COALESCED_EVENTS.
+
+        Args:
+            broadcast (Callable): A function to broadcast messages to all clients or a room.
+            tick_rate (Optional[float], optional): Ticks per second. Defaults to 20.
+            events (Optional[str], optional): Comma separated names of the events
+                to batch with a latest-wins policy. Defaults to "pose,cursor".
+        """
+        self.broadcast_func = broadcast
+        self.tick_rate = tick_rate or float(
+            os.getenv("WS_TICK_RATE", DEFAULT_TICK_RATE)
+        )
+        if events is None:
+            events = os.getenv("WS_COALESCED_EVENTS", DEFAULT_COALESCED_EVENTS)
+        self.policies: Dict[str, bool] = {}
+        for event_name in events.split(","):
+            if event_name.strip():
+                self.register(event_name.strip())
+
+        # room -> update key -> update, in the order the keys were last updated
+        self._pending: Dict[Optional[str], Dict[Tuple, Dict[str, Any]]] = {}
+        self._counter = count()
+        self._tick = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, event_name: str, latest_wins: bool = True):
+        """
+        Batch the updates of an event.
+
+        Args:
+            event_name (str): The name of the event.
+            latest_wins (bool, optional): Keep only the latest update of each sender
+                per tick. If False, all updates are sent, in order. Defaults to True.
+        """
+        self.policies[event_name] = latest_wins
+
+    def unregister(self, event_name: str):
+        """
+        Stop batching the updates of an event.
+
+        Args:
+            event_name (str): The name of the event.
+        """
+        self.policies.pop(event_name, None)
+
+    def handles(self, event_name: str) -> bool:
+        """
+        Check whether the updates of an event are batched.
+
+        Args:
+            event_name (str): The name of the event.
+
+        Returns:
+            bool: True if the event is registered.
+        """
+        return event_name in self.policies
+
+    def submit(
+        self,
+        event_name: str,
+        sender_id: str,
+        sender_name: str,
+        data: Dict[Any, Any],
+        room: Optional[str] = None,
+    ):
+        """
+        Add an update to the next batch of a room, starting the tick task if needed.
+
+        Args:
+            event_name (str): The name of the event, which must be registered.
+            sender_id (str): The ID of the client that sent the update.
+            sender_name (str): The name of the client that sent the update.
+            data (Dict[Any, Any]): The data of the update.
+            room (Optional[str], optional): Only deliver to the members of this room.
+                                            Defaults to None (all clients).
+        """
+        updates = self._pending.setdefault(room, {})
+        if self.policies[event_name]:
+            key = (event_name, sender_id)
+            if updates.pop(key, None) is not None:
+                WS_TICK_COALESCED.inc()
+        else:
+            key = (event_name, sender_id, next(self._counter))
+        updates[key] = {
+            "event": event_name,
+            "sender_id": sender_id,
+            "sender_name": sender_name,
+            "data": data,
+        }
+        WS_TICK_UPDATES.inc()
+
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def flush(self):
+        """
+        Broadcast the pending updates now, one batch per room.
+        """
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self._tick += 1
+        for room, updates in pending.items():
+            WS_TICK_BATCH_SIZE.observe(len(updates))
+            await self.broadcast_func(
+                {
+                    "event": BATCH_EVENT,
+                    "tick": self._tick,
+                    "updates": list(updates.values()),
+                },
+                include_sender=True,
+                room=room,
+            )
+
+    async def _run(self):
+        """
+        Flush the pending updates once per tick until no updates arrive for a tick.
+        """
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        try:
+            while True:
+                # keep a steady rate, but skip ticks that were missed
+                next_tick = max(next_tick + interval, loop.time())
+                await asyncio.sleep(next_tick - loop.time())
+                if not self._pending:
+                    return
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error("Failed to broadcast tick %d: %s", self._tick, e)
+        finally:
+            self._task = None
+
+    async def close(self):
+        """
+        Stop the tick task and broadcast the updates still pending.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
@@ -5,12 +5,18 @@ This module provides a WebSocketManager class that integrates various components
 to manage WebSocket connections, events, and client information in the DataDiVR-Backend system.
 """
 
-from typing import Callable, Dict
+from typing import Callable, Dict, List, Optional
 
+from ..metrics import metrics
+from . import codec
+from .backplane import Backplane, InProcessBackplane
 from .broadcaster import Broadcaster
 from .client_manager import ClientManager
 from .event_decorator import event_decorator
 from .event_handler import EventHandler
+from .rate_limiter import RateLimiter
+from .session import SESSION_TAKEN_OVER_CLOSE_CODE
+from .tick_broadcaster import TickBroadcaster
 
 
 class WebSocketManager:
@@ -18,7 +24,11 @@ class WebSocketManager:
     Manages WebSocket connections, events, and client information for the DataDiVR-Backend.
 
     This class integrates ClientManager, Broadcaster, and EventHandler to provide
-    a comprehensive WebSocket management solution.
+    a comprehensive WebSocket management solution. Broadcasts and client registry
+    changes are also published on a Backplane, so they reach the managers of
+    other worker processes. High-frequency events such as poses are batched by a
+    TickBroadcaster, and the rate of the events each client sends is limited by
+    a RateLimiter.
     """
 
     def __init__(self):
@@ -28,10 +38,91 @@ class WebSocketManager:
         self.handlers: Dict[str, Callable] = {}
         self.client_manager = ClientManager()
         self.broadcaster = Broadcaster(self.client_manager.get_client_info)
+        self.tick_broadcaster = TickBroadcaster(self.broadcast)
+        self.rate_limiter = RateLimiter()
         self.event_handler = EventHandler(
-            self.handlers, self.client_manager.get_client_info, self.broadcast
+            self.handlers,
+            self.client_manager.get_client_info,
+            self.broadcast,
+            self.tick_broadcaster,
+            self.client_manager.is_member,
+            self.send_message,
         )
         self.event = event_decorator(self.handlers, self.client_manager.get_client_info)
+        self.backplane: Backplane = InProcessBackplane()
+        self._backplane_listeners: Dict[str, List[Callable]] = {}
+
+    async def start_backplane(self, backplane: Optional[Backplane] = None):
+        """
+        Connect the manager to the managers of other workers.
+
+        Args:
+            backplane (Optional[Backplane], optional): The backplane to use. Defaults to
+                the current one, an InProcessBackplane unless replaced.
+        """
+        if backplane is not None:
+            self.backplane = backplane
+        await self.backplane.start(self._handle_backplane_message)
+
+    async def stop_backplane(self):
+        """
+        Disconnect the manager from the managers of other workers.
+        """
+        await self.backplane.close()
+
+    def add_backplane_listener(self, kind, listener):
+        """
+        Call a function for every backplane message of a type.
+
+        Listeners are called after the manager handled the message, including for
+        the types the manager handles itself, such as "worker_joined".
+
+        Args:
+            kind (str): The type of message.
+            listener (Callable): An async function taking the message.
+        """
+        self._backplane_listeners.setdefault(kind, []).append(listener)
+
+    async def _handle_backplane_message(self, message):
+        """
+        Apply a message published by another worker.
+
+        Args:
+            message (dict): The backplane message.
+        """
+        kind = message.get("type")
+        if kind == "broadcast":
+            self._broadcast_local(
+                codec.EncodedMessage(frames=message["frames"]),
+                message.get("event"),
+                message.get("sender_id"),
+                message.get("include_sender", False),
+                message.get("room"),
+            )
+        elif kind == "client_added":
+            self.client_manager.add_remote_client(
+                message["origin"], message["client_id"], message["first_name"]
+            )
+        elif kind == "client_removed":
+            self.client_manager.remove_remote_client(message["client_id"])
+        elif kind == "worker_joined":
+            for client in self.client_manager.get_all_clients():
+                self._publish_client_added(client.client_id, client.first_name)
+        elif kind == "worker_left":
+            self.client_manager.remove_remote_worker(message["worker_id"])
+        elif kind == "connected":
+            # (re)connected: rebuild the registry of remote clients from scratch
+            self.client_manager.remote_clients.clear()
+            self.backplane.publish({"type": "worker_joined"})
+            for client in self.client_manager.get_all_clients():
+                self._publish_client_added(client.client_id, client.first_name)
+        for listener in self._backplane_listeners.get(kind, ()):
+            await listener(message)
+
+    def _publish_client_added(self, client_id, first_name):
+        self.backplane.publish(
+            {"type": "client_added", "client_id": client_id, "first_name": first_name}
+        )
 
     def get_client_info(self, websocket):
         """
@@ -45,28 +136,72 @@ class WebSocketManager:
         """
         return self.client_manager.get_client_info(websocket)
 
-    def add_client(self, client):
+    def add_client(self, client, resumable=False, resume_token=None, last_seq=0):
         """
         Add a new client to the WebSocket manager.
 
+        If the session of the resume token is still attached to a connection that
+        has not noticed it dropped, that connection is closed and the new one takes over.
+
         Args:
             client: The WebSocket connection of the new client.
+            resumable (bool, optional): Start a resumable session for the client. Defaults to False.
+            resume_token (str, optional): The token of a session to resume.
+            last_seq (int, optional): The sequence number of the last frame the client
+                                      received in that session. Defaults to 0.
 
         Returns:
             str: The unique ID assigned to the new client.
         """
-        return self.client_manager.add_client(client)
+        if resume_token:
+            attached = self.client_manager.sessions.get_attached(resume_token)
+            if attached is not None:
+                old = self.client_manager.connected_clients[attached.client_id]
+                old.outbound.disconnect(SESSION_TAKEN_OVER_CLOSE_CODE)
+                self.remove_client(attached.client_id)
+        client_id = self.client_manager.add_client(
+            client, resumable, resume_token, last_seq
+        )
+        client_info = self.client_manager.connected_clients[client_id]
+        self._publish_client_added(client_id, client_info.first_name)
+        return client_id
 
-    def remove_client(self, client_id):
+    def remove_client(self, client_id, websocket=None):
         """
         Remove a client from the WebSocket manager.
 
         Args:
             client_id (str): The unique ID of the client to remove.
+            websocket (WebSocket, optional): Only remove the client if it is still
+                connected through this WebSocket, not through a connection that
+                resumed its session.
         """
+        client = self.client_manager.connected_clients.get(client_id)
+        if (
+            websocket is not None
+            and client is not None
+            and client.websocket is not websocket
+        ):
+            return
+        if client is not None:
+            self.backplane.publish({"type": "client_removed", "client_id": client_id})
         self.client_manager.remove_client(client_id)
+        self.rate_limiter.remove_client(client_id)
 
-    async def handle_event(self, event_name, data, websocket):
+    def get_session(self, websocket):
+        """
+        Get the resumable session of a client.
+
+        Args:
+            websocket: The WebSocket connection of the client.
+
+        Returns:
+            Optional[Session]: The session, or None if the client has none.
+        """
+        client = self.client_manager.get_client(websocket)
+        return client.session if client is not None else None
+
+    async def handle_event(self, event_name, data, websocket, raw=None):
         """
         Handle an incoming WebSocket event.
 
@@ -74,20 +209,210 @@ class WebSocketManager:
             event_name (str): The name of the event to handle.
             data (dict): The data associated with the event.
             websocket: The WebSocket connection that received the event.
+            raw (str, optional): The frame the event was decoded from, if available.
+        """
+        await self.event_handler.handle_event(event_name, data, websocket, raw)
+
+    async def send_message(self, websocket, data):
+        """
+        Send data to a single client through its outbound queue.
+
+        Connections that are not registered with the manager are written to directly.
+
+        Args:
+            websocket: The WebSocket connection of the client.
+            data (dict): The data to send.
+
+        Returns:
+            bool: False if the client's outbound queue dropped the message, True otherwise.
+        """
+        client = self.client_manager.get_client(websocket)
+        if client is None:
+            await self.broadcaster.send_message(websocket, data)
+            return True
+        return client.outbound.put(
+            codec.encode_frame(data, client.protocol), key=data.get("event")
+        )
+
+    async def send_to(self, data, client_id=None, room=None):
+        """
+        Send data to a client identified by its ID, or to all members of a room.
+
+        Args:
+            data (dict): The data to send.
+            client_id (Optional[str], optional): The ID of a client connected to this worker.
+            room (Optional[str], optional): A room; its members on all workers receive the data.
+
+        Returns:
+            bool: False if the client is not connected or its outbound queue dropped
+            the message, True otherwise.
+        """
+        if room is not None:
+            await self.broadcast(data, include_sender=True, room=room)
+            return True
+        client = self.client_manager.connected_clients.get(client_id)
+        if client is None:
+            for session in self.client_manager.sessions.detached():
+                if session.client_id == client_id:
+                    session.history.record(codec.encode_frame(data, session.protocol))
+            return False
+        return client.outbound.put(
+            codec.encode_frame(data, client.protocol), key=data.get("event")
+        )
+
+    def set_protocol(self, websocket, protocol):
+        """
+        Set the wire protocol used for messages to a client.
+
+        Args:
+            websocket: The WebSocket connection of the client.
+            protocol (str): "json" or, if msgpack is installed, "msgpack".
+
+        Returns:
+            str: The protocol the client uses from now on.
+        """
+        client = self.client_manager.get_client(websocket)
+        if client is None:
+            return codec.JSON
+        self.client_manager.set_protocol(client.client_id, protocol)
+        return client.protocol
+
+    def get_protocol(self, websocket):
+        """
+        Get the wire protocol used for messages to a client.
+
+        Args:
+            websocket: The WebSocket connection of the client.
+
+        Returns:
+            str: The negotiated protocol, "json" if the client is unknown.
+        """
+        client = self.client_manager.get_client(websocket)
+        return client.protocol if client is not None else codec.JSON
+
+    def join_room(self, client_id, room):
+        """
+        Add a client to a room.
+
+        Args:
+            client_id (str): The unique ID of the client.
+            room (str): The name of the room to join.
+
+        Returns:
+            bool: True if the client joined the room, False otherwise.
+        """
+        return self.client_manager.join_room(client_id, room)
+
+    def leave_room(self, client_id, room):
+        """
+        Remove a client from a room.
+
+        Args:
+            client_id (str): The unique ID of the client.
+            room (str): The name of the room to leave.
+
+        Returns:
+            bool: True if the client left the room, False otherwise.
         """
-        await self.event_handler.handle_event(event_name, data, websocket)
+        return self.client_manager.leave_room(client_id, room)
 
-    async def broadcast(self, data, include_sender=False):
+    async def broadcast(self, data, include_sender=False, room=None, publish=True):
         """
-        Broadcast data to all connected clients.
+        Broadcast data to all connected clients, or to the members of a room.
+
+        The broadcast is also published on the backplane, so clients connected to
+        other workers receive it as well, unless publish is False.
 
         Args:
             data (dict): The data to broadcast.
             include_sender (bool, optional): Whether to include the sender in the broadcast. Defaults to False.
+            room (str, optional): Only deliver to the members of this room. Defaults to None (all clients).
+            publish (bool, optional): Whether to publish the broadcast to other workers.
+                Defaults to True; messages that every worker derives itself are not published.
+
+        Returns:
+            BroadcastResult: The per-client outcome of the broadcast for the clients
+                             connected to this worker.
+        """
+        message = codec.EncodedMessage(data)
+        event, sender_id = data.get("event"), data.get("sender_id")
+        if publish and self.backplane.has_peers:
+            self.backplane.publish(
+                {
+                    "type": "broadcast",
+                    "frames": message.frames(codec.available_protocols()),
+                    "event": event,
+                    "sender_id": sender_id,
+                    "include_sender": include_sender,
+                    "room": room,
+                }
+            )
+        return self._broadcast_local(message, event, sender_id, include_sender, room)
+
+    def _broadcast_local(
+        self, message, event=None, sender_id=None, include_sender=False, room=None
+    ):
         """
-        clients = self.client_manager.get_all_clients()
-        await self.broadcaster.broadcast(data, clients, include_sender)
+        Queue an encoded message for the clients connected to this worker.
+
+        Args:
+            message (EncodedMessage): The message, encoded at most once per protocol.
+            event (str, optional): The event name of the message.
+            sender_id (str, optional): The ID of the client that sent the message.
+            include_sender (bool, optional): Whether to include the sender in the broadcast. Defaults to False.
+            room (str, optional): Only deliver to the members of this room. Defaults to None (all clients).
+
+        Returns:
+            BroadcastResult: The per-client outcome of the broadcast.
+        """
+        if room is None:
+            clients = self.client_manager.get_all_clients()
+        else:
+            clients = self.client_manager.get_room_clients(room)
+        # keep the message for the disconnected clients that may still resume
+        for session in self.client_manager.sessions.detached():
+            if (room is None or room in session.rooms) and (
+                include_sender or session.client_id != sender_id
+            ):
+                session.history.record(message.frame(session.protocol))
+        return self.broadcaster.broadcast_encoded(
+            message, clients, event, sender_id, include_sender
+        )
 
 
 # Create a global instance of WebSocketManager
 ws_manager = WebSocketManager()
+
+metrics.gauge(
+    "datadivr_ws_connected_clients",
+    "Clients connected to this worker.",
+    function=lambda: len(ws_manager.client_manager.connected_clients),
+)
+metrics.gauge(
+    "datadivr_ws_remote_clients",
+    "Clients connected to other workers.",
+    function=lambda: len(ws_manager.client_manager.remote_clients),
+)
+metrics.gauge(
+    "datadivr_ws_rooms",
+    "Rooms with at least one client connected to this worker.",
+    function=lambda: len(ws_manager.client_manager.get_rooms()),
+)
+metrics.gauge(
+    "datadivr_ws_outbound_queue_depth",
+    "Frames waiting in outbound queues, summed over all clients.",
+    function=lambda: sum(
+        client.outbound.depth for client in ws_manager.client_manager.get_all_clients()
+    ),
+)
+metrics.gauge(
+    "datadivr_ws_outbound_queue_max_depth",
+    "Frames waiting in the fullest outbound queue.",
+    function=lambda: max(
+        (
+            client.outbound.depth
+            for client in ws_manager.client_manager.get_all_clients()
+        ),
+        default=0,
+    ),
+)